@@ -0,0 +1,41 @@
+"""Add ai_assessment_cache table.
+
+Revision ID: a7c2e9d4b381
+Revises: f1d4b8c2a967
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a7c2e9d4b381"
+down_revision = "f1d4b8c2a967"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_assessment_cache",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("cache_key", sa.String(length=64), nullable=False),
+        sa.Column("document_sha256", sa.String(length=128), nullable=False),
+        sa.Column("context_hash", sa.String(length=64), nullable=False),
+        sa.Column("prompt_version", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("latency_ms", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("cache_key"),
+    )
+    op.create_index("ix_ai_assessment_cache_document_sha256", "ai_assessment_cache", ["document_sha256"])
+    op.create_index("ix_ai_assessment_cache_expires_at", "ai_assessment_cache", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_assessment_cache_expires_at", table_name="ai_assessment_cache")
+    op.drop_index("ix_ai_assessment_cache_document_sha256", table_name="ai_assessment_cache")
+    op.drop_table("ai_assessment_cache")
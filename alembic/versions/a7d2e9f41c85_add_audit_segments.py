@@ -0,0 +1,41 @@
+"""Add audit_segments table for archived audit rows.
+
+Revision ID: a7d2e9f41c85
+Revises: f3c8a1d6b254
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a7d2e9f41c85"
+down_revision = "f3c8a1d6b254"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_segments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("first_id", sa.Integer(), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("min_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("max_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("entities", sa.JSON(), nullable=False),
+        sa.Column("blocks", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("filename", name="uq_audit_segments_filename"),
+    )
+    op.create_index("ix_audit_segments_min_at_max_at", "audit_segments", ["min_at", "max_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_segments_min_at_max_at", table_name="audit_segments")
+    op.drop_table("audit_segments")
@@ -0,0 +1,31 @@
+"""Add cache_versions table.
+
+Revision ID: b41c7e9a2d10
+Revises: add_stripe_fields_to_users
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b41c7e9a2d10"
+down_revision = "add_stripe_fields_to_users"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cache_versions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("name", name="uq_cache_versions_name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cache_versions")
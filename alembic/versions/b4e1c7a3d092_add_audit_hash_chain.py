@@ -0,0 +1,55 @@
+"""Add audit hash chain columns and audit_checkpoints table.
+
+Revision ID: b4e1c7a3d092
+Revises: a7d2e9f41c85
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b4e1c7a3d092"
+down_revision = "a7d2e9f41c85"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("audit_logs") as batch_op:
+        batch_op.add_column(sa.Column("chain_seq", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("row_hash", sa.String(length=64), nullable=True))
+        batch_op.create_index("ux_audit_logs_chain_seq", ["chain_seq"], unique=True)
+
+    with op.batch_alter_table("audit_segments") as batch_op:
+        batch_op.add_column(sa.Column("first_seq", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("last_seq", sa.Integer(), nullable=True))
+
+    op.create_table(
+        "audit_checkpoints",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("first_seq", sa.Integer(), nullable=False),
+        sa.Column("last_seq", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("merkle_root", sa.String(length=64), nullable=False),
+        sa.Column("chain_head", sa.String(length=64), nullable=False),
+        sa.Column("verified_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("first_seq", name="uq_audit_checkpoints_first_seq"),
+    )
+    op.create_index("ix_audit_checkpoints_last_seq", "audit_checkpoints", ["last_seq"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_checkpoints_last_seq", table_name="audit_checkpoints")
+    op.drop_table("audit_checkpoints")
+
+    with op.batch_alter_table("audit_segments") as batch_op:
+        batch_op.drop_column("last_seq")
+        batch_op.drop_column("first_seq")
+
+    with op.batch_alter_table("audit_logs") as batch_op:
+        batch_op.drop_index("ux_audit_logs_chain_seq")
+        batch_op.drop_column("row_hash")
+        batch_op.drop_column("chain_seq")
@@ -0,0 +1,25 @@
+"""Add a compare-and-set version to rate_limit_buckets.
+
+Revision ID: b9e4d1a7c302
+Revises: a7c2e9d4b381
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b9e4d1a7c302"
+down_revision = "a7c2e9d4b381"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("rate_limit_buckets") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("rate_limit_buckets") as batch_op:
+        batch_op.drop_column("version")
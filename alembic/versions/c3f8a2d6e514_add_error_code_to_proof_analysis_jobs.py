@@ -0,0 +1,25 @@
+"""Add a client-facing error_code to proof_analysis_jobs.
+
+Revision ID: c3f8a2d6e514
+Revises: b9e4d1a7c302
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c3f8a2d6e514"
+down_revision = "b9e4d1a7c302"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("proof_analysis_jobs") as batch_op:
+        batch_op.add_column(sa.Column("error_code", sa.String(length=40), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("proof_analysis_jobs") as batch_op:
+        batch_op.drop_column("error_code")
@@ -0,0 +1,57 @@
+"""Add escrow_balances table backfilled from deposits and payments.
+
+Revision ID: c5a8e2f7b613
+Revises: b4e1c7a3d092
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c5a8e2f7b613"
+down_revision = "b4e1c7a3d092"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "escrow_balances",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("escrow_id", sa.Integer(), sa.ForeignKey("escrow_agreements.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("deposited", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("paid", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("reserved", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("escrow_id", name="uq_escrow_balances_escrow_id"),
+    )
+
+    op.execute(
+        """
+        INSERT INTO escrow_balances (escrow_id, deposited, paid, reserved, version, created_at, updated_at)
+        SELECT
+            e.id,
+            COALESCE((SELECT SUM(d.amount) FROM escrow_deposits d WHERE d.escrow_id = e.id), 0),
+            COALESCE(
+                (SELECT SUM(p.amount) FROM payments p
+                 WHERE p.escrow_id = e.id AND p.status IN ('SENT', 'SETTLED')),
+                0
+            ),
+            COALESCE(
+                (SELECT SUM(p.amount) FROM payments p
+                 WHERE p.escrow_id = e.id AND p.status = 'PENDING'),
+                0
+            ),
+            0,
+            CURRENT_TIMESTAMP,
+            CURRENT_TIMESTAMP
+        FROM escrow_agreements e
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("escrow_balances")
@@ -0,0 +1,43 @@
+"""Add api_key_usage_rollups table.
+
+Revision ID: c82d5f0b7e31
+Revises: b41c7e9a2d10
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c82d5f0b7e31"
+down_revision = "b41c7e9a2d10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "api_key_usage_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("api_key_id", sa.Integer(), nullable=False),
+        sa.Column("scope", sa.String(length=20), nullable=False),
+        sa.Column("route", sa.String(length=255), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint(
+            "api_key_id", "scope", "route", "bucket_start", name="uq_api_key_usage_bucket"
+        ),
+    )
+    op.create_index(
+        "ix_api_key_usage_key_bucket",
+        "api_key_usage_rollups",
+        ["api_key_id", "bucket_start"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_api_key_usage_key_bucket", table_name="api_key_usage_rollups")
+    op.drop_table("api_key_usage_rollups")
@@ -0,0 +1,57 @@
+"""Add ledger_entries journal and ledger_snapshots.
+
+Revision ID: d2b7f4a9c158
+Revises: c5a8e2f7b613
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d2b7f4a9c158"
+down_revision = "c5a8e2f7b613"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ledger_entries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("txn_id", sa.String(length=32), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("account", sa.String(length=64), nullable=False),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("source", sa.String(length=32), nullable=False),
+        sa.Column("source_id", sa.Integer(), nullable=False),
+        sa.Column("at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_ledger_entries_account_id", "ledger_entries", ["account", "id"])
+    op.create_index("ix_ledger_entries_txn_id", "ledger_entries", ["txn_id"])
+    op.create_index("ix_ledger_entries_source", "ledger_entries", ["source", "source_id"])
+
+    op.create_table(
+        "ledger_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("account", sa.String(length=64), nullable=False),
+        sa.Column("balance", sa.Numeric(18, 2), nullable=False),
+        sa.Column("last_entry_id", sa.Integer(), nullable=False),
+        sa.Column("as_of", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("account", "last_entry_id", name="uq_ledger_snapshots_account_entry"),
+    )
+    op.create_index("ix_ledger_snapshots_account_as_of", "ledger_snapshots", ["account", "as_of"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ledger_snapshots_account_as_of", table_name="ledger_snapshots")
+    op.drop_table("ledger_snapshots")
+    op.drop_index("ix_ledger_entries_source", table_name="ledger_entries")
+    op.drop_index("ix_ledger_entries_txn_id", table_name="ledger_entries")
+    op.drop_index("ix_ledger_entries_account_id", table_name="ledger_entries")
+    op.drop_table("ledger_entries")
@@ -0,0 +1,32 @@
+"""Add rate_limit_buckets table.
+
+Revision ID: d5a91e3c4f62
+Revises: c82d5f0b7e31
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d5a91e3c4f62"
+down_revision = "c82d5f0b7e31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("bucket_key", sa.String(length=255), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("refilled_at", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("bucket_key", name="uq_rate_limit_buckets_key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_buckets")
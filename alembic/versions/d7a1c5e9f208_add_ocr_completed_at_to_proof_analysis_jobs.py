@@ -0,0 +1,25 @@
+"""Record OCR completion on proof_analysis_jobs so retries skip it.
+
+Revision ID: d7a1c5e9f208
+Revises: c3f8a2d6e514
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d7a1c5e9f208"
+down_revision = "c3f8a2d6e514"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("proof_analysis_jobs") as batch_op:
+        batch_op.add_column(sa.Column("ocr_completed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("proof_analysis_jobs") as batch_op:
+        batch_op.drop_column("ocr_completed_at")
@@ -0,0 +1,47 @@
+"""Add milestone progress counters to escrow_agreements.
+
+Revision ID: e8c3a6d1f274
+Revises: d2b7f4a9c158
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e8c3a6d1f274"
+down_revision = "d2b7f4a9c158"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("escrow_agreements") as batch_op:
+        batch_op.add_column(sa.Column("milestones_total", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("milestones_paid", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("current_milestone_idx", sa.Integer(), nullable=True))
+
+    op.execute(
+        """
+        UPDATE escrow_agreements SET
+            milestones_total = (
+                SELECT COUNT(*) FROM milestones m WHERE m.escrow_id = escrow_agreements.id
+            ),
+            milestones_paid = (
+                SELECT COUNT(*) FROM milestones m
+                WHERE m.escrow_id = escrow_agreements.id AND m.status = 'PAID'
+            ),
+            current_milestone_idx = (
+                SELECT MIN(m.idx) FROM milestones m
+                WHERE m.escrow_id = escrow_agreements.id
+                  AND m.status IN ('WAITING', 'PENDING_REVIEW', 'APPROVED', 'PAYING')
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("escrow_agreements") as batch_op:
+        batch_op.drop_column("current_milestone_idx")
+        batch_op.drop_column("milestones_paid")
+        batch_op.drop_column("milestones_total")
@@ -0,0 +1,51 @@
+"""Add proof_analysis_jobs queue and proofs.analysis_status.
+
+Revision ID: f1d4b8c2a967
+Revises: e8c3a6d1f274
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f1d4b8c2a967"
+down_revision = "e8c3a6d1f274"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("proofs") as batch_op:
+        batch_op.add_column(sa.Column("analysis_status", sa.String(length=20), nullable=True))
+
+    op.create_table(
+        "proof_analysis_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("proof_id", sa.Integer(), sa.ForeignKey("proofs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="QUEUED"),
+        sa.Column("run_ocr", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("run_ai", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("backend_checks", sa.JSON(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("locked_by", sa.String(length=64), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("proof_id"),
+    )
+    op.create_index(
+        "ix_proof_analysis_jobs_status_available_at",
+        "proof_analysis_jobs",
+        ["status", "available_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_proof_analysis_jobs_status_available_at", table_name="proof_analysis_jobs")
+    op.drop_table("proof_analysis_jobs")
+    with op.batch_alter_table("proofs") as batch_op:
+        batch_op.drop_column("analysis_status")
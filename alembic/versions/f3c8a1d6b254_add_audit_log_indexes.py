@@ -0,0 +1,26 @@
+"""Add lookup indexes to audit_logs.
+
+Revision ID: f3c8a1d6b254
+Revises: e1f4b7c2a903
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f3c8a1d6b254"
+down_revision = "e1f4b7c2a903"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_audit_logs_entity_entity_id_at", "audit_logs", ["entity", "entity_id", "at"]
+    )
+    op.create_index("ix_audit_logs_actor_at", "audit_logs", ["actor", "at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_logs_actor_at", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_entity_entity_id_at", table_name="audit_logs")
@@ -1,8 +1,22 @@
-"""Application configuration settings."""
+"""Application configuration settings.
+
+``get_settings()`` returns an immutable ``Settings`` snapshot held by the
+module-level ``SettingsProvider``. Reading it is a plain attribute load; the
+snapshot is only rebuilt when the ``.env`` file changes or a reload is
+requested (``SIGHUP``), and that work happens on the provider's refresher
+thread rather than on request threads. Components that cache objects built
+from settings (the Stripe client, the AI client) subscribe to be told when a
+new snapshot replaces the old one.
+"""
 from __future__ import annotations
 
+import logging
 import os
+import threading
 import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
 
 from pydantic import AliasChoices, BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -34,6 +48,8 @@ class Settings(BaseSettings):
 
     app_env: str = ENV
     database_url: str = "sqlite:///kobatella.db"
+    # Async driver URL; derived from database_url (aiosqlite / asyncpg) when unset.
+    ASYNC_DATABASE_URL: str | None = None
     psp_webhook_secret: str | None = None
     psp_webhook_secret_next: str | None = None
     psp_webhook_max_drift_seconds: int = 180
@@ -55,6 +71,12 @@ class Settings(BaseSettings):
     SENTRY_DSN: str | None = None
     PROMETHEUS_ENABLED: bool = True
 
+    # --- SQL instrumentation ---------------------------------------------
+    SQL_QUERY_STATS_ENABLED: bool = True
+    SERVER_TIMING_HEADER_ENABLED: bool = True
+    # Log a possible N+1 when one statement repeats this often in a request.
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
+
     # --- AI Proof Advisor (MVP) ------------------------------------------
     AI_PROOF_ADVISOR_ENABLED: bool = False
     AI_PROOF_ADVISOR_PROVIDER: str = "openai"
@@ -64,12 +86,152 @@ class Settings(BaseSettings):
     AI_PROOF_MAX_PDF_PAGES: int = 5
     AI_PROOF_TIMEOUT_SECONDS: int = 12
     OPENAI_API_KEY: str | None = None
+    # Advisor calls share one event loop and HTTP connection pool; at most
+    # AI_PROOF_MAX_CONCURRENCY are in flight. Each call has an end-to-end
+    # deadline split across its attempts (AI_PROOF_TIMEOUT_SECONDS caps one
+    # attempt), with full-jitter backoff between them.
+    AI_PROOF_ADVISOR_BASE_URL: str = "https://api.openai.com/v1"
+    AI_PROOF_MAX_CONCURRENCY: int = 8
+    AI_PROOF_DEADLINE_SECONDS: float = 30.0
+    AI_PROOF_MAX_ATTEMPTS: int = 3
+    AI_PROOF_BACKOFF_BASE_MS: int = 200
+    AI_PROOF_BACKOFF_MAX_MS: int = 2000
+    # The breaker opens after this many failed calls inside the window and
+    # lets one probe call through once the cooldown has passed.
+    AI_PROOF_BREAKER_FAILURES: int = 5
+    AI_PROOF_BREAKER_WINDOW_SECONDS: int = 60
+    AI_PROOF_BREAKER_COOLDOWN_SECONDS: int = 30
+    # The compact context is cut down to this many (estimated) tokens; 0 = no
+    # limit. The system prompt goes first, unchanged, with this cache key
+    # (plus the prompt version) so the provider can reuse it as a prefix.
+    AI_PROOF_CONTEXT_TOKEN_BUDGET: int = 1200
+    AI_PROOF_PROMPT_CACHE_KEY: str = "kobatella-proof-advisor"
+
+    # --- AI pre-screening ------------------------------------------------
+    # Backend checks are scored locally first; at this clean (or 1 - this
+    # suspect) probability the local verdict is used and the model skipped.
+    AI_PRESCREEN_ENABLED: bool = True
+    AI_PRESCREEN_CONFIDENCE: float = 0.95
+
+    # --- AI assessment cache ---------------------------------------------
+    # Advisor results keyed by (document sha256, sanitized context, prompt
+    # version, model): an in-process LRU in front of ai_assessment_cache.
+    AI_ASSESSMENT_CACHE_ENABLED: bool = True
+    AI_ASSESSMENT_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    AI_ASSESSMENT_CACHE_MAX_ENTRIES: int = 1024
+    AI_ASSESSMENT_CACHE_VERSION_CHECK_SECONDS: int = 5
+    AI_ASSESSMENT_CACHE_PURGE_HOURS: int = 24
+
+    # --- Proof analysis --------------------------------------------------
+    # OCR and AI advice run from proof_analysis_jobs on a bounded worker pool
+    # (0 workers = jobs stay queued for another process or a manual drain).
+    PROOF_ANALYSIS_WORKERS: int = 2
+    PROOF_ANALYSIS_POLL_MS: int = 500
+    PROOF_ANALYSIS_MAX_ATTEMPTS: int = 3
+    PROOF_ANALYSIS_RETRY_SECONDS: int = 30
+    # A RUNNING job whose worker died is claimed again after this long.
+    PROOF_ANALYSIS_LEASE_SECONDS: int = 300
 
     # --- Invoice OCR -----------------------------------------------------
     INVOICE_OCR_ENABLED: bool = False
     INVOICE_OCR_PROVIDER: str = "none"
     INVOICE_OCR_API_KEY: str | None = None
 
+    # --- Read replica ----------------------------------------------------
+    # Safe GET handlers read from this URL when set (see app/core/read_replica.py).
+    DATABASE_READ_URL: str | None = None
+    READ_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    READ_REPLICA_LAG_CHECK_SECONDS: float = 2.0
+    READ_AFTER_WRITE_STICKY_SECONDS: float = 5.0
+    READ_REPLICA_HEARTBEAT_SECONDS: int = 2
+    # Dev/test stand-in for replication: copy the primary SQLite file every N seconds (0 = off).
+    READ_REPLICA_SQLITE_COPY_SECONDS: int = 0
+
+    # --- Database pool ---------------------------------------------------
+    # Ignored for in-memory SQLite; file SQLite and Postgres use a QueuePool.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # --- SQLite performance profile (file-backed SQLite only) ------------
+    SQLITE_PERFORMANCE_PROFILE: bool = False
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KIB: int = 65536
+    SQLITE_MMAP_SIZE_BYTES: int = 268_435_456
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_WAL_CHECKPOINT_MINUTES: int = 5
+    SQLITE_WAL_CHECKPOINT_MODE: str = "PASSIVE"
+
+    # --- API key cache ---------------------------------------------------
+    API_KEY_CACHE_ENABLED: bool = True
+    API_KEY_CACHE_TTL_SECONDS: int = 60
+    API_KEY_CACHE_MAX_ENTRIES: int = 1024
+    API_KEY_CACHE_VERSION_CHECK_SECONDS: int = 5
+
+    # --- API key usage write-behind --------------------------------------
+    API_KEY_USAGE_BUFFER_ENABLED: bool = True
+    API_KEY_USAGE_FLUSH_INTERVAL_MS: int = 1000
+    API_KEY_USAGE_FLUSH_MAX_ENTRIES: int = 500
+    # Fraction of non-admin calls that still get a raw API_KEY_USED audit row.
+    API_KEY_USAGE_AUDIT_SAMPLE_RATE: float = 0.0
+
+    # --- Audit outbox ----------------------------------------------------
+    # Audit entries are committed to audit_outbox with the business change and
+    # copied to audit_logs in batches by a background writer.
+    AUDIT_OUTBOX_ENABLED: bool = True
+    AUDIT_OUTBOX_FLUSH_INTERVAL_MS: int = 250
+    AUDIT_OUTBOX_BATCH_SIZE: int = 500
+
+    # --- Audit archive (cold tier) ---------------------------------------
+    # Rows older than AUDIT_ARCHIVE_AFTER_DAYS move to compressed segment files.
+    AUDIT_ARCHIVE_ENABLED: bool = False
+    AUDIT_ARCHIVE_DIR: str = "audit_archive"
+    AUDIT_ARCHIVE_AFTER_DAYS: int = 180
+    AUDIT_ARCHIVE_INTERVAL_HOURS: int = 24
+    AUDIT_ARCHIVE_SEGMENT_ROWS: int = 50_000
+    AUDIT_ARCHIVE_BLOCK_ROWS: int = 1000
+    AUDIT_ARCHIVE_DELETE_CHUNK: int = 1000
+
+    # --- Audit hash chain -------------------------------------------------
+    # Rows are chained by hash in seal order; checkpoints pin Merkle roots.
+    AUDIT_CHAIN_ENABLED: bool = True
+    AUDIT_CHAIN_SEAL_SECONDS: int = 30
+    AUDIT_CHAIN_BATCH_SIZE: int = 1000
+    AUDIT_CHECKPOINT_MINUTES: int = 60
+    AUDIT_CHECKPOINT_MAX_ROWS: int = 65_536
+    AUDIT_VERIFY_HOURS: int = 24
+    AUDIT_VERIFY_WORKERS: int = 0  # 0 = one per CPU
+    AUDIT_VERIFY_CHUNK_ROWS: int = 4096  # rounded down to a power of two
+
+    # --- Ledger ----------------------------------------------------------
+    # Balances are snapshotted so point-in-time reads only scan a short tail.
+    LEDGER_SNAPSHOT_ENABLED: bool = True
+    LEDGER_SNAPSHOT_MINUTES: int = 15
+    # Entries younger than this stay in the tail so late commits are not skipped.
+    LEDGER_SNAPSHOT_LAG_SECONDS: int = 60
+
+    # --- Reconciliation --------------------------------------------------
+    # Re-sums source rows per id chunk and alerts when cached totals drift.
+    RECONCILE_ENABLED: bool = True
+    RECONCILE_HOURS: int = 6
+    RECONCILE_CHUNK_SIZE: int = 500
+    RECONCILE_WORKERS: int = 4
+    RECONCILE_MAX_ALERTS: int = 100
+
+    # --- Rate limiting ---------------------------------------------------
+    # Token buckets per (API key, route); PER_MINUTE=0 disables a scope's limit.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (single worker) | "db" (shared)
+    RATE_LIMIT_SENDER_PER_MINUTE: int = 120
+    RATE_LIMIT_SENDER_BURST: int = 30
+    RATE_LIMIT_SUPPORT_PER_MINUTE: int = 300
+    RATE_LIMIT_SUPPORT_BURST: int = 60
+    RATE_LIMIT_ADMIN_PER_MINUTE: int = 0
+    RATE_LIMIT_ADMIN_BURST: int = 0
+
     # --- Scheduler -------------------------------------------------------
     SCHEDULER_ENABLED: bool = SCHEDULER_ENABLED
     SCHEDULER_CRON: str = SCHEDULER_CRON
@@ -77,8 +239,12 @@ class Settings(BaseSettings):
     # --- Lifespan safeguards --------------------------------------------
     ALLOW_DB_CREATE_ALL: bool = False
 
+    # --- Settings reload -------------------------------------------------
+    # How often the refresher thread checks .env for changes (0 disables it).
+    SETTINGS_REFRESH_SECONDS: float = 5.0
+
     model_config = SettingsConfigDict(
-        env_file=".env", env_prefix="", env_file_encoding="utf-8"
+        env_file=".env", env_prefix="", env_file_encoding="utf-8", frozen=True
     )
 
     @field_validator("psp_webhook_secret", "psp_webhook_secret_next")
@@ -97,27 +263,166 @@ class AppInfo(BaseModel):
     version: str = "0.1.0"
 
 
-_SETTINGS_CACHE: Settings | None = None
-_SETTINGS_LOADED_AT: float | None = None
-_SETTINGS_TTL_SECONDS = 60.0
+logger = logging.getLogger(__name__)
 
+SettingsListener = Callable[[Settings, Settings], None]
 
-def get_settings() -> Settings:
-    """Return cached application settings with a TTL refresh."""
 
-    global _SETTINGS_CACHE, _SETTINGS_LOADED_AT
-    now = time.time()
+class SettingsProvider:
+    """Hold the current settings snapshot and swap it when configuration changes."""
+
+    def __init__(self, factory: Callable[[], Settings] = Settings, env_file: str | os.PathLike = ".env") -> None:
+        self._factory = factory
+        self._env_file = Path(env_file)
+        self._snapshot: Settings | None = None
+        self._env_mtime: float | None = None
+        # Serialises (re)loads and subscriber changes; never taken by get().
+        self._lock = threading.RLock()
+        self._reload_requested = threading.Event()
+        self._listeners: list[SettingsListener] = []
+        self._refresher: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._reloads = 0
+        self._reload_errors = 0
+        self._last_reload_at: float | None = None
+
+    def _env_file_mtime(self) -> float | None:
+        try:
+            return self._env_file.stat().st_mtime
+        except OSError:
+            return None
+
+    def get(self) -> Settings:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                self._env_mtime = self._env_file_mtime()
+                self._snapshot = self._factory()
+            return self._snapshot
+
+    def _swap(self, new: Settings) -> Settings:
+        with self._lock:
+            old = self.get()
+            self._snapshot = new
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(old, new)
+            except Exception:  # noqa: BLE001
+                logger.exception("Settings listener failed", extra={"listener": repr(listener)})
+        return old
+
+    def reload(self, *, force: bool = False) -> bool:
+        """Re-read the environment; swap and notify only if a value changed."""
+
+        with self._lock:
+            current = self.get()
+            self._env_mtime = self._env_file_mtime()
+            try:
+                fresh = self._factory()
+            except Exception:  # noqa: BLE001
+                self._reload_errors += 1
+                logger.exception("Settings reload failed; keeping the current snapshot")
+                return False
+            if not force and fresh.model_dump() == current.model_dump():
+                return False
+            self._reloads += 1
+            self._last_reload_at = time.time()
+            self._swap(fresh)
+        logger.info("Settings reloaded", extra={"reloads": self._reloads})
+        return True
+
+    def request_reload(self, *_signal_args: object) -> None:
+        """Ask the refresher to reload on its next pass (safe from a signal handler)."""
+
+        self._reload_requested.set()
+
+    def check_for_changes(self) -> bool:
+        """Reload when ``.env`` was modified or a reload was requested."""
+
+        requested = self._reload_requested.is_set()
+        if not requested and self._env_file_mtime() == self._env_mtime:
+            return False
+        self._reload_requested.clear()
+        return self.reload()
+
+    def subscribe(self, listener: SettingsListener) -> Callable[[], None]:
+        """Call ``listener(old, new)`` after every swap; returns an unsubscribe callable."""
+
+        with self._lock:
+            self._listeners.append(listener)
+
+        def _unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return _unsubscribe
+
+    @contextmanager
+    def override(self, **changes: object) -> Iterator[Settings]:
+        """Temporarily replace the snapshot with a copy carrying ``changes``."""
+
+        unknown = set(changes) - set(Settings.model_fields)
+        if unknown:
+            raise AttributeError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        previous = self.get()
+        overridden = previous.model_copy(update=changes)
+        self._swap(overridden)
+        try:
+            yield overridden
+        finally:
+            self._swap(previous)
+
+    def _run_refresher(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.check_for_changes()
+            except Exception:  # noqa: BLE001
+                logger.exception("Settings refresher pass failed")
+
+    def start_refresher(self, interval: float | None = None) -> None:
+        interval = self.get().SETTINGS_REFRESH_SECONDS if interval is None else interval
+        with self._lock:
+            if interval <= 0 or (self._refresher is not None and self._refresher.is_alive()):
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(
+                target=self._run_refresher, args=(interval,), name="settings-refresher", daemon=True
+            )
+            self._refresher.start()
+
+    def stop_refresher(self) -> None:
+        with self._lock:
+            refresher, self._refresher = self._refresher, None
+        if refresher is None:
+            return
+        self._stop.set()
+        refresher.join(timeout=5)
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "reloads": self._reloads,
+            "reload_errors": self._reload_errors,
+            "last_reload_at": self._last_reload_at,
+            "listeners": len(self._listeners),
+            "refresher_running": self._refresher is not None and self._refresher.is_alive(),
+        }
+
+
+settings_provider = SettingsProvider()
+
+
+def get_settings() -> Settings:
+    """Return the current immutable settings snapshot."""
 
-    if _SETTINGS_CACHE is None or _SETTINGS_LOADED_AT is None:
-        _SETTINGS_CACHE = Settings()
-        _SETTINGS_LOADED_AT = now
-        return _SETTINGS_CACHE
+    return settings_provider.get()
 
-    if now - _SETTINGS_LOADED_AT > _SETTINGS_TTL_SECONDS:
-        _SETTINGS_CACHE = Settings()
-        _SETTINGS_LOADED_AT = now
 
-    return _SETTINGS_CACHE
+def get_settings_stats() -> dict[str, object]:
+    return settings_provider.stats()
 
 
 __all__ = [
@@ -128,6 +433,9 @@ __all__ = [
     "SCHEDULER_ENABLED",
     "SCHEDULER_CRON",
     "Settings",
+    "SettingsProvider",
     "AppInfo",
     "get_settings",
+    "get_settings_stats",
+    "settings_provider",
 ]
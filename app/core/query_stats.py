@@ -0,0 +1,161 @@
+"""Per-request SQL statement counting and timing.
+
+Global ``before/after_cursor_execute`` listeners time every statement and add
+it to whichever collectors are active in the current context. The
+``QueryStatsMiddleware`` opens one collector per HTTP request, exports the
+totals as Prometheus histograms and adds a ``Server-Timing`` header such as
+``db;dur=4.12;desc="6 queries"``.
+
+Collectors nest: ``capture_queries()`` used around a test request sees the
+same statements as the request's own collector. Statements are keyed by their
+SQL text (parameters excluded), so the same statement executed many times in
+one request is reported by ``repeated()`` — the usual shape of an N+1.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter as StatementCounter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DB_QUERIES = Histogram(
+    "kobatella_request_db_queries",
+    "SQL statements executed per HTTP request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "kobatella_request_db_seconds",
+    "Time spent in SQL statements per HTTP request.",
+    ["method", "route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+_START_KEY = "query_stats_started"
+
+
+@dataclass
+class QueryStats:
+    """Statements seen while the collector was active."""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    statements: StatementCounter = field(default_factory=StatementCounter)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_seconds * 1000.0
+
+    def repeated(self, threshold: int = 2) -> dict[str, int]:
+        """Statements executed at least ``threshold`` times."""
+
+        return {sql: n for sql, n in self.statements.items() if n >= threshold}
+
+    def describe(self, limit: int = 5) -> str:
+        lines = [f"{self.count} queries in {self.total_ms:.2f} ms"]
+        for sql, n in self.statements.most_common(limit):
+            lines.append(f"  {n}x {' '.join(sql.split())[:160]}")
+        return "\n".join(lines)
+
+
+_ACTIVE: ContextVar[tuple[QueryStats, ...]] = ContextVar("query_stats_active", default=())
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _ACTIVE.get():
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    collectors = _ACTIVE.get()
+    starts = conn.info.get(_START_KEY)
+    if not collectors or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for stats in collectors:
+        stats.record(statement, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start time.
+    connection = exception_context.connection
+    starts = connection.info.get(_START_KEY) if connection is not None else None
+    if starts:
+        starts.pop()
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Collect every statement executed in this context (and threads it spawns via anyio)."""
+
+    stats = QueryStats()
+    token = _ACTIVE.set(_ACTIVE.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _ACTIVE.reset(token)
+
+
+def _server_timing(stats: QueryStats) -> bytes:
+    return f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"'.encode("latin-1")
+
+
+class QueryStatsMiddleware:
+    """Count statements per request; export histograms and a Server-Timing header."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        settings = get_settings()
+        if scope["type"] != "http" or not settings.SQL_QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        async def _send(message) -> None:
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_HEADER_ENABLED:
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", _server_timing(stats))]
+            await send(message)
+
+        with capture_queries() as stats:
+            try:
+                await self.app(scope, receive, _send)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                REQUEST_DB_QUERIES.labels(method=scope["method"], route=route).observe(stats.count)
+                REQUEST_DB_SECONDS.labels(method=scope["method"], route=route).observe(stats.total_seconds)
+                repeated = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+                if repeated:
+                    statement, repeats = max(repeated.items(), key=lambda item: item[1])
+                    logger.warning(
+                        "Repeated SQL statement within one request (possible N+1)",
+                        extra={
+                            "route": route,
+                            "method": scope["method"],
+                            "repeats": repeats,
+                            "statement": " ".join(statement.split())[:200],
+                        },
+                    )
+
+
+__all__ = ["QueryStats", "QueryStatsMiddleware", "capture_queries"]
@@ -0,0 +1,477 @@
+"""Optional read replica for safe GET handlers.
+
+When ``DATABASE_READ_URL`` is set, handlers that only read declare
+``get_read_db`` / ``get_async_read_db`` instead of ``get_db`` /
+``get_async_db`` and are served from the replica. Reads fall back to the
+primary when:
+
+* no replica is configured;
+* the caller issued a write (any non-safe method) within the last
+  ``READ_AFTER_WRITE_STICKY_SECONDS``, so clients read their own writes.
+  Write responses carry a short-lived ``kob_read_primary_until`` cookie, so
+  the next read honours it on whichever worker serves it; clients that drop
+  cookies are only remembered by the worker that took their write;
+* the measured replica lag exceeds ``READ_REPLICA_MAX_LAG_SECONDS`` or
+  cannot be measured. The lag is re-measured off the request path every
+  ``READ_REPLICA_LAG_CHECK_SECONDS``; routing only reads the cached value.
+
+Sessions handed out here are read-only: flushing pending changes raises.
+
+Lag is measured through a heartbeat row in ``cache_versions`` that the
+primary bumps periodically (``write_replica_heartbeat``). For Postgres
+streaming replicas ``pg_last_xact_replay_timestamp()`` is used instead.
+``copy_sqlite_replica`` keeps a second SQLite file in sync with the backup
+API, a stand-in for real replication in development and tests.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Generator
+from datetime import datetime, timezone
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app import db
+from app.config import get_settings
+from app.models.cache_version import CacheVersion
+
+logger = logging.getLogger(__name__)
+
+REPLICA_HEARTBEAT_NAME = "replica_heartbeat"
+READ_PRIMARY_COOKIE = "kob_read_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+read_engine: Engine | None = None
+ReadSessionLocal: sessionmaker[Session] | None = None
+async_read_engine: AsyncEngine | None = None
+AsyncReadSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+
+class ReadOnlySessionError(RuntimeError):
+    """Raised when a handler tries to write through a read-only session."""
+
+
+class ReadOnlySession(Session):
+    """Session used for replica reads (and their primary fallback)."""
+
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def _reject_writes(session: Session, flush_context, instances) -> None:
+    if session.new or session.dirty or session.deleted:
+        raise ReadOnlySessionError("Read-only session cannot flush changes; use get_db for writes.")
+
+
+# --- Engines -------------------------------------------------------------
+
+
+def init_read_engine() -> Engine | None:
+    """Create the replica engine when ``DATABASE_READ_URL`` is configured."""
+
+    global read_engine, ReadSessionLocal
+    url = get_settings().DATABASE_READ_URL
+    if read_engine is None and url:
+        kwargs = db._engine_kwargs(url)
+        if "poolclass" in kwargs:
+            # Keep the primary's checkout telemetry free of replica traffic.
+            kwargs["poolclass"] = QueuePool
+        read_engine = create_engine(url, future=True, echo=False, **kwargs)
+        ReadSessionLocal = sessionmaker(
+            bind=read_engine,
+            class_=ReadOnlySession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return read_engine
+
+
+def init_async_read_engine() -> AsyncEngine | None:
+    global async_read_engine, AsyncReadSessionLocal
+    url = get_settings().DATABASE_READ_URL
+    if async_read_engine is None and url:
+        async_url = db.async_database_url(url)
+        async_read_engine = create_async_engine(async_url, echo=False, **db._async_engine_kwargs(async_url))
+        AsyncReadSessionLocal = async_sessionmaker(
+            bind=async_read_engine,
+            sync_session_class=ReadOnlySession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return async_read_engine
+
+
+async def close_read_engines() -> None:
+    global read_engine, ReadSessionLocal, async_read_engine, AsyncReadSessionLocal
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
+    if read_engine is not None:
+        read_engine.dispose()
+    read_engine = ReadSessionLocal = async_read_engine = AsyncReadSessionLocal = None
+    _LAG_MONITOR.reset()
+
+
+# --- Read-your-own-writes -------------------------------------------------
+
+
+def _client_fingerprint(headers) -> str | None:
+    token = headers.get("x-api-key") or headers.get("authorization")
+    if not token:
+        return None
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+class RecentWriters:
+    """Clients that wrote recently, kept for the sticky window (bounded LRU)."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self._lock = threading.Lock()
+        self._writes: OrderedDict[str, float] = OrderedDict()
+        self._max_entries = max_entries
+
+    def mark(self, fingerprint: str, now: float | None = None) -> None:
+        with self._lock:
+            self._writes[fingerprint] = now if now is not None else time.monotonic()
+            self._writes.move_to_end(fingerprint)
+            while len(self._writes) > self._max_entries:
+                self._writes.popitem(last=False)
+
+    def wrote_within(self, fingerprint: str, seconds: float) -> bool:
+        with self._lock:
+            at = self._writes.get(fingerprint)
+        return at is not None and time.monotonic() - at <= seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes.clear()
+
+
+_RECENT_WRITERS = RecentWriters()
+
+
+def _sticky_cookie(seconds: float) -> bytes:
+    until = time.time() + seconds
+    return (
+        f"{READ_PRIMARY_COOKIE}={until:.3f}; Max-Age={math.ceil(seconds)}; Path=/; HttpOnly; SameSite=Lax"
+    ).encode("latin-1")
+
+
+def _cookie_sticky(request: Request, seconds: float) -> bool:
+    """True while the client's read-after-write cookie is still running."""
+
+    try:
+        until = float(request.cookies.get(READ_PRIMARY_COOKIE, ""))
+    except ValueError:
+        return False
+    now = time.time()
+    # Ignore values further out than one window: the cookie is client-controlled.
+    return now < until <= now + seconds
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware remembering which clients just sent a non-safe request.
+
+    The writer is remembered locally and handed a sticky cookie, so other
+    workers route its next reads to the primary too.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        fingerprint = _client_fingerprint(headers)
+        if fingerprint:
+            _RECENT_WRITERS.mark(fingerprint)
+
+        settings = get_settings()
+        seconds = settings.READ_AFTER_WRITE_STICKY_SECONDS
+        if not settings.DATABASE_READ_URL or seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def _send(message) -> None:
+            if message["type"] == "http.response.start":
+                cookie = (b"set-cookie", _sticky_cookie(seconds))
+                message = {**message, "headers": [*message.get("headers", []), cookie]}
+            await send(message)
+
+        await self.app(scope, receive, _send)
+
+
+# --- Lag ------------------------------------------------------------------
+
+
+def write_replica_heartbeat(db_session: Session | None = None) -> None:
+    """Bump the heartbeat row on the primary; replicas receive it through replication."""
+
+    session = db_session or db.get_sessionmaker()()
+    try:
+        now = datetime.now(timezone.utc)
+        # Upsert so two workers beating on a fresh database cannot both insert the row.
+        dialect = session.get_bind().dialect.name
+        if dialect in {"sqlite", "postgresql"}:
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            table = CacheVersion.__table__
+            stmt = dialect_insert(table).values(
+                name=REPLICA_HEARTBEAT_NAME, version=1, created_at=now, updated_at=now
+            )
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["name"],
+                    set_={"version": table.c.version + 1, "updated_at": now},
+                )
+            )
+        else:
+            result = session.execute(
+                update(CacheVersion)
+                .where(CacheVersion.name == REPLICA_HEARTBEAT_NAME)
+                .values(version=CacheVersion.version + 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                session.add(CacheVersion(name=REPLICA_HEARTBEAT_NAME, version=1, updated_at=now))
+        session.commit()
+    finally:
+        if db_session is None:
+            session.close()
+
+
+def _heartbeat_at(engine: Engine) -> datetime | None:
+    with engine.connect() as conn:
+        value = conn.execute(
+            select(CacheVersion.updated_at).where(CacheVersion.name == REPLICA_HEARTBEAT_NAME)
+        ).scalar()
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def measure_replica_lag(engine: Engine | None = None) -> float | None:
+    """Return the replica lag in seconds, or ``None`` when it cannot be measured."""
+
+    replica = engine or init_read_engine()
+    if replica is None:
+        return None
+    if replica.dialect.name == "postgresql":
+        with replica.connect() as conn:
+            lag = conn.execute(
+                text("SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())")
+            ).scalar()
+        return max(0.0, float(lag)) if lag is not None else None
+
+    primary_at = _heartbeat_at(db.get_engine())
+    replica_at = _heartbeat_at(replica)
+    if primary_at is None or replica_at is None:
+        return None
+    return max(0.0, (primary_at - replica_at).total_seconds())
+
+
+class ReplicaLagMonitor:
+    """Cache the lag measurement so routing does not query both databases per request.
+
+    Routing only ever reads the cached value. When it goes stale, one
+    background thread re-measures (single flight) while callers keep using the
+    previous reading for up to one more check interval, then treat the lag as
+    unknown. The event loop never waits on the two lag queries.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._lag: float | None = None
+            self._checked_at: float | None = None
+            self._error: str | None = None
+            self._refreshing = False
+            self.replica_reads = 0
+            self.primary_fallbacks = 0
+
+    def refresh(self) -> float | None:
+        """Measure the lag now (blocking) and cache the result."""
+
+        with self._lock:
+            generation = self._generation
+        try:
+            lag, error = measure_replica_lag(), None
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Replica lag check failed", extra={"error": str(exc)})
+            lag, error = None, type(exc).__name__
+        with self._lock:
+            if generation == self._generation:
+                self._lag, self._error, self._checked_at = lag, error, time.monotonic()
+        return lag
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def lag(self, *, max_age_seconds: float) -> float | None:
+        """Return the cached lag without querying; ``None`` when unknown or too old."""
+
+        with self._lock:
+            age = None if self._checked_at is None else time.monotonic() - self._checked_at
+            if age is not None and age < max_age_seconds:
+                return self._lag
+            start = not self._refreshing
+            self._refreshing = True
+            lag = self._lag if age is not None and age < 2 * max_age_seconds else None
+        if start:
+            threading.Thread(target=self._refresh_in_background, name="replica-lag", daemon=True).start()
+        return lag
+
+    def record(self, *, replica: bool) -> None:
+        with self._lock:
+            if replica:
+                self.replica_reads += 1
+            else:
+                self.primary_fallbacks += 1
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "lag_seconds": self._lag,
+                "lag_error": self._error,
+                "replica_reads": self.replica_reads,
+                "primary_fallbacks": self.primary_fallbacks,
+            }
+
+
+_LAG_MONITOR = ReplicaLagMonitor()
+
+
+def use_replica(request: Request | None) -> bool:
+    """Decide whether this request's reads may go to the replica."""
+
+    settings = get_settings()
+    if not settings.DATABASE_READ_URL:
+        return False
+    if request is not None:
+        sticky = settings.READ_AFTER_WRITE_STICKY_SECONDS
+        fingerprint = _client_fingerprint(request.headers)
+        if _cookie_sticky(request, sticky) or (
+            fingerprint and _RECENT_WRITERS.wrote_within(fingerprint, sticky)
+        ):
+            _LAG_MONITOR.record(replica=False)
+            return False
+    lag = _LAG_MONITOR.lag(max_age_seconds=settings.READ_REPLICA_LAG_CHECK_SECONDS)
+    ok = lag is not None and lag <= settings.READ_REPLICA_MAX_LAG_SECONDS
+    _LAG_MONITOR.record(replica=ok)
+    return ok
+
+
+def refresh_replica_lag() -> float | None:
+    """Measure the replica lag now and cache it for routing (blocking)."""
+
+    return _LAG_MONITOR.refresh()
+
+
+def get_replica_stats() -> dict[str, object]:
+    settings = get_settings()
+    stats: dict[str, object] = {"configured": bool(settings.DATABASE_READ_URL)}
+    if settings.DATABASE_READ_URL:
+        _LAG_MONITOR.lag(max_age_seconds=settings.READ_REPLICA_LAG_CHECK_SECONDS)
+        stats.update(_LAG_MONITOR.stats())
+        stats["max_lag_seconds"] = settings.READ_REPLICA_MAX_LAG_SECONDS
+    return stats
+
+
+# --- Dependencies ----------------------------------------------------------
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """Read-only session on the replica, or on the primary when routing says so."""
+
+    if use_replica(request):
+        init_read_engine()
+        assert ReadSessionLocal is not None
+        session = ReadSessionLocal()
+    else:
+        session = ReadOnlySession(bind=db.get_engine(), autoflush=False, expire_on_commit=False)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Async counterpart of :func:`get_read_db`."""
+
+    if use_replica(request):
+        init_async_read_engine()
+        assert AsyncReadSessionLocal is not None
+        session = AsyncReadSessionLocal()
+    else:
+        session = AsyncSession(
+            bind=db.get_async_engine(),
+            sync_session_class=ReadOnlySession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    async with session:
+        yield session
+
+
+# --- Local SQLite copier ---------------------------------------------------
+
+
+def copy_sqlite_replica(primary_url: str | None = None, replica_url: str | None = None) -> None:
+    """Copy the primary SQLite file onto the replica file with the online backup API."""
+
+    settings = get_settings()
+    primary = make_url(primary_url or settings.database_url)
+    replica = make_url(replica_url or settings.DATABASE_READ_URL or "")
+    if primary.get_backend_name() != "sqlite" or replica.get_backend_name() != "sqlite":
+        raise ValueError("copy_sqlite_replica only supports SQLite primary and replica files")
+    source = sqlite3.connect(primary.database)
+    target = sqlite3.connect(replica.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def reset_read_routing() -> None:
+    """Forget sticky writers and cached lag (used by tests)."""
+
+    _RECENT_WRITERS.clear()
+    _LAG_MONITOR.reset()
+
+
+__all__ = [
+    "READ_PRIMARY_COOKIE",
+    "ReadOnlySession",
+    "ReadOnlySessionError",
+    "ReadYourWritesMiddleware",
+    "close_read_engines",
+    "copy_sqlite_replica",
+    "get_async_read_db",
+    "get_read_db",
+    "get_replica_stats",
+    "measure_replica_lag",
+    "refresh_replica_lag",
+    "reset_read_routing",
+    "use_replica",
+    "write_replica_heartbeat",
+]
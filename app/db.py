@@ -1,11 +1,17 @@
 """Database configuration and session management."""
 from __future__ import annotations
 
-from collections.abc import Generator
+import threading
+import time
+from collections.abc import AsyncGenerator, Generator
 
+from prometheus_client import Counter, Gauge, Histogram
 from sqlalchemy import create_engine, event
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app.config import get_settings
 from app.models.base import Base
@@ -13,13 +19,133 @@ from app.models.base import Base
 # Public aliases kept for backward compatibility with older imports.
 engine: Engine | None = None
 SessionLocal: sessionmaker[Session] | None = None
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
 
+POOL_CHECKOUT_WAIT = Histogram(
+    "kobatella_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled DB connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_CHECKOUTS = Counter("kobatella_db_pool_checkouts_total", "Pooled DB connection checkouts.")
+POOL_TIMEOUTS = Counter("kobatella_db_pool_timeouts_total", "Checkouts that hit DB_POOL_TIMEOUT_SECONDS.")
+POOL_IN_USE = Gauge("kobatella_db_pool_in_use", "DB connections currently checked out.")
+POOL_OVERFLOW = Gauge("kobatella_db_pool_overflow", "DB connections opened beyond DB_POOL_SIZE.")
 
-def _engine_kwargs() -> dict[str, object]:
+
+class PoolTelemetry:
+    """Counters fed by pool events and by :class:`InstrumentedQueuePool`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.in_use = 0
+            self.max_in_use = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.waits = 0
+
+    def record_wait(self, seconds: float) -> None:
+        POOL_CHECKOUT_WAIT.observe(seconds)
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self) -> None:
+        POOL_TIMEOUTS.inc()
+        with self._lock:
+            self.timeouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        POOL_CHECKOUTS.inc()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            avg_ms = (self.wait_seconds_total / self.waits * 1000.0) if self.waits else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkout_wait_ms_avg": round(avg_ms, 3),
+                "checkout_wait_ms_max": round(self.wait_seconds_max * 1000.0, 3),
+            }
+
+
+_POOL_TELEMETRY = PoolTelemetry()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times each checkout; pool events have no "before checkout" hook."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            _POOL_TELEMETRY.record_timeout()
+            raise
+        _POOL_TELEMETRY.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in {"sqlite:", "sqlite+pysqlite:"})
+
+
+def _engine_kwargs(url: str | None = None) -> dict[str, object]:
     settings = get_settings()
-    if settings.database_url.startswith("sqlite"):
-        return {"connect_args": {"check_same_thread": False}}
-    return {}
+    url = url or settings.database_url
+    kwargs: dict[str, object] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            # In-memory SQLite keeps its SingletonThreadPool; sizing does not apply.
+            return kwargs
+    kwargs.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    return kwargs
+
+
+def _instrument_pool(target: Engine) -> None:
+    event.listen(target, "connect", _POOL_TELEMETRY.on_connect)
+    event.listen(target, "checkout", _POOL_TELEMETRY.on_checkout)
+    event.listen(target, "checkin", _POOL_TELEMETRY.on_checkin)
+    event.listen(target, "invalidate", _POOL_TELEMETRY.on_invalidate)
 
 
 def init_engine() -> Engine:
@@ -29,6 +155,7 @@ def init_engine() -> Engine:
     if engine is None:
         settings = get_settings()
         engine = create_engine(settings.database_url, future=True, echo=False, **_engine_kwargs())
+        _instrument_pool(engine)
         SessionLocal = sessionmaker(
             bind=engine,
             autoflush=False,
@@ -47,6 +174,75 @@ def get_engine() -> Engine:
     return engine
 
 
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)."""
+
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {backend!r} URLs")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def _async_engine_kwargs(url: str) -> dict[str, object]:
+    settings = get_settings()
+    kwargs: dict[str, object] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() == "sqlite":
+        return kwargs
+    kwargs.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    return kwargs
+
+
+def init_async_engine() -> AsyncEngine:
+    """Initialise the async engine used by async-native read endpoints."""
+
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        settings = get_settings()
+        url = settings.ASYNC_DATABASE_URL or async_database_url(settings.database_url)
+        async_engine = create_async_engine(url, echo=False, **_async_engine_kwargs(url))
+        AsyncSessionLocal = async_sessionmaker(
+            bind=async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return async_engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Return the async engine, creating it if necessary."""
+
+    if async_engine is None:
+        return init_async_engine()
+    return async_engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    if AsyncSessionLocal is None:
+        init_async_engine()
+    assert AsyncSessionLocal is not None  # for type-checkers
+    return AsyncSessionLocal
+
+
+async def close_async_engine() -> None:
+    """Dispose of the async engine and reset its session factory."""
+
+    global async_engine, AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+        AsyncSessionLocal = None
+
+
 def get_sessionmaker() -> sessionmaker[Session]:
     """Return the configured session factory, initialising the engine on demand."""
 
@@ -56,9 +252,58 @@ def get_sessionmaker() -> sessionmaker[Session]:
     return SessionLocal
 
 
+_SQLITE_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_SQLITE_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def sqlite_profile_pragmas(settings) -> list[str]:
+    """Return the PRAGMA statements of the opt-in SQLite performance profile."""
+
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    temp_store = settings.SQLITE_TEMP_STORE.upper()
+    if synchronous not in _SQLITE_SYNCHRONOUS:
+        raise ValueError(f"Invalid SQLITE_SYNCHRONOUS {settings.SQLITE_SYNCHRONOUS!r}")
+    if temp_store not in _SQLITE_TEMP_STORE:
+        raise ValueError(f"Invalid SQLITE_TEMP_STORE {settings.SQLITE_TEMP_STORE!r}")
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        # Negative cache_size is expressed in KiB rather than pages.
+        f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KIB)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_BYTES)}",
+        f"PRAGMA temp_store={temp_store}",
+    ]
+
+
+def apply_sqlite_profile(dbapi_connection, settings) -> None:
+    """Apply the performance profile on a raw file-backed ``sqlite3`` connection."""
+
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_profile_pragmas(settings):
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _is_file_sqlite(dbapi_connection) -> bool:
+    # sqlite3 connections or SQLAlchemy's aiosqlite adapter.
+    if "sqlite" not in type(dbapi_connection).__module__:
+        return False
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA database_list")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    # In-memory and temporary databases report an empty file name.
+    return bool(row and row[2])
+
+
 @event.listens_for(Engine, "connect")
 def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:  # pragma: no cover - defensive
-    """Ensure SQLite enforces foreign key constraints."""
+    """Ensure SQLite enforces foreign key constraints (plus the opt-in performance profile)."""
 
     try:
         cursor = dbapi_connection.cursor()
@@ -66,7 +311,11 @@ def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:  # pragma:
         cursor.close()
     except Exception:
         # Some DBAPI implementations (e.g. tests with in-memory DBs) might not support PRAGMA.
-        pass
+        return
+
+    settings = get_settings()
+    if settings.SQLITE_PERFORMANCE_PROFILE and _is_file_sqlite(dbapi_connection):
+        apply_sqlite_profile(dbapi_connection, settings)
 
 
 def create_all() -> None:
@@ -86,6 +335,48 @@ def close_engine() -> None:
         SessionLocal = None
 
 
+def _current_queue_pool() -> QueuePool | None:
+    pool = engine.pool if engine is not None else None
+    return pool if isinstance(pool, QueuePool) else None
+
+
+def get_pool_stats() -> dict[str, object]:
+    """Return pool sizing, occupancy and checkout telemetry for ``/health``."""
+
+    stats: dict[str, object] = dict(_POOL_TELEMETRY.stats())
+    stats["pool_class"] = type(engine.pool).__name__ if engine is not None else None
+    pool = _current_queue_pool()
+    if pool is not None:
+        settings = get_settings()
+        stats.update(
+            size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            timeout_seconds=pool.timeout(),
+        )
+    return stats
+
+
+def reset_pool_stats() -> None:
+    _POOL_TELEMETRY.reset()
+
+
+def _pool_in_use() -> int:
+    pool = _current_queue_pool()
+    return pool.checkedout() if pool is not None else 0
+
+
+def _pool_overflow() -> int:
+    pool = _current_queue_pool()
+    return max(0, pool.overflow()) if pool is not None else 0
+
+
+POOL_IN_USE.set_function(_pool_in_use)
+POOL_OVERFLOW.set_function(_pool_overflow)
+
+
 def get_db() -> Generator[Session, None, None]:
     """Provide a database session for FastAPI dependencies."""
 
@@ -96,14 +387,33 @@ def get_db() -> Generator[Session, None, None]:
         session.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Provide an ``AsyncSession`` for async-native FastAPI handlers."""
+
+    async with get_async_sessionmaker()() as session:
+        yield session
+
+
 __all__ = [
+    "AsyncSessionLocal",
     "Base",
     "SessionLocal",
+    "async_database_url",
+    "async_engine",
+    "close_async_engine",
     "engine",
     "create_all",
+    "get_async_db",
+    "get_async_engine",
+    "get_async_sessionmaker",
     "get_db",
     "get_engine",
+    "get_pool_stats",
     "get_sessionmaker",
+    "init_async_engine",
     "init_engine",
+    "apply_sqlite_profile",
+    "sqlite_profile_pragmas",
     "close_engine",
+    "reset_pool_stats",
 ]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import signal
 from contextlib import asynccontextmanager
 from typing import Any
 
@@ -9,12 +10,29 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app import db  # moteur/metadata centralisés
-from app.config import AppInfo, get_settings
+from app.config import AppInfo, get_settings, settings_provider
 from app.core.logging import get_logger, setup_logging
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.read_replica import (
+    ReadYourWritesMiddleware,
+    close_read_engines,
+    copy_sqlite_replica,
+    write_replica_heartbeat,
+)
 from app.core.runtime_state import set_scheduler_active
 import app.models  # enregistre les tables
 from app.routers import apikeys, get_api_router, kct_public
+from app.services.ai_assessment_cache import purge_ai_assessment_cache_once
+from app.services.ai_proof_advisor import stop_ai_client_pool
+from app.services.apikey_usage import start_usage_buffer, stop_usage_buffer
+from app.services.audit_archive import archive_audit_logs_once
+from app.services.audit_chain import checkpoint_audit_chain, seal_audit_chain, verify_audit_chain_once
+from app.services.audit_outbox import start_audit_writer, stop_audit_writer
 from app.services.cron import expire_mandates_once
+from app.services.ledger import snapshot_ledger_once
+from app.services.proof_analysis import start_proof_analysis_workers, stop_proof_analysis_workers
+from app.services.reconciliation import reconcile_once
+from app.services.sqlite_maintenance import checkpoint_wal_once, sqlite_profile_active
 from app.services.scheduler_lock import (
     refresh_scheduler_lock,
     release_scheduler_lock,
@@ -37,6 +55,8 @@ def _configure_middlewares(fastapi_app: FastAPI) -> None:
     """Configure middleware using a fresh snapshot of the settings."""
 
     runtime_settings = _current_settings()
+    fastapi_app.add_middleware(ReadYourWritesMiddleware)
+    fastapi_app.add_middleware(QueryStatsMiddleware)
     fastapi_app.add_middleware(
         CORSMiddleware,
         allow_origins=runtime_settings.CORS_ALLOW_ORIGINS,
@@ -101,6 +121,16 @@ async def lifespan(app: FastAPI):
             settings.app_env,
             settings.ALLOW_DB_CREATE_ALL,
         )
+    start_usage_buffer()
+    start_audit_writer()
+    start_proof_analysis_workers()
+    settings_provider.start_refresher()
+    if hasattr(signal, "SIGHUP"):
+        try:
+            signal.signal(signal.SIGHUP, settings_provider.request_reload)
+        except ValueError:
+            # Only the main thread may install handlers (e.g. not under some test runners).
+            logger.info("SIGHUP settings reload unavailable outside the main thread")
     # NOTE: In multi-replica deployments, enable SCHEDULER_ENABLED=true on ONE runner only (others=false).
     # For 1.0.0 consider external cron/worker or APScheduler with a distributed job store/lock.
     # Lancer le scheduler uniquement sur l'instance désignée (cf. déploiement multi-runner).
@@ -119,6 +149,84 @@ async def lifespan(app: FastAPI):
                 id="expire-mandates",
                 replace_existing=True,
             )
+            if sqlite_profile_active() and settings.SQLITE_WAL_CHECKPOINT_MINUTES > 0:
+                scheduler.add_job(
+                    checkpoint_wal_once,
+                    "interval",
+                    minutes=settings.SQLITE_WAL_CHECKPOINT_MINUTES,
+                    id="sqlite-wal-checkpoint",
+                    replace_existing=True,
+                )
+            if settings.AUDIT_CHAIN_ENABLED:
+                scheduler.add_job(
+                    seal_audit_chain,
+                    "interval",
+                    seconds=settings.AUDIT_CHAIN_SEAL_SECONDS,
+                    id="audit-chain-seal",
+                    replace_existing=True,
+                )
+                scheduler.add_job(
+                    checkpoint_audit_chain,
+                    "interval",
+                    minutes=settings.AUDIT_CHECKPOINT_MINUTES,
+                    id="audit-chain-checkpoint",
+                    replace_existing=True,
+                )
+                scheduler.add_job(
+                    verify_audit_chain_once,
+                    "interval",
+                    hours=settings.AUDIT_VERIFY_HOURS,
+                    id="audit-chain-verify",
+                    replace_existing=True,
+                )
+            if settings.LEDGER_SNAPSHOT_ENABLED:
+                scheduler.add_job(
+                    snapshot_ledger_once,
+                    "interval",
+                    minutes=settings.LEDGER_SNAPSHOT_MINUTES,
+                    id="ledger-snapshot",
+                    replace_existing=True,
+                )
+            if settings.RECONCILE_ENABLED:
+                scheduler.add_job(
+                    reconcile_once,
+                    "interval",
+                    hours=settings.RECONCILE_HOURS,
+                    id="reconcile",
+                    replace_existing=True,
+                )
+            if settings.AI_ASSESSMENT_CACHE_ENABLED:
+                scheduler.add_job(
+                    purge_ai_assessment_cache_once,
+                    "interval",
+                    hours=settings.AI_ASSESSMENT_CACHE_PURGE_HOURS,
+                    id="ai-assessment-cache-purge",
+                    replace_existing=True,
+                )
+            if settings.AUDIT_ARCHIVE_ENABLED:
+                scheduler.add_job(
+                    archive_audit_logs_once,
+                    "interval",
+                    hours=settings.AUDIT_ARCHIVE_INTERVAL_HOURS,
+                    id="audit-archive",
+                    replace_existing=True,
+                )
+            if settings.DATABASE_READ_URL:
+                scheduler.add_job(
+                    write_replica_heartbeat,
+                    "interval",
+                    seconds=settings.READ_REPLICA_HEARTBEAT_SECONDS,
+                    id="replica-heartbeat",
+                    replace_existing=True,
+                )
+                if settings.READ_REPLICA_SQLITE_COPY_SECONDS > 0:
+                    scheduler.add_job(
+                        copy_sqlite_replica,
+                        "interval",
+                        seconds=settings.READ_REPLICA_SQLITE_COPY_SECONDS,
+                        id="replica-sqlite-copy",
+                        replace_existing=True,
+                    )
             scheduler.add_job(
                 refresh_scheduler_lock,
                 "interval",
@@ -145,6 +253,13 @@ async def lifespan(app: FastAPI):
         if lock_acquired:
             release_scheduler_lock()
         set_scheduler_active(False)
+        stop_usage_buffer()
+        stop_proof_analysis_workers()
+        stop_ai_client_pool()
+        stop_audit_writer()
+        settings_provider.stop_refresher()
+        await close_read_engines()
+        await db.close_async_engine()
         db.close_engine()
         logger.info("Application shutdown", extra={"env": settings.app_env})
 
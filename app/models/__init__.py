@@ -1,18 +1,23 @@
 """ORM models package."""
+from .ai_assessment import AiAssessmentCacheEntry
 from .alert import Alert
 from .allowlist import AllowedRecipient
 from .allowed_payee import AllowedPayee
 from .api_key import ApiKey, ApiScope
-from .audit import AuditLog
+from .api_key_usage import ApiKeyUsageRollup
+from .audit import AuditCheckpoint, AuditLog, AuditOutbox, AuditSegment
 from .base import Base
+from .cache_version import CacheVersion
 from .certified import CertifiedAccount, CertificationLevel
-from .escrow import EscrowAgreement, EscrowDeposit, EscrowDomain, EscrowEvent, EscrowStatus
+from .escrow import EscrowAgreement, EscrowBalance, EscrowDeposit, EscrowDomain, EscrowEvent, EscrowStatus
 from .funding import FundingRecord, FundingStatus
 from .gov_public import GovEntity, GovEntityType, GovProject, GovProjectManager, GovProjectMandate
+from .ledger import LedgerEntry, LedgerSnapshot
 from .milestone import Milestone, MilestoneStatus
 from .payment import Payment, PaymentStatus
-from .proof import Proof
+from .proof import Proof, ProofAnalysisJob
 from .psp_webhook import PSPWebhookEvent
+from .rate_limit import RateLimitBucket
 from .transaction import Transaction, TransactionStatus
 from .scheduler_lock import SchedulerLock
 from .spend import AllowedUsage, Merchant, Purchase, PurchaseStatus, SpendCategory
@@ -20,16 +25,23 @@ from .usage_mandate import UsageMandate, UsageMandateStatus
 from .user import User
 
 __all__ = [
+    "AiAssessmentCacheEntry",
     "Alert",
     "AllowedRecipient",
     "AllowedPayee",
     "ApiKey",
     "ApiScope",
+    "ApiKeyUsageRollup",
+    "AuditCheckpoint",
     "AuditLog",
+    "AuditOutbox",
+    "AuditSegment",
     "Base",
+    "CacheVersion",
     "CertifiedAccount",
     "CertificationLevel",
     "EscrowAgreement",
+    "EscrowBalance",
     "EscrowDeposit",
     "EscrowDomain",
     "EscrowEvent",
@@ -41,12 +53,16 @@ __all__ = [
     "GovProject",
     "GovProjectManager",
     "GovProjectMandate",
+    "LedgerEntry",
+    "LedgerSnapshot",
     "Milestone",
     "MilestoneStatus",
     "Payment",
     "PaymentStatus",
     "PSPWebhookEvent",
     "Proof",
+    "ProofAnalysisJob",
+    "RateLimitBucket",
     "SchedulerLock",
     "Transaction",
     "TransactionStatus",
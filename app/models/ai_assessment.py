@@ -0,0 +1,28 @@
+"""Persistent tier of the AI proof assessment cache."""
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Index, JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class AiAssessmentCacheEntry(Base):
+    """Normalised advisor result for one (document, context, prompt version, model) key."""
+
+    __tablename__ = "ai_assessment_cache"
+    __table_args__ = (
+        Index("ix_ai_assessment_cache_document_sha256", "document_sha256"),
+        Index("ix_ai_assessment_cache_expires_at", "expires_at"),
+    )
+
+    # sha256 over document_sha256, context_hash, prompt_version and model.
+    cache_key: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    document_sha256: Mapped[str] = mapped_column(String(128), nullable=False)
+    context_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    prompt_version: Mapped[str] = mapped_column(String(64), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    result: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # Duration of the advisor call that produced ``result``; each hit saves about this much.
+    latency_ms: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,24 @@
+"""Per-key API usage rollups."""
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class ApiKeyUsageRollup(Base):
+    """Request count for one API key, scope and route template within a minute bucket."""
+
+    __tablename__ = "api_key_usage_rollups"
+    __table_args__ = (
+        UniqueConstraint("api_key_id", "scope", "route", "bucket_start", name="uq_api_key_usage_bucket"),
+        Index("ix_api_key_usage_key_bucket", "api_key_id", "bucket_start"),
+    )
+
+    # 0 identifies the legacy dev key (no api_keys row), hence no foreign key.
+    api_key_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    scope: Mapped[str] = mapped_column(String(20), nullable=False)
+    route: Mapped[str] = mapped_column(String(255), nullable=False)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,7 +1,7 @@
-"""Audit log model."""
+"""Audit log models."""
 from datetime import datetime
 
-from sqlalchemy import DateTime, JSON, String
+from sqlalchemy import DateTime, Index, Integer, JSON, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -11,6 +11,11 @@ class AuditLog(Base):
     """Represents an audit event in the system."""
 
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_entity_entity_id_at", "entity", "entity_id", "at"),
+        Index("ix_audit_logs_actor_at", "actor", "at"),
+        Index("ux_audit_logs_chain_seq", "chain_seq", unique=True),
+    )
 
     actor: Mapped[str] = mapped_column(String(100), nullable=False)
     action: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -18,3 +23,65 @@ class AuditLog(Base):
     entity_id: Mapped[int] = mapped_column(nullable=False)
     data_json: Mapped[dict] = mapped_column(JSON, nullable=False)
     at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Position and hash in the tamper-evident chain; NULL until the row is sealed.
+    chain_seq: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    row_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+
+class AuditOutbox(Base):
+    """Audit entry committed with the change it records, awaiting copy to ``audit_logs``."""
+
+    __tablename__ = "audit_outbox"
+
+    actor: Mapped[str] = mapped_column(String(100), nullable=False)
+    action: Mapped[str] = mapped_column(String(100), nullable=False)
+    entity: Mapped[str] = mapped_column(String(100), nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    data_json: Mapped[dict] = mapped_column(JSON, nullable=False)
+    at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class AuditSegment(Base):
+    """Immutable compressed file holding audit rows moved out of ``audit_logs``.
+
+    ``blocks`` is the sparse index: one entry per independently compressed
+    block with its byte range, time range and the entities it contains.
+    """
+
+    __tablename__ = "audit_segments"
+    __table_args__ = (
+        UniqueConstraint("filename", name="uq_audit_segments_filename"),
+        Index("ix_audit_segments_min_at_max_at", "min_at", "max_at"),
+    )
+
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    first_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    min_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    max_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    first_seq: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_seq: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    # "deleting" until every archived row has left audit_logs, then "sealed".
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="deleting")
+    entities: Mapped[list] = mapped_column(JSON, nullable=False)
+    blocks: Mapped[list] = mapped_column(JSON, nullable=False)
+
+
+class AuditCheckpoint(Base):
+    """Merkle root over a contiguous range of the audit hash chain.
+
+    ``chain_head`` is the hash of the range's last row, which the first row of
+    the next checkpoint chains from, so each range verifies on its own.
+    """
+
+    __tablename__ = "audit_checkpoints"
+    __table_args__ = (UniqueConstraint("first_seq", name="uq_audit_checkpoints_first_seq"),)
+
+    first_seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_seq: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    merkle_root: Mapped[str] = mapped_column(String(64), nullable=False)
+    chain_head: Mapped[str] = mapped_column(String(64), nullable=False)
+    verified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
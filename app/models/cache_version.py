@@ -0,0 +1,14 @@
+"""Cache version stamps shared across workers."""
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class CacheVersion(Base):
+    """Monotonic version counter used to invalidate in-process caches on every worker."""
+
+    __tablename__ = "cache_versions"
+
+    name: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
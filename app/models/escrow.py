@@ -4,7 +4,18 @@ from decimal import Decimal
 from enum import Enum as PyEnum
 import enum
 
-from sqlalchemy import CheckConstraint, DateTime, Enum as SqlEnum, ForeignKey, Index, JSON, Numeric, String
+from sqlalchemy import (
+    CheckConstraint,
+    DateTime,
+    Enum as SqlEnum,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    Numeric,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -50,6 +61,11 @@ class EscrowAgreement(Base):
     )
     release_conditions_json: Mapped[dict] = mapped_column(JSON, nullable=False)
     deadline_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Milestone progress, maintained on every milestone flush (app/services/milestones.py).
+    milestones_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    milestones_paid: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Lowest idx still WAITING, PENDING_REVIEW, APPROVED or PAYING.
+    current_milestone_idx: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     deposits = relationship("EscrowDeposit", back_populates="escrow", cascade="all, delete-orphan")
     events = relationship("EscrowEvent", back_populates="escrow", cascade="all, delete-orphan")
@@ -68,6 +84,22 @@ class EscrowDeposit(Base):
     escrow = relationship("EscrowAgreement", back_populates="deposits")
 
 
+class EscrowBalance(Base):
+    """Running totals of an escrow's deposits and payouts, one row per escrow."""
+
+    __tablename__ = "escrow_balances"
+    __table_args__ = (UniqueConstraint("escrow_id", name="uq_escrow_balances_escrow_id"),)
+
+    escrow_id: Mapped[int] = mapped_column(ForeignKey("escrow_agreements.id", ondelete="CASCADE"), nullable=False)
+    deposited: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=Decimal("0"))
+    # Payments in SENT or SETTLED.
+    paid: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=Decimal("0"))
+    # Payments still PENDING.
+    reserved: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=Decimal("0"))
+    # Bumped on every change; payouts compare-and-set on it.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class EscrowEvent(Base):
     """Timeline event for an escrow agreement."""
 
@@ -0,0 +1,50 @@
+"""Double-entry journal of money movements and its balance snapshots."""
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import DateTime, Index, Integer, Numeric, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class LedgerEntry(Base):
+    """One leg of a journal transaction; the legs of a ``txn_id`` sum to zero.
+
+    ``amount`` is the signed change of ``account``'s balance. Rows are
+    append-only: corrections are new transactions, never updates.
+    """
+
+    __tablename__ = "ledger_entries"
+    __table_args__ = (
+        Index("ix_ledger_entries_account_id", "account", "id"),
+        Index("ix_ledger_entries_txn_id", "txn_id"),
+        Index("ix_ledger_entries_source", "source", "source_id"),
+    )
+
+    txn_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    # "escrow:<id>", "provider:<user id>", "mandate:<id>", "merchant:<id>",
+    # "psp:clearing" or "psp:funding".
+    account: Mapped[str] = mapped_column(String(64), nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+    source: Mapped[str] = mapped_column(String(32), nullable=False)
+    source_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class LedgerSnapshot(Base):
+    """Running balance of an account through journal entry ``last_entry_id``."""
+
+    __tablename__ = "ledger_snapshots"
+    __table_args__ = (
+        UniqueConstraint("account", "last_entry_id", name="uq_ledger_snapshots_account_entry"),
+        Index("ix_ledger_snapshots_account_as_of", "account", "as_of"),
+    )
+
+    account: Mapped[str] = mapped_column(String(64), nullable=False)
+    balance: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    last_entry_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # ``at`` of the newest entry folded into ``balance``.
+    as_of: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -32,9 +32,12 @@ class Payment(Base):
 
     escrow_id: Mapped[int] = mapped_column(ForeignKey("escrow_agreements.id"), nullable=False, index=True)
     milestone_id: Mapped[int | None] = mapped_column(ForeignKey("milestones.id"), nullable=True, index=True)
-    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    # active_history keeps the previous value around for the escrow balance deltas.
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, active_history=True)
     psp_ref: Mapped[str | None] = mapped_column(String(128), nullable=True, unique=True)
-    status: Mapped[PaymentStatus] = mapped_column(SqlEnum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING)
+    status: Mapped[PaymentStatus] = mapped_column(
+        SqlEnum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING, active_history=True
+    )
     idempotency_key: Mapped[str | None] = mapped_column(String(128), unique=True, nullable=True)
 
     milestone = relationship("Milestone")
@@ -2,7 +2,7 @@
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import DateTime, ForeignKey, JSON, Numeric, String, Text
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, JSON, Numeric, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -47,5 +47,34 @@ class Proof(Base):
     ai_checked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     ai_reviewed_by: Mapped[str | None] = mapped_column(String(100), nullable=True, index=True)
     ai_reviewed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # OCR/AI run in the background: QUEUED -> RUNNING -> DONE | FAILED, or SKIPPED.
+    analysis_status: Mapped[str | None] = mapped_column(String(20), nullable=True)
 
     milestone = relationship("Milestone", back_populates="proofs")
+
+
+class ProofAnalysisJob(Base):
+    """Durable OCR/AI analysis job for one proof (see app/services/proof_analysis.py)."""
+
+    __tablename__ = "proof_analysis_jobs"
+    __table_args__ = (Index("ix_proof_analysis_jobs_status_available_at", "status", "available_at"),)
+
+    proof_id: Mapped[int] = mapped_column(
+        ForeignKey("proofs.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    # QUEUED -> RUNNING -> DONE | FAILED; a failed attempt goes back to QUEUED until max attempts.
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="QUEUED")
+    run_ocr: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    run_ai: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Submission-time validation signals passed to the AI advisor (PHOTO proofs).
+    backend_checks: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Set in the transaction that writes the OCR results back; retries skip the OCR step.
+    ocr_completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    locked_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Step that failed (see proof_analysis.ERROR_*); last_error keeps the exception for operators.
+    error_code: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,19 @@
+"""Shared token-bucket state for the DB rate-limit backend."""
+from sqlalchemy import Float, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class RateLimitBucket(Base):
+    """Token count of one (API key, route) bucket, shared by every worker."""
+
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = (UniqueConstraint("bucket_key", name="uq_rate_limit_buckets_key"),)
+
+    bucket_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    # Unix timestamp of the last refill.
+    refilled_at: Mapped[float] = mapped_column(Float, nullable=False)
+    # Bumped on every update; the compare-and-set token (timestamps can tie).
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,7 +1,7 @@
 """API routers for the Kobatella backend."""
 from fastapi import APIRouter
 
-from . import alerts, escrow, health, mandates, payments, proofs, psp, spend, transactions, users
+from . import alerts, audit, escrow, health, mandates, payments, proofs, psp, spend, transactions, users
 
 
 def get_api_router() -> APIRouter:
@@ -13,6 +13,7 @@ def get_api_router() -> APIRouter:
     api_router.include_router(transactions.router)
     api_router.include_router(escrow.router)
     api_router.include_router(alerts.router)
+    api_router.include_router(audit.router)
     api_router.include_router(mandates.router)
     api_router.include_router(spend.router)
     api_router.include_router(psp.router)
@@ -1,25 +1,28 @@
 """Alerts endpoints."""
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.core.read_replica import get_async_read_db
 from app.models.alert import Alert
 from app.schemas.alert import AlertRead
 from app.models.api_key import ApiScope
-from app.security import require_api_key, require_scope
+from app.security import require_api_key_async, require_scope_async
 
-router = APIRouter(prefix="/alerts", tags=["alerts"], dependencies=[Depends(require_api_key)])
+router = APIRouter(prefix="/alerts", tags=["alerts"], dependencies=[Depends(require_api_key_async)])
 
 
 @router.get(
     "",
     response_model=list[AlertRead],
     status_code=status.HTTP_200_OK,
-    dependencies=[Depends(require_scope({ApiScope.admin, ApiScope.support}))],
+    dependencies=[Depends(require_scope_async({ApiScope.admin, ApiScope.support}))],
 )
-def list_alerts(alert_type: str | None = Query(default=None, alias="type"), db: Session = Depends(get_db)) -> list[Alert]:
+async def list_alerts(
+    alert_type: str | None = Query(default=None, alias="type"),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> list[Alert]:
     stmt = select(Alert)
     if alert_type:
         stmt = stmt.where(Alert.type == alert_type)
-    return list(db.scalars(stmt).all())
+    return list((await db.scalars(stmt)).all())
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from datetime import datetime, UTC, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel, field_validator
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
@@ -11,11 +11,11 @@ from sqlalchemy.orm import Session
 from app.db import get_db
 from app.models.api_key import ApiKey, ApiScope
 from app.models.user import User
-from app.models.audit import AuditLog
 from app.security import require_scope
-from app.utils.audit import sanitize_payload_for_audit
+from app.services.apikey_usage import get_key_usage
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
-from app.utils.apikey import gen_key
+from app.utils.apikey import gen_key, invalidate_cached_key
 
 router = APIRouter(prefix="/apikeys", tags=["apikeys"])
 
@@ -61,6 +61,27 @@ class ApiKeyRead(BaseModel):
         from_attributes = True
 
 
+class ApiKeyRouteUsage(BaseModel):
+    route: str
+    scope: str
+    count: int
+
+
+class ApiKeyUsageBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+
+
+class ApiKeyUsageRead(BaseModel):
+    """Usage agrégé d'une clé (rollups par route et par minute)."""
+    api_key_id: int
+    since: datetime
+    until: datetime | None
+    total: int
+    by_route: list[ApiKeyRouteUsage]
+    buckets: list[ApiKeyUsageBucket]
+
+
 # ------ Routes ------
 
 @router.post(
@@ -104,15 +125,14 @@ def create_api_key(payload: CreateKeyIn, db: Session = Depends(get_db)) -> ApiKe
     db.refresh(row)
 
     # Audit: création de clé
-    db.add(
-        AuditLog(
-            actor="admin",
-            action="CREATE_API_KEY",
-            entity="ApiKey",
-            entity_id=row.id,
-            data_json=sanitize_payload_for_audit({"name": row.name, "scope": row.scope.value}),
-            at=now,
-        )
+    log_audit(
+        db,
+        actor="admin",
+        action="CREATE_API_KEY",
+        entity="ApiKey",
+        entity_id=row.id,
+        data={"name": row.name, "scope": row.scope.value},
+        at=now,
     )
     db.commit()
 
@@ -140,6 +160,27 @@ def get_apikey(api_key_id: int, db: Session = Depends(get_db)) -> ApiKey:
     return row
 
 
+@router.get(
+    "/{api_key_id}/usage",
+    response_model=ApiKeyUsageRead,
+    dependencies=[Depends(require_scope({ApiScope.admin}))],
+)
+def get_apikey_usage(
+    api_key_id: int,
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    db: Session = Depends(get_db),
+) -> dict:
+    """Renvoie l'usage d'une clé depuis les rollups (24h par défaut)."""
+    if api_key_id != 0 and db.get(ApiKey, api_key_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response("APIKEY_NOT_FOUND", "API key not found."),
+        )
+    window_start = since or datetime.now(UTC) - timedelta(hours=24)
+    return get_key_usage(db, api_key_id, since=window_start, until=until)
+
+
 @router.delete(
     "/{api_key_id}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -156,30 +197,29 @@ def revoke_apikey(api_key_id: int, db: Session = Depends(get_db)) -> Response:
         )
 
     if not row.is_active:
-        db.add(
-            AuditLog(
-                actor="admin",
-                action="REVOKE_API_KEY_NOOP",
-                entity="ApiKey",
-                entity_id=api_key_id,
-                data_json=sanitize_payload_for_audit({}),
-                at=now,
-            )
+        log_audit(
+            db,
+            actor="admin",
+            action="REVOKE_API_KEY_NOOP",
+            entity="ApiKey",
+            entity_id=api_key_id,
+            data={},
+            at=now,
         )
         db.commit()
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     row.is_active = False
     db.add(row)
-    db.add(
-        AuditLog(
-            actor="admin",
-            action="REVOKE_API_KEY",
-            entity="ApiKey",
-            entity_id=api_key_id,
-            data_json=sanitize_payload_for_audit({"name": row.name}),
-            at=now,
-        )
+    invalidate_cached_key(db, row.key_hash)
+    log_audit(
+        db,
+        actor="admin",
+        action="REVOKE_API_KEY",
+        entity="ApiKey",
+        entity_id=api_key_id,
+        data={"name": row.name},
+        at=now,
     )
     db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,68 @@
+"""Audit log investigation endpoints."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.read_replica import get_read_db
+from app.models.api_key import ApiScope
+from app.schemas.audit import AuditLogPage, AuditLogRead
+from app.security import require_api_key, require_scope
+from app.services.audit_query import (
+    AuditFilters,
+    InvalidCursor,
+    fetch_audit_page,
+    iter_audit_logs,
+)
+from app.utils.errors import error_response
+
+router = APIRouter(prefix="/audit", tags=["audit"], dependencies=[Depends(require_api_key)])
+
+
+def _ndjson(db: Session, filters: AuditFilters, order: Literal["asc", "desc"]) -> Iterator[bytes]:
+    try:
+        for row in iter_audit_logs(db, filters, order=order):
+            yield AuditLogRead.model_validate(row).model_dump_json().encode() + b"\n"
+    finally:
+        db.close()
+
+
+@router.get(
+    "",
+    response_model=AuditLogPage,
+    dependencies=[Depends(require_scope({ApiScope.admin}))],
+)
+def list_audit_logs(
+    entity: str | None = Query(default=None),
+    entity_id: int | None = Query(default=None),
+    actor: str | None = Query(default=None),
+    action: str | None = Query(default=None),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    order: Literal["asc", "desc"] = Query(default="desc"),
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = Query(default=None),
+    format: Literal["json", "ndjson"] = Query(default="json"),
+    db: Session = Depends(get_read_db),
+):
+    """Recherche dans le journal d'audit; ``format=ndjson`` diffuse tous les résultats."""
+
+    filters = AuditFilters(
+        entity=entity, entity_id=entity_id, actor=actor, action=action, since=since, until=until
+    )
+    if format == "ndjson":
+        return StreamingResponse(_ndjson(db, filters, order), media_type="application/x-ndjson")
+
+    try:
+        rows, next_cursor = fetch_audit_page(db, filters, limit=limit, cursor=cursor, order=order)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("INVALID_CURSOR", "Pagination cursor is invalid."),
+        )
+    return {"items": rows, "next_cursor": next_cursor}
@@ -1,11 +1,12 @@
 """Escrow agreement endpoints."""
 from fastapi import APIRouter, Body, Depends, Header, HTTPException, status
 from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app.core.read_replica import get_async_read_db
+from app.db import get_async_db, get_db
 from app.models.api_key import ApiKey, ApiScope
-from app.models.audit import AuditLog
 from app.models.escrow import EscrowAgreement
 from app.models.milestone import Milestone, MilestoneStatus
 from app.models.user import User
@@ -14,15 +15,16 @@ from app.schemas.escrow import (
     EscrowCreate,
     EscrowDepositCreate,
     EscrowRead,
+    MilestoneBulkCreate,
     MilestoneCreate,
     MilestoneRead,
 )
 from app.schemas.funding import FundingSessionRead
-from app.security import require_scope
+from app.security import require_scope, require_scope_async
 from app.services import escrow as escrow_service
 from app.services import funding as funding_service
-from app.utils.audit import actor_from_api_key
-from app.utils.time import utcnow
+from app.services import milestones as milestones_service
+from app.utils.audit import actor_from_api_key, log_audit
 
 router = APIRouter(
     prefix="/escrows",
@@ -136,24 +138,22 @@ def check_deadline(
 
 
 @router.get("/{escrow_id}", response_model=EscrowRead)
-def read_escrow(
+async def read_escrow(
     escrow_id: int,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(require_scope({ApiScope.sender, ApiScope.support, ApiScope.admin})),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: ApiKey = Depends(require_scope_async({ApiScope.sender, ApiScope.support, ApiScope.admin})),
 ) -> EscrowAgreement:
     actor = actor_from_api_key(api_key, fallback="apikey:unknown")
-    escrow = escrow_service.get_escrow(db, escrow_id, actor=actor)
-    db.add(
-        AuditLog(
-            actor=actor,
-            action="READ_ESCROW",
-            entity="EscrowAgreement",
-            entity_id=escrow_id,
-            data_json={"endpoint": "GET /escrows/{id}"},
-            at=utcnow(),
-        )
+    escrow = await escrow_service.get_escrow_async(db, escrow_id, actor=actor)
+    log_audit(
+        db,
+        actor=actor,
+        action="READ_ESCROW",
+        entity="EscrowAgreement",
+        entity_id=escrow_id,
+        data={"endpoint": "GET /escrows/{id}"},
     )
-    db.commit()
+    await db.commit()
     return escrow
 
 
@@ -220,27 +220,41 @@ def create_milestone_for_escrow(
     return milestone
 
 
+@router.post(
+    "/{escrow_id}/milestones:bulk",
+    response_model=list[MilestoneRead],
+    status_code=status.HTTP_201_CREATED,
+)
+def create_milestones_bulk(
+    escrow_id: int,
+    payload: MilestoneBulkCreate,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(require_scope({ApiScope.admin})),
+):
+    escrow = _get_escrow_or_404(db, escrow_id)
+    return milestones_service.create_milestone_plan(db, escrow, payload.milestones)
+
+
 @router.get(
     "/{escrow_id}/milestones",
     response_model=list[MilestoneRead],
     status_code=status.HTTP_200_OK,
 )
-def list_milestones_for_escrow(
+async def list_milestones_for_escrow(
     escrow_id: int,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(require_scope({ApiScope.sender, ApiScope.admin})),
+    db: AsyncSession = Depends(get_async_read_db),
+    api_key: ApiKey = Depends(require_scope_async({ApiScope.sender, ApiScope.admin})),
 ):
-    _get_escrow_or_404(db, escrow_id)
+    if await db.get(EscrowAgreement, escrow_id) is None:
+        raise HTTPException(status_code=404, detail="Escrow not found")
 
     milestones = (
-        db.execute(
+        await db.scalars(
             select(Milestone)
             .where(Milestone.escrow_id == escrow_id)
             .order_by(Milestone.idx)
         )
-        .scalars()
-        .all()
-    )
+    ).all()
     return milestones
 
 
@@ -10,13 +10,26 @@ from sqlalchemy import text
 
 from fastapi import APIRouter
 
-from app.config import Settings, get_settings
+from app.config import Settings, get_settings, get_settings_stats
+from app.core.read_replica import get_replica_stats
 from app.core.runtime_state import is_scheduler_active
-from app.db import get_engine
+from app.db import get_engine, get_pool_stats
+from app.services.ai_assessment_cache import get_ai_assessment_cache_stats
 from app.services.ai_proof_advisor import get_ai_stats
 from app.services.ai_proof_flags import ai_enabled
+from app.services.apikey_usage import get_usage_buffer_stats
+from app.services.audit_archive import get_audit_archive_stats
+from app.services.audit_chain import get_audit_chain_stats
+from app.services.audit_outbox import get_audit_outbox_stats
+from app.services.escrow_balance import get_escrow_balance_stats
 from app.services.invoice_ocr import get_ocr_stats
+from app.services.ledger import get_ledger_stats
+from app.services.proof_analysis import get_proof_analysis_stats
+from app.services.rate_limit import get_rate_limit_stats
+from app.services.reconciliation import get_reconciliation_stats
 from app.services.scheduler_lock import describe_scheduler_lock
+from app.services.sqlite_maintenance import get_sqlite_profile_stats
+from app.utils.apikey import get_apikey_cache_stats
 
 router = APIRouter(prefix="/health", tags=["health"])
 logger = logging.getLogger(__name__)
@@ -131,11 +144,26 @@ def healthcheck() -> dict[str, object]:
         "ai_proof_enabled": ai_enabled(),
         "ai_metrics": ai_stats,
         "ai_stats": ai_stats,
+        "ai_assessment_cache": get_ai_assessment_cache_stats(),
         "ocr_metrics": get_ocr_stats(),
+        "proof_analysis": get_proof_analysis_stats(),
+        "apikey_cache": get_apikey_cache_stats(),
+        "apikey_usage_buffer": get_usage_buffer_stats(),
+        "audit_outbox": get_audit_outbox_stats(),
+        "audit_archive": get_audit_archive_stats(),
+        "audit_chain": get_audit_chain_stats(),
+        "escrow_balance": get_escrow_balance_stats(),
+        "ledger": get_ledger_stats(),
+        "reconciliation": get_reconciliation_stats(),
+        "rate_limit": get_rate_limit_stats(),
+        "settings": get_settings_stats(),
         "scheduler_config_enabled": bool(settings.SCHEDULER_ENABLED),
         "scheduler_running": is_scheduler_active(),
         "db_ok": db_ok,
         "db_status": db_status,
+        "db_pool": get_pool_stats(),
+        "read_replica": get_replica_stats(),
+        "sqlite_profile": get_sqlite_profile_stats(),
         "migrations_ok": migration_ok,
         "migrations_status": migration_status,
         "scheduler_lock": describe_scheduler_lock(),
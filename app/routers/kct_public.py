@@ -3,8 +3,10 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.read_replica import get_async_read_db
 from app.db import get_db
 from app.models.escrow import EscrowAgreement
 from app.models.gov_public import GovProject, GovProjectManager, GovProjectMandate
@@ -15,14 +17,21 @@ from app.schemas.kct_public import (
     GovProjectManagerCreate,
     GovProjectRead,
 )
-from app.security import ApiScope, require_public_user, require_scope
-from app.services.kct_public import compute_project_stats, get_project, merge_project_and_stats
+from app.security import ApiScope, require_public_user_async, require_scope_async
+from app.services.kct_public import (
+    compute_project_stats,
+    compute_project_stats_async,
+    get_project,
+    merge_project_and_stats,
+)
 from app.utils.errors import error_response
 
 router = APIRouter(
     prefix="/kct_public",
     tags=["kct_public"],
-    dependencies=[Depends(require_scope({ApiScope.sender, ApiScope.admin})), Depends(require_public_user)],
+    # Async auth for every route, so the key is verified (and counted) once per request
+    # whichever handler runs; the sync handlers still run in the threadpool.
+    dependencies=[Depends(require_scope_async({ApiScope.sender, ApiScope.admin})), Depends(require_public_user_async)],
 )
 
 
@@ -34,7 +43,7 @@ router = APIRouter(
 def create_project(
     payload: GovProjectCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_public_user),
+    current_user: User = Depends(require_public_user_async),
 ):
     project = GovProject(
         label=payload.label,
@@ -71,7 +80,7 @@ def add_project_manager(
     project_id: int,
     payload: GovProjectManagerCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_public_user),
+    current_user: User = Depends(require_public_user_async),
 ):
     project = get_project(db, project_id, current_user)
 
@@ -94,7 +103,7 @@ def attach_project_mandate(
     project_id: int,
     payload: GovProjectMandateCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_public_user),
+    current_user: User = Depends(require_public_user_async),
 ):
     project = get_project(db, project_id, current_user)
 
@@ -126,7 +135,7 @@ def attach_project_mandate(
 def get_project_view(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_public_user),
+    current_user: User = Depends(require_public_user_async),
 ):
     project = get_project(db, project_id, current_user)
     stats = compute_project_stats(db, project.id)
@@ -134,12 +143,12 @@ def get_project_view(
 
 
 @router.get("/projects", response_model=list[GovProjectRead])
-def list_projects(
+async def list_projects(
     domain: str | None = Query(None),
     country: str | None = Query(None),
     status_filter: str | None = Query(None, alias="status"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_public_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(require_public_user_async),
 ):
     stmt = select(GovProject).join(GovProjectManager).where(
         GovProjectManager.user_id == current_user.id,
@@ -153,10 +162,10 @@ def list_projects(
     if status_filter:
         stmt = stmt.where(GovProject.status == status_filter)
 
-    projects = db.scalars(stmt).all()
+    projects = (await db.scalars(stmt)).all()
 
     results: list[GovProjectRead] = []
     for project in projects:
-        stats = compute_project_stats(db, project.id)
+        stats = await compute_project_stats_async(db, project.id)
         results.append(merge_project_and_stats(project, stats))
     return results
@@ -1,13 +1,15 @@
 """Proof submission and decision endpoints."""
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.db import get_db
-from app.schemas.proof import ProofCreate, ProofDecision, ProofRead
+from app.schemas.proof import ProofAnalysisRead, ProofCreate, ProofDecision, ProofRead
 from app.models.api_key import ApiKey, ApiScope
 from app.security import require_scope
+from app.services import proof_analysis
 from app.services import proofs as proofs_service
 from app.utils.audit import actor_from_api_key
+from app.utils.errors import error_response
 from app.utils.masking import mask_proof_metadata
 
 router = APIRouter(prefix="/proofs", tags=["proofs"])
@@ -34,6 +36,40 @@ def submit_proof(
     return _proof_response(proof)
 
 
+@router.get("/{proof_id}/analysis", response_model=ProofAnalysisRead)
+def get_proof_analysis(
+    proof_id: int,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(require_scope({ApiScope.sender, ApiScope.support, ApiScope.admin})),
+):
+    """Poll the background OCR/AI analysis of a proof."""
+
+    found = proof_analysis.get_analysis(db, proof_id)
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response("PROOF_NOT_FOUND", "Proof not found."),
+        )
+    proof, job = found
+    return ProofAnalysisRead(
+        proof_id=proof.id,
+        analysis_status=proof.analysis_status,
+        attempts=job.attempts if job else 0,
+        error_code=job.error_code if job else None,
+        queued_at=job.created_at if job else None,
+        finished_at=job.finished_at if job else None,
+        ocr_status=(proof.metadata_ or {}).get("ocr_status"),
+        invoice_total_amount=proof.invoice_total_amount,
+        invoice_currency=proof.invoice_currency,
+        ai_risk_level=proof.ai_risk_level,
+        ai_score=proof.ai_score,
+        ai_flags=proof.ai_flags,
+        ai_explanation=proof.ai_explanation,
+        ai_checked_at=proof.ai_checked_at,
+        ai_decided_by=(proof.metadata_ or {}).get("ai_decided_by"),
+    )
+
+
 @router.post("/{proof_id}/decision", response_model=ProofRead)
 def decide_proof(
     proof_id: int,
@@ -5,6 +5,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.read_replica import get_read_db
 from app.db import get_db
 from app.models.api_key import ApiKey, ApiScope
 from app.models.transaction import Transaction
@@ -97,11 +98,13 @@ def post_transaction(
 def get_transaction(
     transaction_id: int,
     db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
     api_key: ApiKey = Depends(require_scope({ApiScope.admin})),
 ) -> Transaction:
     """Retrieve transaction details (admin only)."""
 
-    transaction = transactions_service.get_transaction(db, transaction_id)
+    # The lookup may hit the replica; the audit row is written on the primary.
+    transaction = transactions_service.get_transaction(read_db, transaction_id)
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -117,5 +120,4 @@ def get_transaction(
         data={"transaction_id": transaction.id},
     )
     db.commit()
-    db.refresh(transaction)
     return transaction
@@ -8,7 +8,7 @@ from app.db import get_db
 from app.models.user import User
 from app.models.api_key import ApiKey, ApiScope
 from app.schemas.user import StripeAccountLinkRead, UserCreate, UserRead
-from app.services.psp_stripe import StripeClient
+from app.services.psp_stripe import get_stripe_client
 from app.security import require_scope
 from app.utils.audit import actor_from_api_key, log_audit
 from app.utils.errors import error_response
@@ -108,7 +108,7 @@ def create_stripe_account_link_for_user(
             detail=error_response("STRIPE_CONNECT_DISABLED", "Stripe Connect is disabled."),
         )
 
-    stripe_client = StripeClient(settings)
+    stripe_client = get_stripe_client(settings)
 
     if not user.stripe_account_id:
         account = stripe_client.create_connected_account(user)
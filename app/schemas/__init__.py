@@ -1,5 +1,6 @@
 """Schema package exports."""
 from .alert import AlertRead
+from .audit import AuditLogPage, AuditLogRead
 from .escrow import EscrowActionPayload, EscrowCreate, EscrowDepositCreate, EscrowRead
 from .funding import FundingRead, FundingSessionRead
 from .milestone import MilestoneCreate, MilestoneRead
@@ -32,6 +33,8 @@ from .user import StripeAccountLinkRead, UserCreate, UserRead
 
 __all__ = [
     "AlertRead",
+    "AuditLogPage",
+    "AuditLogRead",
     "EscrowActionPayload",
     "EscrowCreate",
     "EscrowDepositCreate",
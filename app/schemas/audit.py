@@ -0,0 +1,21 @@
+"""Audit log schemas."""
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class AuditLogRead(BaseModel):
+    id: int
+    actor: str
+    action: str
+    entity: str
+    entity_id: int
+    data_json: dict
+    at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuditLogPage(BaseModel):
+    items: list[AuditLogRead]
+    next_cursor: str | None
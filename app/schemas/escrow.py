@@ -50,6 +50,10 @@ class MilestoneCreate(BaseModel):
     proof_requirements: Dict[str, Any] = Field(default_factory=dict)
 
 
+class MilestoneBulkCreate(BaseModel):
+    milestones: list[MilestoneCreate] = Field(..., min_length=1, max_length=200)
+
+
 class MilestoneRead(BaseModel):
     id: int
     escrow_id: int
@@ -33,6 +33,7 @@ class ProofRead(BaseModel):
     ai_checked_at: datetime | None = None
     ai_reviewed_by: str | None = None
     ai_reviewed_at: datetime | None = None
+    analysis_status: str | None = None
 
     invoice_total_amount: Decimal | None = None
     invoice_currency: str | None = None
@@ -40,6 +41,24 @@ class ProofRead(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 
+class ProofAnalysisRead(BaseModel):
+    proof_id: int
+    analysis_status: str | None = None
+    attempts: int = 0
+    error_code: str | None = None
+    queued_at: datetime | None = None
+    finished_at: datetime | None = None
+    ocr_status: str | None = None
+    invoice_total_amount: Decimal | None = None
+    invoice_currency: str | None = None
+    ai_risk_level: str | None = None
+    ai_score: Decimal | None = None
+    ai_flags: list[str] | None = None
+    ai_explanation: str | None = None
+    ai_checked_at: datetime | None = None
+    ai_decided_by: str | None = None  # prescreen | cache | model
+
+
 class ProofDecision(BaseModel):
     decision: str = Field(
         pattern="^(approve|approved|reject|rejected)$",
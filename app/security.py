@@ -2,27 +2,38 @@
 """Security dependencies for API key validation and scope enforcement."""
 from __future__ import annotations
 
+import math
+import random
 from datetime import datetime, UTC
+from functools import partial
 from typing import Callable, Set
 
-from fastapi import Depends, Header, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.config import DEV_API_KEY, DEV_API_KEY_ALLOWED, ENV
-from app.db import get_db
+from app.config import DEV_API_KEY, DEV_API_KEY_ALLOWED, ENV, get_settings
+from app.db import get_async_db, get_db
 from app.models.api_key import ApiKey, ApiScope
 from app.models.user import User
-from app.models.audit import AuditLog
-from app.utils.apikey import find_valid_key
-from app.utils.audit import sanitize_payload_for_audit
+from app.services.apikey_usage import (
+    LEGACY_KEY_ID,
+    build_usage_audit_row,
+    record_api_key_usage,
+    record_api_key_usage_async,
+)
+from app.services.rate_limit import RateLimitDecision, check_rate_limit
+from app.utils.apikey import find_valid_key, find_valid_key_async
 from app.utils.errors import error_response
 
 
-def _extract_key(
+async def _extract_key(
     authorization: str | None = Header(default=None),
     x_api_key: str | None = Header(default=None, alias="X-API-Key"),
 ) -> str | None:
     """Récupère la clé depuis Authorization: Bearer ... ou X-API-Key."""
+    # async: FastAPI would otherwise hand this header parsing to the threadpool.
     if x_api_key:
         return x_api_key.strip()
     if authorization and authorization.startswith("Bearer "):
@@ -30,120 +41,201 @@ def _extract_key(
     return None
 
 
-def require_api_key(
-    db: Session = Depends(get_db),
-    token: str | None = Depends(_extract_key),
-) -> ApiKey:
-    """Validate API key tokens and return the corresponding row."""
-    if not token:
+def _route_template(request: Request) -> str:
+    """Return the matched route template (e.g. ``/escrows/{escrow_id}``) for rollups."""
+
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
+def _should_audit_usage(scope: ApiScope) -> bool:
+    """Raw usage audit rows are kept for admin keys and a sampled fraction of the rest."""
+
+    if scope == ApiScope.admin:
+        return True
+    rate = get_settings().API_KEY_USAGE_AUDIT_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def _legacy_allowed() -> None:
+    if not DEV_API_KEY_ALLOWED:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=error_response("NO_API_KEY", "API key required."),
+            detail=error_response("LEGACY_KEY_FORBIDDEN", "Legacy dev key disabled."),
         )
 
-    # Gestion de la clé legacy (mode dev)
-    if token == DEV_API_KEY:
-        if not DEV_API_KEY_ALLOWED:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=error_response("LEGACY_KEY_FORBIDDEN", "Legacy dev key disabled."),
-            )
-        now = datetime.now(UTC)
-        db.add(
-            AuditLog(
-                actor="legacy-apikey",
-                action="LEGACY_API_KEY_USED",
-                entity="ApiKey",
-                entity_id=0,
-                data_json=sanitize_payload_for_audit({"env": ENV}),
-                at=now,
-            )
-        )
-        db.commit()
-        fake = ApiKey(
-            id=0,
-            name="__legacy__",
-            prefix="legacy",
-            key_hash="legacy",
-            scope=ApiScope.admin,
-            is_active=True,
-            created_at=now,
-            expires_at=None,
-            last_used_at=now,
-        )
-        return fake
 
-    # Clés normales (prefix + hash)
-    key = find_valid_key(db, token)
-    if key == "legacy":
-        # Cas non attendu car déjà géré ci-dessus mais on garde par prudence.
-        if not DEV_API_KEY_ALLOWED:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=error_response("LEGACY_KEY_FORBIDDEN", "Legacy dev key disabled."),
-            )
-        now = datetime.now(UTC)
-        db.add(
-            AuditLog(
-                actor="legacy-apikey",
-                action="LEGACY_API_KEY_USED",
-                entity="ApiKey",
-                entity_id=0,
-                data_json=sanitize_payload_for_audit({"env": ENV}),
-                at=now,
-            )
-        )
-        db.commit()
-        return ApiKey(
-            id=0,
-            name="__legacy__",
-            prefix="legacy",
-            key_hash="legacy",
-            scope=ApiScope.admin,
-            is_active=True,
-            created_at=now,
-            expires_at=None,
-            last_used_at=now,
+def _legacy_usage(request: Request, now: datetime) -> dict:
+    return {
+        "api_key_id": LEGACY_KEY_ID,
+        "scope": ApiScope.admin.value,
+        "route": _route_template(request),
+        "at": now,
+        "audit_row": build_usage_audit_row(
+            actor="legacy-apikey",
+            action="LEGACY_API_KEY_USED",
+            entity_id=LEGACY_KEY_ID,
+            data={"env": ENV},
+            at=now,
+        ),
+    }
+
+
+def _legacy_key(now: datetime) -> ApiKey:
+    return ApiKey(
+        id=LEGACY_KEY_ID,
+        name="__legacy__",
+        prefix="legacy",
+        key_hash="legacy",
+        scope=ApiScope.admin,
+        is_active=True,
+        created_at=now,
+        expires_at=None,
+        last_used_at=now,
+    )
+
+
+def _legacy_api_key(db: Session, request: Request) -> ApiKey:
+    """Record legacy key usage and return the synthetic admin key (dev only)."""
+
+    _legacy_allowed()
+    now = datetime.now(UTC)
+    record_api_key_usage(db, **_legacy_usage(request, now))
+    return _legacy_key(now)
+
+
+async def _legacy_api_key_async(db: AsyncSession, request: Request) -> ApiKey:
+    _legacy_allowed()
+    now = datetime.now(UTC)
+    await record_api_key_usage_async(db, **_legacy_usage(request, now))
+    return _legacy_key(now)
+
+
+def _require_token(token: str | None) -> str:
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=error_response("NO_API_KEY", "API key required."),
         )
+    return token
 
+
+def _verified(key: ApiKey | str | None) -> ApiKey:
     if not isinstance(key, ApiKey) or not key.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=error_response("UNAUTHORIZED", "Invalid or expired API key"),
         )
+    return key
+
+
+def _key_usage(key: ApiKey, request: Request) -> dict:
+    """Book-keeping : last_used_at + usage rollup (+ sampled audit), coalesced by the write-behind buffer."""
 
-    # Book-keeping : last_used_at + audit
     now = datetime.now(UTC)
-    key.last_used_at = now
-    prefix = getattr(key, "prefix", None)
-    payload = {"scope": key.scope.value}
-    if prefix:
-        payload["prefix"] = prefix
-    db.add(
-        AuditLog(
+    audit_row = None
+    if _should_audit_usage(key.scope):
+        prefix = getattr(key, "prefix", None)
+        payload = {"scope": key.scope.value}
+        if prefix:
+            payload["prefix"] = prefix
+        audit_row = build_usage_audit_row(
             actor=f"apikey:{key.id}",
             action="API_KEY_USED",
-            entity="ApiKey",
             entity_id=key.id,
-            data_json=sanitize_payload_for_audit(payload),
+            data=payload,
             at=now,
         )
-    )
-    db.commit()
+    return {
+        "api_key_id": key.id,
+        "scope": key.scope.value,
+        "route": _route_template(request),
+        "at": now,
+        "audit_row": audit_row,
+    }
+
+
+def require_api_key(
+    request: Request,
+    db: Session = Depends(get_db),
+    token: str | None = Depends(_extract_key),
+) -> ApiKey:
+    """Validate API key tokens and return the corresponding row."""
+    token = _require_token(token)
+
+    # Gestion de la clé legacy (mode dev)
+    if token == DEV_API_KEY:
+        return _legacy_api_key(db, request)
+
+    # Clés normales (prefix + hash)
+    key = find_valid_key(db, token)
+    if key == "legacy":
+        # Cas non attendu car déjà géré ci-dessus mais on garde par prudence.
+        return _legacy_api_key(db, request)
+
+    key = _verified(key)
+    record_api_key_usage(db, **_key_usage(key, request))
     return key
 
 
-def require_scope(allowed: Set[ApiScope]) -> Callable:
-    """Enforce qu'une clé possède l'un des scopes autorisés."""
+async def require_api_key_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    token: str | None = Depends(_extract_key),
+) -> ApiKey:
+    """``require_api_key`` for ``async def`` routes: runs on the event loop, not the threadpool.
 
-    if not allowed:
-        raise RuntimeError("require_scope needs a non-empty set of ApiScope")
+    A cached key with the usage buffer running touches no database at all.
+    """
+    token = _require_token(token)
+    if token == DEV_API_KEY:
+        return await _legacy_api_key_async(db, request)
 
-    def _dep(key: ApiKey = Depends(require_api_key)) -> ApiKey:
-        if key.id == 0:
-            return key
-        if key.scope == ApiScope.admin or key.scope in allowed:
-            return key
+    key = await find_valid_key_async(db, token)
+    if key == "legacy":
+        return await _legacy_api_key_async(db, request)
+
+    key = _verified(key)
+    await record_api_key_usage_async(db, **_key_usage(key, request))
+    return key
+
+
+def _rate_limit_args(key: ApiKey, request: Request) -> dict:
+    return {
+        "api_key_id": key.id,
+        "scope": key.scope,
+        "route": f"{request.method} {_route_template(request)}",
+    }
+
+
+def _raise_if_throttled(decision: RateLimitDecision | None) -> None:
+    if decision is None or decision.allowed:
+        return
+    retry_after = max(1, math.ceil(decision.retry_after_seconds))
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=error_response("RATE_LIMITED", f"Too many requests; retry in {retry_after}s."),
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def _enforce_rate_limit(key: ApiKey, request: Request) -> None:
+    """Consume a token from the key/route bucket or answer 429 with Retry-After."""
+
+    _raise_if_throttled(check_rate_limit(**_rate_limit_args(key, request)))
+
+
+async def _enforce_rate_limit_async(key: ApiKey, request: Request) -> None:
+    if get_settings().RATE_LIMIT_BACKEND == "memory":
+        decision = check_rate_limit(**_rate_limit_args(key, request))
+    else:
+        # The shared bucket runs its own blocking session; keep it off the event loop.
+        decision = await run_in_threadpool(partial(check_rate_limit, **_rate_limit_args(key, request)))
+    _raise_if_throttled(decision)
+
+
+def _check_scope(key: ApiKey, allowed: Set[ApiScope]) -> None:
+    if key.scope != ApiScope.admin and key.scope not in allowed:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=error_response(
@@ -152,17 +244,46 @@ def require_scope(allowed: Set[ApiScope]) -> Callable:
             ),
         )
 
+
+def require_scope(allowed: Set[ApiScope]) -> Callable:
+    """Enforce qu'une clé possède l'un des scopes autorisés."""
+
+    if not allowed:
+        raise RuntimeError("require_scope needs a non-empty set of ApiScope")
+
+    def _dep(
+        request: Request,
+        key: ApiKey = Depends(require_api_key),
+    ) -> ApiKey:
+        if key.id == 0:
+            return key
+        _check_scope(key, allowed)
+        _enforce_rate_limit(key, request)
+        return key
+
     return _dep
 
 
-def require_public_user(
-    api_key: ApiKey = Depends(require_api_key),
-    db: Session = Depends(get_db),
-) -> User:
-    """Ensure the API key is linked to a GOV/ONG user and return it."""
+def require_scope_async(allowed: Set[ApiScope]) -> Callable:
+    """``require_scope`` on ``require_api_key_async``, for ``async def`` routes."""
 
-    user_id = getattr(api_key, "user_id", None)
-    user = db.get(User, user_id) if user_id is not None else None
+    if not allowed:
+        raise RuntimeError("require_scope_async needs a non-empty set of ApiScope")
+
+    async def _dep(
+        request: Request,
+        key: ApiKey = Depends(require_api_key_async),
+    ) -> ApiKey:
+        if key.id == 0:
+            return key
+        _check_scope(key, allowed)
+        await _enforce_rate_limit_async(key, request)
+        return key
+
+    return _dep
+
+
+def _public_user(user: User | None) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -181,4 +302,31 @@ def require_public_user(
     return user
 
 
-__all__ = ["require_api_key", "require_scope", "require_public_user"]
+def require_public_user(
+    api_key: ApiKey = Depends(require_api_key),
+    db: Session = Depends(get_db),
+) -> User:
+    """Ensure the API key is linked to a GOV/ONG user and return it."""
+
+    user_id = getattr(api_key, "user_id", None)
+    return _public_user(db.get(User, user_id) if user_id is not None else None)
+
+
+async def require_public_user_async(
+    api_key: ApiKey = Depends(require_api_key_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """``require_public_user`` on ``require_api_key_async``."""
+
+    user_id = getattr(api_key, "user_id", None)
+    return _public_user(await db.get(User, user_id) if user_id is not None else None)
+
+
+__all__ = [
+    "require_api_key",
+    "require_api_key_async",
+    "require_public_user",
+    "require_public_user_async",
+    "require_scope",
+    "require_scope_async",
+]
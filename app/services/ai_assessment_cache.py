@@ -0,0 +1,381 @@
+"""Content-addressed cache of AI proof advisor results.
+
+The key is a sha256 over the document ``sha256``, a hash of the context after
+``_sanitize_context`` (minus the storage URL, which says where the bytes are,
+not what they are), ``AI_PROOF_PROMPT_VERSION`` and the model. A resubmitted
+document or a re-run for an unchanged milestone context is therefore served
+without calling the model again.
+
+Lookups go to an in-process LRU first and then to the ``ai_assessment_cache``
+table, which is shared by every worker. Entries expire after
+``AI_ASSESSMENT_CACHE_TTL_SECONDS``. Changing ``AI_PROOF_ADVISOR_CORE_PROMPT``
+changes the prompt version, so old entries stop matching at once;
+``purge_ai_assessment_cache_once`` then deletes them with the expired rows.
+``invalidate_ai_assessments`` drops entries explicitly and bumps a shared
+``cache_versions`` stamp so other workers clear their LRU too.
+
+Only real model answers are stored; fallback results (circuit open, missing
+key, retries exhausted) never are.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from prometheus_client import Counter
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.config import get_settings
+from app.models import AiAssessmentCacheEntry, CacheVersion
+from app.services.ai_proof_advisor import AI_PROOF_PROMPT_VERSION, _sanitize_context
+from app.utils.time import utcnow
+
+logger = logging.getLogger(__name__)
+
+AI_ASSESSMENT_CACHE_VERSION_NAME = "ai_assessments"
+
+AI_ASSESSMENT_CACHE_LOOKUPS = Counter(
+    "kobatella_ai_assessment_cache_lookups_total",
+    "AI assessment cache lookups by outcome.",
+    ["outcome"],  # memory_hit | db_hit | miss
+)
+AI_ASSESSMENT_CACHE_SAVED_SECONDS = Counter(
+    "kobatella_ai_assessment_cache_saved_seconds_total",
+    "Advisor latency avoided by AI assessment cache hits.",
+)
+
+
+@dataclass(frozen=True)
+class CachedAssessment:
+    key: str
+    document_sha256: str
+    result: dict[str, Any]
+    latency_ms: float
+    expires_at: datetime
+
+
+def context_hash(context: dict[str, Any]) -> str:
+    """Stable hash of the sanitized advisor context, ignoring the storage URL."""
+
+    sanitized = _sanitize_context(context)
+    document = sanitized.get("document_context")
+    if isinstance(document, dict):
+        sanitized["document_context"] = {k: v for k, v in document.items() if k != "storage_url"}
+    canonical = json.dumps(sanitized, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cache_key(document_sha256: str, ctx_hash: str, *, model: str, prompt_version: str | None = None) -> str:
+    parts = (document_sha256, ctx_hash, prompt_version or AI_PROOF_PROMPT_VERSION, model)
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _as_aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value
+
+
+def is_cacheable(result: dict[str, Any]) -> bool:
+    return "ai_unavailable" not in (result.get("flags") or [])
+
+
+class AssessmentLRU:
+    """Bounded LRU of cached assessments, cleared when the shared version moves."""
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, CachedAssessment] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._version_checked_at: float | None = None
+        self._counters = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "purged_rows": 0,
+        }
+        self._saved_ms = 0.0
+
+    def get(self, key: str, now: datetime) -> CachedAssessment | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                del self._entries[key]
+                self._counters["evictions"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, entry: CachedAssessment, *, max_entries: int) -> None:
+        if max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def drop(self, document_sha256: str | None = None) -> None:
+        with self._lock:
+            doomed = [
+                key
+                for key, entry in self._entries.items()
+                if document_sha256 is None or entry.document_sha256 == document_sha256
+            ]
+            for key in doomed:
+                del self._entries[key]
+            self._counters["evictions"] += len(doomed)
+
+    def sync_version(self, db: Session, *, interval_seconds: float) -> None:
+        now = time.monotonic()
+        checked_at = self._version_checked_at
+        if checked_at is not None and now - checked_at < interval_seconds:
+            return
+        version = db.scalar(
+            select(CacheVersion.version).where(CacheVersion.name == AI_ASSESSMENT_CACHE_VERSION_NAME)
+        ) or 0
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._counters["evictions"] += len(self._entries)
+                self._entries.clear()
+            self._version = version
+            self._version_checked_at = now
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += amount
+
+    def record_saved(self, latency_ms: float) -> None:
+        with self._lock:
+            self._saved_ms += latency_ms
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._version_checked_at = None
+            self._counters = dict.fromkeys(self._counters, 0)
+            self._saved_ms = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["db_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                "size": len(self._entries),
+                **self._counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "saved_ms_total": round(self._saved_ms, 3),
+                "prompt_version": AI_PROOF_PROMPT_VERSION,
+            }
+
+
+_LRU = AssessmentLRU()
+
+
+def _hit(outcome: str, entry: CachedAssessment) -> dict[str, Any]:
+    _LRU.count("memory_hits" if outcome == "memory_hit" else "db_hits")
+    _LRU.record_saved(entry.latency_ms)
+    AI_ASSESSMENT_CACHE_LOOKUPS.labels(outcome=outcome).inc()
+    AI_ASSESSMENT_CACHE_SAVED_SECONDS.inc(entry.latency_ms / 1000.0)
+    return dict(entry.result)
+
+
+def lookup(db: Session, key: str) -> dict[str, Any] | None:
+    """Return a copy of the cached result for ``key``, or ``None`` on a miss."""
+
+    settings = get_settings()
+    if not settings.AI_ASSESSMENT_CACHE_ENABLED:
+        return None
+    now = utcnow()
+    _LRU.sync_version(db, interval_seconds=settings.AI_ASSESSMENT_CACHE_VERSION_CHECK_SECONDS)
+    entry = _LRU.get(key, now)
+    if entry is not None:
+        return _hit("memory_hit", entry)
+
+    row = db.execute(
+        select(
+            AiAssessmentCacheEntry.document_sha256,
+            AiAssessmentCacheEntry.result,
+            AiAssessmentCacheEntry.latency_ms,
+            AiAssessmentCacheEntry.expires_at,
+        ).where(AiAssessmentCacheEntry.cache_key == key, AiAssessmentCacheEntry.expires_at > now)
+    ).first()
+    if row is None:
+        _LRU.count("misses")
+        AI_ASSESSMENT_CACHE_LOOKUPS.labels(outcome="miss").inc()
+        return None
+    entry = CachedAssessment(
+        key=key,
+        document_sha256=row.document_sha256,
+        result=dict(row.result),
+        latency_ms=float(row.latency_ms or 0.0),
+        expires_at=_as_aware(row.expires_at),
+    )
+    _LRU.put(entry, max_entries=settings.AI_ASSESSMENT_CACHE_MAX_ENTRIES)
+    return _hit("db_hit", entry)
+
+
+def store(
+    db: Session,
+    key: str,
+    *,
+    document_sha256: str,
+    ctx_hash: str,
+    model: str,
+    result: dict[str, Any],
+    latency_ms: float,
+) -> bool:
+    """Stage ``result`` under ``key`` on ``db`` (the caller commits); skip fallbacks."""
+
+    settings = get_settings()
+    if not settings.AI_ASSESSMENT_CACHE_ENABLED or not is_cacheable(result):
+        return False
+    now = utcnow()
+    expires_at = now + timedelta(seconds=max(1, settings.AI_ASSESSMENT_CACHE_TTL_SECONDS))
+    # An expired row would hold the unique key; replace it.
+    db.execute(
+        delete(AiAssessmentCacheEntry).where(
+            AiAssessmentCacheEntry.cache_key == key, AiAssessmentCacheEntry.expires_at <= now
+        )
+    )
+    values = {
+        "cache_key": key,
+        "document_sha256": document_sha256,
+        "context_hash": ctx_hash,
+        "prompt_version": AI_PROOF_PROMPT_VERSION,
+        "model": model,
+        "result": dict(result),
+        "latency_ms": latency_ms,
+        "expires_at": expires_at,
+        "created_at": now,
+        "updated_at": now,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect in {"sqlite", "postgresql"}:
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        db.execute(dialect_insert(AiAssessmentCacheEntry).values(**values).on_conflict_do_nothing(
+            index_elements=["cache_key"]
+        ))
+    else:
+        db.execute(insert(AiAssessmentCacheEntry).values(**values))
+    _LRU.put(
+        CachedAssessment(
+            key=key,
+            document_sha256=document_sha256,
+            result=dict(result),
+            latency_ms=latency_ms,
+            expires_at=expires_at,
+        ),
+        max_entries=settings.AI_ASSESSMENT_CACHE_MAX_ENTRIES,
+    )
+    _LRU.count("stores")
+    return True
+
+
+def _bump_version(db: Session) -> None:
+    # Upsert: two first-time invalidations racing on the missing row must not both insert.
+    dialect = db.get_bind().dialect.name
+    if dialect in {"sqlite", "postgresql"}:
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        table = CacheVersion.__table__
+        now = utcnow()
+        stmt = dialect_insert(table).values(
+            name=AI_ASSESSMENT_CACHE_VERSION_NAME, version=1, created_at=now, updated_at=now
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["name"],
+                set_={"version": table.c.version + 1, "updated_at": now},
+            )
+        )
+        return
+    bumped = db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == AI_ASSESSMENT_CACHE_VERSION_NAME)
+        .values(version=CacheVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if bumped.rowcount == 0:
+        db.add(CacheVersion(name=AI_ASSESSMENT_CACHE_VERSION_NAME, version=1))
+
+
+def invalidate_ai_assessments(db: Session, *, document_sha256: str | None = None) -> int:
+    """Delete cached results (all, or one document's) and tell other workers to drop theirs.
+
+    Staged on ``db``; returns the number of rows deleted.
+    """
+
+    stmt = delete(AiAssessmentCacheEntry)
+    if document_sha256 is not None:
+        stmt = stmt.where(AiAssessmentCacheEntry.document_sha256 == document_sha256)
+    deleted = db.execute(stmt).rowcount or 0
+    _bump_version(db)
+    _LRU.drop(document_sha256)
+    _LRU.count("invalidations")
+    return deleted
+
+
+def purge_ai_assessment_cache_once(db: Session | None = None) -> int | None:
+    """Delete expired rows and rows written under another prompt version."""
+
+    session = db or db_module.get_sessionmaker()()
+    try:
+        purged = session.execute(
+            delete(AiAssessmentCacheEntry).where(
+                or_(
+                    AiAssessmentCacheEntry.expires_at <= utcnow(),
+                    AiAssessmentCacheEntry.prompt_version != AI_PROOF_PROMPT_VERSION,
+                )
+            )
+        ).rowcount or 0
+        session.commit()
+    except Exception:  # noqa: BLE001
+        session.rollback()
+        logger.exception("AI assessment cache purge failed")
+        return None
+    finally:
+        if db is None:
+            session.close()
+    _LRU.count("purged_rows", purged)
+    return purged
+
+
+def reset_ai_assessment_cache() -> None:
+    """Drop the in-process entries and counters (tests and admin tooling)."""
+
+    _LRU.reset()
+
+
+def get_ai_assessment_cache_stats() -> dict[str, Any]:
+    settings = get_settings()
+    return {"enabled": bool(settings.AI_ASSESSMENT_CACHE_ENABLED), **_LRU.stats()}
+
+
+__all__ = [
+    "AssessmentLRU",
+    "CachedAssessment",
+    "cache_key",
+    "context_hash",
+    "get_ai_assessment_cache_stats",
+    "invalidate_ai_assessments",
+    "is_cacheable",
+    "lookup",
+    "purge_ai_assessment_cache_once",
+    "reset_ai_assessment_cache",
+    "store",
+]
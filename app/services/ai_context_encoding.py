@@ -0,0 +1,192 @@
+"""Compact encoding of the AI advisor context.
+
+The advisor used to receive ``json.dumps(context)`` verbatim: null checks,
+``_ai_redacted_keys`` bookkeeping, the storage URL and document hash, long key
+names and pretty separators, all of it billed as input tokens on every call.
+``encode_ai_context``:
+
+- drops ``None``, empty strings, lists and dicts, redaction bookkeeping and
+  fields the model cannot use (``storage_url``, ``sha256``);
+- renames keys through ``CONTEXT_KEY_ALIASES``, a fixed table whose legend is
+  part of the (cached) system prompt, so the aliases never drift per call;
+- writes masked values as ``"*"`` and uses compact, key-sorted JSON;
+- keeps the result under a token budget by shedding ``_SHED_ORDER`` paths,
+  then truncating long strings, and reports what it dropped.
+
+Token counts are estimated as UTF-8 bytes / 4, close enough to BPE on
+JSON for budgeting; the provider's own counts are recorded per call.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from app.utils.masking import AI_MASK_PLACEHOLDER, AI_REDACTED_KEYS_FIELD
+
+MASKED_VALUE = "*"
+
+# Stable: changing an alias changes the prompt legend and therefore the prompt version.
+CONTEXT_KEY_ALIASES: dict[str, str] = {
+    "mandate_context": "m",
+    "backend_checks": "bc",
+    "document_context": "d",
+    "metadata": "md",
+    "ocr_text": "ocr",
+    "escrow_id": "eid",
+    "milestone_idx": "mi",
+    "milestone_label": "ml",
+    "milestone_amount": "mamt",
+    "proof_type": "pt",
+    "proof_requirements": "req",
+    "invoice_total_amount": "inv_amt",
+    "invoice_currency": "inv_cur",
+    "type": "t",
+    "has_metadata": "has_md",
+    "amount_check": "amt",
+    "expected_amount": "exp",
+    "expected_currency": "exp_cur",
+    "invoice_amount": "got",
+    "absolute_diff": "diff",
+    "relative_diff": "rdiff",
+    "currency_expected": "cur_exp",
+    "currency_actual": "cur_got",
+    "currency_match": "cur_ok",
+    "amount_match": "ok",
+    "iban_check": "iban",
+    "expected_iban_last4": "exp4",
+    "invoice_iban_last4": "got4",
+    "date_check": "date",
+    "expected_date_min": "min",
+    "expected_date_max": "max",
+    "invoice_date": "inv_date",
+    "in_range": "ok",
+    "days_from_min": "dmin",
+    "days_from_max": "dmax",
+    "supplier_check": "sup",
+    "expected_name": "exp",
+    "actual_name": "got",
+    "exact_match": "ok",
+    "match": "ok",
+    "geofence_configured": "geo",
+    "validation_ok": "valid",
+    "validation_reason": "why",
+}
+
+# Keys never worth sending: where the file lives and its digest say nothing about its content.
+_DROPPED_KEYS = frozenset({AI_REDACTED_KEYS_FIELD, "storage_url", "sha256"})
+
+# Shed first when over budget, as (section, key) on the original names.
+_SHED_ORDER: tuple[tuple[str, ...], ...] = (
+    ("document_context", "ocr_text"),
+    ("mandate_context", "milestone_label"),
+    ("document_context", "metadata", "ocr_provider"),
+    ("document_context", "metadata", "ocr_status"),
+    ("document_context", "metadata", "file_mime_type"),
+    ("document_context", "metadata", "file_pages"),
+    ("mandate_context", "proof_requirements"),
+    ("document_context", "metadata"),
+)
+
+_MAX_STRING_CHARS = 160
+
+CONTEXT_KEY_LEGEND = (
+    "=== CONTEXT FORMAT ===\n\n"
+    "The user message is `JSON_CONTEXT:` followed by one compact JSON object. "
+    "Keys are abbreviated: "
+    + ", ".join(
+        f"{alias}={'/'.join(name for name, a in CONTEXT_KEY_ALIASES.items() if a == alias)}"
+        for alias in dict.fromkeys(CONTEXT_KEY_ALIASES.values())
+    )
+    + ". A missing key means unknown or not applicable. "
+    f'The value "{MASKED_VALUE}" means the field exists but was masked for privacy; do not penalise it. '
+    "An attached image, if any, is the proof document itself.\n"
+)
+
+
+@dataclass(frozen=True)
+class EncodedContext:
+    text: str
+    estimated_tokens: int
+    dropped: tuple[str, ...] = ()
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.dropped)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or (isinstance(value, (list, dict, tuple)) and not value)
+
+
+def _compact(value: Any, max_chars: int | None) -> Any:
+    if isinstance(value, dict):
+        out: dict[str, Any] = {}
+        for key, item in value.items():
+            if key in _DROPPED_KEYS:
+                continue
+            item = _compact(item, max_chars)
+            if _is_empty(item):
+                continue
+            alias = CONTEXT_KEY_ALIASES.get(key, key)
+            out[key if alias in out else alias] = item
+        return out
+    if isinstance(value, (list, tuple)):
+        items = [_compact(item, max_chars) for item in value]
+        return [item for item in items if not _is_empty(item)]
+    if value == AI_MASK_PLACEHOLDER:
+        return MASKED_VALUE
+    if isinstance(value, str) and max_chars is not None and len(value) > max_chars:
+        return value[:max_chars] + "…"
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _dump(compacted: dict[str, Any]) -> str:
+    return json.dumps(compacted, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str)
+
+
+def _without(context: dict[str, Any], path: tuple[str, ...]) -> bool:
+    node: Any = context
+    for key in path[:-1]:
+        node = node.get(key) if isinstance(node, dict) else None
+    if isinstance(node, dict) and path[-1] in node:
+        del node[path[-1]]
+        return True
+    return False
+
+
+def encode_ai_context(context: dict[str, Any], *, budget_tokens: int | None = None) -> EncodedContext:
+    """Compact JSON for ``context`` (already sanitized), within ``budget_tokens`` if given."""
+
+    text = _dump(_compact(context, None))
+    tokens = estimate_tokens(text)
+    if budget_tokens is None or tokens <= budget_tokens:
+        return EncodedContext(text=text, estimated_tokens=tokens)
+
+    working = json.loads(json.dumps(context, default=str))
+    dropped: list[str] = []
+    for path in _SHED_ORDER:
+        if _without(working, path):
+            dropped.append(".".join(path))
+            text = _dump(_compact(working, None))
+            tokens = estimate_tokens(text)
+            if tokens <= budget_tokens:
+                return EncodedContext(text=text, estimated_tokens=tokens, dropped=tuple(dropped))
+    text = _dump(_compact(working, _MAX_STRING_CHARS))
+    dropped.append("long_strings")
+    return EncodedContext(text=text, estimated_tokens=estimate_tokens(text), dropped=tuple(dropped))
+
+
+__all__ = [
+    "CONTEXT_KEY_ALIASES",
+    "CONTEXT_KEY_LEGEND",
+    "EncodedContext",
+    "encode_ai_context",
+    "estimate_tokens",
+]
@@ -0,0 +1,213 @@
+"""Local pre-screening of proofs before the AI advisor is called.
+
+Most proofs are settled by the backend checks alone: an invoice whose amount,
+currency and IBAN all match the milestone, or a photo that passed EXIF and
+geofence validation from a trusted source, is clean; an invoice in the wrong
+currency for a different amount is suspect. The document checks run on the
+metadata the submitter declared, so a match only counts towards clean when the
+OCR read the same value from the file (``ocr_raw``); without that, the local
+scorer can only find a document suspect. ``prescreen`` scores those signals
+with a small weight table (log-odds, squashed by a sigmoid) and a few guard
+rules, in a handful of microseconds and without I/O.
+
+When the clean probability reaches ``AI_PRESCREEN_CONFIDENCE`` (or falls to
+``1 - AI_PRESCREEN_CONFIDENCE``) the result stands in for the advisor's answer
+and no model call is made. Anything in between, or anything a guard rule
+refuses to decide, goes to the model as before. Decided results carry the
+``local_prescreen`` flag so reviewers can tell no model looked at the file.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from app.config import get_settings
+
+PRESCREEN_FLAG = "local_prescreen"
+
+# Relative amount difference below which a mismatch counts as small.
+_SMALL_AMOUNT_DIFF = Decimal("0.02")
+
+# Log-odds contribution of each signal towards "clean". Signal names double as
+# the advisor's flag vocabulary (see AI_PROOF_ADVISOR_CORE_PROMPT).
+WEIGHTS: dict[str, float] = {
+    "bias": -1.0,
+    "invoice_amount_match": 2.0,
+    "invoice_amount_mismatch_small": -1.5,
+    "invoice_amount_mismatch_large": -4.0,
+    "currency_match": 0.5,
+    "currency_mismatch": -3.0,
+    "iban_match": 1.5,
+    "iban_mismatch": -4.0,
+    "date_ok": 1.0,
+    "date_diff_large": -1.5,
+    "supplier_name_match": 1.0,
+    "supplier_name_mismatch": -1.0,
+    "missing_required_field": -2.0,
+    "gps_ok": 4.0,
+    "exif_ok": 1.0,
+}
+
+# Document match signals -> (check, value the check compared, ocr_raw key that must agree).
+_OCR_CORROBORATION: dict[str, tuple[str, str, str]] = {
+    "invoice_amount_match": ("amount_check", "invoice_amount", "total_amount"),
+    "currency_match": ("amount_check", "currency_actual", "currency"),
+    "iban_match": ("iban_check", "invoice_iban_last4", "iban_last4"),
+    "date_ok": ("date_check", "invoice_date", "invoice_date"),
+    "supplier_name_match": ("supplier_check", "actual_name", "supplier_name"),
+}
+
+# A clean verdict needs one of these; a suspect verdict needs one of these.
+_CLEAN_ANCHORS = frozenset({"invoice_amount_match", "gps_ok"})
+_SUSPECT_ANCHORS = frozenset({"invoice_amount_mismatch_large", "currency_mismatch", "iban_mismatch"})
+
+_EXPLANATIONS = {
+    "clean": (
+        "Évaluation locale à partir des contrôles automatiques : {signals}. "
+        "Les données sont cohérentes avec le mandat ; le modèle d'IA n'a pas été sollicité."
+    ),
+    "suspect": (
+        "Évaluation locale à partir des contrôles automatiques : {signals}. "
+        "Ces écarts sont incompatibles avec le mandat ; une vérification humaine est nécessaire. "
+        "Le modèle d'IA n'a pas été sollicité."
+    ),
+}
+
+
+@dataclass(frozen=True)
+class PrescreenResult:
+    probability: float
+    signals: tuple[str, ...]
+    risk_level: str | None = None
+    deferred_by: str | None = None
+
+    @property
+    def decided(self) -> bool:
+        return self.risk_level is not None
+
+    def as_ai_result(self) -> dict[str, Any]:
+        """The advisor-shaped result (risk_level, score, flags, explanation)."""
+
+        if self.risk_level is None:
+            raise ValueError("prescreen did not reach a decision")
+        return {
+            "risk_level": self.risk_level,
+            "score": round(self.probability, 4),
+            "flags": [*self.signals, PRESCREEN_FLAG],
+            "explanation": _EXPLANATIONS[self.risk_level].format(signals=", ".join(self.signals)),
+        }
+
+
+def _decimal(value: Any) -> Decimal | None:
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _read_by_ocr(checks: dict[str, Any], ocr: dict[str, Any], signal: str) -> bool:
+    check, field, ocr_key = _OCR_CORROBORATION[signal]
+    checked, read = (checks.get(check) or {}).get(field), ocr.get(ocr_key)
+    if checked is None or read is None:
+        return False
+    if signal == "invoice_amount_match":
+        return _decimal(checked) is not None and _decimal(checked) == _decimal(read)
+    return str(checked).strip().lower() == str(read).strip().lower()
+
+
+def _document_signals(checks: dict[str, Any], ocr: dict[str, Any]) -> list[str]:
+    signals: list[str] = []
+    amount = checks.get("amount_check") or {}
+    if amount.get("amount_match") is True:
+        signals.append("invoice_amount_match")
+    elif amount.get("amount_match") is False:
+        relative = _decimal(amount.get("relative_diff"))
+        small = relative is not None and abs(relative) <= _SMALL_AMOUNT_DIFF
+        signals.append("invoice_amount_mismatch_small" if small else "invoice_amount_mismatch_large")
+    if amount.get("currency_match") is True:
+        signals.append("currency_match")
+    elif amount.get("currency_match") is False:
+        signals.append("currency_mismatch")
+
+    iban_match = (checks.get("iban_check") or {}).get("match")
+    if iban_match is not None:
+        signals.append("iban_match" if iban_match else "iban_mismatch")
+    in_range = (checks.get("date_check") or {}).get("in_range")
+    if in_range is not None:
+        signals.append("date_ok" if in_range else "date_diff_large")
+    supplier = (checks.get("supplier_check") or {}).get("exact_match")
+    if supplier is not None:
+        signals.append("supplier_name_match" if supplier else "supplier_name_mismatch")
+    # A declared value matching the mandate proves nothing; a declared mismatch still counts.
+    return [
+        name for name in signals if name not in _OCR_CORROBORATION or _read_by_ocr(checks, ocr, name)
+    ]
+
+
+def _photo_signals(checks: dict[str, Any]) -> list[str]:
+    # validate_photo_metadata passing implies a fresh EXIF timestamp, a trusted
+    # source and, when the milestone has one, a position inside the geofence.
+    if checks.get("validation_ok") is not True:
+        return []
+    return ["gps_ok" if checks.get("geofence_configured") else "exif_ok"]
+
+
+def extract_signals(context: dict[str, Any]) -> list[str]:
+    """Map the backend checks of an advisor context to weighted signal names."""
+
+    checks = context.get("backend_checks") or {}
+    if not isinstance(checks, dict):
+        return []
+    if "validation_ok" in checks:
+        signals = _photo_signals(checks)
+    else:
+        metadata = ((context.get("document_context") or {}).get("metadata")) or {}
+        ocr = metadata.get("ocr_raw")
+        signals = _document_signals(checks, ocr if isinstance(ocr, dict) else {})
+    if checks.get("has_metadata") is False:
+        signals.append("missing_required_field")
+    return signals
+
+
+def _guard(context: dict[str, Any], signals: list[str], risk_level: str) -> str | None:
+    """Name of the rule that refuses ``risk_level`` for this proof, if any."""
+
+    metadata = ((context.get("document_context") or {}).get("metadata")) or {}
+    if risk_level == "clean":
+        if not _CLEAN_ANCHORS.intersection(signals):
+            return "no_clean_anchor"
+        if "missing_required_field" in signals:
+            return "missing_required_field"
+        if metadata.get("review_reason"):
+            return "manual_review_requested"
+        if metadata.get("invoice_normalization_errors"):
+            return "invoice_normalization_errors"
+    elif not _SUSPECT_ANCHORS.intersection(signals):
+        return "no_suspect_anchor"
+    return None
+
+
+def prescreen(context: dict[str, Any], *, confidence: float | None = None) -> PrescreenResult:
+    """Score ``context`` locally; ``result.decided`` says whether the model can be skipped."""
+
+    threshold = get_settings().AI_PRESCREEN_CONFIDENCE if confidence is None else confidence
+    signals = extract_signals(context)
+    logit = WEIGHTS["bias"] + sum(WEIGHTS[name] for name in signals)
+    probability = 1.0 / (1.0 + math.exp(-logit))
+    if probability >= threshold:
+        candidate = "clean"
+    elif probability <= 1.0 - threshold:
+        candidate = "suspect"
+    else:
+        return PrescreenResult(probability=probability, signals=tuple(signals), deferred_by="low_confidence")
+    refused_by = _guard(context, signals, candidate)
+    if refused_by is not None:
+        return PrescreenResult(probability=probability, signals=tuple(signals), deferred_by=refused_by)
+    return PrescreenResult(probability=probability, signals=tuple(signals), risk_level=candidate)
+
+
+__all__ = ["PRESCREEN_FLAG", "PrescreenResult", "WEIGHTS", "extract_signals", "prescreen"]
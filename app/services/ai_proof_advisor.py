@@ -2,64 +2,377 @@
 
 This module centralises calls to the OpenAI API to analyse proofs
 (invoices, photos, etc.) and return structured risk assessments.
+
+Calls go through ``AiClientPool``: one background event loop owns a
+long-lived ``httpx.AsyncClient`` per (base URL, API key) and an
+``asyncio.Semaphore`` capping in-flight requests at
+``AI_PROOF_MAX_CONCURRENCY``. Worker threads block on
+``call_ai_proof_advisor`` while the loop multiplexes the HTTP traffic.
+
+Each call has an end-to-end deadline (``AI_PROOF_DEADLINE_SECONDS``). Every
+attempt gets an equal share of what is left, capped by
+``AI_PROOF_TIMEOUT_SECONDS``, and attempts are separated by full-jitter
+exponential backoff that never sleeps past the deadline. Outcomes feed a
+thread-safe ``CircuitBreaker`` that opens on repeated failures inside a time
+window and half-opens after a cooldown.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
+import random
+import threading
 import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from copy import deepcopy
 from typing import Any, Dict, List, Optional
 
+import httpx
+from prometheus_client import Counter, Histogram
 
-from app.config import get_settings
+from app.config import Settings, get_settings, settings_provider
+from app.services.ai_context_encoding import CONTEXT_KEY_LEGEND, EncodedContext, encode_ai_context
 from app.services.ai_proof_flags import ai_enabled, ai_model, ai_timeout_seconds
-from app.utils.masking import (
-    AI_MASK_PLACEHOLDER,
-    SENSITIVE_PATTERNS,
-    mask_metadata_for_ai,
+from app.utils.masking import mask_metadata_for_ai, mask_sensitive_for_ai
+
+logger = logging.getLogger(__name__)
+
+AI_ADVISOR_CALL_SECONDS = Histogram(
+    "kobatella_ai_advisor_call_seconds",
+    "End-to-end AI proof advisor call latency, retries and queueing included.",
+    ["status"],  # success | error | deadline_exceeded | circuit_breaker_open | disabled | missing_api_key
+)
+AI_ADVISOR_TOKENS = Counter(
+    "kobatella_ai_advisor_tokens_total",
+    "AI proof advisor tokens: provider-reported input/cached_input/output, local context_estimated.",
+    ["kind"],
 )
 
-# Simple in-memory circuit breaker + metrics for AI Proof Advisor
-_AI_FAILURE_COUNT: int = 0
-_AI_FAILURE_THRESHOLD: int = 5
-_AI_CIRCUIT_OPEN: bool = False
 
-_AI_CALLS: int = 0
-_AI_ERRORS: int = 0
+# --------------------------------------------------
+# Circuit breaker
+# --------------------------------------------------
+class CircuitBreaker:
+    """Time-windowed breaker shared by every thread calling the advisor.
+
+    ``closed``: calls pass; failures older than ``window_seconds`` are
+    forgotten. ``threshold`` failures inside the window open it. ``open``:
+    calls are refused until ``cooldown_seconds`` have passed, then a single
+    probe is admitted (``half_open``). The probe's success closes the breaker,
+    its failure re-opens it for another cooldown.
+    """
 
-try:
-    from openai import (  # type: ignore[import-not-found]
-        APITimeoutError,
-        APIError,
-        RateLimitError,
-        OpenAI,
-    )
-except Exception:  # noqa: BLE001
-    OpenAI = None
-    APIError = None
-    RateLimitError = None
-    APITimeoutError = None
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        *,
+        threshold: int,
+        window_seconds: float,
+        cooldown_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._failures: deque[float] = deque()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._opened_total = 0
+        self.configure(threshold=threshold, window_seconds=window_seconds, cooldown_seconds=cooldown_seconds)
+
+    def configure(self, *, threshold: int, window_seconds: float, cooldown_seconds: float) -> None:
+        with self._lock:
+            self.threshold = max(1, int(threshold))
+            self.window_seconds = max(0.0, float(window_seconds))
+            self.cooldown_seconds = max(0.0, float(cooldown_seconds))
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._failures and self._failures[0] <= horizon:
+            self._failures.popleft()
+
+    def _open(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._opened_total += 1
+
+    def allow(self) -> bool:
+        """Return True when a call may go to the provider now."""
+
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown_seconds:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._probe_in_flight = False
+                self._failures.clear()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = self._clock()
+            if self._state != self.CLOSED:
+                self._open(now)
+                return
+            self._failures.append(now)
+            self._prune(now)
+            if len(self._failures) >= self.threshold:
+                self._failures.clear()
+                self._open(now)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def snapshot(self) -> dict[str, Any]:
+        state = self.state
+        with self._lock:
+            self._prune(self._clock())
+            return {
+                "state": state,
+                "failure_count": len(self._failures),
+                "opened_total": self._opened_total,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures.clear()
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+            self._opened_total = 0
+
+
+def _breaker_kwargs(settings: Settings) -> dict[str, float]:
+    return {
+        "threshold": settings.AI_PROOF_BREAKER_FAILURES,
+        "window_seconds": settings.AI_PROOF_BREAKER_WINDOW_SECONDS,
+        "cooldown_seconds": settings.AI_PROOF_BREAKER_COOLDOWN_SECONDS,
+    }
+
+
+_AI_BREAKER = CircuitBreaker(**_breaker_kwargs(get_settings()))
+
+
+# --------------------------------------------------
+# Async client pool
+# --------------------------------------------------
+class AiClientPool:
+    """Background event loop owning the provider HTTP clients and concurrency limit.
+
+    The loop thread starts on first use. ``run`` submits a coroutine from any
+    thread and waits for it; the coroutine should acquire ``slot`` around its
+    provider traffic so at most ``max_concurrency`` requests are in flight.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._clients: dict[tuple[str, str], httpx.AsyncClient] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+        self._limit = 0
+        self._in_flight = 0
+        self._waiting = 0
+        self._peak_in_flight = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._thread is not None and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name="ai-client-pool", daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread = loop, thread
+            self._clients = {}
+            self._semaphore = None
+            return loop
+
+    def run(self, coro_factory: Callable[[], Any], *, timeout: float) -> Any:
+        """Run ``coro_factory()`` on the pool loop and wait up to ``timeout`` seconds."""
+
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro_factory(), loop)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def client(self, *, base_url: str, api_key: str) -> httpx.AsyncClient:
+        """Long-lived client for ``base_url``/``api_key``; call from the pool loop."""
+
+        key = (base_url, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            limit = max(1, get_settings().AI_PROOF_MAX_CONCURRENCY)
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                headers={"Authorization": f"Bearer {api_key}"},
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            )
+            self._clients[key] = client
+        return client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        limit = max(1, get_settings().AI_PROOF_MAX_CONCURRENCY)
+        if self._semaphore is None or (limit != self._limit and self._in_flight == 0 and self._waiting == 0):
+            self._semaphore = asyncio.Semaphore(limit)
+            self._limit = limit
+        return self._semaphore
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a concurrency slot, giving up after ``timeout`` seconds."""
+
+        semaphore = self._get_semaphore()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        return True
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    async def _aclose_clients(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def drop_clients(self) -> None:
+        """Close pooled clients (e.g. after a key change); new ones open on demand."""
+
+        with self._lock:
+            loop = self._loop
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._aclose_clients(), loop)
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        if loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._aclose_clients(), loop).result(timeout=5)
+            except Exception:  # noqa: BLE001
+                logger.warning("AI client pool did not close its clients cleanly", exc_info=True)
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
+        self._clients = {}
+        self._semaphore = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "peak_in_flight": self._peak_in_flight,
+            "max_concurrency": max(1, get_settings().AI_PROOF_MAX_CONCURRENCY),
+        }
+
+
+_AI_POOL = AiClientPool()
+
+_AI_STATS_LOCK = threading.Lock()
+_AI_STATS: dict[str, int] = {
+    "calls": 0,
+    "errors": 0,
+    "retries": 0,
+    "deadline_exceeded": 0,
+    "rejected_open": 0,
+    "input_tokens": 0,
+    "cached_input_tokens": 0,
+    "output_tokens": 0,
+    "context_tokens_estimated": 0,
+    "context_truncated": 0,
+}
+
+
+def _bump(key: str, amount: int = 1) -> None:
+    with _AI_STATS_LOCK:
+        _AI_STATS[key] += amount
+
+
+_TOKEN_KINDS = {
+    "input_tokens": "input",
+    "cached_input_tokens": "cached_input",
+    "output_tokens": "output",
+    "context_tokens_estimated": "context_estimated",
+}
+
+
+def _record_tokens(counts: dict[str, int]) -> None:
+    with _AI_STATS_LOCK:
+        for key, value in counts.items():
+            _AI_STATS[key] += value
+    for key, value in counts.items():
+        AI_ADVISOR_TOKENS.labels(kind=_TOKEN_KINDS[key]).inc(value)
 
-logger = logging.getLogger(__name__)
 
+def _on_settings_change(old: Settings, new: Settings) -> None:
+    if _breaker_kwargs(old) != _breaker_kwargs(new):
+        _AI_BREAKER.configure(**_breaker_kwargs(new))
+    if (
+        old.OPENAI_API_KEY != new.OPENAI_API_KEY
+        or old.AI_PROOF_ADVISOR_BASE_URL != new.AI_PROOF_ADVISOR_BASE_URL
+        or old.AI_PROOF_MAX_CONCURRENCY != new.AI_PROOF_MAX_CONCURRENCY
+    ):
+        _AI_POOL.drop_clients()
 
-def _record_ai_success() -> None:
-    global _AI_FAILURE_COUNT, _AI_CIRCUIT_OPEN
-    _AI_FAILURE_COUNT = 0
-    _AI_CIRCUIT_OPEN = False
 
+settings_provider.subscribe(_on_settings_change)
 
-def _record_ai_failure() -> None:
-    global _AI_FAILURE_COUNT, _AI_CIRCUIT_OPEN, _AI_ERRORS
-    _AI_FAILURE_COUNT += 1
-    _AI_ERRORS += 1
-    if _AI_FAILURE_COUNT >= _AI_FAILURE_THRESHOLD:
-        _AI_CIRCUIT_OPEN = True
 
+def stop_ai_client_pool() -> None:
+    """Close pooled provider connections and stop the loop thread."""
 
-def _is_circuit_open() -> bool:
-    return _AI_CIRCUIT_OPEN
+    _AI_POOL.close()
+
+
+def reset_ai_advisor_state() -> None:
+    """Close the breaker and zero the counters (tests)."""
+
+    _AI_BREAKER.reset()
+    with _AI_STATS_LOCK:
+        for key in _AI_STATS:
+            _AI_STATS[key] = 0
 
 
 def _fallback_ai_result(reason: str) -> dict[str, Any]:
@@ -79,17 +392,24 @@ def _fallback_ai_result(reason: str) -> dict[str, Any]:
     }
 
 
-def get_ai_stats() -> dict[str, int]:
+def get_ai_stats() -> dict[str, Any]:
     """
     Expose basic counters for health/observability.
     """
 
-    return {
-        "calls": _AI_CALLS,
-        "errors": _AI_ERRORS,
-        "failure_count": _AI_FAILURE_COUNT,
-        "circuit_open": int(_AI_CIRCUIT_OPEN),
-    }
+    breaker = _AI_BREAKER.snapshot()
+    with _AI_STATS_LOCK:
+        stats: dict[str, Any] = dict(_AI_STATS)
+    stats.update(
+        {
+            "failure_count": breaker["failure_count"],
+            "circuit_open": int(breaker["state"] == CircuitBreaker.OPEN),
+            "circuit_state": breaker["state"],
+            "circuit_opened_total": breaker["opened_total"],
+        }
+    )
+    stats.update(_AI_POOL.stats())
+    return stats
 
 # --------------------------------------------------
 # 1️⃣ Core prompt (cacheable, ne change plus sans versioning)
@@ -223,26 +543,44 @@ Use the following logic consistently:
 """.strip()
 
 
+# Sent verbatim as the first message of every call, so providers can cache it as a prefix.
+AI_PROOF_ADVISOR_SYSTEM_PROMPT = f"{AI_PROOF_ADVISOR_CORE_PROMPT}\n\n{CONTEXT_KEY_LEGEND}"
+
+# Cached assessments are keyed on this, so editing the prompt invalidates them.
+AI_PROOF_PROMPT_VERSION = hashlib.sha256(AI_PROOF_ADVISOR_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+
 # --------------------------------------------------
 # 2️⃣ Helpers pour construire le message user
 # --------------------------------------------------
-def build_ai_user_content(
+def encode_ai_user_content(
     context: Dict[str, Any],
-) -> str:
-    """Build the user message content sent to the AI.
+    *,
+    budget_tokens: int | None = None,
+) -> EncodedContext:
+    """Compact encoding of the user message, within ``budget_tokens`` when given.
 
     The ``context`` dict should already contain:
     - "mandate_context": mandate / milestone / beneficiary context
     - "backend_checks": backend-computed validations (geofence, dates...)
     - "document_context": information about the uploaded document
     - optionally "ocr_text": OCR-extracted text
+
+    Instructions and the key legend live in the system prompt; the per-call
+    message is only the compact context (see ai_context_encoding).
     """
 
-    return (
-        "Voici les données de contexte et de vérifications backend pour une preuve.\n"
-        "Analyse-les selon tes instructions et renvoie STRICTEMENT un JSON conforme au schéma.\n\n"
-        f"JSON_CONTEXT:\n{json.dumps(context, ensure_ascii=False)}"
-    )
+    return encode_ai_context(context, budget_tokens=budget_tokens)
+
+
+def build_ai_user_content(
+    context: Dict[str, Any],
+    *,
+    budget_tokens: int | None = None,
+) -> str:
+    """Build the user message content sent to the AI."""
+
+    return f"JSON_CONTEXT:{encode_ai_user_content(context, budget_tokens=budget_tokens).text}"
 
 
 def _normalize_ai_result(raw: Dict[str, Any]) -> Dict[str, Any]:
@@ -274,30 +612,6 @@ def _normalize_ai_result(raw: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _mask_sensitive_only(data: dict[str, Any]) -> dict[str, Any]:
-    """Mask sensitive keys but keep non-sensitive fields intact."""
-
-    if not isinstance(data, dict):
-        return {}
-
-    cleaned: dict[str, Any] = {}
-    redacted_keys: list[str] = []
-
-    for key, value in data.items():
-        key_lower = str(key).lower()
-
-        if any(pattern in key_lower for pattern in SENSITIVE_PATTERNS):
-            cleaned[key] = AI_MASK_PLACEHOLDER
-            redacted_keys.append(key)
-        else:
-            cleaned[key] = value
-
-    if redacted_keys:
-        cleaned["_ai_redacted_keys"] = redacted_keys
-
-    return cleaned
-
-
 def _sanitize_context(context: dict) -> dict:
     """
     Ensure FULL privacy:
@@ -313,12 +627,12 @@ def _sanitize_context(context: dict) -> dict:
     # Mandate context – keep non-sensitive signals, redact only sensitive keys
     mandate = cleaned_context.get("mandate_context", {}) or {}
     mandate = mandate if isinstance(mandate, dict) else {}
-    cleaned_context["mandate_context"] = _mask_sensitive_only(mandate)
+    cleaned_context["mandate_context"] = mask_sensitive_for_ai(mandate)
 
     # Backend checks – keep computed signals, redact only sensitive keys
     backend = cleaned_context.get("backend_checks", {}) or {}
     backend = backend if isinstance(backend, dict) else {}
-    cleaned_context["backend_checks"] = _mask_sensitive_only(backend)
+    cleaned_context["backend_checks"] = mask_sensitive_for_ai(backend)
 
     # Document context
     doc_ctx = cleaned_context.get("document_context", {}) or {}
@@ -333,39 +647,17 @@ def _sanitize_context(context: dict) -> dict:
     return cleaned_context
 
 
+
+
 # --------------------------------------------------
 # 3️⃣ Fonction principale : appel OpenAI
 # --------------------------------------------------
-def _call_ai_proof_once(
-    client,
-    model: str,
+def _build_ai_messages(
     system_prompt: str,
-    sanitized_context: dict[str, Any],
-    timeout_seconds: int,
-    proof_storage_url: str | None = None,
-) -> dict[str, Any]:
-    """
-    Single low-level call to the AI provider.
-
-    This function assumes:
-    - client is already configured OpenAI client (or equivalent),
-    - sanitized_context has already been filtered for privacy.
-    """
-
-    user_content = build_ai_user_content(sanitized_context)
-
-    messages: List[Dict[str, Any]] = []
-    messages.append(
-        {
-            "role": "system",
-            "content": [
-                {
-                    "type": "input_text",
-                    "text": system_prompt,
-                }
-            ],
-        }
-    )
+    user_content: str,
+    proof_storage_url: str | None,
+) -> List[Dict[str, Any]]:
+    """Responses API ``input``: the cacheable system prompt, then the proof context."""
 
     user_content_parts: List[Dict[str, Any]] = [
         {
@@ -382,12 +674,75 @@ def _call_ai_proof_once(
             }
         )
 
-    messages.append(
+    return [
+        {
+            "role": "system",
+            "content": [
+                {
+                    "type": "input_text",
+                    "text": system_prompt,
+                }
+            ],
+        },
         {
             "role": "user",
             "content": user_content_parts,
-        }
-    )
+        },
+    ]
+
+
+def _output_text_from_payload(payload: Dict[str, Any]) -> str | None:
+    """Concatenate the ``output_text`` parts of a raw Responses API payload."""
+
+    if payload.get("output_text"):
+        return str(payload["output_text"])
+    parts: List[str] = []
+    for chunk in payload.get("output") or []:
+        for content_item in (chunk or {}).get("content") or []:
+            if (content_item or {}).get("type") == "output_text":
+                parts.append(str(content_item.get("text", "")))
+    return "".join(parts) or None
+
+
+def _usage_from(source: Any) -> dict[str, int]:
+    """Provider token counts from a Responses API payload dict or SDK response object."""
+
+    def _get(obj: Any, key: str) -> Any:
+        return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+    usage = _get(source, "usage")
+    if usage is None:
+        return {}
+    details = _get(usage, "input_tokens_details") or {}
+    counts = {
+        "input_tokens": _get(usage, "input_tokens"),
+        "cached_input_tokens": _get(details, "cached_tokens"),
+        "output_tokens": _get(usage, "output_tokens"),
+    }
+    return {key: int(value) for key, value in counts.items() if isinstance(value, int)}
+
+
+def _parse_ai_output(raw_text: str | None) -> dict[str, Any]:
+    if not raw_text:
+        raise ValueError("AI Proof Advisor did not return any text output")
+
+    raw_data = json.loads(raw_text)
+    return _normalize_ai_result(raw_data)
+
+
+def _call_ai_proof_once(
+    client,
+    model: str,
+    messages: List[Dict[str, Any]],
+    timeout_seconds: float,
+) -> tuple[dict[str, Any], dict[str, int]]:
+    """
+    Single low-level call through a caller-supplied, blocking client.
+
+    This function assumes:
+    - client is already configured OpenAI client (or equivalent),
+    - messages were built from a context already filtered for privacy.
+    """
 
     resp = client.responses.create(
         model=model,
@@ -408,11 +763,98 @@ def _call_ai_proof_once(
         except Exception:  # noqa: BLE001
             raw_text = None
 
-    if not raw_text:
-        raise ValueError("AI Proof Advisor did not return any text output")
+    return _parse_ai_output(raw_text), _usage_from(resp)
+
+
+async def _call_ai_proof_http(
+    http: httpx.AsyncClient,
+    *,
+    model: str,
+    messages: List[Dict[str, Any]],
+    timeout_seconds: float,
+    prompt_cache_key: str | None = None,
+) -> tuple[dict[str, Any], dict[str, int]]:
+    """Single attempt against ``POST {AI_PROOF_ADVISOR_BASE_URL}/responses``."""
+
+    body: Dict[str, Any] = {"model": model, "input": messages}
+    if prompt_cache_key:
+        body["prompt_cache_key"] = prompt_cache_key
+    response = await http.post("/responses", json=body, timeout=timeout_seconds)
+    response.raise_for_status()
+    payload = response.json()
+    return _parse_ai_output(_output_text_from_payload(payload)), _usage_from(payload)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code in (408, 409, 429) or code >= 500
+    return True
 
-    raw_data = json.loads(raw_text)
-    return _normalize_ai_result(raw_data)
+
+def _backoff_seconds(attempt: int, settings: Settings) -> float:
+    """Full jitter: uniform in [0, min(max, base * 2**attempt)]."""
+
+    ceiling = min(settings.AI_PROOF_BACKOFF_MAX_MS, settings.AI_PROOF_BACKOFF_BASE_MS * (2**attempt))
+    return random.uniform(0.0, max(ceiling, 0) / 1000.0)
+
+
+async def _advise_within_deadline(
+    attempt: Callable[[float], Any],
+    *,
+    deadline_seconds: float,
+    attempt_timeout: float,
+    max_attempts: int,
+    settings: Settings,
+) -> tuple[str, dict[str, Any] | None]:
+    """Run ``attempt(timeout)`` until it succeeds, the attempts run out or the deadline passes.
+
+    Returns ``(status, result)``; ``result`` is None unless status is ``success``.
+    """
+
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline_seconds
+    if not await _AI_POOL.acquire(deadline_at - loop.time()):
+        # Queued behind the concurrency limit for the whole budget.
+        return "deadline_exceeded", None
+    try:
+        if not _AI_BREAKER.allow():
+            return "circuit_breaker_open", None
+        try:
+            last_exc: BaseException | None = None
+            for index in range(max_attempts):
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    break
+                budget = min(attempt_timeout, remaining / (max_attempts - index))
+                try:
+                    result = await asyncio.wait_for(attempt(budget), timeout=budget)
+                except Exception as exc:  # noqa: BLE001
+                    last_exc = exc
+                    logger.warning(
+                        "AI Proof Advisor attempt %s/%s failed: %s", index + 1, max_attempts, exc
+                    )
+                    if not _is_retryable(exc) or index + 1 >= max_attempts:
+                        break
+                    delay = _backoff_seconds(index, settings)
+                    if loop.time() + delay >= deadline_at:
+                        break
+                    _bump("retries")
+                    await asyncio.sleep(delay)
+                    continue
+                _AI_BREAKER.record_success()
+                return "success", result
+            _AI_BREAKER.record_failure()
+            if loop.time() >= deadline_at or isinstance(last_exc, TimeoutError):
+                return "deadline_exceeded", None
+            return "retries_exhausted", None
+        except BaseException:
+            # Cancelled mid-call (caller timeout, shutdown): count it as a failure so a
+            # half-open probe is released instead of blocking every later call.
+            _AI_BREAKER.record_failure()
+            raise
+    finally:
+        _AI_POOL.release()
 
 
 def call_ai_proof_advisor(
@@ -421,26 +863,31 @@ def call_ai_proof_advisor(
     context: Dict[str, Any],
     proof_storage_url: Optional[str] = None,
     client: Any | None = None,
-    timeout_seconds: int | None = None,
+    timeout_seconds: float | None = None,
     system_prompt: str | None = None,
+    deadline_seconds: float | None = None,
+    usage: Dict[str, Any] | None = None,
 ) -> Dict[str, Any]:
-    """Call the Kobatela AI Proof Advisor with resilience helpers."""
+    """Call the Kobatela AI Proof Advisor with resilience helpers.
 
-    global _AI_CALLS, _AI_ERRORS
+    Blocks the calling thread until the pool loop returns or
+    ``deadline_seconds`` (default ``AI_PROOF_DEADLINE_SECONDS``) elapses.
+    ``client`` may be a blocking SDK-style client; its calls then run in the
+    loop's executor under the same deadline, semaphore and breaker.
+
+    When ``usage`` is given it is filled with the estimated context tokens,
+    any fields shed to meet ``AI_PROOF_CONTEXT_TOKEN_BUDGET`` and the
+    provider-reported input/cached/output token counts.
+    """
 
     start = time.monotonic()
     status = "success"
     outcome_reason: str | None = None
     settings = get_settings()
+    deadline = float(deadline_seconds or settings.AI_PROOF_DEADLINE_SECONDS)
 
     try:
-        if _is_circuit_open():
-            status = "circuit_breaker_open"
-            outcome_reason = "circuit_breaker_open"
-            logger.warning("AI circuit breaker open; skipping advisory call.")
-            return _fallback_ai_result("circuit_breaker_open")
-
-        _AI_CALLS += 1
+        _bump("calls")
 
         sanitized_context = _sanitize_context(context)
 
@@ -450,52 +897,98 @@ def call_ai_proof_advisor(
             logger.warning(
                 "AI Proof Advisor requested while feature is disabled; returning fallback result."
             )
-            _AI_ERRORS += 1
+            _bump("errors")
             return _fallback_ai_result("ai_disabled")
 
         api_key = settings.OPENAI_API_KEY
-        if not api_key:
+        if not api_key and client is None:
             status = "missing_api_key"
             outcome_reason = "missing_api_key"
             logger.warning("OPENAI_API_KEY is not set; returning fallback AI result.")
-            _AI_ERRORS += 1
+            _bump("errors")
             return _fallback_ai_result("missing_api_key")
 
-        if OpenAI is None:
-            status = "missing_sdk"
-            outcome_reason = "missing_sdk"
-            logger.warning("OpenAI SDK is not installed; returning fallback AI result.")
-            _AI_ERRORS += 1
-            return _fallback_ai_result("missing_sdk")
-
-        ai_client = client or OpenAI(api_key=api_key)
         model_to_use = model or ai_model()
-        timeout_to_use = timeout_seconds or ai_timeout_seconds()
-        system_prompt_to_use = system_prompt or AI_PROOF_ADVISOR_CORE_PROMPT
+        timeout_to_use = float(timeout_seconds or ai_timeout_seconds())
+        system_prompt_to_use = system_prompt or AI_PROOF_ADVISOR_SYSTEM_PROMPT
 
-        last_exc: Exception | None = None
-        for _attempt in range(2):
-            try:
-                result = _call_ai_proof_once(
-                    client=ai_client,
+        encoded = encode_ai_user_content(
+            sanitized_context, budget_tokens=settings.AI_PROOF_CONTEXT_TOKEN_BUDGET or None
+        )
+        _record_tokens({"context_tokens_estimated": encoded.estimated_tokens})
+        if encoded.truncated:
+            _bump("context_truncated")
+            logger.info("AI context over token budget; shed %s", ", ".join(encoded.dropped))
+        if usage is not None:
+            usage["context_tokens_estimated"] = encoded.estimated_tokens
+            if encoded.truncated:
+                usage["context_dropped"] = list(encoded.dropped)
+        messages = _build_ai_messages(system_prompt_to_use, f"JSON_CONTEXT:{encoded.text}", proof_storage_url)
+
+        if client is not None:
+
+            def attempt(budget: float) -> Any:
+                return asyncio.to_thread(
+                    _call_ai_proof_once,
+                    client=client,
+                    model=model_to_use,
+                    messages=messages,
+                    timeout_seconds=budget,
+                )
+
+        else:
+            base_url = settings.AI_PROOF_ADVISOR_BASE_URL.rstrip("/")
+            # Only the stock prompt has a version to route cache hits on.
+            cache_key = None
+            if settings.AI_PROOF_PROMPT_CACHE_KEY and system_prompt_to_use == AI_PROOF_ADVISOR_SYSTEM_PROMPT:
+                cache_key = f"{settings.AI_PROOF_PROMPT_CACHE_KEY}-{AI_PROOF_PROMPT_VERSION}"
+
+            def attempt(budget: float) -> Any:
+                http = _AI_POOL.client(base_url=base_url, api_key=api_key)
+                return _call_ai_proof_http(
+                    http,
                     model=model_to_use,
-                    system_prompt=system_prompt_to_use,
-                    sanitized_context=sanitized_context,
-                    timeout_seconds=timeout_to_use,
-                    proof_storage_url=proof_storage_url,
+                    messages=messages,
+                    timeout_seconds=budget,
+                    prompt_cache_key=cache_key,
                 )
-                _record_ai_success()
-                return result
-            except Exception as exc:  # noqa: BLE001
-                last_exc = exc
-                _record_ai_failure()
 
+        try:
+            status, result = _AI_POOL.run(
+                lambda: _advise_within_deadline(
+                    attempt,
+                    deadline_seconds=deadline,
+                    attempt_timeout=timeout_to_use,
+                    max_attempts=max(1, settings.AI_PROOF_MAX_ATTEMPTS),
+                    settings=settings,
+                ),
+                timeout=deadline + 1.0,
+            )
+        except FutureTimeoutError:
+            status, result = "deadline_exceeded", None
+
+        if result is not None:
+            advice, provider_usage = result
+            _record_tokens(provider_usage)
+            if usage is not None:
+                usage.update(provider_usage)
+            return advice
+        outcome_reason = status
+        if status == "circuit_breaker_open":
+            _bump("rejected_open")
+            logger.warning("AI circuit breaker open; skipping advisory call.")
+            return _fallback_ai_result("circuit_breaker_open")
+        _bump("errors")
+        if status == "deadline_exceeded":
+            _bump("deadline_exceeded")
+            logger.error("AI Proof Advisor exceeded its %.1fs deadline", deadline)
+            return _fallback_ai_result("deadline_exceeded")
         status = "error"
-        outcome_reason = "retries_exhausted"
-        logger.exception("AI Proof Advisor failed after retries: %s", last_exc)
+        logger.error("AI Proof Advisor failed after retries")
         return _fallback_ai_result("retries_exhausted")
     finally:
         duration = time.monotonic() - start
+        AI_ADVISOR_CALL_SECONDS.labels(status=status).observe(duration)
         logger.info(
             "AI proof advisor call completed",
             extra={
@@ -0,0 +1,409 @@
+"""Write-behind buffer and rollups for API key usage book-keeping.
+
+``require_api_key`` used to update ``api_keys.last_used_at``, insert an
+``API_KEY_USED`` audit row and commit on every authenticated request. Usage
+is now counted in ``api_key_usage_rollups`` per (key, scope, route template,
+minute bucket); raw audit rows are only kept for admin keys and for a sampled
+fraction of the other calls.
+
+The buffer below coalesces ``last_used_at`` per key, sums rollup counts and
+bulk-inserts the audit rows every ``API_KEY_USAGE_FLUSH_INTERVAL_MS`` or as
+soon as ``API_KEY_USAGE_FLUSH_MAX_ENTRIES`` entries are pending. Pending
+entries are flushed when the application shuts down.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Mapping
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.config import get_settings
+from app.models.api_key import ApiKey
+from app.models.api_key_usage import ApiKeyUsageRollup
+from app.models.audit import AuditLog
+from app.utils.audit import sanitize_payload_for_audit
+
+logger = logging.getLogger(__name__)
+
+LEGACY_KEY_ID = 0
+
+RollupKey = tuple[int, str, str, datetime]
+
+_UPSERT_CHUNK_ROWS = 1000
+
+
+def minute_bucket(at: datetime) -> datetime:
+    """Return the UTC minute bucket containing ``at``."""
+
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return at.astimezone(timezone.utc).replace(second=0, microsecond=0)
+
+
+def build_usage_audit_row(
+    *,
+    actor: str,
+    action: str,
+    entity_id: int,
+    data: Mapping[str, Any],
+    at: datetime,
+) -> dict[str, Any]:
+    """Return the column mapping for an ``ApiKey`` usage audit row."""
+
+    return {
+        "actor": actor,
+        "action": action,
+        "entity": "ApiKey",
+        "entity_id": entity_id,
+        "data_json": sanitize_payload_for_audit(dict(data)),
+        "at": at,
+    }
+
+
+def _upsert_rollups(db: Session, rollups: Mapping[RollupKey, int]) -> None:
+    rows = [
+        {
+            "api_key_id": key_id,
+            "scope": scope,
+            "route": route,
+            "bucket_start": bucket,
+            "count": count,
+        }
+        for (key_id, scope, route, bucket), count in rollups.items()
+    ]
+    conflict_cols = ["api_key_id", "scope", "route", "bucket_start"]
+    dialect = db.get_bind().dialect.name
+    if dialect in {"sqlite", "postgresql"}:
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        table = ApiKeyUsageRollup.__table__
+        now = datetime.now(timezone.utc)
+        # One multi-row upsert per chunk; chunks keep SQLite under its bound-parameter limit.
+        for start in range(0, len(rows), _UPSERT_CHUNK_ROWS):
+            chunk = rows[start : start + _UPSERT_CHUNK_ROWS]
+            stmt = dialect_insert(table).values([{**row, "created_at": now, "updated_at": now} for row in chunk])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_cols,
+                set_={"count": table.c.count + stmt.excluded.count, "updated_at": now},
+            )
+            db.execute(stmt)
+        return
+
+    for row in rows:
+        result = db.execute(
+            update(ApiKeyUsageRollup)
+            .where(*(getattr(ApiKeyUsageRollup, col) == row[col] for col in conflict_cols))
+            .values(count=ApiKeyUsageRollup.count + row["count"])
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(ApiKeyUsageRollup), [row])
+
+
+def persist_usage(
+    db: Session,
+    last_used: Mapping[int, datetime],
+    audit_rows: list[dict[str, Any]],
+    rollups: Mapping[RollupKey, int] | None = None,
+) -> None:
+    """Stage ``last_used_at`` updates, rollup increments and audit rows on ``db``."""
+
+    if last_used:
+        db.execute(
+            update(ApiKey),
+            [{"id": key_id, "last_used_at": at} for key_id, at in last_used.items()],
+        )
+    if rollups:
+        _upsert_rollups(db, rollups)
+    if audit_rows:
+        db.execute(insert(AuditLog), audit_rows)
+
+
+class ApiKeyUsageBuffer:
+    """Thread-safe write-behind buffer flushed by a background thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_used: dict[int, datetime] = {}
+        self._rollups: dict[RollupKey, int] = {}
+        self._audit_rows: list[dict[str, Any]] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._max_entries = 500
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._flush_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def record(
+        self,
+        *,
+        api_key_id: int,
+        scope: str,
+        route: str,
+        at: datetime,
+        audit_row: dict[str, Any] | None = None,
+    ) -> None:
+        """Queue a usage event; ``LEGACY_KEY_ID`` skips the ``last_used_at`` update."""
+
+        rollup_key = (api_key_id, scope, route, minute_bucket(at))
+        with self._lock:
+            if api_key_id != LEGACY_KEY_ID:
+                previous = self._last_used.get(api_key_id)
+                if previous is None or at > previous:
+                    self._last_used[api_key_id] = at
+            self._rollups[rollup_key] = self._rollups.get(rollup_key, 0) + 1
+            if audit_row is not None:
+                self._audit_rows.append(audit_row)
+            pending = len(self._audit_rows) + len(self._rollups)
+        if pending >= self._max_entries:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._audit_rows) + len(self._rollups)
+
+    def _drain(self) -> tuple[dict[int, datetime], list[dict[str, Any]], dict[RollupKey, int]]:
+        with self._lock:
+            drained = self._last_used, self._audit_rows, self._rollups
+            self._last_used, self._audit_rows, self._rollups = {}, [], {}
+        return drained
+
+    def _requeue(
+        self,
+        last_used: dict[int, datetime],
+        audit_rows: list[dict[str, Any]],
+        rollups: dict[RollupKey, int],
+    ) -> None:
+        with self._lock:
+            for key_id, at in last_used.items():
+                current = self._last_used.get(key_id)
+                if current is None or at > current:
+                    self._last_used[key_id] = at
+            for rollup_key, count in rollups.items():
+                self._rollups[rollup_key] = self._rollups.get(rollup_key, 0) + count
+            self._audit_rows[:0] = audit_rows
+
+    def flush(self, *, db_session: Session | None = None) -> int:
+        """Write all pending entries in one transaction and return the entry count."""
+
+        last_used, audit_rows, rollups = self._drain()
+        if not last_used and not audit_rows and not rollups:
+            return 0
+
+        written = len(audit_rows) + len(rollups)
+        session = db_session or db_module.get_sessionmaker()()
+        try:
+            persist_usage(session, last_used, audit_rows, rollups)
+            session.commit()
+        except Exception:  # noqa: BLE001
+            session.rollback()
+            self._requeue(last_used, audit_rows, rollups)
+            with self._lock:
+                self._flush_errors += 1
+            logger.exception(
+                "API key usage flush failed; entries re-queued",
+                extra={"pending": written},
+            )
+            return 0
+        finally:
+            if db_session is None:
+                session.close()
+
+        with self._lock:
+            self._flushes += 1
+            self._flushed_rows += written
+        return written
+
+    def _run(self, interval_seconds: float) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(interval_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def start(self, *, interval_ms: int, max_entries: int) -> None:
+        if self.running:
+            return
+        self._max_entries = max(1, max_entries)
+        self._stop.clear()
+        self._wake.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(max(interval_ms, 1) / 1000.0,),
+            name="apikey-usage-flusher",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and flush whatever is still buffered."""
+
+        thread = self._thread
+        self._stop.set()
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout=10)
+        self._thread = None
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "running": int(self.running),
+                "pending": len(self._audit_rows),
+                "pending_keys": len(self._last_used),
+                "pending_rollups": len(self._rollups),
+                "flushes": self._flushes,
+                "flushed_rows": self._flushed_rows,
+                "flush_errors": self._flush_errors,
+            }
+
+
+_USAGE_BUFFER = ApiKeyUsageBuffer()
+
+
+def _buffered(api_key_id: int, scope: str, route: str, at: datetime, audit_row: dict[str, Any] | None) -> bool:
+    if get_settings().API_KEY_USAGE_BUFFER_ENABLED and _USAGE_BUFFER.running:
+        _USAGE_BUFFER.record(api_key_id=api_key_id, scope=scope, route=route, at=at, audit_row=audit_row)
+        return True
+    return False
+
+
+def _write_through(
+    db: Session, api_key_id: int, scope: str, route: str, at: datetime, audit_row: dict[str, Any] | None
+) -> None:
+    last_used = {api_key_id: at} if api_key_id != LEGACY_KEY_ID else {}
+    rollups = {(api_key_id, scope, route, minute_bucket(at)): 1}
+    persist_usage(db, last_used, [audit_row] if audit_row is not None else [], rollups)
+
+
+def record_api_key_usage(
+    db: Session,
+    *,
+    api_key_id: int,
+    scope: str,
+    route: str,
+    at: datetime,
+    audit_row: dict[str, Any] | None = None,
+) -> None:
+    """Buffer a usage event, or write it through ``db`` when the buffer is not running."""
+
+    if _buffered(api_key_id, scope, route, at, audit_row):
+        return
+    _write_through(db, api_key_id, scope, route, at, audit_row)
+    db.commit()
+
+
+async def record_api_key_usage_async(
+    db: AsyncSession,
+    *,
+    api_key_id: int,
+    scope: str,
+    route: str,
+    at: datetime,
+    audit_row: dict[str, Any] | None = None,
+) -> None:
+    """``record_api_key_usage`` on an ``AsyncSession``; buffering needs no I/O at all."""
+
+    if _buffered(api_key_id, scope, route, at, audit_row):
+        return
+    await db.run_sync(_write_through, api_key_id, scope, route, at, audit_row)
+    await db.commit()
+
+
+def get_key_usage(
+    db: Session,
+    api_key_id: int,
+    *,
+    since: datetime,
+    until: datetime | None = None,
+) -> dict[str, Any]:
+    """Aggregate the usage rollups of one key, per route and per minute bucket."""
+
+    filters = [
+        ApiKeyUsageRollup.api_key_id == api_key_id,
+        ApiKeyUsageRollup.bucket_start >= minute_bucket(since),
+    ]
+    if until is not None:
+        filters.append(ApiKeyUsageRollup.bucket_start <= until)
+
+    by_route = db.execute(
+        select(
+            ApiKeyUsageRollup.route,
+            ApiKeyUsageRollup.scope,
+            func.sum(ApiKeyUsageRollup.count).label("count"),
+        )
+        .where(*filters)
+        .group_by(ApiKeyUsageRollup.route, ApiKeyUsageRollup.scope)
+        .order_by(func.sum(ApiKeyUsageRollup.count).desc())
+    ).all()
+    buckets = db.execute(
+        select(
+            ApiKeyUsageRollup.bucket_start,
+            func.sum(ApiKeyUsageRollup.count).label("count"),
+        )
+        .where(*filters)
+        .group_by(ApiKeyUsageRollup.bucket_start)
+        .order_by(ApiKeyUsageRollup.bucket_start)
+    ).all()
+
+    return {
+        "api_key_id": api_key_id,
+        "since": since,
+        "until": until,
+        "total": sum(int(row.count) for row in by_route),
+        "by_route": [
+            {"route": row.route, "scope": row.scope, "count": int(row.count)} for row in by_route
+        ],
+        "buckets": [
+            {"bucket_start": row.bucket_start, "count": int(row.count)} for row in buckets
+        ],
+    }
+
+
+def start_usage_buffer() -> None:
+    settings = get_settings()
+    if not settings.API_KEY_USAGE_BUFFER_ENABLED:
+        return
+    _USAGE_BUFFER.start(
+        interval_ms=settings.API_KEY_USAGE_FLUSH_INTERVAL_MS,
+        max_entries=settings.API_KEY_USAGE_FLUSH_MAX_ENTRIES,
+    )
+
+
+def stop_usage_buffer() -> None:
+    _USAGE_BUFFER.stop()
+
+
+def get_usage_buffer() -> ApiKeyUsageBuffer:
+    return _USAGE_BUFFER
+
+
+def get_usage_buffer_stats() -> dict[str, int]:
+    return _USAGE_BUFFER.stats()
+
+
+__all__ = [
+    "LEGACY_KEY_ID",
+    "ApiKeyUsageBuffer",
+    "build_usage_audit_row",
+    "get_key_usage",
+    "get_usage_buffer",
+    "get_usage_buffer_stats",
+    "minute_bucket",
+    "persist_usage",
+    "record_api_key_usage",
+    "record_api_key_usage_async",
+    "start_usage_buffer",
+    "stop_usage_buffer",
+]
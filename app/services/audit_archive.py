@@ -0,0 +1,267 @@
+"""Cold tier for ``audit_logs``: compressed, immutable segment files.
+
+``archive_audit_logs_once`` moves rows older than ``AUDIT_ARCHIVE_AFTER_DAYS``
+into segment files under ``AUDIT_ARCHIVE_DIR``. A segment is a concatenation
+of gzip members, one per block of ``AUDIT_ARCHIVE_BLOCK_ROWS`` rows written as
+NDJSON, so ``zcat`` reads a whole segment while queries can seek to and
+decompress a single block. The ``audit_segments`` row is the sparse index: the
+byte range, time range and entity names of every block.
+
+Rows keep their ``chain_seq`` and ``row_hash`` (see ``audit_chain``); with
+the chain enabled only rows already pinned by a checkpoint are archived.
+
+A segment is written to a temporary file, fsynced, renamed and made
+read-only before its index row commits. Only then are its rows deleted from
+``audit_logs``, ``AUDIT_ARCHIVE_DELETE_CHUNK`` ids per transaction. The
+segment stays ``deleting`` until the last chunk is gone; an interrupted run
+resumes those deletions first. Until then a row can exist in both tiers, and
+readers de-duplicate by id.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.config import get_settings
+from app.models.audit import AuditCheckpoint, AuditLog, AuditSegment
+from app.services import audit_chain
+from app.utils.time import utcnow
+
+logger = logging.getLogger(__name__)
+
+_STATS_LOCK = threading.Lock()
+_ARCHIVE_STATS: dict[str, Any] = {
+    "runs": 0,
+    "errors": 0,
+    "segments_written": 0,
+    "rows_archived": 0,
+    "rows_deleted": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+}
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Return ``value`` as a naive UTC datetime (the form SQLite hands back)."""
+
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value
+
+
+def archive_dir() -> Path:
+    return Path(get_settings().AUDIT_ARCHIVE_DIR)
+
+
+def _record(row: AuditLog) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "actor": row.actor,
+        "action": row.action,
+        "entity": row.entity,
+        "entity_id": row.entity_id,
+        "data_json": row.data_json,
+        "at": naive_utc(row.at).isoformat(),
+        "chain_seq": row.chain_seq,
+        "row_hash": row.row_hash,
+    }
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _seq_range(rows: list[AuditLog]) -> tuple[int | None, int | None]:
+    seqs = [row.chain_seq for row in rows if row.chain_seq is not None]
+    return (min(seqs), max(seqs)) if seqs else (None, None)
+
+
+def write_segment(directory: Path, rows: list[AuditLog], *, block_rows: int) -> AuditSegment:
+    """Write ``rows`` to a new segment file and return its (unsaved) index row."""
+
+    rows = sorted(rows, key=lambda row: (naive_utc(row.at), row.id))
+    first_id = min(row.id for row in rows)
+    last_id = max(row.id for row in rows)
+    first_seq, last_seq = _seq_range(rows)
+    filename = f"audit-{first_id:012d}-{last_id:012d}.ndjson.gz"
+    directory.mkdir(parents=True, exist_ok=True)
+    final_path = directory / filename
+    tmp_path = directory / f".{filename}.tmp"
+
+    digest = hashlib.sha256()
+    blocks: list[dict[str, Any]] = []
+    with open(tmp_path, "wb") as fh:
+        for chunk in _chunks(rows, max(1, block_rows)):
+            payload = "".join(
+                json.dumps(_record(row), separators=(",", ":"), default=str) + "\n" for row in chunk
+            )
+            data = gzip.compress(payload.encode("utf-8"), mtime=0)
+            min_seq, max_seq = _seq_range(chunk)
+            blocks.append(
+                {
+                    "offset": fh.tell(),
+                    "length": len(data),
+                    "rows": len(chunk),
+                    "min_at": naive_utc(chunk[0].at).isoformat(),
+                    "max_at": naive_utc(chunk[-1].at).isoformat(),
+                    "entities": sorted({row.entity for row in chunk}),
+                    "min_seq": min_seq,
+                    "max_seq": max_seq,
+                }
+            )
+            fh.write(data)
+            digest.update(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, final_path)
+    os.chmod(final_path, 0o444)
+
+    return AuditSegment(
+        filename=filename,
+        first_id=first_id,
+        last_id=last_id,
+        min_at=naive_utc(rows[0].at).replace(tzinfo=UTC),
+        max_at=naive_utc(rows[-1].at).replace(tzinfo=UTC),
+        row_count=len(rows),
+        first_seq=first_seq,
+        last_seq=last_seq,
+        sha256=digest.hexdigest(),
+        status="deleting",
+        entities=sorted({row.entity for row in rows}),
+        blocks=blocks,
+    )
+
+
+@lru_cache(maxsize=64)
+def _read_block(path: str, offset: int, length: int) -> tuple[dict[str, Any], ...]:
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        payload = gzip.decompress(fh.read(length)).decode("utf-8")
+    records = []
+    for line in payload.splitlines():
+        record = json.loads(line)
+        record["at"] = datetime.fromisoformat(record["at"])
+        records.append(record)
+    return tuple(records)
+
+
+def read_block(
+    segment: AuditSegment, block: dict[str, Any], *, directory: Path | None = None
+) -> tuple[dict[str, Any], ...]:
+    """Decompress one block of ``segment``; blocks are immutable, so results are cached."""
+
+    path = (directory or archive_dir()) / segment.filename
+    return _read_block(str(path), int(block["offset"]), int(block["length"]))
+
+
+def iter_segment_records(
+    segment: AuditSegment,
+    blocks: Iterable[dict[str, Any]] | None = None,
+    *,
+    directory: Path | None = None,
+) -> Iterator[dict]:
+    for block in segment.blocks if blocks is None else blocks:
+        yield from read_block(segment, block, directory=directory)
+
+
+def _delete_archived_rows(db: Session, segment: AuditSegment, *, chunk_size: int) -> int:
+    ids = [record["id"] for record in iter_segment_records(segment)]
+    deleted = 0
+    for chunk in _chunks(ids, max(1, chunk_size)):
+        deleted += db.execute(delete(AuditLog).where(AuditLog.id.in_(chunk))).rowcount
+        db.commit()
+    segment.status = "sealed"
+    db.commit()
+    return deleted
+
+
+def archive_audit_logs_once(db: Session | None = None, *, now: datetime | None = None) -> dict[str, int] | None:
+    """Move every audit row older than the configured age to segment files."""
+
+    settings = get_settings()
+    session = db or db_module.get_sessionmaker()()
+    started = time.perf_counter()
+    written = archived = deleted = 0
+    try:
+        for segment in session.scalars(select(AuditSegment).where(AuditSegment.status == "deleting")).all():
+            deleted += _delete_archived_rows(session, segment, chunk_size=settings.AUDIT_ARCHIVE_DELETE_CHUNK)
+
+        cutoff = (now or utcnow()) - timedelta(days=settings.AUDIT_ARCHIVE_AFTER_DAYS)
+        eligible = select(AuditLog).where(AuditLog.at < cutoff)
+        if settings.AUDIT_CHAIN_ENABLED:
+            # Only rows pinned by a checkpoint leave the hot table, so the chain
+            # head is always recoverable and every archived row stays verifiable.
+            audit_chain.checkpoint_audit_chain(session)
+            pinned = session.scalar(select(func.max(AuditCheckpoint.last_seq))) or 0
+            eligible = eligible.where(AuditLog.chain_seq <= pinned)
+        batch = max(1, settings.AUDIT_ARCHIVE_SEGMENT_ROWS)
+        while True:
+            rows = session.scalars(eligible.order_by(AuditLog.id).limit(batch)).all()
+            if not rows:
+                break
+            segment = write_segment(archive_dir(), list(rows), block_rows=settings.AUDIT_ARCHIVE_BLOCK_ROWS)
+            session.add(segment)
+            session.commit()
+            written += 1
+            archived += segment.row_count
+            for row in rows:
+                session.expunge(row)
+            deleted += _delete_archived_rows(session, segment, chunk_size=settings.AUDIT_ARCHIVE_DELETE_CHUNK)
+            if len(rows) < batch:
+                break
+    except Exception:  # noqa: BLE001
+        session.rollback()
+        logger.exception("Audit archive run failed")
+        with _STATS_LOCK:
+            _ARCHIVE_STATS["errors"] += 1
+        return None
+    finally:
+        if db is None:
+            session.close()
+
+    with _STATS_LOCK:
+        _ARCHIVE_STATS["runs"] += 1
+        _ARCHIVE_STATS["segments_written"] += written
+        _ARCHIVE_STATS["rows_archived"] += archived
+        _ARCHIVE_STATS["rows_deleted"] += deleted
+        _ARCHIVE_STATS["last_run_at"] = time.time()
+        _ARCHIVE_STATS["last_duration_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+    if written:
+        logger.info("Audit rows archived", extra={"segments": written, "rows": archived})
+    return {"segments": written, "rows_archived": archived, "rows_deleted": deleted}
+
+
+def get_audit_archive_stats() -> dict[str, Any]:
+    settings = get_settings()
+    with _STATS_LOCK:
+        stats = dict(_ARCHIVE_STATS)
+    return {
+        "enabled": bool(settings.AUDIT_ARCHIVE_ENABLED),
+        "after_days": settings.AUDIT_ARCHIVE_AFTER_DAYS,
+        **stats,
+    }
+
+
+__all__ = [
+    "archive_audit_logs_once",
+    "get_audit_archive_stats",
+    "iter_segment_records",
+    "naive_utc",
+    "read_block",
+    "write_segment",
+]
@@ -0,0 +1,180 @@
+"""Transactional outbox for audit entries and its batched background writer.
+
+``log_audit`` adds one ``AuditOutbox`` row to the caller's session, so the
+entry commits (or rolls back) with the change it describes and a crash can
+never keep one without the other. A single writer thread per process moves
+committed entries to ``audit_logs`` every ``AUDIT_OUTBOX_FLUSH_INTERVAL_MS``
+with one ``INSERT ... SELECT`` and one ``DELETE`` per batch, in outbox id
+order. Entries left behind by a crash are picked up on the next start.
+
+While the writer is not running (scripts, tests, ``AUDIT_OUTBOX_ENABLED``
+off) ``log_audit`` writes ``audit_logs`` directly, as before.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.config import get_settings
+from app.models.audit import AuditLog, AuditOutbox
+
+logger = logging.getLogger(__name__)
+
+_COPIED_COLUMNS = ("actor", "action", "entity", "entity_id", "data_json", "at", "created_at", "updated_at")
+
+
+def drain_audit_outbox(db: Session, *, batch_size: int = 500) -> int:
+    """Move up to ``batch_size`` outbox entries to ``audit_logs``; the caller commits."""
+
+    ids = db.scalars(
+        select(AuditOutbox.id)
+        .order_by(AuditOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        return 0
+
+    outbox = AuditOutbox.__table__
+    db.execute(
+        insert(AuditLog.__table__).from_select(
+            list(_COPIED_COLUMNS),
+            select(*(outbox.c[name] for name in _COPIED_COLUMNS))
+            .where(outbox.c.id.in_(ids))
+            .order_by(outbox.c.id),
+        )
+    )
+    deleted = db.execute(delete(outbox).where(outbox.c.id.in_(ids))).rowcount
+    if deleted != len(ids):
+        # Another writer moved part of this batch; roll back rather than duplicate it.
+        raise RuntimeError(f"audit outbox batch changed while draining ({deleted}/{len(ids)})")
+    return len(ids)
+
+
+class AuditOutboxWriter:
+    """Background thread copying committed outbox entries to ``audit_logs``."""
+
+    def __init__(self, session_factory: Callable[[], Session] | None = None) -> None:
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._batch_size = 500
+        self._batches = 0
+        self._drained_rows = 0
+        self._errors = 0
+        self._last_drain_at: float | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def drain(self) -> int:
+        """Drain the outbox batch by batch until it is empty; return the entries moved."""
+
+        factory = self._session_factory or db_module.get_sessionmaker()
+        total = 0
+        while True:
+            session = factory()
+            try:
+                moved = drain_audit_outbox(session, batch_size=self._batch_size)
+                session.commit()
+            except Exception:  # noqa: BLE001
+                session.rollback()
+                with self._lock:
+                    self._errors += 1
+                logger.exception("Audit outbox drain failed; entries stay queued")
+                return total
+            finally:
+                session.close()
+            if not moved:
+                return total
+            total += moved
+            with self._lock:
+                self._batches += 1
+                self._drained_rows += moved
+                self._last_drain_at = time.time()
+            if moved < self._batch_size:
+                return total
+
+    def _run(self, interval_seconds: float) -> None:
+        while True:
+            self.drain()
+            if self._stop.wait(interval_seconds):
+                return
+
+    def start(self, *, interval_ms: int, batch_size: int) -> None:
+        if self.running:
+            return
+        self._batch_size = max(1, batch_size)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(max(interval_ms, 1) / 1000.0,),
+            name="audit-outbox-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread, then drain what was committed in the meantime."""
+
+        thread = self._thread
+        self._stop.set()
+        if thread is not None:
+            thread.join(timeout=10)
+        self._thread = None
+        self.drain()
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "running": int(self.running),
+                "batches": self._batches,
+                "drained_rows": self._drained_rows,
+                "errors": self._errors,
+                "last_drain_at": self._last_drain_at,
+            }
+
+
+_AUDIT_WRITER = AuditOutboxWriter()
+
+
+def audit_outbox_active() -> bool:
+    """True when new audit entries should be staged in the outbox."""
+
+    return bool(get_settings().AUDIT_OUTBOX_ENABLED) and _AUDIT_WRITER.running
+
+
+def start_audit_writer() -> None:
+    settings = get_settings()
+    if not settings.AUDIT_OUTBOX_ENABLED:
+        return
+    _AUDIT_WRITER.start(
+        interval_ms=settings.AUDIT_OUTBOX_FLUSH_INTERVAL_MS,
+        batch_size=settings.AUDIT_OUTBOX_BATCH_SIZE,
+    )
+
+
+def stop_audit_writer() -> None:
+    _AUDIT_WRITER.stop()
+
+
+def get_audit_outbox_stats() -> dict[str, object]:
+    return _AUDIT_WRITER.stats()
+
+
+__all__ = [
+    "AuditOutboxWriter",
+    "audit_outbox_active",
+    "drain_audit_outbox",
+    "get_audit_outbox_stats",
+    "start_audit_writer",
+    "stop_audit_writer",
+]
@@ -0,0 +1,256 @@
+"""Filtered, keyset-paginated reads of ``audit_logs``.
+
+Rows are ordered by ``(at, id)`` and a page ends with an opaque cursor that
+encodes the last row's position, so the next page is a range seek on the
+``(entity, entity_id, at)`` or ``(actor, at)`` index instead of an
+``OFFSET`` scan. ``iter_audit_logs`` walks the same pages for streaming
+exports without holding a long-lived cursor open.
+
+Rows moved to the cold tier (see ``app.services.audit_archive``) are searched
+transparently: ``audit_segments`` is consulted to find the segments and blocks
+whose time range and entity list can match, only those blocks are
+decompressed, and their records are merged with the hot rows in ``(at, id)``
+order. A row present in both tiers while its segment is being sealed is
+returned once.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any, Literal
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.audit import AuditLog, AuditSegment
+from app.services.audit_archive import naive_utc, read_block
+
+AuditOrder = Literal["asc", "desc"]
+
+
+class InvalidCursor(ValueError):
+    """The pagination cursor could not be decoded."""
+
+
+@dataclass(frozen=True)
+class AuditFilters:
+    entity: str | None = None
+    entity_id: int | None = None
+    actor: str | None = None
+    action: str | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+
+
+def encode_cursor(row: AuditLog) -> str:
+    raw = f"{naive_utc(row.at).isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        at_text, id_text = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return naive_utc(datetime.fromisoformat(at_text)), int(id_text)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _statement(filters: AuditFilters, order: AuditOrder, after: tuple[datetime, int] | None) -> Select:
+    stmt = select(AuditLog)
+    if filters.entity is not None:
+        stmt = stmt.where(AuditLog.entity == filters.entity)
+    if filters.entity_id is not None:
+        stmt = stmt.where(AuditLog.entity_id == filters.entity_id)
+    if filters.actor is not None:
+        stmt = stmt.where(AuditLog.actor == filters.actor)
+    if filters.action is not None:
+        stmt = stmt.where(AuditLog.action == filters.action)
+    if filters.since is not None:
+        stmt = stmt.where(AuditLog.at >= filters.since)
+    if filters.until is not None:
+        stmt = stmt.where(AuditLog.at < filters.until)
+
+    position = tuple_(AuditLog.at, AuditLog.id)
+    if order == "desc":
+        if after is not None:
+            stmt = stmt.where(position < tuple_(*after))
+        return stmt.order_by(AuditLog.at.desc(), AuditLog.id.desc())
+    if after is not None:
+        stmt = stmt.where(position > tuple_(*after))
+    return stmt.order_by(AuditLog.at.asc(), AuditLog.id.asc())
+
+
+def _segment_statement(
+    filters: AuditFilters, order: AuditOrder, after: tuple[datetime, int] | None
+) -> Select:
+    stmt = select(AuditSegment)
+    if filters.since is not None:
+        stmt = stmt.where(AuditSegment.max_at >= filters.since)
+    if filters.until is not None:
+        stmt = stmt.where(AuditSegment.min_at < filters.until)
+    if after is not None:
+        if order == "desc":
+            stmt = stmt.where(AuditSegment.min_at <= after[0])
+        else:
+            stmt = stmt.where(AuditSegment.max_at >= after[0])
+    return stmt
+
+
+def _block_may_match(
+    block: dict[str, Any],
+    filters: AuditFilters,
+    order: AuditOrder,
+    after: tuple[datetime, int] | None,
+) -> bool:
+    if filters.entity is not None and filters.entity not in block["entities"]:
+        return False
+    min_at = datetime.fromisoformat(block["min_at"])
+    max_at = datetime.fromisoformat(block["max_at"])
+    if filters.since is not None and max_at < naive_utc(filters.since):
+        return False
+    if filters.until is not None and min_at >= naive_utc(filters.until):
+        return False
+    if after is not None:
+        if order == "desc" and min_at > after[0]:
+            return False
+        if order == "asc" and max_at < after[0]:
+            return False
+    return True
+
+
+def _record_matches(
+    record: dict[str, Any],
+    filters: AuditFilters,
+    order: AuditOrder,
+    after: tuple[datetime, int] | None,
+) -> bool:
+    if filters.entity is not None and record["entity"] != filters.entity:
+        return False
+    if filters.entity_id is not None and record["entity_id"] != filters.entity_id:
+        return False
+    if filters.actor is not None and record["actor"] != filters.actor:
+        return False
+    if filters.action is not None and record["action"] != filters.action:
+        return False
+    if filters.since is not None and record["at"] < naive_utc(filters.since):
+        return False
+    if filters.until is not None and record["at"] >= naive_utc(filters.until):
+        return False
+    if after is not None:
+        position = (record["at"], record["id"])
+        return position < after if order == "desc" else position > after
+    return True
+
+
+def _cold_rows(
+    db: Session,
+    filters: AuditFilters,
+    order: AuditOrder,
+    after: tuple[datetime, int] | None,
+    wanted: int,
+) -> list[AuditLog]:
+    """Matching archived rows, as transient ``AuditLog`` objects, best ``wanted`` first.
+
+    Blocks are visited nearest-first; once ``wanted`` rows are in hand, a block
+    that starts beyond the last of them cannot contribute and the scan stops.
+    """
+
+    candidates: list[tuple[AuditSegment, dict[str, Any]]] = []
+    for segment in db.scalars(_segment_statement(filters, order, after)):
+        if filters.entity is not None and filters.entity not in (segment.entities or []):
+            continue
+        candidates.extend(
+            (segment, block)
+            for block in segment.blocks or []
+            if _block_may_match(block, filters, order, after)
+        )
+    if not candidates:
+        return []
+
+    descending = order == "desc"
+    if descending:
+        candidates.sort(key=lambda item: item[1]["max_at"], reverse=True)
+    else:
+        candidates.sort(key=lambda item: item[1]["min_at"])
+
+    matches: list[dict[str, Any]] = []
+    for segment, block in candidates:
+        if len(matches) >= wanted:
+            boundary = matches[wanted - 1]["at"]
+            if descending and datetime.fromisoformat(block["max_at"]) < boundary:
+                break
+            if not descending and datetime.fromisoformat(block["min_at"]) > boundary:
+                break
+        matches.extend(
+            record for record in read_block(segment, block) if _record_matches(record, filters, order, after)
+        )
+        matches.sort(key=lambda record: (record["at"], record["id"]), reverse=descending)
+
+    return [
+        AuditLog(
+            id=record["id"],
+            actor=record["actor"],
+            action=record["action"],
+            entity=record["entity"],
+            entity_id=record["entity_id"],
+            data_json=record["data_json"],
+            at=record["at"].replace(tzinfo=UTC),
+        )
+        for record in matches[:wanted]
+    ]
+
+
+def fetch_audit_page(
+    db: Session,
+    filters: AuditFilters,
+    *,
+    limit: int,
+    cursor: str | None = None,
+    order: AuditOrder = "desc",
+) -> tuple[list[AuditLog], str | None]:
+    """Return up to ``limit`` rows after ``cursor`` and the cursor of the next page."""
+
+    after = decode_cursor(cursor) if cursor else None
+    rows = list(db.scalars(_statement(filters, order, after).limit(limit + 1)))
+    cold = _cold_rows(db, filters, order, after, limit + 1)
+    if cold:
+        hot_ids = {row.id for row in rows}
+        rows.extend(row for row in cold if row.id not in hot_ids)
+        rows.sort(key=lambda row: (naive_utc(row.at), row.id), reverse=order == "desc")
+        rows = rows[: limit + 1]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+def iter_audit_logs(
+    db: Session,
+    filters: AuditFilters,
+    *,
+    order: AuditOrder = "asc",
+    batch_size: int = 1000,
+) -> Iterator[AuditLog]:
+    """Yield every matching row, one keyset page at a time."""
+
+    cursor: str | None = None
+    while True:
+        rows, cursor = fetch_audit_page(db, filters, limit=batch_size, cursor=cursor, order=order)
+        yield from rows
+        db.expunge_all()
+        if cursor is None:
+            return
+
+
+__all__ = [
+    "AuditFilters",
+    "InvalidCursor",
+    "decode_cursor",
+    "encode_cursor",
+    "fetch_audit_page",
+    "iter_audit_logs",
+]
@@ -4,16 +4,16 @@ from decimal import Decimal, InvalidOperation
 from typing import Any
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.models.audit import AuditLog
 from app.models.escrow import EscrowAgreement, EscrowDeposit, EscrowDomain, EscrowEvent, EscrowStatus
 from app.models.user import User
 from app.schemas.escrow import EscrowCreate, EscrowDepositCreate, EscrowActionPayload
+from app.services import escrow_balance, ledger
 from app.services.idempotency import get_existing_by_key
-from app.utils.audit import sanitize_payload_for_audit
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -39,7 +39,7 @@ def _to_decimal(value: Any) -> Decimal:
 
 
 def _audit(
-    db: Session,
+    db: Session | AsyncSession,
     *,
     actor: str,
     action: str,
@@ -48,15 +48,13 @@ def _audit(
 ) -> None:
     """Persist an audit trail entry for escrow state changes."""
 
-    db.add(
-        AuditLog(
-            actor=actor,
-            action=action,
-            entity="EscrowAgreement",
-            entity_id=escrow.id,
-            data_json=sanitize_payload_for_audit(data),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor=actor,
+        action=action,
+        entity="EscrowAgreement",
+        entity_id=escrow.id,
+        data=data,
     )
 
 def create_escrow(
@@ -104,16 +102,6 @@ def create_escrow(
     return agreement
 
 
-def _total_deposited(db: Session, escrow_id: int) -> Decimal:
-    stmt = select(func.coalesce(func.sum(EscrowDeposit.amount), 0)).where(EscrowDeposit.escrow_id == escrow_id)
-    value = db.scalar(stmt)
-    if value is None:
-        return Decimal("0")
-    if isinstance(value, Decimal):
-        return value
-    return Decimal(value)
-
-
 def deposit(
     db: Session,
     escrow_id: int,
@@ -152,9 +140,12 @@ def deposit(
     deposit = EscrowDeposit(escrow_id=agreement.id, amount=amount_dec, idempotency_key=normalized_key)
     try:
         db.add(deposit)
+        # Le flush applique le dépôt à la ligne escrow_balances.
+        db.flush()
+        ledger.record_deposit(db, deposit, agreement)
 
         # --- TOUT EN DECIMAL ---
-        total = _total_deposited(db, agreement.id) + amount_dec
+        total = escrow_balance.get_balance(db, agreement.id).deposited
         # (agreement.amount_total est Decimal si défini en Numeric(asdecimal=True); au cas où:)
         amount_total_dec = _to_decimal(agreement.amount_total)
         if total >= amount_total_dec:
@@ -218,6 +209,29 @@ def get_escrow(
     return agreement
 
 
+async def get_escrow_async(
+    db: AsyncSession,
+    escrow_id: int,
+    *,
+    actor: str | None = None,
+) -> EscrowAgreement:
+    """Async variant of :func:`get_escrow` used by the async read endpoint."""
+
+    agreement = await db.get(EscrowAgreement, escrow_id)
+    if not agreement:
+        raise HTTPException(status_code=404, detail=error_response("ESCROW_NOT_FOUND", "Escrow not found."))
+    _audit(
+        db,
+        actor=actor or "system",
+        action="ESCROW_READ",
+        escrow=agreement,
+        data={"status": agreement.status.value},
+    )
+    await db.commit()
+    await db.refresh(agreement)
+    return agreement
+
+
 def mark_delivered(
     db: Session, escrow_id: int, payload: EscrowActionPayload, *, actor: str | None = None
 ) -> EscrowAgreement:
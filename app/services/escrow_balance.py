@@ -0,0 +1,330 @@
+"""Materialized per-escrow balance kept in step with deposits and payments.
+
+Every flush that inserts a deposit or creates, re-prices or moves a payment
+between statuses applies the matching delta to the escrow's
+``escrow_balances`` row, inside the same transaction. Readers then get
+``deposited`` / ``paid`` / ``reserved`` with one lookup on the unique
+``escrow_id`` index instead of summing ``escrow_deposits`` and ``payments``.
+
+Deltas are relative ``UPDATE ... SET paid = paid + :delta`` statements, so
+concurrent writers never lose each other's changes. Payouts additionally
+claim the row with a compare-and-set on ``version`` (see
+:func:`claim_payout`): the winner holds the row until its transaction ends,
+which is when its PENDING payment has reserved the funds.
+
+Only ORM flushes are tracked. Code that rewrites payments or deposits with
+bulk ``update()``/``delete()`` statements must call :func:`rebuild_balance`.
+"""
+from __future__ import annotations
+
+import threading
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, attributes
+
+from app.models import EscrowAgreement, EscrowBalance, EscrowDeposit, Payment, PaymentStatus
+from app.utils.time import utcnow
+
+ZERO = Decimal("0")
+_CAS_ATTEMPTS = 5
+
+_PAID_STATUSES = (PaymentStatus.SENT, PaymentStatus.SETTLED)
+
+_STATS_LOCK = threading.Lock()
+_BALANCE_STATS: dict[str, int] = {
+    "deltas_applied": 0,
+    "backfills": 0,
+    "rebuilds": 0,
+    "payout_claims": 0,
+    "cas_conflicts": 0,
+    "insufficient": 0,
+}
+
+
+class BalanceSnapshot(NamedTuple):
+    """One read of an ``escrow_balances`` row."""
+
+    deposited: Decimal
+    paid: Decimal
+    reserved: Decimal
+    version: int
+
+    @property
+    def available(self) -> Decimal:
+        """Deposits minus money already sent (PENDING payouts not subtracted).
+
+        Ledger view used by reconciliation; payouts are guarded by :attr:`unreserved`.
+        """
+
+        return self.deposited - self.paid
+
+    @property
+    def unreserved(self) -> Decimal:
+        """What a new payout may still claim once PENDING payouts are held back."""
+
+        return self.deposited - self.paid - self.reserved
+
+
+def _bump(name: str, amount: int = 1) -> None:
+    with _STATS_LOCK:
+        _BALANCE_STATS[name] += amount
+
+
+def _to_decimal(value) -> Decimal:
+    if value is None:
+        return ZERO
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+# --------------------------------------------------
+# Ledger totals
+# --------------------------------------------------
+def ledger_totals(db: Session, escrow_id: int) -> tuple[Decimal, Decimal, Decimal]:
+    """Sum deposits, paid and reserved payments for ``escrow_id`` from the ledger tables."""
+
+    deposited = (
+        select(func.coalesce(func.sum(EscrowDeposit.amount), 0))
+        .where(EscrowDeposit.escrow_id == escrow_id)
+        .scalar_subquery()
+    )
+    paid = (
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.escrow_id == escrow_id, Payment.status.in_(_PAID_STATUSES))
+        .scalar_subquery()
+    )
+    reserved = (
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.escrow_id == escrow_id, Payment.status == PaymentStatus.PENDING)
+        .scalar_subquery()
+    )
+    row = db.execute(select(deposited, paid, reserved)).one()
+    return _to_decimal(row[0]), _to_decimal(row[1]), _to_decimal(row[2])
+
+
+def _insert_missing(db: Session, escrow_id: int, totals: tuple[Decimal, Decimal, Decimal]) -> None:
+    now = utcnow()
+    values = {
+        "escrow_id": escrow_id,
+        "deposited": totals[0],
+        "paid": totals[1],
+        "reserved": totals[2],
+        "version": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect in {"sqlite", "postgresql"}:
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        db.execute(
+            dialect_insert(EscrowBalance).values(**values).on_conflict_do_nothing(index_elements=["escrow_id"])
+        )
+        return
+    db.execute(insert(EscrowBalance).values(**values))
+
+
+def _backfill(db: Session, escrow_id: int) -> None:
+    """Create the row of an escrow that predates the table (or was written around the ORM)."""
+
+    _insert_missing(db, escrow_id, ledger_totals(db, escrow_id))
+    _bump("backfills")
+
+
+def rebuild_balance(db: Session, escrow_id: int) -> BalanceSnapshot:
+    """Overwrite the row of ``escrow_id`` with fresh ledger totals and return it."""
+
+    deposited, paid, reserved = ledger_totals(db, escrow_id)
+    result = db.execute(
+        update(EscrowBalance)
+        .where(EscrowBalance.escrow_id == escrow_id)
+        .values(
+            deposited=deposited,
+            paid=paid,
+            reserved=reserved,
+            version=EscrowBalance.version + 1,
+            updated_at=utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        _insert_missing(db, escrow_id, (deposited, paid, reserved))
+    _bump("rebuilds")
+    return get_balance(db, escrow_id)
+
+
+# --------------------------------------------------
+# Reads and payout claims
+# --------------------------------------------------
+def _read(db: Session, escrow_id: int) -> BalanceSnapshot | None:
+    row = db.execute(
+        select(
+            EscrowBalance.deposited, EscrowBalance.paid, EscrowBalance.reserved, EscrowBalance.version
+        ).where(EscrowBalance.escrow_id == escrow_id)
+    ).first()
+    if row is None:
+        return None
+    return BalanceSnapshot(_to_decimal(row[0]), _to_decimal(row[1]), _to_decimal(row[2]), int(row[3]))
+
+
+def get_balance(db: Session, escrow_id: int) -> BalanceSnapshot:
+    """Return the current balance of ``escrow_id``, creating its row on first use."""
+
+    snapshot = _read(db, escrow_id)
+    if snapshot is None:
+        _backfill(db, escrow_id)
+        snapshot = _read(db, escrow_id)
+    assert snapshot is not None
+    return snapshot
+
+
+def claim_payout(db: Session, escrow_id: int, amount: Decimal) -> bool:
+    """Compare-and-set the balance row before a new payout of ``amount``.
+
+    Returns ``False`` when the unreserved balance is too small. On success
+    the row version has moved and this transaction holds the row, so the
+    PENDING payment it inserts next reserves the funds before any other
+    payout can re-read the balance.
+    """
+
+    amount = _to_decimal(amount)
+    for _ in range(_CAS_ATTEMPTS):
+        snapshot = get_balance(db, escrow_id)
+        if snapshot.unreserved < amount:
+            _bump("insufficient")
+            return False
+        result = db.execute(
+            update(EscrowBalance)
+            .where(EscrowBalance.escrow_id == escrow_id, EscrowBalance.version == snapshot.version)
+            .values(version=snapshot.version + 1, updated_at=utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            _bump("payout_claims")
+            return True
+        _bump("cas_conflicts")
+    raise RuntimeError(f"escrow balance {escrow_id} stayed contended")
+
+
+# --------------------------------------------------
+# Flush tracking
+# --------------------------------------------------
+_Delta = list[Decimal]  # [deposited, paid, reserved]
+
+
+def _payment_share(status: PaymentStatus | None, amount) -> tuple[Decimal, Decimal]:
+    """(paid, reserved) contribution of a payment in ``status``."""
+
+    amount = _to_decimal(amount)
+    if status in _PAID_STATUSES:
+        return amount, ZERO
+    if status == PaymentStatus.PENDING:
+        return ZERO, amount
+    return ZERO, ZERO
+
+
+def _before_after(obj, key: str) -> tuple[object, object, bool]:
+    """Return the (old, new) values of ``key`` and whether the old value is known.
+
+    ``Payment.status`` and ``Payment.amount`` use ``active_history`` so their
+    previous value is loaded before an overwrite; ``escrow_id`` is not
+    expected to change and a blind overwrite triggers a rebuild instead.
+    """
+
+    history = attributes.get_history(obj, key)
+    if history.added or history.deleted:
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        return old, new, bool(history.deleted)
+    current = getattr(obj, key)
+    return current, current, True
+
+
+def _collect(session: Session) -> tuple[dict[int, _Delta], set[int], set[int]]:
+    deltas: dict[int, _Delta] = {}
+    created: set[int] = set()
+    rebuild: set[int] = set()
+
+    def add(escrow_id: int | None, deposited=ZERO, paid=ZERO, reserved=ZERO) -> None:
+        if escrow_id is None:
+            return
+        delta = deltas.setdefault(escrow_id, [ZERO, ZERO, ZERO])
+        delta[0] += deposited
+        delta[1] += paid
+        delta[2] += reserved
+
+    for obj in session.new:
+        if isinstance(obj, EscrowAgreement):
+            created.add(obj.id)
+        elif isinstance(obj, EscrowDeposit):
+            add(obj.escrow_id, deposited=_to_decimal(obj.amount))
+        elif isinstance(obj, Payment):
+            paid, reserved = _payment_share(obj.status, obj.amount)
+            add(obj.escrow_id, paid=paid, reserved=reserved)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Payment):
+            continue
+        old_escrow, new_escrow, escrow_known = _before_after(obj, "escrow_id")
+        old_status, new_status, status_known = _before_after(obj, "status")
+        old_amount, new_amount, amount_known = _before_after(obj, "amount")
+        if (old_escrow, old_status, old_amount) == (new_escrow, new_status, new_amount):
+            continue
+        if not (escrow_known and status_known and amount_known):
+            rebuild.update(escrow_id for escrow_id in (old_escrow, new_escrow) if escrow_id is not None)
+            continue
+        old_paid, old_reserved = _payment_share(old_status, old_amount)
+        new_paid, new_reserved = _payment_share(new_status, new_amount)
+        add(old_escrow, paid=-old_paid, reserved=-old_reserved)
+        add(new_escrow, paid=new_paid, reserved=new_reserved)
+
+    for obj in session.deleted:
+        if isinstance(obj, (EscrowDeposit, Payment)):
+            escrow_id = attributes.instance_dict(obj).get("escrow_id")
+            if escrow_id is not None:
+                rebuild.add(escrow_id)
+
+    return deltas, created, rebuild
+
+
+def _apply(session: Session, escrow_id: int, delta: _Delta) -> None:
+    result = session.execute(
+        update(EscrowBalance)
+        .where(EscrowBalance.escrow_id == escrow_id)
+        .values(
+            deposited=EscrowBalance.deposited + delta[0],
+            paid=EscrowBalance.paid + delta[1],
+            reserved=EscrowBalance.reserved + delta[2],
+            version=EscrowBalance.version + 1,
+            updated_at=utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # The ledger already holds this flush's rows, so the backfill includes the delta.
+        _backfill(session, escrow_id)
+    _bump("deltas_applied")
+
+
+@event.listens_for(Session, "after_flush")
+def _track_balances(session: Session, flush_context) -> None:
+    if not (session.new or session.dirty or session.deleted):
+        return
+    deltas, created, rebuild = _collect(session)
+    for escrow_id in created:
+        if escrow_id not in deltas and escrow_id not in rebuild:
+            _insert_missing(session, escrow_id, (ZERO, ZERO, ZERO))
+    for escrow_id, delta in deltas.items():
+        if escrow_id in rebuild or not any(delta):
+            continue
+        _apply(session, escrow_id, delta)
+    for escrow_id in rebuild:
+        rebuild_balance(session, escrow_id)
+
+
+def get_escrow_balance_stats() -> dict[str, int]:
+    with _STATS_LOCK:
+        return dict(_BALANCE_STATS)
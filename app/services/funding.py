@@ -9,13 +9,12 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
-from app.models import AuditLog, EscrowAgreement, FundingRecord, FundingStatus
+from app.models import EscrowAgreement, FundingRecord, FundingStatus
 from app.schemas import EscrowDepositCreate
 from app.services import escrow as escrow_services
-from app.services.psp_stripe import StripeClient
-from app.utils.audit import sanitize_payload_for_audit
+from app.services.psp_stripe import get_stripe_client
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
-from app.utils.time import utcnow
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +31,7 @@ def create_funding_session(
             detail=error_response("STRIPE_FUNDING_DISABLED", "Stripe funding not enabled."),
         )
 
-    client = StripeClient(settings)
+    client = get_stripe_client(settings)
     payment_intent = client.create_funding_payment_intent(
         escrow=escrow, amount=amount, currency=currency
     )
@@ -46,22 +45,18 @@ def create_funding_session(
     )
     db.add(funding)
     db.flush()
-    db.add(
-        AuditLog(
-            actor="system",
-            action="FUNDING_SESSION_CREATED",
-            entity="FundingRecord",
-            entity_id=funding.id,
-            data_json=sanitize_payload_for_audit(
-                {
-                    "escrow_id": escrow.id,
-                    "amount": str(amount),
-                    "currency": currency,
-                    "stripe_payment_intent_id": payment_intent.id,
-                }
-            ),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor="system",
+        action="FUNDING_SESSION_CREATED",
+        entity="FundingRecord",
+        entity_id=funding.id,
+        data={
+            "escrow_id": escrow.id,
+            "amount": str(amount),
+            "currency": currency,
+            "stripe_payment_intent_id": payment_intent.id,
+        },
     )
     db.commit()
     db.refresh(funding)
@@ -100,22 +95,18 @@ def mark_funding_succeeded(
         return funding
 
     funding.status = FundingStatus.SUCCEEDED
-    db.add(
-        AuditLog(
-            actor="system",
-            action="FUNDING_SUCCEEDED",
-            entity="FundingRecord",
-            entity_id=funding.id,
-            data_json=sanitize_payload_for_audit(
-                {
-                    "escrow_id": funding.escrow_id,
-                    "stripe_payment_intent_id": stripe_payment_intent_id,
-                    "amount": str(amount),
-                    "currency": currency,
-                }
-            ),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor="system",
+        action="FUNDING_SUCCEEDED",
+        entity="FundingRecord",
+        entity_id=funding.id,
+        data={
+            "escrow_id": funding.escrow_id,
+            "stripe_payment_intent_id": stripe_payment_intent_id,
+            "amount": str(amount),
+            "currency": currency,
+        },
     )
     db.commit()
     db.refresh(funding)
@@ -156,20 +147,16 @@ def mark_funding_failed(db: Session, *, stripe_payment_intent_id: str) -> Fundin
         return funding
 
     funding.status = FundingStatus.FAILED
-    db.add(
-        AuditLog(
-            actor="system",
-            action="FUNDING_FAILED",
-            entity="FundingRecord",
-            entity_id=funding.id,
-            data_json=sanitize_payload_for_audit(
-                {
-                    "escrow_id": funding.escrow_id,
-                    "stripe_payment_intent_id": stripe_payment_intent_id,
-                }
-            ),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor="system",
+        action="FUNDING_FAILED",
+        entity="FundingRecord",
+        entity_id=funding.id,
+        data={
+            "escrow_id": funding.escrow_id,
+            "stripe_payment_intent_id": stripe_payment_intent_id,
+        },
     )
     db.commit()
     db.refresh(funding)
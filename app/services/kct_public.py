@@ -1,9 +1,10 @@
 """Services for KCT Public Sector operations."""
 from decimal import Decimal
-from typing import Any, Dict
+from typing import Any, Dict, Sequence
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.escrow import EscrowAgreement
@@ -48,53 +49,75 @@ def get_project(db: Session, project_id: int, current_user: User) -> GovProject:
     return project
 
 
-def compute_project_stats(db: Session, project_id: int) -> Dict[str, Any]:
-    """Compute aggregated escrow/payment statistics for a project."""
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        "total_amount": Decimal("0"),
+        "released_amount": Decimal("0"),
+        "remaining_amount": Decimal("0"),
+        "current_milestone": None,
+    }
 
-    escrow_ids = db.scalars(
-        select(GovProjectMandate.escrow_id).where(
-            GovProjectMandate.gov_project_id == project_id
-        )
-    ).all()
 
-    if not escrow_ids:
-        return {
-            "total_amount": Decimal("0"),
-            "released_amount": Decimal("0"),
-            "remaining_amount": Decimal("0"),
-            "current_milestone": None,
-        }
-
-    total = db.scalars(
-        select(func.coalesce(func.sum(EscrowAgreement.amount_total), 0)).where(
-            EscrowAgreement.id.in_(escrow_ids)
-        )
-    ).one()
+def _project_escrow_ids_stmt(project_id: int) -> Select:
+    return select(GovProjectMandate.escrow_id).where(GovProjectMandate.gov_project_id == project_id)
 
-    released = db.scalars(
-        select(func.coalesce(func.sum(Payment.amount), 0)).where(
-            Payment.escrow_id.in_(escrow_ids),
-            Payment.status == PaymentStatus.SETTLED,
-        )
-    ).one()
 
-    remaining = total - released
+def _project_stats_stmts(escrow_ids: Sequence[int]) -> tuple[Select, Select, Select]:
+    """Return the (total, released, current milestone) aggregate queries."""
+
+    total = select(func.coalesce(func.sum(EscrowAgreement.amount_total), 0)).where(
+        EscrowAgreement.id.in_(escrow_ids)
+    )
+    released = select(func.coalesce(func.sum(Payment.amount), 0)).where(
+        Payment.escrow_id.in_(escrow_ids),
+        Payment.status == PaymentStatus.SETTLED,
+    )
+    current_milestone = select(func.max(Milestone.idx)).where(
+        Milestone.escrow_id.in_(escrow_ids),
+        Milestone.status.in_([MilestoneStatus.PAID, MilestoneStatus.PAYING]),
+    )
+    return total, released, current_milestone
 
-    current_milestone = db.scalars(
-        select(func.max(Milestone.idx)).where(
-            Milestone.escrow_id.in_(escrow_ids),
-            Milestone.status.in_([MilestoneStatus.PAID, MilestoneStatus.PAYING]),
-        )
-    ).one()
 
+def _stats_dict(total: Any, released: Any, current_milestone: Any) -> Dict[str, Any]:
     return {
         "total_amount": total,
         "released_amount": released,
-        "remaining_amount": remaining,
+        "remaining_amount": total - released,
         "current_milestone": current_milestone,
     }
 
 
+def compute_project_stats(db: Session, project_id: int) -> Dict[str, Any]:
+    """Compute aggregated escrow/payment statistics for a project."""
+
+    escrow_ids = db.scalars(_project_escrow_ids_stmt(project_id)).all()
+    if not escrow_ids:
+        return _empty_stats()
+
+    total_stmt, released_stmt, milestone_stmt = _project_stats_stmts(escrow_ids)
+    return _stats_dict(
+        db.scalars(total_stmt).one(),
+        db.scalars(released_stmt).one(),
+        db.scalars(milestone_stmt).one(),
+    )
+
+
+async def compute_project_stats_async(db: AsyncSession, project_id: int) -> Dict[str, Any]:
+    """Async variant of :func:`compute_project_stats`."""
+
+    escrow_ids = (await db.scalars(_project_escrow_ids_stmt(project_id))).all()
+    if not escrow_ids:
+        return _empty_stats()
+
+    total_stmt, released_stmt, milestone_stmt = _project_stats_stmts(escrow_ids)
+    return _stats_dict(
+        (await db.scalars(total_stmt)).one(),
+        (await db.scalars(released_stmt)).one(),
+        (await db.scalars(milestone_stmt)).one(),
+    )
+
+
 def merge_project_and_stats(project: GovProject, stats: Dict[str, Any]) -> Dict[str, Any]:
     """Combine project data with precomputed stats for serialization."""
 
@@ -0,0 +1,477 @@
+"""Double-entry journal of escrow and spend money movements.
+
+Each movement is one journal transaction: two or more ``ledger_entries``
+legs sharing a ``txn_id``, whose signed amounts sum to zero. The deposit,
+payout, settlement and spend services post them in the same database
+transaction as the business change. Entries are never updated or deleted.
+
+Accounts:
+
+* ``psp:funding`` - money received through the PSP (goes negative as escrows fill)
+* ``escrow:<id>`` - funds held on an escrow
+* ``psp:clearing`` - payouts handed to the PSP and not settled yet
+* ``provider:<user id>`` - settled payouts
+* ``mandate:<id>`` / ``merchant:<id>`` - usage-mandate spend at merchants
+
+A payment's amount sits on the escrow while PENDING, ERROR or REFUNDED, in
+clearing while SENT and with the provider once SETTLED; a status change posts
+one transfer from the old place to the new one.
+
+Money that moved before the journal existed is brought in once by
+``post_opening_balances`` (``scripts/backfill_ledger.py``): one ``OPENING``
+transaction per escrow and usage mandate for the deposits, payments and
+purchases that have no journal entry of their own.
+
+``snapshot_ledger_once`` folds the entries written since the previous run
+into one running balance per touched account. ``account_balance`` then costs
+one snapshot read plus a tail scan of the entries after it, at any point in
+time.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.config import get_settings
+from app.models import (
+    AuditLog,
+    EscrowAgreement,
+    EscrowDeposit,
+    LedgerEntry,
+    LedgerSnapshot,
+    Payment,
+    PaymentStatus,
+    Purchase,
+    PurchaseStatus,
+    UsageMandate,
+)
+from app.utils.time import utcnow
+
+logger = logging.getLogger(__name__)
+
+FUNDING_ACCOUNT = "psp:funding"
+CLEARING_ACCOUNT = "psp:clearing"
+OPENING_KIND = "OPENING"
+
+_SNAPSHOT_IN_CHUNK = 500
+
+_STATS_LOCK = threading.Lock()
+_LEDGER_STATS: dict[str, Any] = {
+    "transactions": 0,
+    "entries": 0,
+    "snapshot_runs": 0,
+    "snapshots_written": 0,
+    "errors": 0,
+    "last_snapshot": None,
+}
+
+
+class LedgerImmutableError(RuntimeError):
+    """Raised when a flush would update or delete a journal entry."""
+
+
+def escrow_account(escrow_id: int) -> str:
+    return f"escrow:{escrow_id}"
+
+
+def provider_account(user_id: int) -> str:
+    return f"provider:{user_id}"
+
+
+def mandate_account(mandate_id: int) -> str:
+    return f"mandate:{mandate_id}"
+
+
+def merchant_account(merchant_id: int) -> str:
+    return f"merchant:{merchant_id}"
+
+
+def _to_decimal(value) -> Decimal:
+    if value is None:
+        return Decimal("0")
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+# --------------------------------------------------
+# Posting
+# --------------------------------------------------
+def post(
+    db: Session,
+    *,
+    kind: str,
+    legs: Sequence[tuple[str, Decimal]],
+    currency: str,
+    source: str,
+    source_id: int,
+    at: datetime | None = None,
+) -> str:
+    """Stage one balanced journal transaction on ``db`` and return its ``txn_id``.
+
+    ``legs`` are ``(account, signed amount)`` pairs. Nothing is committed;
+    the entries land with the caller's transaction.
+    """
+
+    amounts = [(account, _to_decimal(amount)) for account, amount in legs if _to_decimal(amount)]
+    if len(amounts) < 2:
+        raise ValueError(f"journal transaction {kind} needs at least two non-zero legs")
+    if sum(amount for _, amount in amounts) != 0:
+        raise ValueError(f"journal transaction {kind} does not balance: {amounts}")
+
+    txn_id = uuid4().hex
+    when = at or utcnow()
+    db.add_all(
+        LedgerEntry(
+            txn_id=txn_id,
+            kind=kind,
+            account=account,
+            amount=amount,
+            currency=currency,
+            source=source,
+            source_id=source_id,
+            at=when,
+        )
+        for account, amount in amounts
+    )
+    with _STATS_LOCK:
+        _LEDGER_STATS["transactions"] += 1
+        _LEDGER_STATS["entries"] += len(amounts)
+    return txn_id
+
+
+def record_deposit(db: Session, deposit: EscrowDeposit, escrow: EscrowAgreement) -> str:
+    """Journal a deposit: PSP funding -> escrow."""
+
+    amount = _to_decimal(deposit.amount)
+    return post(
+        db,
+        kind="DEPOSIT",
+        legs=[(FUNDING_ACCOUNT, -amount), (escrow_account(escrow.id), amount)],
+        currency=escrow.currency,
+        source="EscrowDeposit",
+        source_id=deposit.id,
+    )
+
+
+def _payment_account(status: PaymentStatus | None, escrow: EscrowAgreement) -> str:
+    if status == PaymentStatus.SENT:
+        return CLEARING_ACCOUNT
+    if status == PaymentStatus.SETTLED:
+        return provider_account(escrow.provider_id)
+    return escrow_account(escrow.id)
+
+
+def record_payment_transition(
+    db: Session,
+    payment: Payment,
+    previous: PaymentStatus | None,
+    *,
+    escrow: EscrowAgreement | None = None,
+) -> str | None:
+    """Journal a payment moving from ``previous`` to its current status.
+
+    Returns ``None`` when the money does not change place (PENDING -> ERROR).
+    """
+
+    escrow = escrow or db.get(EscrowAgreement, payment.escrow_id)
+    if escrow is None:
+        return None
+    source_account = _payment_account(previous, escrow)
+    target_account = _payment_account(payment.status, escrow)
+    if source_account == target_account:
+        return None
+    amount = _to_decimal(payment.amount)
+    return post(
+        db,
+        kind=f"PAYMENT_{payment.status.value}",
+        legs=[(source_account, -amount), (target_account, amount)],
+        currency=escrow.currency,
+        source="Payment",
+        source_id=payment.id,
+    )
+
+
+def record_purchase(db: Session, purchase: Purchase, mandate: UsageMandate) -> str:
+    """Journal a completed purchase: usage mandate -> merchant."""
+
+    amount = _to_decimal(purchase.amount)
+    return post(
+        db,
+        kind="SPEND",
+        legs=[(mandate_account(mandate.id), -amount), (merchant_account(purchase.merchant_id), amount)],
+        currency=purchase.currency,
+        source="Purchase",
+        source_id=purchase.id,
+    )
+
+
+# --------------------------------------------------
+# Opening balances
+# --------------------------------------------------
+def _journaled(source: str):
+    return select(LedgerEntry.source_id).where(LedgerEntry.source == source)
+
+
+def _escrow_opening_legs(db: Session) -> dict[int, dict[str, Decimal]]:
+    escrows = {row.id: row for row in db.execute(select(EscrowAgreement.id, EscrowAgreement.provider_id))}
+    legs: dict[int, dict[str, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+
+    def move(escrow_id: int, source: str, target: str, amount) -> None:
+        legs[escrow_id][source] -= _to_decimal(amount)
+        legs[escrow_id][target] += _to_decimal(amount)
+
+    for escrow_id, total in db.execute(
+        select(EscrowDeposit.escrow_id, func.sum(EscrowDeposit.amount))
+        .where(EscrowDeposit.id.not_in(_journaled("EscrowDeposit")))
+        .group_by(EscrowDeposit.escrow_id)
+    ):
+        move(escrow_id, FUNDING_ACCOUNT, escrow_account(escrow_id), total)
+
+    # A payment never journaled sits where its status says (a later move would have posted).
+    for escrow_id, status, total in db.execute(
+        select(Payment.escrow_id, Payment.status, func.sum(Payment.amount))
+        .where(Payment.id.not_in(_journaled("Payment")))
+        .group_by(Payment.escrow_id, Payment.status)
+    ):
+        escrow = escrows.get(escrow_id)
+        if escrow is not None and _payment_account(status, escrow) != escrow_account(escrow_id):
+            move(escrow_id, escrow_account(escrow_id), _payment_account(status, escrow), total)
+
+    # A journaled payment started where its first transfer takes the money from.
+    first_move = (
+        select(LedgerEntry.source_id, func.min(LedgerEntry.id).label("entry_id"))
+        .where(LedgerEntry.source == "Payment", LedgerEntry.amount < 0)
+        .group_by(LedgerEntry.source_id)
+        .subquery()
+    )
+    for escrow_id, account, total in db.execute(
+        select(Payment.escrow_id, LedgerEntry.account, func.sum(LedgerEntry.amount))
+        .join(first_move, first_move.c.source_id == Payment.id)
+        .join(LedgerEntry, LedgerEntry.id == first_move.c.entry_id)
+        .group_by(Payment.escrow_id, LedgerEntry.account)
+    ):
+        if account != escrow_account(escrow_id):
+            move(escrow_id, escrow_account(escrow_id), account, -_to_decimal(total))
+    return legs
+
+
+def _mandate_opening_legs(db: Session) -> dict[int, dict[str, Decimal]]:
+    # Purchases carry no mandate id; the MANDATE_CONSUMED audit row links the two.
+    purchase_id = AuditLog.data_json["purchase_id"].as_integer()
+    legs: dict[int, dict[str, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+    for mandate_id, merchant_id, total in db.execute(
+        select(AuditLog.entity_id, Purchase.merchant_id, func.sum(Purchase.amount))
+        .join(Purchase, Purchase.id == purchase_id)
+        .where(
+            AuditLog.entity == "UsageMandate",
+            AuditLog.action == "MANDATE_CONSUMED",
+            Purchase.status == PurchaseStatus.COMPLETED,
+            Purchase.id.not_in(_journaled("Purchase")),
+        )
+        .group_by(AuditLog.entity_id, Purchase.merchant_id)
+    ):
+        legs[mandate_id][mandate_account(mandate_id)] -= _to_decimal(total)
+        legs[mandate_id][merchant_account(merchant_id)] += _to_decimal(total)
+    return legs
+
+
+def post_opening_balances(db: Session) -> dict[str, int]:
+    """Journal what escrows and mandates held before the journal existed.
+
+    Deposits, payments and completed purchases without journal entries of
+    their own are folded into one ``OPENING`` transaction per escrow
+    (``source="EscrowAgreement"``) and per mandate (``source="UsageMandate"``),
+    dated at the start of the journal. Escrows and mandates that already have
+    one are skipped, so the backfill can be re-run. Staged on ``db``; the
+    caller commits. Returns how many transactions were posted per kind.
+    """
+
+    opened = {
+        (source, source_id)
+        for source, source_id in db.execute(
+            select(LedgerEntry.source, LedgerEntry.source_id).where(LedgerEntry.kind == OPENING_KIND)
+        )
+    }
+    cutover = db.scalar(select(func.min(LedgerEntry.at)).where(LedgerEntry.kind != OPENING_KIND)) or utcnow()
+    currencies = {
+        "EscrowAgreement": dict(db.execute(select(EscrowAgreement.id, EscrowAgreement.currency)).all()),
+        "UsageMandate": dict(db.execute(select(UsageMandate.id, UsageMandate.currency)).all()),
+    }
+    posted = {"escrows": 0, "mandates": 0}
+    for source, counter, legs_by_owner in (
+        ("EscrowAgreement", "escrows", _escrow_opening_legs(db)),
+        ("UsageMandate", "mandates", _mandate_opening_legs(db)),
+    ):
+        for owner_id, legs in sorted(legs_by_owner.items()):
+            non_zero = [(account, amount) for account, amount in legs.items() if amount]
+            currency = currencies[source].get(owner_id)
+            if (source, owner_id) in opened or len(non_zero) < 2 or currency is None:
+                continue
+            post(
+                db,
+                kind=OPENING_KIND,
+                legs=non_zero,
+                currency=currency,
+                source=source,
+                source_id=owner_id,
+                at=cutover,
+            )
+            posted[counter] += 1
+    return posted
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_entry_changes(session: Session, flush_context, instances) -> None:
+    for obj in session.deleted:
+        if isinstance(obj, LedgerEntry):
+            raise LedgerImmutableError("Journal entries cannot be deleted; post a reversing transaction.")
+    for obj in session.dirty:
+        if isinstance(obj, LedgerEntry) and session.is_modified(obj):
+            raise LedgerImmutableError("Journal entries cannot be updated; post a reversing transaction.")
+
+
+# --------------------------------------------------
+# Balances
+# --------------------------------------------------
+def account_balance(db: Session, account: str, *, at: datetime | None = None) -> Decimal:
+    """Balance of ``account`` now, or as of ``at``: latest snapshot plus the entries after it."""
+
+    snapshot_stmt = (
+        select(LedgerSnapshot.balance, LedgerSnapshot.last_entry_id)
+        .where(LedgerSnapshot.account == account)
+        .order_by(LedgerSnapshot.last_entry_id.desc())
+        .limit(1)
+    )
+    if at is not None:
+        snapshot_stmt = snapshot_stmt.where(LedgerSnapshot.as_of <= at)
+    snapshot = db.execute(snapshot_stmt).first()
+    base, after_id = (_to_decimal(snapshot[0]), snapshot[1]) if snapshot else (Decimal("0"), 0)
+
+    tail_stmt = select(func.coalesce(func.sum(LedgerEntry.amount), 0)).where(
+        LedgerEntry.account == account, LedgerEntry.id > after_id
+    )
+    if at is not None:
+        tail_stmt = tail_stmt.where(LedgerEntry.at <= at)
+    return base + _to_decimal(db.scalar(tail_stmt))
+
+
+def transaction_entries(db: Session, txn_id: str) -> list[LedgerEntry]:
+    return list(db.scalars(select(LedgerEntry).where(LedgerEntry.txn_id == txn_id).order_by(LedgerEntry.id)))
+
+
+# --------------------------------------------------
+# Snapshots
+# --------------------------------------------------
+def _previous_balances(db: Session, accounts: list[str]) -> dict[str, Decimal]:
+    balances: dict[str, Decimal] = {}
+    for start in range(0, len(accounts), _SNAPSHOT_IN_CHUNK):
+        chunk = accounts[start : start + _SNAPSHOT_IN_CHUNK]
+        latest = (
+            select(LedgerSnapshot.account, func.max(LedgerSnapshot.last_entry_id).label("last_entry_id"))
+            .where(LedgerSnapshot.account.in_(chunk))
+            .group_by(LedgerSnapshot.account)
+            .subquery()
+        )
+        rows = db.execute(
+            select(LedgerSnapshot.account, LedgerSnapshot.balance).join(
+                latest,
+                and_(
+                    LedgerSnapshot.account == latest.c.account,
+                    LedgerSnapshot.last_entry_id == latest.c.last_entry_id,
+                ),
+            )
+        )
+        balances.update((account, _to_decimal(balance)) for account, balance in rows)
+    return balances
+
+
+def _snapshot(db: Session, now: datetime) -> int:
+    watermark = db.scalar(select(func.max(LedgerSnapshot.last_entry_id))) or 0
+    cutoff = now - timedelta(seconds=max(0, get_settings().LEDGER_SNAPSHOT_LAG_SECONDS))
+    high = db.scalar(select(func.max(LedgerEntry.id)).where(LedgerEntry.id > watermark, LedgerEntry.at <= cutoff))
+    if high is None:
+        return 0
+
+    moved = db.execute(
+        select(LedgerEntry.account, func.sum(LedgerEntry.amount), func.max(LedgerEntry.at))
+        .where(LedgerEntry.id > watermark, LedgerEntry.id <= high)
+        .group_by(LedgerEntry.account)
+    ).all()
+    previous = _previous_balances(db, [account for account, _, _ in moved])
+    db.add_all(
+        LedgerSnapshot(
+            account=account,
+            balance=previous.get(account, Decimal("0")) + _to_decimal(delta),
+            last_entry_id=high,
+            as_of=as_of,
+        )
+        for account, delta, as_of in moved
+    )
+    db.commit()
+    return len(moved)
+
+
+def snapshot_ledger_once(db: Session | None = None, *, now: datetime | None = None) -> int | None:
+    """Write a snapshot for every account with entries since the last run."""
+
+    session = db or db_module.get_sessionmaker()()
+    started = time.perf_counter()
+    try:
+        written = _snapshot(session, now or utcnow())
+    except Exception:  # noqa: BLE001
+        session.rollback()
+        logger.exception("Ledger snapshot run failed")
+        with _STATS_LOCK:
+            _LEDGER_STATS["errors"] += 1
+        return None
+    finally:
+        if db is None:
+            session.close()
+    with _STATS_LOCK:
+        _LEDGER_STATS["snapshot_runs"] += 1
+        _LEDGER_STATS["snapshots_written"] += written
+        _LEDGER_STATS["last_snapshot"] = {
+            "accounts": written,
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 2),
+        }
+    return written
+
+
+def get_ledger_stats() -> dict[str, Any]:
+    settings = get_settings()
+    with _STATS_LOCK:
+        stats = dict(_LEDGER_STATS)
+    return {"snapshots_enabled": bool(settings.LEDGER_SNAPSHOT_ENABLED), **stats}
+
+
+__all__ = [
+    "CLEARING_ACCOUNT",
+    "FUNDING_ACCOUNT",
+    "LedgerImmutableError",
+    "OPENING_KIND",
+    "account_balance",
+    "escrow_account",
+    "get_ledger_stats",
+    "mandate_account",
+    "merchant_account",
+    "post",
+    "post_opening_balances",
+    "provider_account",
+    "record_deposit",
+    "record_payment_transition",
+    "record_purchase",
+    "snapshot_ledger_once",
+    "transaction_entries",
+]
@@ -9,12 +9,11 @@ from fastapi import HTTPException, status
 from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 
-from app.models.audit import AuditLog
 from app.models.spend import Merchant, SpendCategory
 from app.models.usage_mandate import UsageMandate, UsageMandateStatus
 from app.models.user import User
 from app.schemas.mandates import UsageMandateCreate
-from app.utils.audit import sanitize_payload_for_audit
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -31,15 +30,14 @@ def _audit_mandate(
 ) -> None:
     """Persist an audit log entry for mandate lifecycle events."""
 
-    audit = AuditLog(
+    log_audit(
+        db,
         actor=actor,
         action=action,
         entity="UsageMandate",
         entity_id=mandate_id,
-        data_json=sanitize_payload_for_audit(data or {}),
-        at=utcnow(),
+        data=data,
     )
-    db.add(audit)
 
 
 def _ensure_user(db: Session, user_id: int, *, role: str) -> None:
@@ -1,8 +1,28 @@
-"""Milestone utility services."""
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+"""Milestone utility services.
 
+``EscrowAgreement`` carries denormalized milestone progress:
+``milestones_total``, ``milestones_paid`` and ``current_milestone_idx`` (the
+lowest idx still open). An ``after_flush`` listener applies the flushed
+milestone inserts, deletes and status/idx transitions to them as deltas
+(``total += 1``, ``paid += 1`` on -> PAID, ...) in the same transaction, and
+re-derives only ``current_milestone_idx``, and only when the set of open
+milestones or their idx moved. The readers below never scan milestones.
+``refresh_milestone_counters`` recomputes everything from the rows, for bulk
+writes and as a repair tool.
+"""
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, attributes
+
+from app.models.escrow import EscrowAgreement
 from app.models.milestone import Milestone, MilestoneStatus
+from app.schemas.escrow import MilestoneCreate
 
 _OPEN_STATES = (
     MilestoneStatus.WAITING,
@@ -11,13 +31,36 @@ _OPEN_STATES = (
     MilestoneStatus.PAYING,
 )
 
+_TRACKED_KEYS = ("escrow_id", "idx", "status")
+
+_STATS_LOCK = threading.Lock()
+_COUNTER_STATS: dict[str, int] = {"recomputes": 0, "escrows_refreshed": 0, "delta_updates": 0}
+
+
+def _progress(db: Session, escrow_id: int) -> tuple[int, int, int | None]:
+    row = db.execute(
+        select(
+            EscrowAgreement.milestones_total,
+            EscrowAgreement.milestones_paid,
+            EscrowAgreement.current_milestone_idx,
+        ).where(EscrowAgreement.id == escrow_id)
+    ).first()
+    if row is None:
+        return 0, 0, None
+    return int(row[0] or 0), int(row[1] or 0), row[2]
+
+
 def get_current_open_milestone(db: Session, escrow_id: int) -> Milestone | None:
     stmt = (
         select(Milestone)
+        .join(
+            EscrowAgreement,
+            and_(
+                EscrowAgreement.id == Milestone.escrow_id,
+                EscrowAgreement.current_milestone_idx == Milestone.idx,
+            ),
+        )
         .where(Milestone.escrow_id == escrow_id)
-        .where(Milestone.status.in_(_OPEN_STATES))
-        .order_by(Milestone.idx.asc())
-        .limit(1)
     )
     return db.scalars(stmt).first()
 
@@ -25,17 +68,272 @@ def get_current_open_milestone(db: Session, escrow_id: int) -> Milestone | None:
 def all_milestones_paid(db: Session, escrow_id: int) -> bool:
     """Return True when all milestones for an escrow are marked as paid."""
 
-    stmt = select(Milestone).where(Milestone.escrow_id == escrow_id)
-    items = list(db.scalars(stmt).all())
-    return len(items) > 0 and all(m.status == MilestoneStatus.PAID for m in items)
+    total, paid, _ = _progress(db, escrow_id)
+    return total > 0 and paid == total
+
 
 def open_next_waiting_milestone(db: Session, escrow_id: int) -> Milestone | None:
-    stmt = (
-        select(Milestone)
-        .where(Milestone.escrow_id == escrow_id, Milestone.status.in_(_OPEN_STATES))
-        .order_by(Milestone.idx.asc())
-        .limit(1)
+    return get_current_open_milestone(db, escrow_id)
+
+
+def _bad_plan(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def create_milestone_plan(
+    db: Session, escrow: EscrowAgreement, items: Sequence[MilestoneCreate]
+) -> list[Milestone]:
+    """Validate a whole milestone plan for ``escrow`` and insert it in one statement.
+
+    The plan must use the escrow currency, continue the existing sequence
+    without gaps or duplicates, and keep the milestone total within
+    ``amount_total``. Nothing is written unless every item passes.
+    """
+
+    currency = escrow.currency.upper()
+    if any(item.currency.upper() != currency for item in items):
+        raise _bad_plan("Milestone currency must match escrow currency")
+    if any(item.amount <= 0 for item in items):
+        raise _bad_plan("Milestone amounts must be positive")
+
+    existing = db.execute(
+        select(Milestone.idx, Milestone.amount).where(Milestone.escrow_id == escrow.id)
+    ).all()
+    taken = {idx for idx, _ in existing}
+    planned = [item.sequence_index for item in items]
+    if len(set(planned)) != len(planned) or taken.intersection(planned):
+        raise _bad_plan("A milestone with this sequence_index already exists for this escrow")
+    expected = set(range(1, len(taken) + len(planned) + 1))
+    if taken.union(planned) != expected:
+        missing = sorted(expected - taken.union(planned))
+        raise _bad_plan(f"Milestone sequence has gaps; missing sequence_index {missing}")
+
+    existing_amount = sum((Decimal(amount) for _, amount in existing), Decimal("0"))
+    if existing_amount + sum(item.amount for item in items) > escrow.amount_total:
+        raise _bad_plan("Total milestone amounts exceed escrow amount_total")
+
+    rows = [
+        {
+            "escrow_id": escrow.id,
+            "idx": item.sequence_index,
+            "label": item.label,
+            "amount": item.amount,
+            "currency": currency,
+            "status": MilestoneStatus.WAITING,
+            "proof_type": item.proof_kind,
+            "proof_requirements": item.proof_requirements,
+        }
+        for item in sorted(items, key=lambda item: item.sequence_index)
+    ]
+    try:
+        # One multi-row INSERT ... RETURNING; its row order is not guaranteed.
+        created = sorted(db.scalars(insert(Milestone).returning(Milestone), rows), key=lambda m: m.idx)
+        # A bulk insert bypasses the flush listener, so refresh the counters here.
+        refresh_milestone_counters(db, [escrow.id])
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A milestone with this sequence_index already exists for this escrow",
+        ) from exc
+    return created
+
+
+# --------------------------------------------------
+# Counter maintenance
+# --------------------------------------------------
+def _current_idx(escrow_id_column):
+    return (
+        select(func.min(Milestone.idx))
+        .where(Milestone.escrow_id == escrow_id_column, Milestone.status.in_(_OPEN_STATES))
+        .scalar_subquery()
     )
-    return db.scalars(stmt).first()
 
-__all__ = ["all_milestones_paid", "get_current_open_milestone", "open_next_waiting_milestone"]
+
+def _progress_values(escrow_id_column) -> dict:
+    def count(*criteria):
+        return (
+            select(func.count(Milestone.id))
+            .where(Milestone.escrow_id == escrow_id_column, *criteria)
+            .scalar_subquery()
+        )
+
+    return {
+        "milestones_total": count(),
+        "milestones_paid": count(Milestone.status == MilestoneStatus.PAID),
+        "current_milestone_idx": _current_idx(escrow_id_column),
+    }
+
+
+def _set_loaded(db: Session, escrow_id: int, total, paid, current_idx) -> None:
+    # Loaded escrows get the new values as committed state: no refresh needed.
+    obj = db.identity_map.get(db.identity_key(EscrowAgreement, escrow_id))
+    if obj is not None:
+        attributes.set_committed_value(obj, "milestones_total", total)
+        attributes.set_committed_value(obj, "milestones_paid", paid)
+        attributes.set_committed_value(obj, "current_milestone_idx", current_idx)
+
+
+def refresh_milestone_counters(db: Session, escrow_ids) -> None:
+    """Recompute the progress counters of ``escrow_ids`` from their milestone rows.
+
+    Escrow instances already loaded in ``db`` get the new values as their
+    committed state, so callers holding them see the change without a refresh.
+    """
+
+    ids = sorted({escrow_id for escrow_id in escrow_ids if escrow_id is not None})
+    if not ids:
+        return
+    db.execute(
+        update(EscrowAgreement)
+        .where(EscrowAgreement.id.in_(ids))
+        .values(**_progress_values(EscrowAgreement.id))
+        .execution_options(synchronize_session=False)
+    )
+    loaded = [
+        escrow_id for escrow_id in ids if db.identity_map.get(db.identity_key(EscrowAgreement, escrow_id)) is not None
+    ]
+    if loaded:
+        rows = db.execute(
+            select(
+                EscrowAgreement.id,
+                EscrowAgreement.milestones_total,
+                EscrowAgreement.milestones_paid,
+                EscrowAgreement.current_milestone_idx,
+            ).where(EscrowAgreement.id.in_(loaded))
+        )
+        for escrow_id, total, paid, current_idx in rows:
+            _set_loaded(db, escrow_id, total, paid, current_idx)
+    with _STATS_LOCK:
+        _COUNTER_STATS["recomputes"] += 1
+        _COUNTER_STATS["escrows_refreshed"] += len(ids)
+
+
+_UNKNOWN = object()
+
+
+def _before(obj: Milestone, key: str):
+    """Value of ``key`` before this flush, or ``_UNKNOWN`` when it was never loaded."""
+
+    history = attributes.instance_state(obj).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if history.added:
+        return _UNKNOWN
+    return attributes.instance_dict(obj).get(key, _UNKNOWN)
+
+
+@dataclass
+class _ProgressDelta:
+    total: int = 0
+    paid: int = 0
+    current_idx_moved: bool = False
+
+
+def _progress_deltas(session: Session) -> tuple[dict[int, _ProgressDelta], set[int]]:
+    """Counter deltas per escrow for this flush, plus escrows to recompute in full."""
+
+    deltas: dict[int, _ProgressDelta] = {}
+    rebuild: set[int] = set()
+
+    def bump(escrow_id, total: int, paid: int, current_idx_moved: bool) -> None:
+        if escrow_id is None:
+            return
+        delta = deltas.setdefault(escrow_id, _ProgressDelta())
+        delta.total += total
+        delta.paid += paid
+        delta.current_idx_moved = delta.current_idx_moved or current_idx_moved
+
+    def is_paid(status) -> int:
+        return int(status == MilestoneStatus.PAID)
+
+    for obj in session.new:
+        if isinstance(obj, Milestone):
+            bump(obj.escrow_id, 1, is_paid(obj.status), True)
+    for obj in session.deleted:
+        if isinstance(obj, Milestone):
+            escrow_id, old_status = _before(obj, "escrow_id"), _before(obj, "status")
+            if _UNKNOWN in (escrow_id, old_status):
+                rebuild.add(attributes.instance_dict(obj).get("escrow_id"))
+                continue
+            bump(escrow_id, -1, -is_paid(old_status), True)
+    for obj in session.dirty:
+        if not isinstance(obj, Milestone):
+            continue
+        state = attributes.instance_state(obj)
+        if not any(state.attrs[key].history.has_changes() for key in _TRACKED_KEYS):
+            continue
+        old_escrow, old_status = _before(obj, "escrow_id"), _before(obj, "status")
+        if _UNKNOWN in (old_escrow, old_status):
+            rebuild.add(obj.escrow_id)
+            if old_escrow is not _UNKNOWN:
+                rebuild.add(old_escrow)
+            continue
+        if old_escrow != obj.escrow_id:
+            bump(old_escrow, -1, -is_paid(old_status), True)
+            bump(obj.escrow_id, 1, is_paid(obj.status), True)
+            continue
+        idx_moved = state.attrs["idx"].history.has_changes()
+        open_moved = (old_status in _OPEN_STATES) != (obj.status in _OPEN_STATES)
+        bump(obj.escrow_id, 0, is_paid(obj.status) - is_paid(old_status), idx_moved or open_moved)
+    rebuild.discard(None)
+    return {escrow_id: delta for escrow_id, delta in deltas.items() if escrow_id not in rebuild}, rebuild
+
+
+def _apply_progress_deltas(db: Session, deltas: dict[int, _ProgressDelta]) -> None:
+    applied = 0
+    for escrow_id, delta in sorted(deltas.items()):
+        values = {}
+        if delta.total:
+            values["milestones_total"] = EscrowAgreement.milestones_total + delta.total
+        if delta.paid:
+            values["milestones_paid"] = EscrowAgreement.milestones_paid + delta.paid
+        if delta.current_idx_moved:
+            values["current_milestone_idx"] = _current_idx(EscrowAgreement.id)
+        if not values:
+            continue
+        row = db.execute(
+            update(EscrowAgreement)
+            .where(EscrowAgreement.id == escrow_id)
+            .values(**values)
+            .returning(
+                EscrowAgreement.milestones_total,
+                EscrowAgreement.milestones_paid,
+                EscrowAgreement.current_milestone_idx,
+            )
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is not None:
+            _set_loaded(db, escrow_id, *row)
+        applied += 1
+    with _STATS_LOCK:
+        _COUNTER_STATS["delta_updates"] += applied
+
+
+@event.listens_for(Session, "after_flush")
+def _track_milestone_progress(session: Session, flush_context) -> None:
+    if not (session.new or session.dirty or session.deleted):
+        return
+    deltas, rebuild = _progress_deltas(session)
+    if deltas:
+        _apply_progress_deltas(session, deltas)
+    if rebuild:
+        refresh_milestone_counters(session, rebuild)
+
+
+def get_milestone_counter_stats() -> dict[str, int]:
+    with _STATS_LOCK:
+        return dict(_COUNTER_STATS)
+
+
+__all__ = [
+    "all_milestones_paid",
+    "create_milestone_plan",
+    "get_current_open_milestone",
+    "get_milestone_counter_stats",
+    "open_next_waiting_milestone",
+    "refresh_milestone_counters",
+]
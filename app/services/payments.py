@@ -5,15 +5,13 @@ from uuid import uuid4
 from typing import Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
 from app.models import (
-    AuditLog,
     EscrowAgreement,
-    EscrowDeposit,
     EscrowEvent,
     EscrowStatus,
     Milestone,
@@ -22,9 +20,10 @@ from app.models import (
     PaymentStatus,
     User,
 )
-from app.services.psp_stripe import StripeClient
+from app.services import escrow_balance, ledger
+from app.services.psp_stripe import get_stripe_client
 from app.services.idempotency import get_existing_by_key
-from app.utils.audit import sanitize_payload_for_audit
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -35,35 +34,15 @@ def _to_decimal(x) -> Decimal:
         return x
     return Decimal(str(x))
 
-def _sum_deposits(db: Session, escrow_id: int) -> Decimal:
-
-    stmt = select(func.coalesce(func.sum(EscrowDeposit.amount), 0)).where(EscrowDeposit.escrow_id == escrow_id)
-    value = db.scalar(stmt)
-    if value is None:
-        return Decimal("0")
-    if isinstance(value, Decimal):
-        return value
-    return Decimal(value)
-
-
-def _sum_payments(db: Session, escrow_id: int) -> Decimal:
-    stmt = (
-        select(func.coalesce(func.sum(Payment.amount), 0))
-        .where(Payment.escrow_id == escrow_id)
-        .where(Payment.status.in_([PaymentStatus.SENT, PaymentStatus.SETTLED]))
-    )
-    value = db.scalar(stmt)
-    if value is None:
-        return Decimal("0")
-    if isinstance(value, Decimal):
-        return value
-    return Decimal(value)
-
 
 def available_balance(db: Session, escrow_id: int) -> Decimal:
-    """Return the remaining balance available for payouts on the escrow."""
+    """Return the remaining balance available for payouts on the escrow.
 
-    return _sum_deposits(db, escrow_id) - _sum_payments(db, escrow_id)
+    PENDING payouts already hold their funds back, so this is the same
+    quantity :func:`execute_payout` checks before it claims a new payout.
+    """
+
+    return escrow_balance.get_balance(db, escrow_id).unreserved
 
 
 def _send_payout_via_psp(
@@ -86,7 +65,7 @@ def _send_payout_via_psp(
     ):
         return _fallback_stub()
 
-    stripe_client = StripeClient(settings)
+    stripe_client = get_stripe_client(settings)
     currency = getattr(payment, "currency", escrow.currency)
 
     try:
@@ -110,26 +89,6 @@ def _send_payout_via_psp(
     payment.status = PaymentStatus.SENT
     return transfer.id
 
-def _escrow_available(db: Session, escrow_id: int) -> Decimal:
-    """Dépôts confirmés – paiements déjà envoyés (statuts débitants)."""
-    # dépôts
-    deposited = _sum_deposits(db, escrow_id)
-    # paiements effectivement débités (SENT/SETTLED)
-    stmt = (
-        select(func.coalesce(func.sum(Payment.amount), 0))
-        .where(Payment.escrow_id == escrow_id)
-        .where(Payment.status.in_([PaymentStatus.SENT, PaymentStatus.SETTLED]))
-    )
-    paid_value = db.scalar(stmt)
-    if paid_value is None:
-        paid = Decimal("0")
-    elif isinstance(paid_value, Decimal):
-        paid = paid_value
-    else:
-        paid = Decimal(paid_value)
-    return deposited - paid
-
-
 def execute_payout(
     db: Session,
     *,
@@ -172,6 +131,7 @@ def execute_payout(
                 beneficiary=beneficiary,
             )
             existing.psp_ref = psp_ref
+            ledger.record_payment_transition(db, existing, PaymentStatus.PENDING, escrow=escrow)
             if milestone:
                 milestone.status = MilestoneStatus.PAID
             db.commit()
@@ -199,8 +159,8 @@ def execute_payout(
                 db.commit()
             return reuse_candidate
 
-    # 3) Solde séquestre suffisant ?
-    if available_balance(db, escrow.id) < amount:
+    # 3) Solde séquestre suffisant ? (compare-and-set sur la ligne escrow_balances)
+    if not escrow_balance.claim_payout(db, escrow.id, amount):
         logger.warning(
             "Insufficient escrow balance for payout",
             extra={"escrow_id": escrow.id, "amount": str(amount)},
@@ -239,6 +199,7 @@ def execute_payout(
             beneficiary=beneficiary,
         )
         payment.psp_ref = psp_ref
+        ledger.record_payment_transition(db, payment, PaymentStatus.PENDING, escrow=escrow)
         if milestone:
             milestone.status = MilestoneStatus.PAID
 
@@ -247,23 +208,19 @@ def execute_payout(
         if milestone:
             db.refresh(milestone)
         _handle_post_payment(db, payment)
-        db.add(
-            AuditLog(
-                actor="system",
-                action="PAYMENT_EXECUTED",
-                entity="Payment",
-                entity_id=payment.id,
-                data_json=sanitize_payload_for_audit(
-                    {
-                        "escrow_id": payment.escrow_id,
-                        "milestone_id": payment.milestone_id,
-                        "amount": str(payment.amount),
-                        "idempotency_key": payment.idempotency_key,
-                        "psp_ref": payment.psp_ref,
-                    }
-                ),
-                at=utcnow(),
-            )
+        log_audit(
+            db,
+            actor="system",
+            action="PAYMENT_EXECUTED",
+            entity="Payment",
+            entity_id=payment.id,
+            data={
+                "escrow_id": payment.escrow_id,
+                "milestone_id": payment.milestone_id,
+                "amount": str(payment.amount),
+                "idempotency_key": payment.idempotency_key,
+                "psp_ref": payment.psp_ref,
+            },
         )
         db.commit()
         logger.info(
@@ -322,22 +279,19 @@ def mark_failed_from_psp(
 
     previous_status = payment.status
     payment.status = PaymentStatus.ERROR
+    ledger.record_payment_transition(db, payment, previous_status)
 
-    db.add(
-        AuditLog(
-            actor="psp",
-            action="PAYMENT_FAILED",
-            entity="Payment",
-            entity_id=payment.id,
-            data_json=sanitize_payload_for_audit(
-                {
-                    "psp_ref": payment.psp_ref,
-                    "external_error": external_error,
-                    "previous_status": getattr(previous_status, "value", str(previous_status)),
-                }
-            ),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor="psp",
+        action="PAYMENT_FAILED",
+        entity="Payment",
+        entity_id=payment.id,
+        data={
+            "psp_ref": payment.psp_ref,
+            "external_error": external_error,
+            "previous_status": getattr(previous_status, "value", str(previous_status)),
+        },
     )
 
     db.add(payment)
@@ -391,22 +345,18 @@ def execute_payment(db: Session, payment_id: int) -> Payment:
                 at=utcnow(),
             )
         )
-        db.add(
-            AuditLog(
-                actor="system",
-                action="PAYMENT_EXECUTED",
-                entity="Payment",
-                entity_id=payment.id,
-                data_json=sanitize_payload_for_audit(
-                    {
-                        "idempotency_key": payment.idempotency_key,
-                        "amount": str(payment.amount),
-                        "escrow_id": payment.escrow_id,
-                        "milestone_id": payment.milestone_id,
-                    }
-                ),
-                at=utcnow(),
-            )
+        log_audit(
+            db,
+            actor="system",
+            action="PAYMENT_EXECUTED",
+            entity="Payment",
+            entity_id=payment.id,
+            data={
+                "idempotency_key": payment.idempotency_key,
+                "amount": str(payment.amount),
+                "escrow_id": payment.escrow_id,
+                "milestone_id": payment.milestone_id,
+            },
         )
     try:
         executed = execute_payout(
@@ -449,8 +399,10 @@ def finalize_payment_settlement(
         return
 
     now = utcnow()
+    previous_status = payment.status
     payment.status = PaymentStatus.SETTLED
     db.add(payment)
+    ledger.record_payment_transition(db, payment, previous_status)
 
     event_key = f"payment:{payment.id}:settled"
     existing_event = db.scalar(
@@ -478,22 +430,19 @@ def finalize_payment_settlement(
             )
         )
 
-    db.add(
-        AuditLog(
-            actor=source,
-            action="PAYMENT_SETTLED",
-            entity="Payment",
-            entity_id=payment.id,
-            data_json=sanitize_payload_for_audit(
-                {
-                    "escrow_id": payment.escrow_id,
-                    "amount": str(payment.amount),
-                    "source": source,
-                    **(extra or {}),
-                }
-            ),
-            at=now,
-        )
+    log_audit(
+        db,
+        actor=source,
+        action="PAYMENT_SETTLED",
+        entity="Payment",
+        entity_id=payment.id,
+        data={
+            "escrow_id": payment.escrow_id,
+            "amount": str(payment.amount),
+            "source": source,
+            **(extra or {}),
+        },
+        at=now,
     )
 
     _finalize_escrow_if_paid(db, payment.escrow_id)
@@ -501,22 +450,13 @@ def finalize_payment_settlement(
 
 
 def _finalize_escrow_if_paid(db: Session, escrow_id: int) -> None:
-    total = int(db.scalar(
-        select(func.count()).select_from(Milestone).where(Milestone.escrow_id == escrow_id)
-    ) or 0)
-    if total == 0:
+    db.flush()  # pending milestone transitions update the escrow counters
+    escrow = db.get(EscrowAgreement, escrow_id)
+    if escrow is None or not escrow.milestones_total:
         return  # ne ferme pas les escrows sans jalons
 
-    remaining = int(db.scalar(
-        select(func.count()).select_from(Milestone).where(
-            Milestone.escrow_id == escrow_id,
-            Milestone.status != MilestoneStatus.PAID,
-        )
-    ) or 0)
-
-    if remaining == 0:
-        escrow = db.get(EscrowAgreement, escrow_id)
-        if escrow and escrow.status != EscrowStatus.RELEASED:
+    if escrow.milestones_paid == escrow.milestones_total:
+        if escrow.status != EscrowStatus.RELEASED:
             now = utcnow()
             escrow.status = EscrowStatus.RELEASED
             db.add(
@@ -527,15 +467,14 @@ def _finalize_escrow_if_paid(db: Session, escrow_id: int) -> None:
                     at=now,
                 )
             )
-            db.add(
-                AuditLog(
-                    actor="system",
-                    action="ESCROW_RELEASED",
-                    entity="EscrowAgreement",
-                    entity_id=escrow_id,
-                    data_json=sanitize_payload_for_audit({"source": "_finalize_escrow_if_paid"}),
-                    at=now,
-                )
+            log_audit(
+                db,
+                actor="system",
+                action="ESCROW_RELEASED",
+                entity="EscrowAgreement",
+                entity_id=escrow_id,
+                data={"source": "_finalize_escrow_if_paid"},
+                at=now,
             )
             db.commit()
 
@@ -0,0 +1,554 @@
+"""Durable background analysis (invoice OCR and AI advice) for submitted proofs.
+
+``submit_proof`` no longer waits on the OCR provider or the AI advisor: it
+stages one ``proof_analysis_jobs`` row in the submission transaction and sets
+``Proof.analysis_status`` to ``QUEUED``. A bounded pool of worker threads
+(``PROOF_ANALYSIS_WORKERS``) claims jobs with a compare-and-set on
+``(status, attempts)``, so several processes can share the queue, and writes
+the results back to the proof's OCR/invoice and ``ai_*`` fields.
+
+The slow provider calls run outside any database transaction. A failed attempt
+is retried after ``PROOF_ANALYSIS_RETRY_SECONDS`` up to
+``PROOF_ANALYSIS_MAX_ATTEMPTS``; a job whose worker died is reclaimed once its
+lease (``PROOF_ANALYSIS_LEASE_SECONDS``) runs out. The advisor does not raise
+on an outage but answers with its ``ai_unavailable`` fallback; that counts as
+a failed attempt too, and the fallback is only written to the proof once the
+attempts are exhausted. A failure is recorded as a
+short ``error_code`` naming the step that failed, which is what API clients
+see; the exception itself goes to the log and ``last_error``. ``process_pending_jobs``
+drains the queue inline for scripts and tests.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.config import get_settings
+from app.models import Milestone, Proof, ProofAnalysisJob
+from app.services import ai_assessment_cache, ai_prescreen
+from app.services.ai_proof_advisor import call_ai_proof_advisor
+from app.services.ai_proof_flags import ai_model
+from app.services.document_checks import compute_document_backend_checks
+from app.services.invoice_ocr import normalize_invoice_amount_and_currency, run_invoice_ocr_if_enabled
+from app.utils.audit import log_audit
+from app.utils.time import utcnow
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+DONE = "DONE"
+FAILED = "FAILED"
+SKIPPED = "SKIPPED"
+
+# Job.error_code: the step that failed.
+ERROR_PROOF_MISSING = "PROOF_MISSING"
+ERROR_OCR_FAILED = "OCR_FAILED"
+ERROR_AI_FAILED = "AI_ASSESSMENT_FAILED"
+
+DOCUMENT_PROOF_TYPES = frozenset({"PDF", "INVOICE", "CONTRACT"})
+
+_CLAIM_CANDIDATES = 8
+_MAX_ERROR_LENGTH = 500
+
+_STATS_LOCK = threading.Lock()
+_ANALYSIS_STATS: dict[str, Any] = {
+    "enqueued": 0,
+    "skipped": 0,
+    "claimed": 0,
+    "claim_conflicts": 0,
+    "completed": 0,
+    "retried": 0,
+    "failed": 0,
+    "ai_decided_prescreen": 0,
+    "ai_decided_cache": 0,
+    "ai_decided_model": 0,
+    "last_duration_ms": None,
+}
+
+
+# Metadata keys written by the analysis itself; never accepted from submitters
+# nor fed back into the advisor context.
+AI_OUTPUT_METADATA_KEYS = frozenset({"ai_assessment", "ai_decided_by", "ai_usage"})
+
+
+class AiAdvisorUnavailable(RuntimeError):
+    """The advisor answered with its fallback (outage, deadline, open breaker)."""
+
+
+def _ai_unavailable(ai_result: dict[str, Any]) -> bool:
+    return "ai_unavailable" in (ai_result.get("flags") or [])
+
+
+def _bump(key: str, amount: int = 1) -> None:
+    with _STATS_LOCK:
+        _ANALYSIS_STATS[key] += amount
+
+
+# --------------------------------------------------
+# Enqueue
+# --------------------------------------------------
+def enqueue_analysis(
+    db: Session,
+    proof: Proof,
+    *,
+    run_ocr: bool,
+    run_ai: bool,
+    backend_checks: dict[str, Any] | None = None,
+) -> ProofAnalysisJob | None:
+    """Stage the analysis job of ``proof`` in the caller's transaction.
+
+    ``proof`` must be flushed. Returns ``None`` (status ``SKIPPED``) when
+    there is nothing to run.
+    """
+
+    if not (run_ocr or run_ai):
+        proof.analysis_status = SKIPPED
+        _bump("skipped")
+        return None
+    job = ProofAnalysisJob(
+        proof_id=proof.id,
+        status=QUEUED,
+        run_ocr=run_ocr,
+        run_ai=run_ai,
+        backend_checks=backend_checks,
+        attempts=0,
+        available_at=utcnow(),
+    )
+    db.add(job)
+    proof.analysis_status = QUEUED
+    _bump("enqueued")
+    return job
+
+
+# --------------------------------------------------
+# Analysis steps
+# --------------------------------------------------
+def _apply_ocr(db: Session, proof: Proof) -> None:
+    ocr_result = run_invoice_ocr_if_enabled(b"")
+    metadata = dict(proof.metadata_ or {})
+    metadata.setdefault("ocr_status", ocr_result.get("ocr_status"))
+    metadata.setdefault("ocr_provider", ocr_result.get("ocr_provider"))
+    if "total_amount" in ocr_result and metadata.get("invoice_total_amount") is None:
+        metadata["invoice_total_amount"] = ocr_result["total_amount"]
+    if "currency" in ocr_result and metadata.get("invoice_currency") is None:
+        metadata["invoice_currency"] = ocr_result["currency"]
+    metadata["ocr_raw"] = {
+        **(metadata.get("ocr_raw") or {}),
+        **{key: str(value) if isinstance(value, Decimal) else value for key, value in ocr_result.items()},
+    }
+    metadata = {key: str(value) if isinstance(value, Decimal) else value for key, value in metadata.items()}
+
+    total, currency, errors = normalize_invoice_amount_and_currency(metadata)
+    if errors:
+        logger.warning(
+            "Invoice normalization errors after OCR",
+            extra={"proof_id": proof.id, "errors": errors},
+        )
+        metadata["invoice_normalization_errors"] = list(errors)
+    else:
+        if proof.invoice_total_amount is None:
+            proof.invoice_total_amount = total
+        if proof.invoice_currency is None:
+            proof.invoice_currency = currency
+    proof.metadata_ = metadata
+
+    log_audit(
+        db,
+        actor="invoice_ocr",
+        action="INVOICE_OCR_RUN",
+        entity="Proof",
+        entity_id=proof.id,
+        data={
+            "escrow_id": proof.escrow_id,
+            "milestone_id": proof.milestone_id,
+            "ocr_status": metadata.get("ocr_status"),
+            "ocr_provider": metadata.get("ocr_provider"),
+        },
+    )
+
+
+def build_ai_context(
+    proof: Proof, milestone: Milestone, backend_checks: dict[str, Any] | None
+) -> dict[str, Any]:
+    """AI advisor context for ``proof``; document checks are computed when none were recorded."""
+
+    metadata = {key: value for key, value in (proof.metadata_ or {}).items() if key not in AI_OUTPUT_METADATA_KEYS}
+    proof_requirements = getattr(milestone, "proof_requirements", None)
+    if backend_checks is None:
+        backend_checks = compute_document_backend_checks(
+            proof_requirements=proof_requirements,
+            metadata=metadata,
+        )
+    return {
+        "mandate_context": {
+            "escrow_id": proof.escrow_id,
+            "milestone_idx": milestone.idx,
+            "milestone_label": milestone.label,
+            "milestone_amount": float(milestone.amount),
+            "proof_type": milestone.proof_type,
+            "proof_requirements": proof_requirements,
+            "invoice_total_amount": float(proof.invoice_total_amount)
+            if proof.invoice_total_amount is not None
+            else None,
+            "invoice_currency": proof.invoice_currency,
+        },
+        "backend_checks": backend_checks,
+        "document_context": {
+            "type": proof.type,
+            "storage_url": proof.storage_url,
+            "sha256": proof.sha256,
+            "metadata": metadata,
+        },
+    }
+
+
+def _apply_ai_result(
+    db: Session,
+    proof: Proof,
+    ai_result: dict[str, Any],
+    *,
+    decided_by: str = "model",
+    usage: dict[str, Any] | None = None,
+) -> None:
+    metadata = {**(proof.metadata_ or {}), "ai_assessment": ai_result, "ai_decided_by": decided_by}
+    if usage:
+        metadata["ai_usage"] = usage
+    else:
+        metadata.pop("ai_usage", None)
+    proof.metadata_ = metadata
+    proof.ai_risk_level = ai_result.get("risk_level")
+    score = ai_result.get("score")
+    try:
+        proof.ai_score = None if score is None else Decimal(str(score))
+    except (InvalidOperation, TypeError, ValueError):
+        proof.ai_score = None
+    proof.ai_flags = list(ai_result.get("flags") or [])
+    proof.ai_explanation = ai_result.get("explanation")
+    proof.ai_checked_at = utcnow()
+
+    log_audit(
+        db,
+        actor="ai_proof_advisor",
+        action="AI_PROOF_ASSESSMENT",
+        entity="Proof",
+        entity_id=proof.id,
+        data={
+            "escrow_id": proof.escrow_id,
+            "milestone_id": proof.milestone_id,
+            "proof_type": proof.type,
+            "risk_level": ai_result.get("risk_level"),
+            "score": ai_result.get("score"),
+            "flags": ai_result.get("flags"),
+            "decided_by": decided_by,
+            "input_tokens": (usage or {}).get("input_tokens"),
+            "output_tokens": (usage or {}).get("output_tokens"),
+        },
+    )
+
+
+# --------------------------------------------------
+# Queue
+# --------------------------------------------------
+def claim_next_job(db: Session, *, worker: str) -> int | None:
+    """Claim the oldest runnable job for ``worker`` and commit; return its id."""
+
+    now = utcnow()
+    stale_before = now - timedelta(seconds=max(1, get_settings().PROOF_ANALYSIS_LEASE_SECONDS))
+    candidates = db.execute(
+        select(
+            ProofAnalysisJob.id,
+            ProofAnalysisJob.proof_id,
+            ProofAnalysisJob.status,
+            ProofAnalysisJob.attempts,
+        )
+        .where(
+            or_(
+                and_(ProofAnalysisJob.status == QUEUED, ProofAnalysisJob.available_at <= now),
+                and_(ProofAnalysisJob.status == RUNNING, ProofAnalysisJob.locked_at < stale_before),
+            )
+        )
+        .order_by(ProofAnalysisJob.available_at, ProofAnalysisJob.id)
+        .limit(_CLAIM_CANDIDATES)
+    ).all()
+    for job_id, proof_id, seen_status, seen_attempts in candidates:
+        claimed = db.execute(
+            update(ProofAnalysisJob)
+            .where(
+                ProofAnalysisJob.id == job_id,
+                ProofAnalysisJob.status == seen_status,
+                ProofAnalysisJob.attempts == seen_attempts,
+            )
+            .values(
+                status=RUNNING,
+                attempts=ProofAnalysisJob.attempts + 1,
+                locked_at=now,
+                locked_by=worker[:64],
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed:
+            db.execute(
+                update(Proof)
+                .where(Proof.id == proof_id)
+                .values(analysis_status=RUNNING)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            _bump("claimed")
+            return job_id
+        _bump("claim_conflicts")
+    db.commit()  # nothing claimed; just end the read transaction
+    return None
+
+
+def _finish(
+    db: Session,
+    job: ProofAnalysisJob,
+    proof: Proof | None,
+    error: Exception | None,
+    error_code: str | None = None,
+) -> None:
+    now = utcnow()
+    job.locked_at = None
+    job.locked_by = None
+    job.error_code = error_code if error is not None else None
+    if error is None:
+        job.status = DONE
+        job.last_error = None
+        job.finished_at = now
+        outcome = DONE
+        _bump("completed")
+    elif job.attempts >= max(1, get_settings().PROOF_ANALYSIS_MAX_ATTEMPTS):
+        job.status = FAILED
+        job.last_error = repr(error)[:_MAX_ERROR_LENGTH]
+        job.finished_at = now
+        outcome = FAILED
+        _bump("failed")
+    else:
+        job.status = QUEUED
+        job.last_error = repr(error)[:_MAX_ERROR_LENGTH]
+        job.available_at = now + timedelta(seconds=max(0, get_settings().PROOF_ANALYSIS_RETRY_SECONDS))
+        outcome = QUEUED
+        _bump("retried")
+    if proof is not None:
+        proof.analysis_status = outcome
+    db.commit()
+
+
+def run_job(db: Session, job_id: int) -> str | None:
+    """Run a claimed job and record its outcome; return the resulting job status."""
+
+    # The claim was a Core UPDATE; reload rather than trust instances already in the session.
+    job = db.get(ProofAnalysisJob, job_id, populate_existing=True)
+    if job is None or job.status != RUNNING:
+        return None
+    proof = db.get(Proof, job.proof_id, populate_existing=True)
+    started = time.perf_counter()
+    error_code = ERROR_PROOF_MISSING
+    unavailable: AiAdvisorUnavailable | None = None
+    try:
+        if proof is None:
+            raise LookupError(f"proof {job.proof_id} no longer exists")
+        milestone = db.get(Milestone, proof.milestone_id)
+        error_code = ERROR_OCR_FAILED
+        # OCR commits before the advisor call; a retry after an AI failure must not rerun it.
+        if job.run_ocr and job.ocr_completed_at is None:
+            _apply_ocr(db, proof)
+            job.ocr_completed_at = utcnow()
+        error_code = ERROR_AI_FAILED
+        context = build_ai_context(proof, milestone, job.backend_checks) if job.run_ai else None
+        ai_result, decided_by, usage = None, None, None
+        if context is not None and get_settings().AI_PRESCREEN_ENABLED:
+            screened = ai_prescreen.prescreen(context)
+            if screened.decided:
+                ai_result, decided_by = screened.as_ai_result(), "prescreen"
+        if context is not None and ai_result is None:
+            model = ai_model()
+            ctx_hash = ai_assessment_cache.context_hash(context)
+            key = ai_assessment_cache.cache_key(proof.sha256, ctx_hash, model=model)
+            ai_result = ai_assessment_cache.lookup(db, key)
+            decided_by = "cache" if ai_result is not None else None
+        # Keep the OCR write-back and release the transaction before the slow advisor call.
+        db.commit()
+        if context is not None:
+            if ai_result is None:
+                decided_by = "model"
+                call_started = time.perf_counter()
+                usage = {}
+                ai_result = call_ai_proof_advisor(
+                    model=model, context=context, proof_storage_url=proof.storage_url, usage=usage
+                )
+                latency_ms = (time.perf_counter() - call_started) * 1000.0
+                usage["latency_ms"] = round(latency_ms, 1)
+                ai_assessment_cache.store(
+                    db,
+                    key,
+                    document_sha256=proof.sha256,
+                    ctx_hash=ctx_hash,
+                    model=model,
+                    result=ai_result,
+                    latency_ms=latency_ms,
+                )
+            if _ai_unavailable(ai_result):
+                unavailable = AiAdvisorUnavailable(", ".join(ai_result.get("flags") or []))
+                if job.attempts < max(1, get_settings().PROOF_ANALYSIS_MAX_ATTEMPTS):
+                    raise unavailable
+                logger.warning("AI advisor unavailable on the last attempt of job %s; keeping its fallback", job_id)
+            _apply_ai_result(db, proof, ai_result, decided_by=decided_by, usage=usage)
+            if unavailable is None:
+                _bump(f"ai_decided_{decided_by}")
+    except Exception as exc:  # noqa: BLE001
+        db.rollback()
+        logger.exception("Proof analysis job %s failed", job_id)
+        job = db.get(ProofAnalysisJob, job_id)
+        proof = db.get(Proof, job.proof_id) if job is not None else None
+        if job is None:
+            return None
+        _finish(db, job, proof, exc, error_code)
+    else:
+        # A fallback kept on the last attempt still fails the job, so it shows up for review.
+        _finish(db, job, proof, unavailable, ERROR_AI_FAILED if unavailable else None)
+    with _STATS_LOCK:
+        _ANALYSIS_STATS["last_duration_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+    return job.status
+
+
+def process_pending_jobs(
+    db: Session | None = None, *, limit: int = 100, worker: str = "inline"
+) -> int:
+    """Claim and run up to ``limit`` runnable jobs in this thread; return how many ran."""
+
+    session = db or db_module.get_sessionmaker()()
+    ran = 0
+    try:
+        while ran < limit:
+            job_id = claim_next_job(session, worker=worker)
+            if job_id is None:
+                break
+            run_job(session, job_id)
+            ran += 1
+    finally:
+        if db is None:
+            session.close()
+    return ran
+
+
+def get_analysis(db: Session, proof_id: int) -> tuple[Proof, ProofAnalysisJob | None] | None:
+    proof = db.get(Proof, proof_id)
+    if proof is None:
+        return None
+    job = db.scalars(select(ProofAnalysisJob).where(ProofAnalysisJob.proof_id == proof_id)).first()
+    return proof, job
+
+
+# --------------------------------------------------
+# Worker pool
+# --------------------------------------------------
+class ProofAnalysisPool:
+    """Fixed set of daemon threads, each claiming and running one job at a time."""
+
+    def __init__(self, session_factory: Callable[[], Session] | None = None) -> None:
+        self._session_factory = session_factory
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._errors = 0
+
+    @property
+    def running(self) -> int:
+        return sum(1 for thread in self._threads if thread.is_alive())
+
+    def _work(self, name: str, poll_seconds: float) -> None:
+        factory = self._session_factory or db_module.get_sessionmaker()
+        while not self._stop.is_set():
+            session = factory()
+            try:
+                job_id = claim_next_job(session, worker=name)
+                if job_id is not None:
+                    run_job(session, job_id)
+            except Exception:  # noqa: BLE001
+                session.rollback()
+                job_id = None
+                with self._lock:
+                    self._errors += 1
+                logger.exception("Proof analysis worker %s iteration failed", name)
+            finally:
+                session.close()
+            if job_id is None and self._stop.wait(poll_seconds):
+                return
+
+    def start(self, *, workers: int, poll_ms: int) -> None:
+        if self.running or workers <= 0:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                args=(f"proof-analysis-{index}", max(poll_ms, 1) / 1000.0),
+                name=f"proof-analysis-{index}",
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop taking jobs; a job in flight finishes, or is reclaimed after its lease."""
+
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"workers": self.running, "worker_errors": self._errors}
+
+
+_POOL = ProofAnalysisPool()
+
+
+def start_proof_analysis_workers() -> None:
+    settings = get_settings()
+    _POOL.start(workers=settings.PROOF_ANALYSIS_WORKERS, poll_ms=settings.PROOF_ANALYSIS_POLL_MS)
+
+
+def stop_proof_analysis_workers() -> None:
+    _POOL.stop()
+
+
+def get_proof_analysis_stats() -> dict[str, Any]:
+    with _STATS_LOCK:
+        stats = dict(_ANALYSIS_STATS)
+    return {**_POOL.stats(), **stats}
+
+
+__all__ = [
+    "AI_OUTPUT_METADATA_KEYS",
+    "AiAdvisorUnavailable",
+    "DOCUMENT_PROOF_TYPES",
+    "ERROR_AI_FAILED",
+    "ERROR_OCR_FAILED",
+    "ERROR_PROOF_MISSING",
+    "ProofAnalysisPool",
+    "build_ai_context",
+    "claim_next_job",
+    "enqueue_analysis",
+    "get_analysis",
+    "get_proof_analysis_stats",
+    "process_pending_jobs",
+    "run_job",
+    "start_proof_analysis_workers",
+    "stop_proof_analysis_workers",
+]
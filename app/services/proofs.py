@@ -1,6 +1,6 @@
 """Proof lifecycle services."""
 import logging
-from decimal import Decimal, InvalidOperation
+from decimal import Decimal
 import os
 
 from fastapi import HTTPException, status
@@ -8,7 +8,6 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models import (
-    AuditLog,
     EscrowAgreement,
     EscrowEvent,
     EscrowStatus,
@@ -22,14 +21,13 @@ from app.schemas.proof import ProofCreate
 from app.services import (
     milestones as milestones_service,
     payments as payments_service,
+    proof_analysis,
     rules as rules_service,
 )
-from app.services.ai_proof_advisor import call_ai_proof_advisor
 from app.services.ai_proof_flags import ai_enabled
-from app.services.document_checks import compute_document_backend_checks
-from app.services.invoice_ocr import normalize_invoice_amount_and_currency, run_invoice_ocr_if_enabled
+from app.services.invoice_ocr import normalize_invoice_amount_and_currency
 from app.services.idempotency import get_existing_by_key
-from app.utils.audit import sanitize_payload_for_audit
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -81,21 +79,12 @@ def submit_proof(
     # en cas d’erreur "dure" (géofence, exif manquant, trop vieux, etc.).
 
     metadata_payload = dict(payload.metadata or {})
-    metadata_payload.pop("ai_assessment", None)
-    ai_result: dict[str, Any] | None = None
-
-    if payload.type in {"PDF", "INVOICE", "CONTRACT"}:
-        ocr_result = run_invoice_ocr_if_enabled(b"")
-        metadata_payload.setdefault("ocr_status", ocr_result.get("ocr_status"))
-        metadata_payload.setdefault("ocr_provider", ocr_result.get("ocr_provider"))
-
-        if "total_amount" in ocr_result and metadata_payload.get("invoice_total_amount") is None:
-            metadata_payload["invoice_total_amount"] = ocr_result["total_amount"]
-        if "currency" in ocr_result and metadata_payload.get("invoice_currency") is None:
-            metadata_payload["invoice_currency"] = ocr_result["currency"]
-
-        metadata_payload.setdefault("ocr_raw", {})
-        metadata_payload["ocr_raw"].update(ocr_result)
+    for key in proof_analysis.AI_OUTPUT_METADATA_KEYS:
+        metadata_payload.pop(key, None)
+    # OCR and AI advice run after the commit (app/services/proof_analysis.py).
+    run_ocr = payload.type in proof_analysis.DOCUMENT_PROOF_TYPES
+    run_ai = False
+    ai_backend_checks: dict[str, Any] | None = None
 
     metadata_payload = _sanitize_metadata_for_storage(metadata_payload) or {}
 
@@ -198,95 +187,21 @@ def submit_proof(
         else:
             auto_approve = True
 
-            # 5) (NEW) Optional AI call for risk assessment (PHOTO only)
+            # 5) Optional AI risk assessment (PHOTO only), queued with the validation signals
             if ai_enabled():
-                try:
-                    ai_context = {
-                        "mandate_context": {
-                        "escrow_id": payload.escrow_id,
-                        "milestone_idx": payload.milestone_idx,
-                        "milestone_label": milestone.label,
-                        "milestone_amount": float(milestone.amount),
-                        "proof_type": milestone.proof_type,
-                        "proof_requirements": getattr(milestone, "proof_requirements", None),
-                        "invoice_total_amount": float(invoice_total_amount)
-                        if invoice_total_amount is not None
-                        else None,
-                        "invoice_currency": invoice_currency,
-                    },
-                    "backend_checks": {
-                        "has_metadata": payload.metadata is not None,
-                        "geofence_configured": geofence is not None,
-                        "validation_ok": bool(ok),
-                            "validation_reason": reason,
-                        },
-                        "document_context": {
-                            "type": payload.type,
-                            "storage_url": payload.storage_url,
-                            "sha256": payload.sha256,
-                            "metadata": metadata_payload,
-                        },
-                    }
-
-                    ai_result = call_ai_proof_advisor(
-                        context=ai_context,
-                        proof_storage_url=payload.storage_url,
-                    )
-
-                    # Store AI result in metadata of the proof
-                    metadata_payload["ai_assessment"] = ai_result
-
-                except Exception as exc:  # noqa: BLE001
-                    logger.exception("AI proof advisor integration failed: %s", exc)
-                    # Never block the proof because of AI issues
-                    # -> fall back to normal behavior (no AI enrichment)
-                    # (nothing else to do here)
+                run_ai = True
+                ai_backend_checks = {
+                    "has_metadata": payload.metadata is not None,
+                    "geofence_configured": geofence is not None,
+                    "validation_ok": bool(ok),
+                    "validation_reason": reason,
+                }
 
     else:
         # NON-PHOTO proofs (PDF, invoices, contracts, other)
-        # → always manual review (no auto_approve) BUT we call AI as an advisor if enabled.
-        if ai_enabled():
-            try:
-                proof_reqs = getattr(milestone, "proof_requirements", None)
-
-                backend_checks = compute_document_backend_checks(
-                    proof_requirements=proof_reqs,
-                    metadata=metadata_payload,
-                )
-
-                ai_context = {
-                    "mandate_context": {
-                        "escrow_id": payload.escrow_id,
-                        "milestone_idx": payload.milestone_idx,
-                        "milestone_label": milestone.label,
-                        "milestone_amount": float(milestone.amount),
-                        "proof_type": milestone.proof_type,
-                        "proof_requirements": proof_reqs,
-                        "invoice_total_amount": float(invoice_total_amount)
-                        if invoice_total_amount is not None
-                        else None,
-                        "invoice_currency": invoice_currency,
-                    },
-                    "backend_checks": backend_checks,
-                    "document_context": {
-                        "type": payload.type,  # e.g. "PDF", "INVOICE", "CONTRACT"
-                        "storage_url": payload.storage_url,
-                        "sha256": payload.sha256,
-                        "metadata": metadata_payload,
-                        # Future extension: "ocr_text": "..." once OCR is wired
-                    },
-                }
-
-                ai_result = call_ai_proof_advisor(
-                    context=ai_context,
-                    proof_storage_url=payload.storage_url,
-                )
-                metadata_payload["ai_assessment"] = ai_result
-
-            except Exception as exc:  # noqa: BLE001
-                logger.exception("AI proof advisor (doc) integration failed: %s", exc)
-                # Never block the proof because of AI issues
-                # → continue with manual review as usual
+        # → always manual review (no auto_approve) BUT the AI advises if enabled;
+        # document checks are computed by the job once OCR has run.
+        run_ai = ai_enabled()
 
     # -------------------------
     # Contrôles d’état APRES validation photo
@@ -339,71 +254,19 @@ def submit_proof(
         invoice_total_amount=invoice_total_amount,
         invoice_currency=invoice_currency,
     )
-    if ai_result:
-        proof.ai_risk_level = ai_result.get("risk_level")
-        score = ai_result.get("score")
-        if score is None:
-            proof.ai_score = None
-        else:
-            try:
-                proof.ai_score = Decimal(str(score))
-            except (InvalidOperation, TypeError, ValueError):
-                proof.ai_score = None
-        proof.ai_flags = list(ai_result.get("flags") or [])
-        proof.ai_explanation = ai_result.get("explanation")
-        proof.ai_checked_at = utcnow()
     db.add(proof)
     db.flush()
+    proof_analysis.enqueue_analysis(
+        db, proof, run_ocr=run_ocr, run_ai=run_ai, backend_checks=ai_backend_checks
+    )
 
-    if payload.type in {"PDF", "INVOICE", "CONTRACT"}:
-        db.add(
-            AuditLog(
-                actor="invoice_ocr",
-                action="INVOICE_OCR_RUN",
-                entity="Proof",
-                entity_id=proof.id,
-                data_json=sanitize_payload_for_audit(
-                    {
-                        "escrow_id": payload.escrow_id,
-                        "milestone_id": milestone.id,
-                        "ocr_status": metadata_payload.get("ocr_status"),
-                        "ocr_provider": metadata_payload.get("ocr_provider"),
-                    }
-                ),
-                at=utcnow(),
-            )
-        )
-
-    if ai_result:
-        db.add(
-            AuditLog(
-                actor="ai_proof_advisor",
-                action="AI_PROOF_ASSESSMENT",
-                entity="Proof",
-                entity_id=proof.id,
-                data_json=sanitize_payload_for_audit(
-                    {
-                        "escrow_id": payload.escrow_id,
-                        "milestone_id": milestone.id,
-                        "proof_type": payload.type,
-                        "risk_level": ai_result.get("risk_level"),
-                        "score": ai_result.get("score"),
-                        "flags": ai_result.get("flags"),
-                    }
-                ),
-                at=utcnow(),
-            )
-        )
-
-    db.add(
-        AuditLog(
-            actor=actor or "system",
-            action="SUBMIT_PROOF",
-            entity="Proof",
-            entity_id=proof.id,
-            data_json=sanitize_payload_for_audit(payload.model_dump()),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor=actor or "system",
+        action="SUBMIT_PROOF",
+        entity="Proof",
+        entity_id=proof.id,
+        data=payload.model_dump(),
     )
 
     escrow = db.get(EscrowAgreement, payload.escrow_id)
@@ -495,17 +358,13 @@ def decide_proof(
 
     updated.ai_reviewed_by = actor or "system"
     updated.ai_reviewed_at = utcnow()
-    db.add(
-        AuditLog(
-            actor=actor or "system",
-            action="DECIDE_PROOF",
-            entity="Proof",
-            entity_id=updated.id,
-            data_json=sanitize_payload_for_audit(
-                {"decision": target, "note": note, "proof_id": updated.id}
-            ),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor=actor or "system",
+        action="DECIDE_PROOF",
+        entity="Proof",
+        entity_id=updated.id,
+        data={"decision": target, "note": note, "proof_id": updated.id},
     )
     db.add(updated)
     db.commit()
@@ -545,15 +404,13 @@ def approve_proof(
     proof.status = "APPROVED"
     milestone.status = MilestoneStatus.APPROVED
 
-    db.add(
-        AuditLog(
-            actor=actor or "system",
-            action="APPROVE_PROOF",
-            entity="Proof",
-            entity_id=proof.id,
-            data_json=sanitize_payload_for_audit({"proof_id": proof.id, "note": note}),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor=actor or "system",
+        action="APPROVE_PROOF",
+        entity="Proof",
+        entity_id=proof.id,
+        data={"proof_id": proof.id, "note": note},
     )
 
     try:
@@ -614,15 +471,13 @@ def reject_proof(
     proof.status = "REJECTED"
     milestone.status = MilestoneStatus.REJECTED
 
-    db.add(
-        AuditLog(
-            actor=actor or "system",
-            action="REJECT_PROOF",
-            entity="Proof",
-            entity_id=proof.id,
-            data_json=sanitize_payload_for_audit({"proof_id": proof.id, "note": note}),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor=actor or "system",
+        action="REJECT_PROOF",
+        entity="Proof",
+        entity_id=proof.id,
+        data={"proof_id": proof.id, "note": note},
     )
     db.commit()
     db.refresh(proof)
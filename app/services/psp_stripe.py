@@ -1,12 +1,13 @@
 """Stripe SDK wrapper for payment and payout operations."""
 from __future__ import annotations
 
+import threading
 from decimal import Decimal
 from typing import TYPE_CHECKING, Any, Dict
 
 import stripe
 
-from app.config import Settings, get_settings
+from app.config import Settings, get_settings, settings_provider
 
 if TYPE_CHECKING:  # pragma: no cover - hints only
     from app.models import EscrowAgreement, Payment, User
@@ -156,3 +157,45 @@ class StripeClient:
             destination=destination_account_id,
             metadata=metadata,
         )
+
+
+_STRIPE_FIELDS = ("STRIPE_ENABLED", "STRIPE_SECRET_KEY", "STRIPE_WEBHOOK_SECRET", "STRIPE_CONNECT_ENABLED")
+_CLIENT_LOCK = threading.Lock()
+_CACHED_CLIENT: tuple[Settings, StripeClient] | None = None
+
+
+def get_stripe_client(settings: Settings | None = None) -> StripeClient:
+    """Return the client built for the current settings snapshot.
+
+    The client is reused until a settings reload changes a Stripe field. Any
+    other ``settings`` object (e.g. a test stub) gets a fresh, uncached client.
+    """
+
+    global _CACHED_CLIENT
+    current = get_settings()
+    settings = settings or current
+    if settings is not current:
+        return StripeClient(settings)
+    with _CLIENT_LOCK:
+        cached = _CACHED_CLIENT
+        if cached is not None and cached[0] is current:
+            return cached[1]
+        client = StripeClient(current)
+        _CACHED_CLIENT = (current, client)
+        return client
+
+
+def _on_settings_change(old: Settings, new: Settings) -> None:
+    global _CACHED_CLIENT
+    with _CLIENT_LOCK:
+        cached = _CACHED_CLIENT
+        if cached is None:
+            return
+        if any(getattr(old, f) != getattr(new, f) for f in _STRIPE_FIELDS):
+            _CACHED_CLIENT = None
+        else:
+            # Same Stripe configuration: carry the client over to the new snapshot.
+            _CACHED_CLIENT = (new, cached[1])
+
+
+settings_provider.subscribe(_on_settings_change)
@@ -18,12 +18,12 @@ from sqlalchemy.orm import Session
 from app.config import get_settings
 from app.models.payment import Payment, PaymentStatus
 from app.models.psp_webhook import PSPWebhookEvent
-from app.models.audit import AuditLog
 from app.services import funding as funding_service
+from app.services import ledger
 from app.services import payments as payments_service
 from app.services.payments import finalize_payment_settlement
-from app.services.psp_stripe import StripeClient
-from app.utils.audit import sanitize_payload_for_audit
+from app.services.psp_stripe import get_stripe_client
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -64,7 +64,7 @@ async def handle_stripe_webhook(request: Request, db: Session) -> dict[str, bool
         )
 
     try:
-        client = StripeClient(settings)
+        client = get_stripe_client(settings)
         event = client.construct_webhook_event(payload, sig_header)
     except RuntimeError as exc:  # configuration issue
         logger.error("Stripe webhook configuration error", exc_info=True)
@@ -446,16 +446,16 @@ def _mark_payment_error(db: Session, *, psp_ref: str | None) -> None:
         logger.info("Payment already marked as error", extra={"payment_id": payment.id})
         return
 
+    previous_status = payment.status
     payment.status = PaymentStatus.ERROR
-    db.add(
-        AuditLog(
-            actor="psp",
-            action="PAYMENT_FAILED",
-            entity="Payment",
-            entity_id=payment.id,
-            data_json=sanitize_payload_for_audit({"psp_ref": psp_ref}),
-            at=utcnow(),
-        )
+    ledger.record_payment_transition(db, payment, previous_status)
+    log_audit(
+        db,
+        actor="psp",
+        action="PAYMENT_FAILED",
+        entity="Payment",
+        entity_id=payment.id,
+        data={"psp_ref": psp_ref},
     )
     db.add(payment)
     logger.info("Payment marked as error", extra={"payment_id": payment.id})
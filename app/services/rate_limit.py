@@ -0,0 +1,291 @@
+"""Token-bucket rate limiting per API key and route.
+
+Each (API key, HTTP method + route template) pair owns a bucket whose size and
+refill rate come from the key's ``ApiScope`` (``RATE_LIMIT_<SCOPE>_BURST`` and
+``RATE_LIMIT_<SCOPE>_PER_MINUTE``). ``require_scope`` consumes one token per
+call and answers ``429`` with ``Retry-After`` when the bucket is empty.
+
+Two state backends are available through ``RATE_LIMIT_BACKEND``:
+
+* ``memory`` keeps buckets in-process; correct for a single worker.
+* ``db`` keeps buckets in ``rate_limit_buckets`` and updates them with a
+  compare-and-set on an integer ``version`` so several workers share one
+  budget. It runs on its own short-lived session and never commits or rolls
+  back the request's session.
+
+Backend errors fail open: a broken limiter must not take the API down.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Protocol
+
+from prometheus_client import Counter
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.config import Settings, get_settings
+from app.models.api_key import ApiScope
+from app.models.rate_limit import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "kobatella_rate_limit_decisions_total",
+    "Rate-limit decisions taken by require_scope.",
+    ["scope", "decision"],
+)
+
+_CAS_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Bucket capacity and refill rate for one scope."""
+
+    capacity: float
+    refill_per_second: float
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    remaining: float
+    retry_after_seconds: float
+
+
+def _refill(tokens: float, refilled_at: float, now: float, limit: RateLimit) -> float:
+    elapsed = max(0.0, now - refilled_at)
+    return min(limit.capacity, tokens + elapsed * limit.refill_per_second)
+
+
+def _decide(tokens: float, limit: RateLimit, cost: float) -> tuple[RateLimitDecision, float]:
+    """Return the decision and the token count to store afterwards."""
+
+    if tokens >= cost:
+        remaining = tokens - cost
+        return RateLimitDecision(True, remaining, 0.0), remaining
+    retry_after = (cost - tokens) / limit.refill_per_second
+    return RateLimitDecision(False, tokens, retry_after), tokens
+
+
+class RateLimitBackend(Protocol):
+    name: str
+
+    def consume(self, bucket_key: str, limit: RateLimit, *, now: float, cost: float = 1.0) -> RateLimitDecision:
+        ...
+
+    def reset(self) -> None:
+        ...
+
+
+class MemoryRateLimitBackend:
+    """In-process buckets (single worker); least recently used buckets are evicted."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._max_entries = max_entries
+
+    def consume(self, bucket_key: str, limit: RateLimit, *, now: float, cost: float = 1.0) -> RateLimitDecision:
+        with self._lock:
+            state = self._buckets.get(bucket_key)
+            tokens = limit.capacity if state is None else _refill(state[0], state[1], now, limit)
+            decision, stored = _decide(tokens, limit, cost)
+            self._buckets[bucket_key] = (stored, now)
+            self._buckets.move_to_end(bucket_key)
+            # An evicted bucket simply restarts full, which only ever errs on the lenient side.
+            while len(self._buckets) > self._max_entries:
+                self._buckets.popitem(last=False)
+            return decision
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseRateLimitBackend:
+    """Buckets shared through ``rate_limit_buckets`` for multi-worker deployments."""
+
+    name = "db"
+
+    def __init__(self, session_factory: Callable[[], Session] | None = None) -> None:
+        self._session_factory = session_factory
+
+    def _insert(self, db: Session, bucket_key: str, tokens: float, now: float) -> bool:
+        values = {"bucket_key": bucket_key, "tokens": tokens, "refilled_at": now, "version": 0}
+        dialect = db.get_bind().dialect.name
+        if dialect in {"sqlite", "postgresql"}:
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            stmt = dialect_insert(RateLimitBucket).values(**values).on_conflict_do_nothing(
+                index_elements=["bucket_key"]
+            )
+            return db.execute(stmt).rowcount == 1
+        db.execute(insert(RateLimitBucket).values(**values))
+        return True
+
+    def consume(self, bucket_key: str, limit: RateLimit, *, now: float, cost: float = 1.0) -> RateLimitDecision:
+        # A session of our own: committing the bucket must not commit (or, on
+        # failure, discard) whatever the request has staged on its session.
+        factory = self._session_factory or db_module.get_sessionmaker()
+        with factory() as session:
+            return self._consume(session, bucket_key, limit, now=now, cost=cost)
+
+    def _consume(
+        self, db: Session, bucket_key: str, limit: RateLimit, *, now: float, cost: float
+    ) -> RateLimitDecision:
+        for _ in range(_CAS_ATTEMPTS):
+            row = db.execute(
+                select(RateLimitBucket.tokens, RateLimitBucket.refilled_at, RateLimitBucket.version).where(
+                    RateLimitBucket.bucket_key == bucket_key
+                )
+            ).first()
+            if row is None:
+                decision, stored = _decide(limit.capacity, limit, cost)
+                if self._insert(db, bucket_key, stored, now):
+                    db.commit()
+                    return decision
+                db.rollback()
+                continue
+
+            tokens = _refill(row.tokens, row.refilled_at, now, limit)
+            decision, stored = _decide(tokens, limit, cost)
+            result = db.execute(
+                update(RateLimitBucket)
+                .where(RateLimitBucket.bucket_key == bucket_key, RateLimitBucket.version == row.version)
+                .values(tokens=stored, refilled_at=max(now, row.refilled_at), version=row.version + 1)
+            )
+            if result.rowcount == 1:
+                db.commit()
+                return decision
+            db.rollback()
+        raise RuntimeError(f"rate limit bucket {bucket_key!r} stayed contended")
+
+    def reset(self) -> None:
+        """Rows are cleaned up with the table; nothing is held in-process."""
+
+
+def scope_limit(settings: Settings, scope: ApiScope) -> RateLimit | None:
+    """Return the configured limit for ``scope`` or ``None`` when unlimited."""
+
+    prefix = f"RATE_LIMIT_{scope.value.upper()}"
+    per_minute = getattr(settings, f"{prefix}_PER_MINUTE", 0) or 0
+    burst = getattr(settings, f"{prefix}_BURST", 0) or 0
+    if per_minute <= 0:
+        return None
+    return RateLimit(capacity=float(burst or per_minute), refill_per_second=per_minute / 60.0)
+
+
+class RateLimiter:
+    """Pick the scope limit, delegate to the backend and count the decisions."""
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._backends: dict[str, RateLimitBackend] = {}
+        self._stats_lock = threading.Lock()
+        self._allowed = 0
+        self._throttled = 0
+        self._errors = 0
+
+    def backend(self, name: str) -> RateLimitBackend:
+        backend = self._backends.get(name)
+        if backend is None:
+            if name == "memory":
+                backend = MemoryRateLimitBackend()
+            elif name == "db":
+                backend = DatabaseRateLimitBackend()
+            else:
+                raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}")
+            self._backends[name] = backend
+        return backend
+
+    def check(self, *, api_key_id: int, scope: ApiScope, route: str) -> RateLimitDecision | None:
+        """Consume one token for the key/route bucket; ``None`` means not limited."""
+
+        settings = get_settings()
+        if not settings.RATE_LIMIT_ENABLED:
+            return None
+        limit = scope_limit(settings, scope)
+        if limit is None:
+            return None
+
+        bucket_key = f"{api_key_id}:{route}"
+        try:
+            decision = self.backend(settings.RATE_LIMIT_BACKEND).consume(bucket_key, limit, now=self._clock())
+        except Exception:  # noqa: BLE001
+            logger.exception("Rate limiter failed; letting the request through", extra={"bucket": bucket_key})
+            with self._stats_lock:
+                self._errors += 1
+            RATE_LIMIT_DECISIONS.labels(scope=scope.value, decision="error").inc()
+            return None
+
+        outcome = "allowed" if decision.allowed else "throttled"
+        with self._stats_lock:
+            if decision.allowed:
+                self._allowed += 1
+            else:
+                self._throttled += 1
+        RATE_LIMIT_DECISIONS.labels(scope=scope.value, decision=outcome).inc()
+        if not decision.allowed:
+            logger.info(
+                "Request throttled",
+                extra={"api_key_id": api_key_id, "route": route, "retry_after": decision.retry_after_seconds},
+            )
+        return decision
+
+    def reset(self) -> None:
+        for backend in self._backends.values():
+            backend.reset()
+        with self._stats_lock:
+            self._allowed = 0
+            self._throttled = 0
+            self._errors = 0
+
+    def stats(self) -> dict[str, object]:
+        settings = get_settings()
+        with self._stats_lock:
+            return {
+                "enabled": bool(settings.RATE_LIMIT_ENABLED),
+                "backend": settings.RATE_LIMIT_BACKEND,
+                "allowed": self._allowed,
+                "throttled": self._throttled,
+                "errors": self._errors,
+            }
+
+
+_RATE_LIMITER = RateLimiter()
+
+
+def check_rate_limit(*, api_key_id: int, scope: ApiScope, route: str) -> RateLimitDecision | None:
+    """Consume a token from the shared limiter for this key and route."""
+
+    return _RATE_LIMITER.check(api_key_id=api_key_id, scope=scope, route=route)
+
+
+def reset_rate_limiter() -> None:
+    _RATE_LIMITER.reset()
+
+
+def get_rate_limit_stats() -> dict[str, object]:
+    return _RATE_LIMITER.stats()
+
+
+__all__ = [
+    "DatabaseRateLimitBackend",
+    "MemoryRateLimitBackend",
+    "RateLimit",
+    "RateLimitDecision",
+    "RateLimiter",
+    "check_rate_limit",
+    "get_rate_limit_stats",
+    "reset_rate_limiter",
+    "scope_limit",
+]
@@ -0,0 +1,384 @@
+"""Reconcile cached balances and counters against the rows they summarize.
+
+Checks:
+
+* ``escrow_balance`` - ``escrow_balances`` deposited/paid/reserved against
+  ``escrow_deposits`` and ``payments``
+* ``escrow_overdrawn`` - payments sent or settled exceed deposits
+* ``payee_spent`` - ``AllowedPayee.spent_total`` against the escrow's
+  ``USAGE_SPEND`` events for that payee
+* ``mandate_spent`` - ``UsageMandate.total_spent`` against the completed
+  purchases journaled on the mandate's ledger account (purchases carry no
+  mandate id, the SPEND entries do) plus the mandate's ``OPENING``
+  transaction for purchases older than the journal
+  (``scripts/backfill_ledger.py``)
+
+Escrow and mandate ids are streamed with a server-side cursor and cut into
+id ranges; every range is checked with a handful of grouped queries, never
+row by row. Ranges run on a thread pool where each worker holds its own
+session, since the work is waiting on the database. Each mismatch becomes an
+``Alert`` (up to ``RECONCILE_MAX_ALERTS`` per run) unless an alert for the
+same check and entity already exists, and the run returns a throughput
+report.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import Numeric, cast, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import db as db_module
+from app.config import get_settings
+from app.models import (
+    Alert,
+    AllowedPayee,
+    EscrowAgreement,
+    EscrowBalance,
+    EscrowDeposit,
+    EscrowEvent,
+    LedgerEntry,
+    Payment,
+    PaymentStatus,
+    Purchase,
+    PurchaseStatus,
+    UsageMandate,
+)
+from app.services import ledger
+from app.services.alerts import create_alert
+
+logger = logging.getLogger(__name__)
+
+ALERT_TYPE = "RECONCILIATION_MISMATCH"
+_CENT = Decimal("0.01")
+_ALERT_LOOKUP_CHUNK = 500
+
+_STATS_LOCK = threading.Lock()
+_RECON_STATS: dict[str, Any] = {
+    "runs": 0,
+    "discrepancies": 0,
+    "alerts": 0,
+    "errors": 0,
+    "last_run": None,
+}
+
+
+@dataclass
+class _ChunkResult:
+    rows: int = 0
+    discrepancies: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _cents(value) -> Decimal:
+    if value is None:
+        return Decimal("0.00")
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(_CENT)
+
+
+def _mismatch(check: str, entity: str, entity_id: int, **values: Any) -> dict[str, Any]:
+    return {
+        "check": check,
+        "entity": entity,
+        "entity_id": entity_id,
+        **{key: str(value) if isinstance(value, Decimal) else value for key, value in values.items()},
+    }
+
+
+# --------------------------------------------------
+# Chunk checks
+# --------------------------------------------------
+def _grouped_sum(db: Session, stmt) -> dict[Any, Decimal]:
+    return {key: _cents(total) for key, total in db.execute(stmt)}
+
+
+def _reconcile_escrows(db: Session, lo: int, hi: int) -> _ChunkResult:
+    in_range = EscrowAgreement.id.between(lo, hi)
+    escrow_ids = list(db.scalars(select(EscrowAgreement.id).where(in_range)))
+    deposits = _grouped_sum(
+        db,
+        select(EscrowDeposit.escrow_id, func.sum(EscrowDeposit.amount))
+        .where(EscrowDeposit.escrow_id.between(lo, hi))
+        .group_by(EscrowDeposit.escrow_id),
+    )
+    payments: dict[tuple[int, PaymentStatus], Decimal] = {}
+    for escrow_id, status, total in db.execute(
+        select(Payment.escrow_id, Payment.status, func.sum(Payment.amount))
+        .where(Payment.escrow_id.between(lo, hi))
+        .group_by(Payment.escrow_id, Payment.status)
+    ):
+        payments[(escrow_id, status)] = _cents(total)
+    balances = {
+        row.escrow_id: row
+        for row in db.execute(
+            select(EscrowBalance.escrow_id, EscrowBalance.deposited, EscrowBalance.paid, EscrowBalance.reserved).where(
+                EscrowBalance.escrow_id.between(lo, hi)
+            )
+        )
+    }
+
+    result = _ChunkResult(rows=len(escrow_ids))
+    for escrow_id in escrow_ids:
+        deposited = deposits.get(escrow_id, _cents(0))
+        paid = payments.get((escrow_id, PaymentStatus.SENT), _cents(0)) + payments.get(
+            (escrow_id, PaymentStatus.SETTLED), _cents(0)
+        )
+        reserved = payments.get((escrow_id, PaymentStatus.PENDING), _cents(0))
+        if paid > deposited:
+            result.discrepancies.append(
+                _mismatch("escrow_overdrawn", "EscrowAgreement", escrow_id, deposited=deposited, paid=paid)
+            )
+        balance = balances.get(escrow_id)
+        if balance is None:
+            continue  # created lazily on first read
+        cached = (_cents(balance.deposited), _cents(balance.paid), _cents(balance.reserved))
+        if cached != (deposited, paid, reserved):
+            result.discrepancies.append(
+                _mismatch(
+                    "escrow_balance",
+                    "EscrowAgreement",
+                    escrow_id,
+                    cached={"deposited": str(cached[0]), "paid": str(cached[1]), "reserved": str(cached[2])},
+                    source={"deposited": str(deposited), "paid": str(paid), "reserved": str(reserved)},
+                )
+            )
+
+    event_payee = EscrowEvent.data_json["payee_ref"].as_string()
+    event_amount = cast(EscrowEvent.data_json["amount"].as_string(), Numeric(18, 2))
+    spent_events: dict[tuple[int, str], Decimal] = {}
+    for escrow_id, payee_ref, total in db.execute(
+        select(EscrowEvent.escrow_id, event_payee, func.sum(event_amount))
+        .where(EscrowEvent.escrow_id.between(lo, hi), EscrowEvent.kind == "USAGE_SPEND")
+        .group_by(EscrowEvent.escrow_id, event_payee)
+    ):
+        spent_events[(escrow_id, payee_ref)] = _cents(total)
+    payees = db.execute(
+        select(AllowedPayee.id, AllowedPayee.escrow_id, AllowedPayee.payee_ref, AllowedPayee.spent_total).where(
+            AllowedPayee.escrow_id.between(lo, hi)
+        )
+    ).all()
+    result.rows += len(payees)
+    for payee_id, escrow_id, payee_ref, spent_total in payees:
+        expected = spent_events.get((escrow_id, payee_ref), _cents(0))
+        if _cents(spent_total) != expected:
+            result.discrepancies.append(
+                _mismatch(
+                    "payee_spent", "AllowedPayee", payee_id, cached=_cents(spent_total), source=expected
+                )
+            )
+    return result
+
+
+def _reconcile_mandates(db: Session, lo: int, hi: int) -> _ChunkResult:
+    mandates = db.execute(
+        select(UsageMandate.id, UsageMandate.total_spent).where(UsageMandate.id.between(lo, hi))
+    ).all()
+    accounts = {ledger.mandate_account(mandate_id): mandate_id for mandate_id, _ in mandates}
+    spent: dict[int, Decimal] = {}
+    if accounts:
+        for account, total in db.execute(
+            select(LedgerEntry.account, func.sum(Purchase.amount))
+            .join(Purchase, Purchase.id == LedgerEntry.source_id)
+            .where(
+                LedgerEntry.kind == "SPEND",
+                LedgerEntry.source == "Purchase",
+                LedgerEntry.account.in_(list(accounts)),
+                Purchase.status == PurchaseStatus.COMPLETED,
+            )
+            .group_by(LedgerEntry.account)
+        ):
+            spent[accounts[account]] = _cents(total)
+        for account, total in db.execute(
+            select(LedgerEntry.account, func.sum(LedgerEntry.amount))
+            .where(LedgerEntry.kind == ledger.OPENING_KIND, LedgerEntry.account.in_(list(accounts)))
+            .group_by(LedgerEntry.account)
+        ):
+            mandate_id = accounts[account]
+            spent[mandate_id] = spent.get(mandate_id, _cents(0)) - _cents(total)
+
+    result = _ChunkResult(rows=len(mandates))
+    for mandate_id, total_spent in mandates:
+        expected = spent.get(mandate_id, _cents(0))
+        if _cents(total_spent) != expected:
+            result.discrepancies.append(
+                _mismatch("mandate_spent", "UsageMandate", mandate_id, cached=_cents(total_spent), source=expected)
+            )
+    return result
+
+
+# --------------------------------------------------
+# Driver
+# --------------------------------------------------
+_ChunkCheck = Callable[[Session, int, int], _ChunkResult]
+
+
+def _id_ranges(db: Session, column, chunk_size: int) -> Iterator[tuple[int, int]]:
+    """Stream ``column`` in id order through a server-side cursor, one range per chunk."""
+
+    result = db.execute(
+        select(column).order_by(column).execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    try:
+        for partition in result.partitions():
+            yield partition[0][0], partition[-1][0]
+    finally:
+        result.close()
+
+
+def _worker_factory(db: Session) -> sessionmaker | None:
+    """Session factory for worker threads, or ``None`` when only ``db`` can see the data."""
+
+    bind = db.get_bind()
+    engine = getattr(bind, "engine", bind)
+    if bind is not engine:
+        # Bound to a caller-owned connection whose uncommitted rows other connections cannot see.
+        return None
+    if engine.url.get_backend_name() == "sqlite" and engine.url.database in (None, "", ":memory:"):
+        return None
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def _run_chunk(factory: sessionmaker, check: _ChunkCheck, lo: int, hi: int) -> _ChunkResult:
+    with factory() as session:
+        return check(session, lo, hi)
+
+
+def _alert_key(payload: dict[str, Any]) -> tuple[Any, Any, Any]:
+    return payload.get("check"), payload.get("entity"), payload.get("entity_id")
+
+
+def _alerted_keys(db: Session, discrepancies: list[dict[str, Any]]) -> set[tuple[Any, Any, Any]]:
+    """(check, entity, entity_id) of the discrepancies that already have an alert.
+
+    Alerts carry no resolution state, so an existing one stays the open alert
+    for its key; a scheduled run must not file it again.
+    """
+
+    entity_ids = sorted({discrepancy["entity_id"] for discrepancy in discrepancies})
+    payload_entity_id = Alert.payload_json["entity_id"].as_integer()
+    keys: set[tuple[Any, Any, Any]] = set()
+    for start in range(0, len(entity_ids), _ALERT_LOOKUP_CHUNK):
+        chunk = entity_ids[start : start + _ALERT_LOOKUP_CHUNK]
+        for (payload,) in db.execute(
+            select(Alert.payload_json).where(Alert.type == ALERT_TYPE, payload_entity_id.in_(chunk))
+        ):
+            keys.add(_alert_key(payload or {}))
+    return keys
+
+
+def _raise_alerts(db: Session, discrepancies: list[dict[str, Any]], limit: int) -> int:
+    already = _alerted_keys(db, discrepancies) if discrepancies else set()
+    discrepancies = [discrepancy for discrepancy in discrepancies if _alert_key(discrepancy) not in already]
+    raised = 0
+    for discrepancy in discrepancies[: max(0, limit)]:
+        create_alert(
+            db,
+            alert_type=ALERT_TYPE,
+            message=f"{discrepancy['check']} mismatch on {discrepancy['entity']} {discrepancy['entity_id']}",
+            actor_user_id=None,
+            payload=discrepancy,
+        )
+        raised += 1
+    if len(discrepancies) > limit:
+        logger.warning(
+            "Reconciliation alerts capped",
+            extra={"discrepancies": len(discrepancies), "alerts": raised},
+        )
+    return raised
+
+
+def reconcile(
+    db: Session | None = None,
+    *,
+    workers: int | None = None,
+    chunk_size: int | None = None,
+    alert: bool = True,
+) -> dict[str, Any]:
+    """Run every check over all escrows and mandates and return a throughput report."""
+
+    settings = get_settings()
+    workers = max(1, workers if workers is not None else settings.RECONCILE_WORKERS)
+    chunk_size = max(1, chunk_size or settings.RECONCILE_CHUNK_SIZE)
+    session = db or db_module.get_sessionmaker()()
+    started = time.perf_counter()
+    rows = chunks = 0
+    discrepancies: list[dict[str, Any]] = []
+    factory = _worker_factory(session) if workers > 1 else None
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reconcile") if factory else None
+    try:
+        plan: list[tuple[_ChunkCheck, Any]] = [
+            (_reconcile_escrows, EscrowAgreement.id),
+            (_reconcile_mandates, UsageMandate.id),
+        ]
+        for check, column in plan:
+            if executor is not None:
+                futures = [
+                    executor.submit(_run_chunk, factory, check, lo, hi)
+                    for lo, hi in _id_ranges(session, column, chunk_size)
+                ]
+                results = [future.result() for future in futures]
+            else:
+                results = [check(session, lo, hi) for lo, hi in list(_id_ranges(session, column, chunk_size))]
+            chunks += len(results)
+            for result in results:
+                rows += result.rows
+                discrepancies.extend(result.discrepancies)
+
+        raised = _raise_alerts(session, discrepancies, settings.RECONCILE_MAX_ALERTS) if alert else 0
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if db is None:
+            session.close()
+
+    elapsed = time.perf_counter() - started
+    by_check: dict[str, int] = {}
+    for discrepancy in discrepancies:
+        by_check[discrepancy["check"]] = by_check.get(discrepancy["check"], 0) + 1
+    report = {
+        "ok": not discrepancies,
+        "rows": rows,
+        "chunks": chunks,
+        "workers": workers if executor is not None else 1,
+        "discrepancies": len(discrepancies),
+        "by_check": by_check,
+        "alerts": raised,
+        "duration_ms": round(elapsed * 1000.0, 2),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None,
+        "details": discrepancies,
+    }
+    with _STATS_LOCK:
+        _RECON_STATS["runs"] += 1
+        _RECON_STATS["discrepancies"] += len(discrepancies)
+        _RECON_STATS["alerts"] += raised
+        _RECON_STATS["last_run"] = {key: value for key, value in report.items() if key != "details"}
+    return report
+
+
+def reconcile_once() -> None:
+    """Scheduler entry point: full reconciliation with its own session."""
+
+    try:
+        reconcile()
+    except Exception:  # noqa: BLE001
+        logger.exception("Reconciliation run failed")
+        with _STATS_LOCK:
+            _RECON_STATS["errors"] += 1
+
+
+def get_reconciliation_stats() -> dict[str, Any]:
+    settings = get_settings()
+    with _STATS_LOCK:
+        stats = dict(_RECON_STATS)
+    return {"enabled": bool(settings.RECONCILE_ENABLED), **stats}
+
+
+__all__ = ["ALERT_TYPE", "get_reconciliation_stats", "reconcile", "reconcile_once"]
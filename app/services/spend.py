@@ -8,7 +8,6 @@ from sqlalchemy import and_, case, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.models.audit import AuditLog
 from app.models.spend import AllowedUsage, Merchant, Purchase, PurchaseStatus, SpendCategory
 from app.models.usage_mandate import UsageMandate, UsageMandateStatus
 from app.schemas.spend import (
@@ -17,9 +16,10 @@ from app.schemas.spend import (
     PurchaseCreate,
     SpendCategoryCreate,
 )
+from app.services import ledger
 from app.services.mandates import audit_mandate_event
 from app.services.idempotency import get_existing_by_key
-from app.utils.audit import log_audit, sanitize_payload_for_audit
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -413,6 +413,7 @@ def create_purchase(
             return existing
         raise
 
+    ledger.record_purchase(db, purchase, mandate)
     audit_mandate_event(
         db,
         actor=f"beneficiary:{beneficiary_id}",
@@ -427,20 +428,17 @@ def create_purchase(
         },
     )
 
-    audit = AuditLog(
+    log_audit(
+        db,
         actor=actor or "system",
         action="CREATE_PURCHASE",
         entity="Purchase",
         entity_id=purchase.id,
-        data_json=sanitize_payload_for_audit(
-            {
-                **payload.model_dump(mode="json"),
-                "resolved_beneficiary_id": beneficiary_id,
-            }
-        ),
-        at=utcnow(),
+        data={
+            **payload.model_dump(mode="json"),
+            "resolved_beneficiary_id": beneficiary_id,
+        },
     )
-    db.add(audit)
 
     db.commit()
     db.refresh(purchase)
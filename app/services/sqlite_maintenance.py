@@ -0,0 +1,91 @@
+"""Periodic WAL checkpoint for the SQLite performance profile.
+
+In WAL mode SQLite only checkpoints automatically when a commit pushes the
+log past ``wal_autocheckpoint`` pages and no reader is active. Under constant
+traffic the ``-wal`` file can keep growing; the scheduler therefore runs an
+explicit checkpoint every ``SQLITE_WAL_CHECKPOINT_MINUTES``.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_MODES = {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}
+
+_STATS_LOCK = threading.Lock()
+_CHECKPOINT_STATS: dict[str, object] = {
+    "runs": 0,
+    "errors": 0,
+    "busy": 0,
+    "last_log_frames": None,
+    "last_checkpointed_frames": None,
+    "last_duration_ms": None,
+    "last_run_at": None,
+}
+
+
+def sqlite_profile_active(engine: Engine | None = None) -> bool:
+    """True when the profile is enabled and the engine is file-backed SQLite."""
+
+    engine = engine or db.get_engine()
+    url = engine.url
+    return (
+        bool(get_settings().SQLITE_PERFORMANCE_PROFILE)
+        and url.get_backend_name() == "sqlite"
+        and url.database not in (None, "", ":memory:")
+    )
+
+
+def checkpoint_wal_once(*, engine: Engine | None = None, mode: str | None = None) -> dict[str, int] | None:
+    """Run ``PRAGMA wal_checkpoint`` and return SQLite's (busy, log, checkpointed) counts."""
+
+    engine = engine or db.get_engine()
+    if not sqlite_profile_active(engine):
+        return None
+    mode = (mode or get_settings().SQLITE_WAL_CHECKPOINT_MODE).upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"Invalid WAL checkpoint mode {mode!r}")
+
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            busy, log_frames, checkpointed = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one()
+    except Exception:  # noqa: BLE001
+        logger.exception("WAL checkpoint failed", extra={"mode": mode})
+        with _STATS_LOCK:
+            _CHECKPOINT_STATS["errors"] += 1
+        return None
+
+    duration_ms = round((time.perf_counter() - started) * 1000.0, 3)
+    with _STATS_LOCK:
+        _CHECKPOINT_STATS["runs"] += 1
+        _CHECKPOINT_STATS["busy"] += int(bool(busy))
+        _CHECKPOINT_STATS["last_log_frames"] = log_frames
+        _CHECKPOINT_STATS["last_checkpointed_frames"] = checkpointed
+        _CHECKPOINT_STATS["last_duration_ms"] = duration_ms
+        _CHECKPOINT_STATS["last_run_at"] = time.time()
+    if busy:
+        logger.info("WAL checkpoint could not complete; readers still active", extra={"mode": mode})
+    return {"busy": busy, "log_frames": log_frames, "checkpointed_frames": checkpointed}
+
+
+def get_sqlite_profile_stats() -> dict[str, object]:
+    settings = get_settings()
+    with _STATS_LOCK:
+        checkpoints = dict(_CHECKPOINT_STATS)
+    return {
+        "enabled": bool(settings.SQLITE_PERFORMANCE_PROFILE),
+        "checkpoint_interval_minutes": settings.SQLITE_WAL_CHECKPOINT_MINUTES,
+        "checkpoints": checkpoints,
+    }
+
+
+__all__ = ["checkpoint_wal_once", "get_sqlite_profile_stats", "sqlite_profile_active"]
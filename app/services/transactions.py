@@ -8,13 +8,12 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.models.allowlist import AllowedRecipient
-from app.models.audit import AuditLog
 from app.models.certified import CertifiedAccount
 from app.models.transaction import Transaction, TransactionStatus
 from app.schemas.transaction import AllowlistCreate, CertificationCreate, TransactionCreate
 from app.services import alerts as alert_service
 from app.services.idempotency import get_existing_by_key
-from app.utils.audit import sanitize_payload_for_audit
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -38,15 +37,13 @@ def _audit(
     entity_id: int | None,
     data: dict | None = None,
 ) -> None:
-    db.add(
-        AuditLog(
-            actor=actor,
-            action=action,
-            entity=entity,
-            entity_id=entity_id,
-            data_json=sanitize_payload_for_audit(data or {}),
-            at=utcnow(),
-        )
+    log_audit(
+        db,
+        actor=actor,
+        action=action,
+        entity=entity,
+        entity_id=entity_id,
+        data=data or {},
     )
 
 
@@ -172,15 +169,14 @@ def create_transaction(
         db.add(transaction)
         db.flush()
 
-        audit = AuditLog(
+        log_audit(
+            db,
             actor=actor or "system",
             action="CREATE_TRANSACTION",
             entity="Transaction",
             entity_id=transaction.id,
-            data_json=payload.model_dump(mode="json"),
-            at=utcnow(),
+            data=payload.model_dump(mode="json"),
         )
-        db.add(audit)
         db.commit()
         db.refresh(transaction)
 
@@ -8,12 +8,11 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.models.allowed_payee import AllowedPayee
-from app.models.audit import AuditLog
 from app.models.escrow import EscrowAgreement, EscrowEvent, EscrowStatus
 from app.models.payment import Payment
 from app.services.idempotency import get_existing_by_key
 from app.services.payments import available_balance, execute_payout, finalize_payment_settlement
-from app.utils.audit import log_audit, sanitize_payload_for_audit
+from app.utils.audit import log_audit
 from app.utils.errors import error_response
 from app.utils.time import utcnow
 
@@ -73,22 +72,6 @@ def add_allowed_payee(
     )
     db.add(payee)
 
-    audit = AuditLog(
-        actor=actor or "system",
-        action="ADD_ALLOWED_PAYEE",
-        entity="AllowedPayee",
-        data_json=sanitize_payload_for_audit(
-            {
-                "escrow_id": escrow_id,
-                "payee_ref": payee_ref,
-                "limits": {
-                    "daily": str(daily_limit) if daily_limit is not None else None,
-                    "total": str(total_limit) if total_limit is not None else None,
-                },
-            }
-        ),
-        at=utcnow(),
-    )
     try:
         db.flush()
     except IntegrityError as exc:
@@ -101,8 +84,21 @@ def add_allowed_payee(
             detail=error_response("PAYEE_ALREADY_ALLOWED", "This payee is already allowed for this escrow."),
         ) from exc
 
-    audit.entity_id = payee.id
-    db.add(audit)
+    log_audit(
+        db,
+        actor=actor or "system",
+        action="ADD_ALLOWED_PAYEE",
+        entity="AllowedPayee",
+        entity_id=payee.id,
+        data={
+            "escrow_id": escrow_id,
+            "payee_ref": payee_ref,
+            "limits": {
+                "daily": str(daily_limit) if daily_limit is not None else None,
+                "total": str(total_limit) if total_limit is not None else None,
+            },
+        },
+    )
     db.commit()
     db.refresh(payee)
     logger.info("Allowed payee added", extra={"payee_id": payee.id, "escrow_id": escrow_id})
@@ -318,21 +314,19 @@ def spend_to_allowed_payee(
         },
         at=utcnow(),
     )
-    audit = AuditLog(
+    db.add_all([payee, event])
+    log_audit(
+        db,
         actor=actor or "system",
         action="USAGE_SPEND",
         entity="Payment",
         entity_id=payment.id,
-        data_json=sanitize_payload_for_audit(
-            {
-                "escrow_id": escrow.id,
-                "payee_ref": payee_ref,
-                "amount": str(amount),
-            }
-        ),
-        at=utcnow(),
+        data={
+            "escrow_id": escrow.id,
+            "payee_ref": payee_ref,
+            "amount": str(amount),
+        },
     )
-    db.add_all([payee, event, audit])
     db.commit()
     logger.info(
         "Usage spend executed",
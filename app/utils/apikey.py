@@ -4,13 +4,24 @@ from __future__ import annotations
 import hashlib
 import hmac
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import Optional
 
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import DEV_API_KEY, DEV_API_KEY_ALLOWED, get_settings
-from app.models.api_key import ApiKey
+from app.models.api_key import ApiKey, ApiScope
+from app.models.cache_version import CacheVersion
+
+API_KEY_CACHE_VERSION_NAME = "api_keys"
+_VERSION_QUERY = select(CacheVersion.version).where(CacheVersion.name == API_KEY_CACHE_VERSION_NAME)
 
 
 def _secret_key() -> str:
@@ -33,22 +44,299 @@ def gen_key(prefix_len: int = 6) -> tuple[str, str, str]:
     return raw, prefix, hash_key(raw)
 
 
+def _as_aware(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+@dataclass(frozen=True)
+class _CachedKey:
+    """Immutable snapshot of a verified API key row."""
+
+    id: int
+    name: str
+    prefix: str
+    key_hash: str
+    scope: ApiScope
+    user_id: int | None
+    created_at: datetime | None
+    expires_at: datetime | None
+    cached_at: float
+
+    @classmethod
+    def from_row(cls, row: ApiKey) -> "_CachedKey":
+        return cls(
+            id=row.id,
+            name=row.name,
+            prefix=row.prefix,
+            key_hash=row.key_hash,
+            scope=row.scope,
+            user_id=row.user_id,
+            created_at=row.created_at,
+            expires_at=_as_aware(row.expires_at),
+            cached_at=time.monotonic(),
+        )
+
+    def is_expired(self, now: datetime) -> bool:
+        return self.expires_at is not None and self.expires_at <= now
+
+    def to_api_key(self) -> ApiKey:
+        """Return a detached ``ApiKey`` built from the snapshot."""
+
+        return ApiKey(
+            id=self.id,
+            name=self.name,
+            prefix=self.prefix,
+            key_hash=self.key_hash,
+            scope=self.scope,
+            user_id=self.user_id,
+            is_active=True,
+            created_at=self.created_at,
+            expires_at=self.expires_at,
+        )
+
+
+class VerifiedKeyCache:
+    """Bounded TTL/LRU cache of verified API keys keyed by HMAC digest.
+
+    Entries are dropped when their TTL elapses, when the key expires, when the
+    key is revoked locally, or when another worker bumps the shared
+    ``cache_versions`` stamp.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, _CachedKey] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._version_checked_at: float | None = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._hit_seconds = 0.0
+        self._miss_seconds = 0.0
+
+    def get(self, key_hash: str, *, ttl_seconds: float) -> _CachedKey | None:
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.cached_at > ttl_seconds:
+                del self._entries[key_hash]
+                self._evictions += 1
+                return None
+            self._entries.move_to_end(key_hash)
+            return entry
+
+    def put(self, entry: _CachedKey, *, max_entries: int) -> None:
+        if max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[entry.key_hash] = entry
+            self._entries.move_to_end(entry.key_hash)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def evict(self, key_hash: str) -> None:
+        with self._lock:
+            if self._entries.pop(key_hash, None) is not None:
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._evictions += len(self._entries)
+            self._entries.clear()
+
+    def reset(self) -> None:
+        """Drop every entry, the known version and the counters."""
+
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._version_checked_at = None
+            self._hits = self._misses = self._evictions = 0
+            self._hit_seconds = self._miss_seconds = 0.0
+
+    def _version_due(self, now: float, interval_seconds: float) -> bool:
+        checked_at = self._version_checked_at
+        return checked_at is None or now - checked_at >= interval_seconds
+
+    def _apply_version(self, version: int, now: float) -> None:
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._evictions += len(self._entries)
+                self._entries.clear()
+            self._version = version
+            self._version_checked_at = now
+
+    def sync_version(self, db: Session, *, interval_seconds: float) -> None:
+        """Clear the cache when the shared version stamp moved since the last check."""
+
+        now = time.monotonic()
+        if self._version_due(now, interval_seconds):
+            self._apply_version(db.scalar(_VERSION_QUERY) or 0, now)
+
+    async def sync_version_async(self, db: AsyncSession, *, interval_seconds: float) -> None:
+        """``sync_version`` on an ``AsyncSession``."""
+
+        now = time.monotonic()
+        if self._version_due(now, interval_seconds):
+            self._apply_version(await db.scalar(_VERSION_QUERY) or 0, now)
+
+    def record_hit(self, seconds: float) -> None:
+        with self._lock:
+            self._hits += 1
+            self._hit_seconds += seconds
+
+    def record_miss(self, seconds: float) -> None:
+        with self._lock:
+            self._misses += 1
+            self._miss_seconds += seconds
+
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            avg_hit = self._hit_seconds / self._hits if self._hits else 0.0
+            avg_miss = self._miss_seconds / self._misses if self._misses else 0.0
+            return {
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "avg_hit_ms": round(avg_hit * 1000, 3),
+                "avg_miss_ms": round(avg_miss * 1000, 3),
+                "saved_ms_total": round(max(avg_miss - avg_hit, 0.0) * self._hits * 1000, 3),
+            }
+
+
+_KEY_CACHE = VerifiedKeyCache()
+
+
+def _valid_key_query(key_hash: str):
+    return select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.is_active.is_(True)).limit(1)
+
+
+def _unexpired(key: ApiKey | None) -> ApiKey | None:
+    if key and (not key.expires_at or _as_aware(key.expires_at) > datetime.now(UTC)):
+        return key
+    return None
+
+
+def _load_valid_key(db: Session, key_hash: str) -> ApiKey | None:
+    return _unexpired(db.scalars(_valid_key_query(key_hash)).first())
+
+
+def _is_dev_key(raw_or_dev: str) -> bool:
+    return bool(DEV_API_KEY and DEV_API_KEY_ALLOWED and secrets.compare_digest(raw_or_dev, DEV_API_KEY))
+
+
+def _cache_hit(key_hash: str, start: float) -> tuple[bool, ApiKey | None]:
+    """``(found, key)``: a cached snapshot, or ``None`` when the cached key has expired."""
+
+    cached = _KEY_CACHE.get(key_hash, ttl_seconds=get_settings().API_KEY_CACHE_TTL_SECONDS)
+    if cached is None:
+        return False, None
+    if cached.is_expired(datetime.now(UTC)):
+        _KEY_CACHE.evict(key_hash)
+        return True, None
+    _KEY_CACHE.record_hit(time.perf_counter() - start)
+    return True, cached.to_api_key()
+
+
+def _cache_miss(key: ApiKey | None, start: float) -> ApiKey | None:
+    _KEY_CACHE.record_miss(time.perf_counter() - start)
+    if key is not None:
+        _KEY_CACHE.put(_CachedKey.from_row(key), max_entries=get_settings().API_KEY_CACHE_MAX_ENTRIES)
+    return key
+
+
 def find_valid_key(db: Session, raw_or_dev: str) -> Optional[ApiKey | str]:
-    """Return a matching active API key or the legacy token identifier."""
+    """Return a matching active API key or the legacy token identifier.
+
+    Verified keys are served from an in-process cache when enabled; cache hits
+    return a detached ``ApiKey`` snapshot instead of a session-bound row.
+    """
+
+    if _is_dev_key(raw_or_dev):
+        return "legacy"
+
+    key_hash = hash_key(raw_or_dev)
+    settings = get_settings()
+    if not settings.API_KEY_CACHE_ENABLED:
+        return _load_valid_key(db, key_hash)
+
+    start = time.perf_counter()
+    _KEY_CACHE.sync_version(db, interval_seconds=settings.API_KEY_CACHE_VERSION_CHECK_SECONDS)
+    found, cached = _cache_hit(key_hash, start)
+    if found:
+        return cached
+    return _cache_miss(_load_valid_key(db, key_hash), start)
 
-    if (
-        DEV_API_KEY
-        and DEV_API_KEY_ALLOWED
-        and secrets.compare_digest(raw_or_dev, DEV_API_KEY)
-    ):
+
+async def find_valid_key_async(db: AsyncSession, raw_or_dev: str) -> Optional[ApiKey | str]:
+    """``find_valid_key`` on an ``AsyncSession``; a cache hit between version checks runs no query."""
+
+    if _is_dev_key(raw_or_dev):
         return "legacy"
 
     key_hash = hash_key(raw_or_dev)
-    key = (
-        db.query(ApiKey)
-        .filter(ApiKey.key_hash == key_hash, ApiKey.is_active.is_(True))
-        .first()
+    settings = get_settings()
+    if not settings.API_KEY_CACHE_ENABLED:
+        return _unexpired((await db.scalars(_valid_key_query(key_hash))).first())
+
+    start = time.perf_counter()
+    await _KEY_CACHE.sync_version_async(db, interval_seconds=settings.API_KEY_CACHE_VERSION_CHECK_SECONDS)
+    found, cached = _cache_hit(key_hash, start)
+    if found:
+        return cached
+    return _cache_miss(_unexpired((await db.scalars(_valid_key_query(key_hash))).first()), start)
+
+
+def _bump_cache_version(db: Session, name: str) -> None:
+    # Upsert so two first-time invalidations racing on a missing row cannot
+    # both insert and fail the revocation with an IntegrityError.
+    dialect = db.get_bind().dialect.name
+    if dialect in {"sqlite", "postgresql"}:
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        table = CacheVersion.__table__
+        now = datetime.now(UTC)
+        stmt = dialect_insert(table).values(name=name, version=1, created_at=now, updated_at=now)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["name"],
+                set_={"version": table.c.version + 1, "updated_at": now},
+            )
+        )
+        return
+    result = db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1)
+        .execution_options(synchronize_session=False)
     )
-    if key and (not key.expires_at or key.expires_at > datetime.now(UTC)):
-        return key
-    return None
+    if result.rowcount == 0:
+        db.add(CacheVersion(name=name, version=1))
+
+
+def invalidate_cached_key(db: Session, key_hash: str) -> None:
+    """Evict a key from the local cache and bump the shared version for other workers.
+
+    The version bump is staged on ``db`` so it commits together with the revocation.
+    """
+
+    _KEY_CACHE.evict(key_hash)
+    _bump_cache_version(db, API_KEY_CACHE_VERSION_NAME)
+
+
+def reset_apikey_cache() -> None:
+    """Drop all cached keys and counters (used by tests and admin tooling)."""
+
+    _KEY_CACHE.reset()
+
+
+def get_apikey_cache_stats() -> dict[str, float | int]:
+    """Expose API key cache counters for health/observability."""
+
+    return _KEY_CACHE.stats()
@@ -1,78 +1,24 @@
 """Audit logging helper utilities."""
 from __future__ import annotations
 
-from typing import Any, Mapping
+from datetime import datetime
+from typing import Any
 
 from sqlalchemy.orm import Session
 
-from app.models.audit import AuditLog
+from app.models.audit import AuditLog, AuditOutbox
+from app.services import audit_outbox
+from app.utils.masking import AUDIT_SENSITIVE_KEYS, mask_audit_payload
 from app.utils.time import utcnow
 
 
-SENSITIVE_KEYS = {
-    "iban",
-    "iban_full",
-    "iban_full_masked",
-    "account_number",
-    "card_number",
-    "email",
-    "storage_url",
-    "psp_reference",
-    "iban_last4",
-}
-
-
-def _mask_value(key: str, value: Any) -> Any:
-    if value is None:
-        return None
-
-    if key in {"iban", "iban_full", "iban_full_masked", "account_number", "card_number"}:
-        stripped = str(value).replace(" ", "")
-        if len(stripped) <= 4:
-            return f"***{stripped}"
-        return f"***{stripped[-4:]}"
-
-    if key == "iban_last4":
-        return f"***{str(value)[-2:]}"
-
-    if key == "email":
-        text = str(value)
-        if "@" in text:
-            _, domain = text.split("@", 1)
-            return f"***@{domain}"
-        return "***"
-
-    if key == "storage_url":
-        text = str(value)
-        base = text.split("?", 1)[0]
-        if "/" in base:
-            prefix = base.rsplit("/", 1)[0]
-            return f"{prefix}/***"
-        return "***/***"
-
-    if key == "psp_reference":
-        text = str(value)
-        if len(text) <= 6:
-            return "***"
-        return f"***{text[-4:]}"
-
-    return value
+SENSITIVE_KEYS = AUDIT_SENSITIVE_KEYS
 
 
 def sanitize_payload_for_audit(data: Any) -> Any:
     """Return a copy of ``data`` with obvious PII fields masked."""
 
-    if isinstance(data, Mapping):
-        sanitized: dict[str, Any] = {}
-        for key, value in data.items():
-            masked_value = _mask_value(key, value) if key in SENSITIVE_KEYS else value
-            sanitized[key] = sanitize_payload_for_audit(masked_value)
-        return sanitized
-
-    if isinstance(data, list):
-        return [sanitize_payload_for_audit(item) for item in data]
-
-    return data
+    return mask_audit_payload(data)
 
 
 def log_audit(
@@ -83,17 +29,24 @@ def log_audit(
     entity: str,
     entity_id: int | None,
     data: dict | None = None,
+    at: datetime | None = None,
 ) -> None:
-    """Persist an audit entry in the shared AuditLog table."""
+    """Stage a sanitized audit entry in the caller's transaction.
+
+    The entry goes to the audit outbox while its writer is running and
+    straight to the AuditLog table otherwise; either way it is committed
+    together with the caller's changes.
+    """
 
+    model = AuditOutbox if audit_outbox.audit_outbox_active() else AuditLog
     db.add(
-        AuditLog(
+        model(
             actor=actor,
             action=action,
             entity=entity,
             entity_id=entity_id if entity_id is not None else 0,
             data_json=sanitize_payload_for_audit(data or {}),
-            at=utcnow(),
+            at=at or utcnow(),
         )
     )
 
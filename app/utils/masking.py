@@ -1,12 +1,27 @@
-"""Helpers for masking sensitive metadata before exposing it externally."""
+"""Helpers for masking sensitive metadata before exposing it externally.
+
+Every masker in the app (audit entries, proof metadata returned by the API,
+metadata and context sent to the AI provider) runs on one engine: a
+:class:`MaskPolicy` turns a key into a :class:`KeyRule` (mask, drop or keep),
+and a :class:`MaskingEngine` memoizes that classification in a bounded LRU
+cache, so the lowercasing and pattern scans run once per distinct key rather
+than once per key occurrence. Payloads are walked with an explicit stack, so
+deeply nested OCR output cannot hit the recursion limit.
+"""
 from __future__ import annotations
 
 import logging
-from typing import Any, Mapping, Sequence
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Mapping, NamedTuple, Sequence
 
 MASKED_PLACEHOLDER = "***masked***"
 logger = logging.getLogger(__name__)
 
+# Distinct keys remembered per policy; payload keys come from a small vocabulary.
+MASK_CACHE_SIZE = 4096
+
 # Keys that should always be fully masked regardless of value length
 FULL_MASK_KEYS = {
     "beneficiary_name",
@@ -34,7 +49,50 @@ ACCOUNT_KEYS = {
 
 CONTACT_KEYS = {"email", "phone", "mobile", "contact_phone"}
 
+AI_MASK_PLACEHOLDER = "***redacted***"
+
+# Allowlist stricte de ce qui peut être envoyé à OpenAI
+AI_ALLOWED_METADATA_KEYS = {
+    "invoice_total_amount",
+    "invoice_currency",
+    "invoice_number",
+    "invoice_date",
+    "supplier_country",
+    "supplier_city",
+    "beneficiary_city",
+    "beneficiary_country",
+    "gps_lat",
+    "gps_lng",
+    "gps_accuracy_m",
+    "file_type",
+    "file_mime_type",
+    "file_pages",
+    "status",
+    "ocr_status",
+    "ocr_provider",
+}
+
+# Patterns sensibles (IBAN, mail, phone, address, identifiers…)
+SENSITIVE_PATTERNS = (
+    "iban",
+    "account",
+    "email",
+    "phone",
+    "tel",
+    "addr",
+    "ssn",
+    "nif",
+    "id_",
+    "ident",
+    "passport",
+)
+
+AI_REDACTED_KEYS_FIELD = "_ai_redacted_keys"
+
 
+# --------------------------------------------------
+# Value masks
+# --------------------------------------------------
 def _clean_account_value(value: Any) -> str:
     text = "" if value is None else str(value)
     normalized = "".join(ch for ch in text if ch.isalnum())
@@ -63,42 +121,287 @@ def _mask_phone(value: Any) -> str:
     return f"***{tail}"
 
 
-def _mask_leaf(key: str, value: Any) -> Any:
-    if isinstance(value, bool) or value is None:
-        return value
+def _audit_last4(value: Any) -> str:
+    stripped = str(value).replace(" ", "")
+    if len(stripped) <= 4:
+        return f"***{stripped}"
+    return f"***{stripped[-4:]}"
 
-    lower = key.lower()
-    if lower in FULL_MASK_KEYS:
-        return MASKED_PLACEHOLDER
 
-    if lower in CONTACT_KEYS or lower.endswith("_email"):
-        return _mask_email(value)
+def _audit_last2(value: Any) -> str:
+    return f"***{str(value)[-2:]}"
 
-    if "phone" in lower or "mobile" in lower:
-        return _mask_phone(value)
 
-    if ("iban" in lower and "check" not in lower and "match" not in lower) or lower in ACCOUNT_KEYS:
-        return _clean_account_value(value)
+def _audit_email(value: Any) -> str:
+    text = str(value)
+    if "@" in text:
+        _, domain = text.split("@", 1)
+        return f"***@{domain}"
+    return "***"
 
-    if "account_number" in lower:
-        return _clean_account_value(value)
 
-    return value
+def _audit_storage_url(value: Any) -> str:
+    base = str(value).split("?", 1)[0]
+    if "/" in base:
+        prefix = base.rsplit("/", 1)[0]
+        return f"{prefix}/***"
+    return "***/***"
+
+
+def _audit_psp_reference(value: Any) -> str:
+    text = str(value)
+    if len(text) <= 6:
+        return "***"
+    return f"***{text[-4:]}"
+
+
+def _upper_text(value: Any) -> Any:
+    return value.upper() if isinstance(value, str) else value
+
+
+# --------------------------------------------------
+# Engine
+# --------------------------------------------------
+class KeyRule(NamedTuple):
+    """What a policy does with the values of one key."""
+
+    mask: Callable[[Any], Any] | None = None
+    drop: bool = False
+    redacted: bool = False  # reported in the policy's ``redacted_keys_field``
+
+
+KEEP = KeyRule()
+DROP = KeyRule(drop=True, redacted=True)
+
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
 
 
-def _mask_mapping(data: Mapping[str, Any]) -> dict[str, Any]:
-    masked: dict[str, Any] = {}
-    for key, value in data.items():
-        if isinstance(value, Mapping):
-            masked[key] = _mask_mapping(value)
-        elif isinstance(value, Sequence) and not isinstance(value, (str, bytes, bytearray)):
-            masked[key] = [
-                _mask_mapping(item) if isinstance(item, Mapping) else _mask_leaf(key, item)
-                for item in value
-            ]
+def _placeholder(text: str) -> KeyRule:
+    return KeyRule(mask=lambda _value: text, redacted=True)
+
+
+def _is_any_sequence(value: Any) -> bool:
+    return isinstance(value, Sequence) and not isinstance(value, (str, bytes, bytearray))
+
+
+def _is_list(value: Any) -> bool:
+    return isinstance(value, list)
+
+
+@dataclass(frozen=True)
+class MaskPolicy:
+    """How one family of payloads is masked.
+
+    ``classify`` maps a key to its :class:`KeyRule`; it must be pure, since
+    the engine caches its result per key. ``mask_containers`` applies a
+    key's mask to the whole value, nested or not (audit entries), instead of
+    only to scalar leaves. Sequence items are masked with their parent key
+    when ``inherit_key`` is set; ``nested_sequences=False`` treats a
+    sequence inside a sequence as a leaf.
+    """
+
+    name: str
+    classify: Callable[[Any], KeyRule]
+    recursive: bool = True
+    mask_containers: bool = False
+    inherit_key: bool = False
+    nested_sequences: bool = True
+    is_sequence: Callable[[Any], bool] = _is_any_sequence
+    passthrough: tuple[type, ...] = (type(None),)
+    redacted_keys_field: str | None = None
+
+
+class MaskingEngine:
+    """Applies one :class:`MaskPolicy`, classifying each distinct key once."""
+
+    def __init__(self, policy: MaskPolicy, *, cache_size: int = MASK_CACHE_SIZE) -> None:
+        self.policy = policy
+        self.rule_for = lru_cache(maxsize=cache_size)(policy.classify)
+
+    def _convert(self, rule: KeyRule, key: Any, value: Any, stack: list, in_sequence: bool) -> Any:
+        policy = self.policy
+        mask = rule.mask
+        if mask is not None and policy.mask_containers:
+            if not isinstance(value, policy.passthrough):
+                value = mask(value)
+            mask = None
+        if policy.recursive:
+            if type(value) is dict or isinstance(value, Mapping):
+                out: dict[Any, Any] = {}
+                stack.append((value, out, None))
+                return out
+            if (policy.nested_sequences or not in_sequence) and policy.is_sequence(value):
+                items: list[Any] = []
+                stack.append((value, items, key if policy.inherit_key else None))
+                return items
+        if mask is None or isinstance(value, policy.passthrough):
+            return value
+        return mask(value)
+
+    def apply(self, data: Any) -> Any:
+        """Return a masked copy of ``data``; mappings and sequences are rebuilt."""
+
+        policy = self.policy
+        rule_for = self.rule_for
+        convert = self._convert
+        passthrough = policy.passthrough
+        stack: list[tuple[Any, Any, Any]] = []
+        redacted: list[Any] = []
+
+        if isinstance(data, Mapping):
+            root: Any = {}
+            stack.append((data, root, None))
+        elif policy.is_sequence(data):
+            root = []
+            stack.append((data, root, None))
         else:
-            masked[key] = _mask_leaf(key, value)
-    return masked
+            return data
+
+        while stack:
+            source, target, parent_key = stack.pop()
+            if type(target) is dict:
+                for key, value in source.items():
+                    rule = rule_for(key)
+                    if rule.redacted:
+                        redacted.append(key)
+                    if rule.drop:
+                        continue
+                    if type(value) in _SCALAR_TYPES:
+                        # Fast path: most values are scalars under keys that keep them.
+                        mask = rule.mask
+                        target[key] = value if mask is None or isinstance(value, passthrough) else mask(value)
+                    else:
+                        target[key] = convert(rule, key, value, stack, False)
+            else:
+                rule = rule_for(parent_key) if parent_key is not None else KEEP
+                mask = rule.mask
+                append = target.append
+                for item in source:
+                    if type(item) in _SCALAR_TYPES:
+                        append(item if mask is None or isinstance(item, passthrough) else mask(item))
+                    else:
+                        append(convert(rule, parent_key, item, stack, True))
+
+        if redacted and policy.redacted_keys_field and type(root) is dict:
+            root[policy.redacted_keys_field] = redacted
+        return root
+
+    def cache_info(self) -> dict[str, int]:
+        info = self.rule_for.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+
+
+# --------------------------------------------------
+# Policies
+# --------------------------------------------------
+_AUDIT_RULES = {
+    "iban": KeyRule(mask=_audit_last4),
+    "iban_full": KeyRule(mask=_audit_last4),
+    "iban_full_masked": KeyRule(mask=_audit_last4),
+    "account_number": KeyRule(mask=_audit_last4),
+    "card_number": KeyRule(mask=_audit_last4),
+    "iban_last4": KeyRule(mask=_audit_last2),
+    "email": KeyRule(mask=_audit_email),
+    "storage_url": KeyRule(mask=_audit_storage_url),
+    "psp_reference": KeyRule(mask=_audit_psp_reference),
+}
+# Exact (case-sensitive) keys masked in audit entries
+AUDIT_SENSITIVE_KEYS = frozenset(_AUDIT_RULES)
+
+
+def _classify_audit(key: Any) -> KeyRule:
+    return _AUDIT_RULES.get(key, KEEP)
+
+
+_FULL_MASK = KeyRule(mask=lambda _value: MASKED_PLACEHOLDER)
+_EMAIL_MASK = KeyRule(mask=_mask_email)
+_PHONE_MASK = KeyRule(mask=_mask_phone)
+_ACCOUNT_MASK = KeyRule(mask=_clean_account_value)
+
+
+def _classify_proof(key: Any) -> KeyRule:
+    lower = str(key).lower()
+    if lower in FULL_MASK_KEYS:
+        return _FULL_MASK
+    if lower in CONTACT_KEYS or lower.endswith("_email"):
+        return _EMAIL_MASK
+    if "phone" in lower or "mobile" in lower:
+        return _PHONE_MASK
+    if ("iban" in lower and "check" not in lower and "match" not in lower) or lower in ACCOUNT_KEYS:
+        return _ACCOUNT_MASK
+    if "account_number" in lower:
+        return _ACCOUNT_MASK
+    return KEEP
+
+
+_AI_REDACT = _placeholder(AI_MASK_PLACEHOLDER)
+_AI_CURRENCY = KeyRule(mask=_upper_text)
+
+
+def _is_sensitive_key(lower: str) -> bool:
+    return any(pattern in lower for pattern in SENSITIVE_PATTERNS)
+
+
+def _classify_ai_metadata(key: Any) -> KeyRule:
+    lower = str(key).lower()
+    if lower in AI_ALLOWED_METADATA_KEYS:
+        return _AI_CURRENCY if lower == "invoice_currency" else KEEP
+    return _AI_REDACT if _is_sensitive_key(lower) else DROP
+
+
+def _classify_ai_context(key: Any) -> KeyRule:
+    return _AI_REDACT if _is_sensitive_key(str(key).lower()) else KEEP
+
+
+AUDIT_POLICY = MaskPolicy(
+    name="audit",
+    classify=_classify_audit,
+    mask_containers=True,
+    is_sequence=_is_list,
+)
+PROOF_POLICY = MaskPolicy(
+    name="proof",
+    classify=_classify_proof,
+    inherit_key=True,
+    nested_sequences=False,
+    passthrough=(bool, type(None)),
+)
+AI_METADATA_POLICY = MaskPolicy(
+    name="ai_metadata",
+    classify=_classify_ai_metadata,
+    recursive=False,
+    passthrough=(),
+    redacted_keys_field=AI_REDACTED_KEYS_FIELD,
+)
+AI_CONTEXT_POLICY = MaskPolicy(
+    name="ai_context",
+    classify=_classify_ai_context,
+    recursive=False,
+    passthrough=(),
+    redacted_keys_field=AI_REDACTED_KEYS_FIELD,
+)
+
+_ENGINES = {
+    policy.name: MaskingEngine(policy)
+    for policy in (AUDIT_POLICY, PROOF_POLICY, AI_METADATA_POLICY, AI_CONTEXT_POLICY)
+}
+
+
+def get_masking_engine(name: str) -> MaskingEngine:
+    return _ENGINES[name]
+
+
+def get_masking_stats() -> dict[str, dict[str, int]]:
+    return {name: engine.cache_info() for name, engine in _ENGINES.items()}
+
+
+# --------------------------------------------------
+# Public maskers
+# --------------------------------------------------
+def mask_audit_payload(data: Any) -> Any:
+    """Return a copy of ``data`` with obvious PII fields masked (audit policy)."""
+
+    return _ENGINES["audit"].apply(data)
 
 
 def mask_proof_metadata(metadata: Mapping[str, Any] | None) -> Mapping[str, Any] | None:
@@ -108,46 +411,7 @@ def mask_proof_metadata(metadata: Mapping[str, Any] | None) -> Mapping[str, Any]
         return None
     if not isinstance(metadata, Mapping):
         return metadata
-    return _mask_mapping(metadata)
-
-
-AI_MASK_PLACEHOLDER = "***redacted***"
-
-# Allowlist stricte de ce qui peut être envoyé à OpenAI
-AI_ALLOWED_METADATA_KEYS = {
-    "invoice_total_amount",
-    "invoice_currency",
-    "invoice_number",
-    "invoice_date",
-    "supplier_country",
-    "supplier_city",
-    "beneficiary_city",
-    "beneficiary_country",
-    "gps_lat",
-    "gps_lng",
-    "gps_accuracy_m",
-    "file_type",
-    "file_mime_type",
-    "file_pages",
-    "status",
-    "ocr_status",
-    "ocr_provider",
-}
-
-# Patterns sensibles (IBAN, mail, phone, address, identifiers…)
-SENSITIVE_PATTERNS = (
-    "iban",
-    "account",
-    "email",
-    "phone",
-    "tel",
-    "addr",
-    "ssn",
-    "nif",
-    "id_",
-    "ident",
-    "passport",
-)
+    return _ENGINES["proof"].apply(metadata)
 
 
 def mask_metadata_for_ai(metadata: Mapping[str, Any] | None) -> dict[str, Any]:
@@ -160,34 +424,25 @@ def mask_metadata_for_ai(metadata: Mapping[str, Any] | None) -> dict[str, Any]:
     """
     if not isinstance(metadata, Mapping):
         return {}
+    return _ENGINES["ai_metadata"].apply(metadata)
 
-    cleaned = {}
-    redacted_keys = []
-
-    for key, value in metadata.items():
-        key_lower = key.lower()
-
-        # 1) Allowed → keep
-        if key_lower in AI_ALLOWED_METADATA_KEYS:
-            if key_lower == "invoice_currency" and isinstance(value, str):
-                cleaned[key] = value.upper()
-            else:
-                cleaned[key] = value
-            continue
-
-        # 2) Sensitive → mask
-        if any(pattern in key_lower for pattern in SENSITIVE_PATTERNS):
-            cleaned[key] = AI_MASK_PLACEHOLDER
-            redacted_keys.append(key)
-            continue
 
-        # 3) Unknown key → drop + log in special field
-        redacted_keys.append(key)
+def mask_sensitive_for_ai(data: Mapping[str, Any] | None) -> dict[str, Any]:
+    """Mask sensitive keys but keep non-sensitive fields intact."""
 
-    if redacted_keys:
-        cleaned["_ai_redacted_keys"] = redacted_keys
-
-    return cleaned
-
-
-__all__ = ["mask_proof_metadata", "mask_metadata_for_ai"]
+    if not isinstance(data, Mapping):
+        return {}
+    return _ENGINES["ai_context"].apply(data)
+
+
+__all__ = [
+    "AI_MASK_PLACEHOLDER",
+    "MaskPolicy",
+    "MaskingEngine",
+    "get_masking_engine",
+    "get_masking_stats",
+    "mask_audit_payload",
+    "mask_metadata_for_ai",
+    "mask_proof_metadata",
+    "mask_sensitive_for_ai",
+]
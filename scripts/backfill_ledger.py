@@ -0,0 +1,39 @@
+"""Post opening journal transactions for money that predates the ledger.
+
+Usage::
+
+    python -m scripts.backfill_ledger            # post and commit
+    python -m scripts.backfill_ledger --dry-run  # report only
+
+Run once after upgrading to the ``ledger_entries`` migration (and again at
+any time: escrows and mandates that already have an ``OPENING`` transaction
+are skipped). Without it, ``account_balance("escrow:<id>")`` leaves out
+deposits made before the journal existed and the ``mandate_spent``
+reconciliation check flags every mandate with older purchases.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.db import get_sessionmaker, init_engine
+from app.services.ledger import post_opening_balances
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="roll back instead of committing")
+    args = parser.parse_args()
+
+    init_engine()
+    with get_sessionmaker()() as session:
+        posted = post_opening_balances(session)
+        if args.dry_run:
+            session.rollback()
+        else:
+            session.commit()
+    print(json.dumps({"dry_run": args.dry_run, **posted}))
+
+
+if __name__ == "__main__":
+    main()
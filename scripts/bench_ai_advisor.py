@@ -0,0 +1,91 @@
+"""Measure AI advisor throughput and tail latency against the fake provider.
+
+Usage::
+
+    python -m scripts.bench_ai_advisor --calls 400 --callers 32 --limits 4,8,16 --latency-ms 80 --jitter-ms 120
+
+``--callers`` threads (standing in for proof analysis workers) each call
+``call_ai_proof_advisor`` in a loop until ``--calls`` are done, once per
+``AI_PROOF_MAX_CONCURRENCY`` value in ``--limits``. The provider is
+``scripts.fake_ai_provider`` on a local port, so the numbers show what the
+client pool, semaphore and deadline logic add on top of provider latency.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.fake_ai_provider import FakeProvider
+
+_CONTEXT = {
+    "mandate_context": {"escrow_id": 1, "milestone_idx": 1, "milestone_amount": 100.0},
+    "backend_checks": {"amount_match": True},
+    "document_context": {"type": "PDF", "metadata": {"invoice_total_amount": "100.00"}},
+}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _run(calls: int, callers: int) -> tuple[float, list[float], int]:
+    from app.services.ai_proof_advisor import call_ai_proof_advisor
+
+    def _one(_index: int) -> tuple[float, bool]:
+        started = time.perf_counter()
+        result = call_ai_proof_advisor(model="bench-model", context=_CONTEXT)
+        return time.perf_counter() - started, "ai_unavailable" not in result["flags"]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        outcomes = list(executor.map(_one, range(calls)))
+    elapsed = time.perf_counter() - started
+    return calls / elapsed, [latency for latency, _ in outcomes], sum(1 for _, ok in outcomes if ok)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--limits", default="4,8,16", help="comma-separated AI_PROOF_MAX_CONCURRENCY values")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=120.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--deadline", type=float, default=30.0, help="AI_PROOF_DEADLINE_SECONDS")
+    args = parser.parse_args()
+
+    from app.config import settings_provider
+    from app.services.ai_proof_advisor import get_ai_stats, reset_ai_advisor_state, stop_ai_client_pool
+
+    provider = FakeProvider(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=7)
+    with provider.serve() as base_url:
+        for limit in (int(value) for value in args.limits.split(",")):
+            with settings_provider.override(
+                AI_PROOF_ADVISOR_ENABLED=True,
+                OPENAI_API_KEY="bench",
+                AI_PROOF_ADVISOR_BASE_URL=base_url,
+                AI_PROOF_MAX_CONCURRENCY=limit,
+                AI_PROOF_DEADLINE_SECONDS=args.deadline,
+                AI_PROOF_BREAKER_FAILURES=10**6,
+            ):
+                reset_ai_advisor_state()
+                provider.peak_in_flight = 0
+                _run(min(20, args.calls), min(4, args.callers))  # warm-up: loop, connections
+                rate, latencies, succeeded = _run(args.calls, args.callers)
+                stats = get_ai_stats()
+                print(
+                    f"limit {limit:3d}  {rate:8.1f} calls/s  "
+                    f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                    f"p95 {_percentile(latencies, 95) * 1000:7.1f} ms  "
+                    f"p99 {_percentile(latencies, 99) * 1000:7.1f} ms  "
+                    f"ok {succeeded}/{args.calls}  retries {stats['retries']}  "
+                    f"provider peak {provider.peak_in_flight}"
+                )
+                stop_ai_client_pool()
+
+
+if __name__ == "__main__":
+    main()
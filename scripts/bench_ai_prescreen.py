@@ -0,0 +1,154 @@
+"""Replay proofs through the local pre-screen and count the AI calls it saves.
+
+Usage::
+
+    python -m scripts.bench_ai_prescreen --synthetic 5000
+    python -m scripts.bench_ai_prescreen --from-db            # proofs in DATABASE_URL
+    python -m scripts.bench_ai_prescreen --dataset contexts.jsonl
+
+Every replayed proof would have cost one advisor call before pre-screening
+("before"); "after" counts the proofs the scorer leaves to the model. With
+``--from-db`` the advisor contexts are rebuilt exactly as the analysis worker
+builds them, and proofs that already carry a model verdict are used to report
+how often the local verdict agrees with it. ``--dataset`` reads one JSON object
+per line, either a bare context or ``{"context": ..., "ai_risk_level": ...}``.
+The synthetic mix mirrors what production sees: mostly matching invoices and
+geofenced photos, with a tail of mismatches and incomplete submissions.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+from collections import Counter
+from collections.abc import Iterator
+from typing import Any
+
+
+def _invoice_checks(rng: random.Random, *, amount: str, currency: bool, iban: bool | None, date: bool | None):
+    return {
+        "has_metadata": True,
+        "amount_check": {
+            "amount_match": amount == "match",
+            "relative_diff": {"match": "0", "small": "0.01", "large": "0.35"}[amount],
+            "currency_match": currency,
+        },
+        "iban_check": {"match": iban},
+        "date_check": {"in_range": date},
+        "supplier_check": {"exact_match": rng.choice([True, True, None])},
+    }
+
+
+def _synthetic(count: int, seed: int) -> Iterator[tuple[dict[str, Any], str | None]]:
+    rng = random.Random(seed)
+    for index in range(count):
+        roll = rng.random()
+        if roll < 0.35:  # matching invoice with bank details
+            checks = _invoice_checks(rng, amount="match", currency=True, iban=True, date=rng.choice([True, None]))
+        elif roll < 0.50:  # matching amount, nothing else to corroborate
+            checks = _invoice_checks(rng, amount="match", currency=True, iban=None, date=None)
+        elif roll < 0.58:  # rounding or fee difference
+            checks = _invoice_checks(rng, amount="small", currency=True, iban=rng.choice([True, None]), date=True)
+        elif roll < 0.64:  # wrong invoice
+            checks = _invoice_checks(rng, amount="large", currency=rng.choice([True, False]), iban=None, date=None)
+        elif roll < 0.67:  # someone else's bank account
+            checks = _invoice_checks(rng, amount="match", currency=True, iban=False, date=True)
+        elif roll < 0.70:  # no metadata at all
+            checks = {"has_metadata": False, "amount_check": {}, "iban_check": {}, "date_check": {}}
+        elif roll < 0.90:  # photo inside the milestone geofence
+            checks = {"has_metadata": True, "geofence_configured": True, "validation_ok": True}
+        else:  # photo without a geofence to check against
+            checks = {"has_metadata": True, "geofence_configured": False, "validation_ok": True}
+        context = {
+            "mandate_context": {"escrow_id": index, "milestone_idx": 1},
+            "backend_checks": checks,
+            "document_context": {"type": "PHOTO" if "validation_ok" in checks else "PDF", "metadata": {}},
+        }
+        yield context, None
+
+
+def _from_file(path: str) -> Iterator[tuple[dict[str, Any], str | None]]:
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                row = json.loads(line)
+                if "context" in row:
+                    yield row["context"], row.get("ai_risk_level")
+                else:
+                    yield row, None
+
+
+def _from_db() -> Iterator[tuple[dict[str, Any], str | None]]:
+    from sqlalchemy import select
+
+    from app import db
+    from app.models import Milestone, Proof, ProofAnalysisJob
+    from app.services.proof_analysis import build_ai_context
+
+    db.init_engine()
+    with db.get_sessionmaker()() as session:
+        jobs = dict(session.execute(select(ProofAnalysisJob.proof_id, ProofAnalysisJob.backend_checks)).all())
+        rows = session.execute(select(Proof, Milestone).join(Milestone, Milestone.id == Proof.milestone_id))
+        for proof, milestone in rows:
+            recorded = None
+            if (proof.metadata_ or {}).get("ai_decided_by", "model") == "model":
+                recorded = proof.ai_risk_level
+            yield build_ai_context(proof, milestone, jobs.get(proof.id)), recorded
+    db.close_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", type=int, default=5000, help="number of generated proofs")
+    source.add_argument("--dataset", help="JSONL file of advisor contexts")
+    source.add_argument("--from-db", action="store_true", help="replay proofs from DATABASE_URL")
+    parser.add_argument("--confidence", type=float, default=None, help="override AI_PRESCREEN_CONFIDENCE")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from app.services.ai_prescreen import prescreen
+
+    if args.from_db:
+        replay = list(_from_db())
+    elif args.dataset:
+        replay = list(_from_file(args.dataset))
+    else:
+        replay = list(_synthetic(args.synthetic, args.seed))
+    if not replay:
+        print("no proofs to replay")
+        return
+
+    verdicts: Counter[str] = Counter()
+    deferred: Counter[str] = Counter()
+    compared = agreed = 0
+    for context, recorded in replay:
+        result = prescreen(context, confidence=args.confidence)
+        if result.decided:
+            verdicts[result.risk_level] += 1
+            if recorded:
+                compared += 1
+                agreed += recorded == result.risk_level
+        else:
+            deferred[result.deferred_by] += 1
+
+    before = len(replay)
+    after = sum(deferred.values())
+    contexts = [context for context, _ in replay]
+    loops = max(1, 20000 // len(contexts))
+    seconds = timeit.timeit(
+        lambda: [prescreen(context, confidence=args.confidence) for context in contexts], number=loops
+    )
+    print(f"proofs replayed   {before}")
+    print(f"AI calls before   {before}")
+    print(f"AI calls after    {after}  ({(before - after) / before:.1%} fewer)")
+    print(f"local verdicts    {dict(verdicts)}")
+    print(f"left to the model {dict(deferred)}")
+    if compared:
+        print(f"agreement with recorded model verdicts  {agreed}/{compared} ({agreed / compared:.1%})")
+    print(f"scoring cost      {seconds / (loops * len(contexts)) * 1e6:.2f} µs per proof")
+
+
+if __name__ == "__main__":
+    main()
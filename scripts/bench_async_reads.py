@@ -0,0 +1,108 @@
+"""Compare requests/s of the sync (threadpool) and async read paths.
+
+Usage::
+
+    python -m scripts.bench_async_reads --requests 2000 --concurrency 200
+
+Both handlers run the same ``GET /alerts``-style query against a temporary
+SQLite file behind API key auth, like the real routes: one is a ``def``
+handler on ``get_db`` and ``require_scope`` (dispatched to Starlette's
+threadpool, 40 threads by default), the other an ``async def`` handler on
+``get_async_db`` and ``require_scope_async``, with no threadpool hop at all.
+Keys are served from the verified-key cache and usage goes through the
+write-behind buffer, as in production. Requests are driven in-process through
+httpx's ASGI transport, so the numbers reflect server-side dispatch rather
+than network.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+async def _drive(client, path: str, *, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one() -> None:
+        async with semaphore:
+            response = await client.get(path)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    # Imports happen after DATABASE_URL points at the scratch database.
+    from fastapi import Depends, FastAPI
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+
+    from app import db
+    from app.models import Alert, ApiKey, Base
+    from app.models.api_key import ApiScope
+    from app.security import require_scope, require_scope_async
+    from app.services.apikey_usage import start_usage_buffer, stop_usage_buffer
+    from app.utils.apikey import hash_key
+
+    engine = db.init_engine()
+    Base.metadata.create_all(engine)
+    token = "bench-key"
+    with db.get_sessionmaker()() as session:
+        session.add_all(
+            Alert(type="BENCH", message=f"alert {i}", payload_json={"i": i}) for i in range(args.rows)
+        )
+        session.add(ApiKey(name="bench", prefix="bench", key_hash=hash_key(token), scope=ApiScope.support))
+        session.commit()
+
+    bench = FastAPI()
+    scopes = {ApiScope.support}
+
+    @bench.get("/sync", dependencies=[Depends(require_scope(scopes))])
+    def sync_alerts(session: Session = Depends(db.get_db)) -> int:
+        return len(session.scalars(select(Alert).where(Alert.type == "BENCH")).all())
+
+    @bench.get("/async", dependencies=[Depends(require_scope_async(scopes))])
+    async def async_alerts(session: AsyncSession = Depends(db.get_async_db)) -> int:
+        return len((await session.scalars(select(Alert).where(Alert.type == "BENCH"))).all())
+
+    start_usage_buffer()
+    transport = ASGITransport(app=bench)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for path in ("/sync", "/async"):
+            await _drive(client, path, total=min(50, args.requests), concurrency=10)  # warm-up
+            rps = await _drive(client, path, total=args.requests, concurrency=args.concurrency)
+            print(f"{path:7s} {rps:9.1f} req/s  ({args.requests} requests, concurrency {args.concurrency})")
+
+    stop_usage_buffer()
+    await db.close_async_engine()
+    db.close_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=50, help="alerts returned per request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        # Give the sync path one pooled connection per in-flight request; with a smaller
+        # pool, sessions parked behind the threadpool exhaust it and the run times out.
+        os.environ["DB_POOL_SIZE"] = str(args.concurrency)
+        # One key hammering one route would only measure 429s.
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure audit hash chain verification throughput by worker count.
+
+Usage::
+
+    python -m scripts.bench_audit_chain --rows 200000 --workers 1 2 4
+
+The script seals and checkpoints ``--rows`` synthetic audit rows in a
+temporary SQLite file, then runs a full ``verify_audit_chain`` once per
+worker count. Each run reports rows/s; the first run with more than one
+worker includes process start-up, which is what the scheduled job pays too.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Alert, AuditCheckpoint, AuditLog, AuditSegment, Base, User
+from app.services import audit_chain
+
+
+def _populate(factory: sessionmaker, rows: int) -> None:
+    start = datetime(2030, 1, 1, tzinfo=UTC)
+    with factory() as session:
+        for offset in range(0, rows, 10_000):
+            session.execute(
+                insert(AuditLog),
+                [
+                    {
+                        "actor": f"apikey:bench{n % 7}",
+                        "action": "BENCH_EVENT",
+                        "entity": "Payment",
+                        "entity_id": n,
+                        "data_json": {"amount": f"{n % 997}.00", "status": "SENT"},
+                        "at": start + timedelta(seconds=n),
+                        "created_at": start,
+                        "updated_at": start,
+                    }
+                    for n in range(offset, min(rows, offset + 10_000))
+                ],
+            )
+        session.commit()
+        audit_chain.checkpoint_audit_chain(session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'chain.db'}")
+        tables = [model.__table__ for model in (User, Alert, AuditLog, AuditSegment, AuditCheckpoint)]
+        Base.metadata.create_all(engine, tables=tables)
+        factory = sessionmaker(bind=engine)
+        _populate(factory, args.rows)
+
+        baseline = None
+        for workers in args.workers:
+            with factory() as session:
+                report = audit_chain.verify_audit_chain(session, full=True, workers=workers)
+            rate = report["rows_per_second"] or 0.0
+            baseline = baseline or rate
+            print(
+                f"workers={workers:2d} rows={report['rows']:8d} ok={report['ok']!s:5s} "
+                f"{report['duration_ms'] / 1000.0:7.2f}s {rate:11.1f} rows/s x{rate / baseline:.2f}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Compare the masking engine with the previous per-call key-walking maskers.
+
+Usage::
+
+    python -m scripts.bench_masking --iterations 20000
+
+The payloads mirror what the maskers see in production: proof metadata with
+invoice and OCR fields (a nested OCR result with per-line blocks), the flat
+metadata sent to the AI advisor, and audit entries for payouts. The legacy
+functions below are verbatim copies of the maskers the engine replaced; the
+script checks both produce identical output before timing them.
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+from collections.abc import Callable
+from typing import Any, Mapping, Sequence
+
+from app.utils import masking
+
+# --------------------------------------------------
+# Legacy maskers (reference implementations)
+# --------------------------------------------------
+_AUDIT_KEYS = {
+    "iban", "iban_full", "iban_full_masked", "account_number", "card_number",
+    "email", "storage_url", "psp_reference", "iban_last4",
+}
+
+
+def _legacy_audit_value(key: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if key in {"iban", "iban_full", "iban_full_masked", "account_number", "card_number"}:
+        stripped = str(value).replace(" ", "")
+        return f"***{stripped}" if len(stripped) <= 4 else f"***{stripped[-4:]}"
+    if key == "iban_last4":
+        return f"***{str(value)[-2:]}"
+    if key == "email":
+        text = str(value)
+        return f"***@{text.split('@', 1)[1]}" if "@" in text else "***"
+    if key == "storage_url":
+        base = str(value).split("?", 1)[0]
+        return f"{base.rsplit('/', 1)[0]}/***" if "/" in base else "***/***"
+    if key == "psp_reference":
+        text = str(value)
+        return "***" if len(text) <= 6 else f"***{text[-4:]}"
+    return value
+
+
+def legacy_audit(data: Any) -> Any:
+    if isinstance(data, Mapping):
+        return {
+            key: legacy_audit(_legacy_audit_value(key, value) if key in _AUDIT_KEYS else value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [legacy_audit(item) for item in data]
+    return data
+
+
+def _legacy_proof_leaf(key: str, value: Any) -> Any:
+    if isinstance(value, bool) or value is None:
+        return value
+    lower = key.lower()
+    if lower in masking.FULL_MASK_KEYS:
+        return masking.MASKED_PLACEHOLDER
+    if lower in masking.CONTACT_KEYS or lower.endswith("_email"):
+        return masking._mask_email(value)
+    if "phone" in lower or "mobile" in lower:
+        return masking._mask_phone(value)
+    if ("iban" in lower and "check" not in lower and "match" not in lower) or lower in masking.ACCOUNT_KEYS:
+        return masking._clean_account_value(value)
+    if "account_number" in lower:
+        return masking._clean_account_value(value)
+    return value
+
+
+def legacy_proof(data: Mapping[str, Any]) -> dict[str, Any]:
+    masked: dict[str, Any] = {}
+    for key, value in data.items():
+        if isinstance(value, Mapping):
+            masked[key] = legacy_proof(value)
+        elif isinstance(value, Sequence) and not isinstance(value, (str, bytes, bytearray)):
+            masked[key] = [
+                legacy_proof(item) if isinstance(item, Mapping) else _legacy_proof_leaf(key, item)
+                for item in value
+            ]
+        else:
+            masked[key] = _legacy_proof_leaf(key, value)
+    return masked
+
+
+def legacy_ai(metadata: Mapping[str, Any]) -> dict[str, Any]:
+    cleaned: dict[str, Any] = {}
+    redacted: list[str] = []
+    for key, value in metadata.items():
+        lower = key.lower()
+        if lower in masking.AI_ALLOWED_METADATA_KEYS:
+            cleaned[key] = value.upper() if lower == "invoice_currency" and isinstance(value, str) else value
+            continue
+        if any(pattern in lower for pattern in masking.SENSITIVE_PATTERNS):
+            cleaned[key] = masking.AI_MASK_PLACEHOLDER
+        redacted.append(key)
+    if redacted:
+        cleaned["_ai_redacted_keys"] = redacted
+    return cleaned
+
+
+# --------------------------------------------------
+# Payloads
+# --------------------------------------------------
+def _proof_metadata() -> dict[str, Any]:
+    return {
+        "invoice_number": "INV-2025-00042",
+        "invoice_date": "2025-11-02",
+        "invoice_total_amount": "1250.00",
+        "invoice_currency": "eur",
+        "supplier_name": "ACME Construction SARL",
+        "supplier_address": "12 rue des Lilas",
+        "supplier_city": "Kinshasa",
+        "supplier_country": "CD",
+        "supplier_iban": "FR76 3000 6000 0112 3456 7890 189",
+        "supplier_email": "billing@acme.example",
+        "contact_phone": "+243 81 234 5678",
+        "beneficiary_name": "Jean K.",
+        "beneficiary_iban_last4": "0189",
+        "iban_check": True,
+        "gps_lat": -4.3217,
+        "gps_lng": 15.3125,
+        "gps_accuracy_m": 8.5,
+        "file_type": "invoice",
+        "file_mime_type": "application/pdf",
+        "file_pages": 2,
+        "ocr_status": "success",
+        "ocr_provider": "dummy",
+        "ocr_raw": {
+            "confidence": 0.93,
+            "fields": {
+                "supplier_name": "ACME Construction SARL",
+                "supplier_iban": "FR7630006000011234567890189",
+                "total": "1250.00",
+                "vat_number": "CD-998877",
+            },
+            "lines": [
+                {"description": f"Item {n}", "quantity": n, "unit_price": "25.00", "account_number": "00012345"}
+                for n in range(12)
+            ],
+            "emails": ["billing@acme.example", "support@acme.example"],
+            "phone_numbers": ["+243812345678"],
+        },
+    }
+
+
+def _audit_payload() -> dict[str, Any]:
+    return {
+        "payment_id": 981,
+        "amount": "1250.00",
+        "currency": "EUR",
+        "psp_reference": "pi_3Q8xYk2eZvKYlo2C1aBcDeFg",
+        "iban": "FR7630006000011234567890189",
+        "email": "sender@example.com",
+        "storage_url": "https://files.example.com/proofs/abc123.pdf?token=secret",
+        "milestones": [{"idx": n, "amount": "125.00", "iban_last4": "0189"} for n in range(10)],
+    }
+
+
+def _bench(label: str, legacy: Callable[[Any], Any], engine: Callable[[Any], Any], payload: Any, n: int) -> None:
+    assert legacy(payload) == engine(payload), f"{label}: outputs differ"
+    old = min(timeit.repeat(lambda: legacy(payload), number=n, repeat=3))
+    new = min(timeit.repeat(lambda: engine(payload), number=n, repeat=3))
+    print(
+        f"{label:16s} legacy {old / n * 1e6:8.2f} us  engine {new / n * 1e6:8.2f} us  "
+        f"speed-up x{old / new:.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    proof = _proof_metadata()
+    _bench("proof metadata", legacy_proof, masking.mask_proof_metadata, proof, args.iterations)
+    _bench("ai metadata", legacy_ai, masking.mask_metadata_for_ai, proof, args.iterations)
+    _bench("audit payload", legacy_audit, masking.mask_audit_payload, _audit_payload(), args.iterations)
+    print(masking.get_masking_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare SQLite write throughput with and without the performance profile.
+
+Usage::
+
+    python -m scripts.bench_sqlite_profile --writers 4 --commits 500
+
+Each writer thread commits one small row per transaction, which is the shape
+of the API's write paths (audit rows, payments, usage rollups). The script
+runs the same workload against a fresh temporary database twice: once with
+SQLite defaults (rollback journal, ``synchronous=FULL``) and once with the
+profile from ``app.db.apply_sqlite_profile``.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from app.config import Settings
+from app.db import apply_sqlite_profile
+
+
+def _run(db_path: Path, *, profile: bool, writers: int, commits: int) -> dict[str, float]:
+    settings = Settings(SQLITE_PERFORMANCE_PROFILE=profile)
+    # The global listener in app.db reads the process settings; configure this engine explicitly.
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=writers,
+    )
+    if profile:
+        event.listen(engine, "connect", lambda conn, _record: apply_sqlite_profile(conn, settings))
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE bench (id INTEGER PRIMARY KEY, writer INTEGER, payload TEXT)"))
+
+    errors = 0
+    errors_lock = threading.Lock()
+
+    def _writer(idx: int) -> None:
+        nonlocal errors
+        for n in range(commits):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO bench (writer, payload) VALUES (:w, :p)"),
+                        {"w": idx, "p": f"row-{idx}-{n}" * 4},
+                    )
+            except OperationalError:
+                with errors_lock:
+                    errors += 1
+
+    threads = [threading.Thread(target=_writer, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        rows = conn.exec_driver_sql("SELECT COUNT(*) FROM bench").scalar()
+    engine.dispose()
+    return {
+        "journal_mode": journal,
+        "rows": rows,
+        "errors": errors,
+        "seconds": elapsed,
+        "commits_per_second": rows / elapsed if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--commits", type=int, default=500, help="commits per writer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "default": _run(Path(tmp) / "default.db", profile=False, writers=args.writers, commits=args.commits),
+            "profile": _run(Path(tmp) / "profile.db", profile=True, writers=args.writers, commits=args.commits),
+        }
+
+    for name, result in results.items():
+        print(
+            f"{name:8s} journal={result['journal_mode']:8s} rows={result['rows']:6d} "
+            f"errors={result['errors']:4d} {result['seconds']:7.2f}s "
+            f"{result['commits_per_second']:9.1f} commits/s"
+        )
+    baseline = results["default"]["commits_per_second"]
+    if baseline:
+        print(f"speed-up: x{results['profile']['commits_per_second'] / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Local stand-in for the AI provider's ``POST /v1/responses`` endpoint.
+
+Usage::
+
+    python -m scripts.fake_ai_provider --port 8787 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+
+then point ``AI_PROOF_ADVISOR_BASE_URL`` at ``http://127.0.0.1:8787/v1``.
+Each request sleeps ``latency + uniform(0, jitter)`` milliseconds and either
+answers with a ``clean`` assessment in the Responses API shape or, with
+probability ``error_rate`` (or for the first ``fail_first`` requests), a 503.
+The server counts requests and the peak number served concurrently, which is
+what ``scripts.bench_ai_advisor`` and the client pool tests measure against.
+It also reports ``usage`` token counts (bytes / 4), treating the system
+message as cached once a ``prompt_cache_key`` has been seen, like the real
+provider's prefix cache.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+_ASSESSMENT = {"risk_level": "clean", "score": 0.92, "flags": [], "explanation": "fake provider"}
+
+
+class FakeProvider:
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        fail_first: int = 0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.bodies: list[dict] = []
+        self._cache_keys: set[str] = set()
+        self.app = Starlette(routes=[Route("/v1/responses", self._responses, methods=["POST"])])
+
+    async def _responses(self, request: Request) -> JSONResponse:
+        body = await request.json()
+        self.bodies.append(body)
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            delay = self.latency_ms + self._random.uniform(0.0, self.jitter_ms)
+            await asyncio.sleep(delay / 1000.0)
+            if self.requests <= self.fail_first or self._random.random() < self.error_rate:
+                self.failures += 1
+                return JSONResponse({"error": {"message": "overloaded"}}, status_code=503)
+            text = json.dumps(_ASSESSMENT)
+            return JSONResponse(
+                {
+                    "id": f"resp_{self.requests}",
+                    "object": "response",
+                    "model": body.get("model"),
+                    "output": [
+                        {
+                            "type": "message",
+                            "role": "assistant",
+                            "content": [{"type": "output_text", "text": text}],
+                        }
+                    ],
+                    "usage": self._usage(body, text),
+                }
+            )
+        finally:
+            self.in_flight -= 1
+
+    def _usage(self, body: dict, output_text: str) -> dict:
+        messages = body.get("input") or []
+        prefix = json.dumps(messages[:1], ensure_ascii=False) if messages else ""
+        input_tokens = len(json.dumps(messages, ensure_ascii=False).encode("utf-8")) // 4
+        cache_key = body.get("prompt_cache_key")
+        cached = len(prefix.encode("utf-8")) // 4 if cache_key and cache_key in self._cache_keys else 0
+        if cache_key:
+            self._cache_keys.add(cache_key)
+        return {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": cached},
+            "output_tokens": len(output_text.encode("utf-8")) // 4,
+            "total_tokens": input_tokens + len(output_text.encode("utf-8")) // 4,
+        }
+
+    @contextmanager
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+        """Run the server on a background thread and yield its ``/v1`` base URL."""
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        bound_port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning", lifespan="off"))
+        thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+        thread.start()
+        try:
+            while not server.started:
+                if not thread.is_alive():
+                    raise RuntimeError("fake AI provider failed to start")
+                threading.Event().wait(0.01)
+            yield f"http://{host}:{bound_port}/v1"
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+            sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    provider = FakeProvider(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    uvicorn.run(provider.app, host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
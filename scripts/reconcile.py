@@ -0,0 +1,40 @@
+"""Reconcile cached balances and counters against their source rows.
+
+Usage::
+
+    python -m scripts.reconcile --workers 4 --chunk-size 500
+    python -m scripts.reconcile --no-alerts --details
+
+Runs the same checks as the scheduled ``reconcile`` job against the
+configured database and prints the throughput report as JSON. The exit
+status is 1 when any discrepancy was found.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from app.db import get_sessionmaker, init_engine
+from app.services.reconciliation import reconcile
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--no-alerts", action="store_true", help="report only, do not write Alert rows")
+    parser.add_argument("--details", action="store_true", help="include every discrepancy in the output")
+    args = parser.parse_args()
+
+    init_engine()
+    with get_sessionmaker()() as session:
+        report = reconcile(session, workers=args.workers, chunk_size=args.chunk_size, alert=not args.no_alerts)
+    if not args.details:
+        report.pop("details")
+    print(json.dumps(report, indent=2, default=str))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@
 import asyncio
 import os
 from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import AbstractContextManager, ExitStack, contextmanager
 from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 from pathlib import Path
@@ -12,6 +13,7 @@ from alembic.config import Config
 import pytest
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, sessionmaker
 import hashlib
 
@@ -23,7 +25,15 @@ os.environ.setdefault("KOB_ENV", "dev")
 
 from app.main import app  # noqa: E402
 from app import models  # noqa: E402
-from app.db import get_db  # noqa: E402
+from app.config import Settings, settings_provider  # noqa: E402
+from app.core.query_stats import QueryStats, capture_queries  # noqa: E402
+from app.core.read_replica import (  # noqa: E402
+    ReadOnlySession,
+    get_async_read_db,
+    get_read_db,
+    reset_read_routing,
+)
+from app.db import get_async_db, get_db  # noqa: E402
 from app.models import (
     Merchant,
     SpendCategory,
@@ -32,7 +42,10 @@ from app.models import (
     User,
 )
 from app.models.api_key import ApiKey, ApiScope
-from app.utils.apikey import hash_key
+from app.services.ai_assessment_cache import reset_ai_assessment_cache
+from app.services.ai_proof_advisor import reset_ai_advisor_state
+from app.services.rate_limit import reset_rate_limiter
+from app.utils.apikey import hash_key, reset_apikey_cache
 
 DB_PATH = Path("./kobatella_test.db")
 
@@ -82,6 +95,79 @@ def override_db_dependency(db_session: Session) -> Iterator[None]:
     yield
     app.dependency_overrides.pop(get_db, None)
 
+@pytest.fixture(autouse=True)
+def override_async_db_dependency(db_session: Session) -> Iterator[None]:
+    # Async handlers must see the rows each test leaves uncommitted: run their
+    # AsyncSession on the test connection (pysqlite never awaits inside greenlet_spawn).
+    connection = db_session.get_bind()
+
+    class _TestConnectionSession(Session):
+        def __init__(self, bind=None, **kwargs) -> None:
+            super().__init__(bind=connection, **kwargs)
+
+    class _TestReadOnlySession(ReadOnlySession):
+        def __init__(self, bind=None, **kwargs) -> None:
+            super().__init__(bind=connection, **kwargs)
+
+    async def _get_async_db() -> AsyncIterator[AsyncSession]:
+        async with AsyncSession(
+            sync_session_class=_TestConnectionSession, autoflush=False, expire_on_commit=False
+        ) as session:
+            yield session
+
+    async def _get_async_read_db() -> AsyncIterator[AsyncSession]:
+        async with AsyncSession(
+            sync_session_class=_TestReadOnlySession, autoflush=False, expire_on_commit=False
+        ) as session:
+            yield session
+
+    def _get_read_db() -> Iterator[Session]:
+        session = _TestReadOnlySession(autoflush=False, expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_async_db] = _get_async_db
+    app.dependency_overrides[get_async_read_db] = _get_async_read_db
+    app.dependency_overrides[get_read_db] = _get_read_db
+    yield
+    for dependency in (get_async_db, get_async_read_db, get_read_db):
+        app.dependency_overrides.pop(dependency, None)
+
+@pytest.fixture(autouse=True)
+def reset_api_key_cache() -> Iterator[None]:
+    # Each test rolls back its keys; never serve a snapshot from a previous test.
+    reset_apikey_cache()
+    yield
+    reset_apikey_cache()
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits() -> Iterator[None]:
+    # Key ids are reused after rollback; start every test with full buckets.
+    reset_rate_limiter()
+    yield
+    reset_rate_limiter()
+
+@pytest.fixture(autouse=True)
+def reset_ai_assessments() -> Iterator[None]:
+    # Cached rows roll back with each test; so must the in-process LRU.
+    reset_ai_assessment_cache()
+    yield
+    reset_ai_assessment_cache()
+
+@pytest.fixture(autouse=True)
+def reset_ai_advisor() -> Iterator[None]:
+    reset_ai_advisor_state()
+    yield
+    reset_ai_advisor_state()
+
+@pytest.fixture(autouse=True)
+def reset_replica_routing() -> Iterator[None]:
+    reset_read_routing()
+    yield
+    reset_read_routing()
+
 @pytest.fixture
 async def client() -> AsyncIterator[AsyncClient]:
     transport = ASGITransport(app=app)
@@ -131,6 +217,38 @@ def admin_headers(make_api_key: Callable[..., ApiKey]) -> dict[str, str]:
     make_api_key(name=f"admin-{uuid4().hex}", key=token, scope=ApiScope.admin)
     return {"Authorization": f"Bearer {token}"}
 
+@pytest.fixture
+def query_budget() -> Callable[..., AbstractContextManager[QueryStats]]:
+    """Assert a block (typically one request) stays within a SQL statement budget.
+
+    ``max_repeats`` flags the same statement running more than that many times,
+    which is how N+1 query patterns show up.
+    """
+
+    @contextmanager
+    def _budget(max_queries: int, *, max_repeats: int | None = None) -> Iterator[QueryStats]:
+        with capture_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, f"query budget {max_queries} exceeded:\n{stats.describe()}"
+        if max_repeats is not None:
+            repeated = stats.repeated(max_repeats + 1)
+            assert not repeated, f"statement repeated more than {max_repeats}x (N+1?):\n{stats.describe()}"
+
+    return _budget
+
+
+@pytest.fixture
+def override_settings() -> Iterator[Callable[..., Settings]]:
+    """Swap in a settings snapshot with the given fields changed until the test ends.
+
+    Snapshots are immutable, so tests cannot ``setattr`` on ``get_settings()``.
+    Later calls stack on top of earlier ones and are undone in reverse order.
+    """
+
+    with ExitStack() as stack:
+        yield lambda **changes: stack.enter_context(settings_provider.override(**changes))
+
+
 @pytest.fixture
 def anyio_backend() -> str:
     return "asyncio"
@@ -0,0 +1,188 @@
+from datetime import timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.models import AiAssessmentCacheEntry, CacheVersion, EscrowAgreement, EscrowStatus, Milestone, MilestoneStatus, User
+from app.schemas.proof import ProofCreate
+from app.services import ai_assessment_cache, proof_analysis
+from app.services import proofs as proofs_service
+from app.utils.time import utcnow
+
+_ADVICE = {"risk_level": "clean", "score": 0.9, "flags": ["invoice_amount_match"], "explanation": "ok"}
+
+
+def _context(amount: float = 100.0, storage_url: str = "https://storage.example.com/a.pdf") -> dict:
+    return {
+        "mandate_context": {"escrow_id": 1, "milestone_idx": 1, "milestone_amount": amount},
+        "backend_checks": {"amount_match": True},
+        "document_context": {"type": "PDF", "storage_url": storage_url, "sha256": "doc", "metadata": {}},
+    }
+
+
+def _store(db_session, key: str, result: dict | None = None, latency_ms: float = 250.0) -> bool:
+    return ai_assessment_cache.store(
+        db_session,
+        key,
+        document_sha256="doc",
+        ctx_hash="ctx",
+        model="model-a",
+        result=result or dict(_ADVICE),
+        latency_ms=latency_ms,
+    )
+
+
+def test_key_depends_on_context_prompt_and_model_but_not_storage_url():
+    base = ai_assessment_cache.context_hash(_context())
+
+    assert ai_assessment_cache.context_hash(_context(storage_url="https://elsewhere/b.pdf")) == base
+    assert ai_assessment_cache.context_hash(_context(amount=101.0)) != base
+    key = ai_assessment_cache.cache_key("doc", base, model="model-a")
+    assert ai_assessment_cache.cache_key("doc", base, model="model-b") != key
+    assert ai_assessment_cache.cache_key("doc", base, model="model-a", prompt_version="v0") != key
+    assert ai_assessment_cache.cache_key("other", base, model="model-a") != key
+
+
+def test_memory_then_database_tier(db_session):
+    key = ai_assessment_cache.cache_key("doc", "ctx", model="model-a")
+    assert ai_assessment_cache.lookup(db_session, key) is None
+    assert _store(db_session, key)
+    db_session.commit()
+
+    assert ai_assessment_cache.lookup(db_session, key) == _ADVICE
+    ai_assessment_cache.reset_ai_assessment_cache()  # a fresh worker only has the table
+    assert ai_assessment_cache.lookup(db_session, key) == _ADVICE
+    assert ai_assessment_cache.lookup(db_session, key) == _ADVICE
+
+    stats = ai_assessment_cache.get_ai_assessment_cache_stats()
+    assert (stats["db_hits"], stats["memory_hits"]) == (1, 1)
+    assert stats["hit_ratio"] == 1.0
+    assert stats["saved_ms_total"] == 500.0
+
+
+def test_fallback_results_and_expired_rows_are_not_served(db_session):
+    key = ai_assessment_cache.cache_key("doc", "ctx", model="model-a")
+    assert not _store(db_session, key, result={"risk_level": "warning", "flags": ["ai_unavailable", "x"]})
+
+    assert _store(db_session, key)
+    db_session.execute(
+        update(AiAssessmentCacheEntry)
+        .where(AiAssessmentCacheEntry.cache_key == key)
+        .values(expires_at=utcnow() - timedelta(seconds=1))
+    )
+    db_session.commit()
+    ai_assessment_cache.reset_ai_assessment_cache()
+
+    assert ai_assessment_cache.lookup(db_session, key) is None
+    assert _store(db_session, key)  # replaces the expired row
+    assert ai_assessment_cache.lookup(db_session, key) == _ADVICE
+
+
+def test_invalidation_and_prompt_version_purge(db_session):
+    key = ai_assessment_cache.cache_key("doc", "ctx", model="model-a")
+    _store(db_session, key)
+    stale = AiAssessmentCacheEntry(
+        cache_key="f" * 64,
+        document_sha256="old",
+        context_hash="ctx",
+        prompt_version="previous-prompt",
+        model="model-a",
+        result=dict(_ADVICE),
+        latency_ms=1.0,
+        expires_at=utcnow() + timedelta(days=1),
+    )
+    db_session.add(stale)
+    db_session.commit()
+
+    assert ai_assessment_cache.purge_ai_assessment_cache_once(db_session) == 1
+    assert ai_assessment_cache.lookup(db_session, key) == _ADVICE
+
+    assert ai_assessment_cache.invalidate_ai_assessments(db_session, document_sha256="doc") == 1
+    db_session.commit()
+    assert ai_assessment_cache.lookup(db_session, key) is None
+
+
+def test_invalidation_upserts_the_version_stamp(db_session):
+    name = ai_assessment_cache.AI_ASSESSMENT_CACHE_VERSION_NAME
+    db_session.execute(delete(CacheVersion).where(CacheVersion.name == name))
+
+    # The first invalidation finds no stamp; the second must bump it, not insert again.
+    ai_assessment_cache.invalidate_ai_assessments(db_session)
+    db_session.commit()
+    ai_assessment_cache.invalidate_ai_assessments(db_session)
+    db_session.commit()
+
+    rows = db_session.scalars(select(CacheVersion).where(CacheVersion.name == name)).all()
+    assert [row.version for row in rows] == [2]
+
+
+def _pdf_milestone(db_session) -> Milestone:
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    db_session.add_all([client_user, provider_user])
+    db_session.flush()
+    escrow = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("100.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={},
+        deadline_at=utcnow(),
+    )
+    db_session.add(escrow)
+    db_session.flush()
+    milestone = Milestone(
+        escrow_id=escrow.id,
+        idx=1,
+        label="Invoice",
+        amount=Decimal("100.00"),
+        proof_type="PDF",
+        validator="SENDER",
+        status=MilestoneStatus.WAITING,
+    )
+    db_session.add(milestone)
+    db_session.commit()
+    return milestone
+
+
+def test_rerunning_analysis_reuses_the_cached_assessment(db_session, monkeypatch, override_settings):
+    override_settings(AI_PROOF_ADVISOR_ENABLED=True)
+    calls = []
+    monkeypatch.setattr(proof_analysis, "call_ai_proof_advisor", lambda **kw: calls.append(kw) or dict(_ADVICE))
+    milestone = _pdf_milestone(db_session)
+    proof = proofs_service.submit_proof(
+        db_session,
+        ProofCreate(
+            escrow_id=milestone.escrow_id,
+            milestone_idx=1,
+            type="PDF",
+            storage_url="https://storage.example.com/proofs/doc.pdf",
+            sha256=f"hash-{uuid4().hex}",
+            metadata={"invoice_total_amount": "100.00", "invoice_currency": "usd"},
+        ),
+    )
+    proof_analysis.process_pending_jobs(db_session)
+    assert len(calls) == 1
+
+    db_session.execute(
+        update(proof_analysis.ProofAnalysisJob)
+        .where(proof_analysis.ProofAnalysisJob.proof_id == proof.id)
+        .values(status=proof_analysis.QUEUED, attempts=0, available_at=utcnow(), run_ocr=False)
+    )
+    db_session.commit()
+    proof_analysis.process_pending_jobs(db_session)
+
+    db_session.refresh(proof)
+    assert len(calls) == 1
+    assert proof.ai_risk_level == "clean"
+    assert ai_assessment_cache.get_ai_assessment_cache_stats()["memory_hits"] == 1
+
+
+@pytest.mark.anyio
+async def test_health_reports_ai_assessment_cache(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "hit_ratio" in response.json()["ai_assessment_cache"]
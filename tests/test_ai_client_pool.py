@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+import pytest
+
+from app.config import get_settings
+from app.services import ai_proof_advisor
+from app.services.ai_proof_advisor import CircuitBreaker, call_ai_proof_advisor, get_ai_stats
+from scripts.fake_ai_provider import FakeProvider
+
+_CONTEXT = {"document_context": {"metadata": {}}}
+
+
+@pytest.fixture
+def fake_provider(override_settings):
+    with ExitStack() as stack:
+
+        def _start(**kwargs):
+            provider = FakeProvider(**kwargs)
+            override_settings(
+                AI_PROOF_ADVISOR_ENABLED=True,
+                OPENAI_API_KEY="test",
+                AI_PROOF_ADVISOR_BASE_URL=stack.enter_context(provider.serve()),
+                AI_PROOF_BACKOFF_BASE_MS=5,
+            )
+            return provider
+
+        yield _start
+        ai_proof_advisor.stop_ai_client_pool()
+
+
+def test_breaker_forgets_failures_outside_the_window_and_half_opens():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=3, window_seconds=10, cooldown_seconds=5, clock=lambda: now[0])
+
+    breaker.record_failure()
+    breaker.record_failure()
+    now[0] = 11.0  # both failures age out
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    now[0] = 16.0
+    assert breaker.allow()  # the single half-open probe
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] = 21.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["opened_total"] == 2
+
+
+def test_cancelled_half_open_probe_releases_the_breaker(monkeypatch, override_settings):
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=1, window_seconds=10, cooldown_seconds=5, clock=lambda: now[0])
+    monkeypatch.setattr(ai_proof_advisor, "_AI_BREAKER", breaker)
+    breaker.record_failure()
+    now[0] = 6.0  # cooled down: the next call is the half-open probe
+    started = threading.Event()
+
+    async def _hanging_attempt(_timeout):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def _cancel_the_probe():
+        task = asyncio.ensure_future(
+            ai_proof_advisor._advise_within_deadline(
+                _hanging_attempt,
+                deadline_seconds=10,
+                attempt_timeout=10,
+                max_attempts=1,
+                settings=get_settings(),
+            )
+        )
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    ai_proof_advisor._AI_POOL.run(_cancel_the_probe, timeout=5)
+
+    # The cancelled probe counts as a failed one: open again, then probed after the cooldown.
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] = 12.0
+    assert breaker.allow()
+
+
+def test_deadline_bounds_the_whole_call_across_retries(monkeypatch, override_settings):
+    class SlowClient:
+        def __init__(self):
+            self.responses = self
+            self.timeouts = []
+
+        def create(self, *_args, timeout, **_kwargs):
+            self.timeouts.append(timeout)
+            time.sleep(0.5)
+            raise AssertionError("cancelled by the deadline first")
+
+    override_settings(AI_PROOF_MAX_ATTEMPTS=3)
+    monkeypatch.setattr(ai_proof_advisor, "ai_enabled", lambda: True)
+    client = SlowClient()
+
+    started = time.monotonic()
+    result = call_ai_proof_advisor(context=_CONTEXT, client=client, deadline_seconds=0.3)
+
+    assert time.monotonic() - started < 0.45
+    assert "deadline_exceeded" in result["flags"]
+    # The first attempt only gets its share of the budget.
+    assert client.timeouts and client.timeouts[0] == pytest.approx(0.1, abs=0.02)
+    stats = get_ai_stats()
+    assert stats["deadline_exceeded"] == 1
+    assert stats["failure_count"] == 1
+
+
+def test_concurrency_is_capped_by_the_pool(fake_provider, override_settings):
+    provider = fake_provider(latency_ms=40)
+    override_settings(AI_PROOF_MAX_CONCURRENCY=3)
+
+    def _one(_index):
+        started = time.perf_counter()
+        result = call_ai_proof_advisor(model="m", context=_CONTEXT)
+        return time.perf_counter() - started, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        outcomes = list(executor.map(_one, range(24)))
+    elapsed = time.perf_counter() - started
+
+    assert all(result["risk_level"] == "clean" for _, result in outcomes)
+    assert provider.requests == 24
+    assert provider.peak_in_flight <= 3
+    assert get_ai_stats()["peak_in_flight"] <= 3
+    # 24 calls, 3 at a time, ~40 ms each: throughput is bounded by the limit.
+    assert elapsed >= 8 * 0.04
+    latencies = sorted(latency for latency, _ in outcomes)
+    assert latencies[-1] < 5.0
+
+
+def test_transient_provider_errors_are_retried(fake_provider):
+    provider = fake_provider(latency_ms=1, fail_first=1)
+
+    result = call_ai_proof_advisor(model="m", context=_CONTEXT)
+
+    assert result["risk_level"] == "clean"
+    assert provider.requests == 2
+    stats = get_ai_stats()
+    assert (stats["retries"], stats["errors"], stats["circuit_state"]) == (1, 0, "closed")
+
+
+@pytest.mark.anyio
+async def test_health_reports_ai_circuit_state(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["ai_stats"]["circuit_state"] == "closed"
@@ -0,0 +1,101 @@
+import json
+
+from app.services import ai_proof_advisor
+from app.services.ai_context_encoding import CONTEXT_KEY_LEGEND, encode_ai_context, estimate_tokens
+from app.services.ai_proof_advisor import _sanitize_context, call_ai_proof_advisor, get_ai_stats
+from app.services.document_checks import compute_document_backend_checks
+from scripts.fake_ai_provider import FakeProvider
+
+_REQUIREMENTS = {"expected_amount": "100.00", "expected_currency": "USD"}
+
+
+def _context(**document_extra):
+    metadata = {"invoice_total_amount": "100.00", "invoice_currency": "USD", "iban_full": "BE71096123456769"}
+    return _sanitize_context(
+        {
+            "mandate_context": {
+                "escrow_id": 12,
+                "milestone_idx": 1,
+                "milestone_label": "Invoice",
+                "milestone_amount": 100.0,
+                "proof_type": "PDF",
+                "proof_requirements": _REQUIREMENTS,
+                "invoice_total_amount": None,
+            },
+            "backend_checks": compute_document_backend_checks(proof_requirements=_REQUIREMENTS, metadata=metadata),
+            "document_context": {
+                "type": "PDF",
+                "storage_url": "https://storage.example.com/proofs/abc.pdf",
+                "sha256": "a" * 64,
+                "metadata": {**metadata, "unknown_field": "dropped by masking"},
+                **document_extra,
+            },
+        }
+    )
+
+
+def test_encoding_drops_empty_and_bookkeeping_fields_and_shortens_keys():
+    context = _context()
+    encoded = encode_ai_context(context)
+    decoded = json.loads(encoded.text)
+
+    assert set(decoded) == {"m", "bc", "d"}
+    assert decoded["d"] == {"t": "PDF", "md": {"inv_amt": "100.00", "inv_cur": "USD", "iban_full": "*"}}
+    assert "inv_amt" not in decoded["m"]  # None is dropped
+    assert decoded["m"]["mamt"] == 100
+    assert decoded["bc"]["amt"]["ok"] is True
+    assert "date" not in decoded["bc"]  # a check with nothing to compare is empty
+    assert encoded.estimated_tokens < estimate_tokens(json.dumps(context, ensure_ascii=False, default=str)) / 2
+    assert not encoded.truncated
+
+
+def test_token_budget_sheds_low_value_fields_first():
+    context = _context(ocr_text="ligne de facture " * 200)
+
+    assert encode_ai_context(context).estimated_tokens > 400
+    encoded = encode_ai_context(context, budget_tokens=150)
+
+    assert encoded.estimated_tokens <= 150
+    assert encoded.dropped[0] == "document_context.ocr_text"
+    assert json.loads(encoded.text)["bc"]["amt"]["ok"] is True
+
+    squeezed = encode_ai_context(context, budget_tokens=10)
+    assert squeezed.dropped[-1] == "long_strings"
+
+
+def test_alias_collisions_keep_the_original_key():
+    decoded = json.loads(encode_ai_context({"backend_checks": {"ok": 1, "match": True}}).text)
+
+    assert decoded == {"bc": {"ok": 1, "match": True}}
+
+
+def test_system_prompt_carries_the_legend_and_versions_the_cache():
+    assert ai_proof_advisor.AI_PROOF_ADVISOR_SYSTEM_PROMPT.endswith(CONTEXT_KEY_LEGEND)
+    assert ai_proof_advisor.AI_PROOF_ADVISOR_SYSTEM_PROMPT.startswith(ai_proof_advisor.AI_PROOF_ADVISOR_CORE_PROMPT)
+
+
+def test_calls_reuse_the_prompt_prefix_and_record_tokens(override_settings):
+    provider = FakeProvider(latency_ms=1)
+    with provider.serve() as base_url:
+        override_settings(
+            AI_PROOF_ADVISOR_ENABLED=True, OPENAI_API_KEY="test", AI_PROOF_ADVISOR_BASE_URL=base_url
+        )
+        usages = [{}, {}]
+        for usage in usages:
+            call_ai_proof_advisor(model="m", context=_context(), usage=usage)
+        ai_proof_advisor.stop_ai_client_pool()
+
+    first, second = provider.bodies
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+    assert first["prompt_cache_key"].endswith(ai_proof_advisor.AI_PROOF_PROMPT_VERSION)
+    assert first["input"][0] == second["input"][0]
+    assert first["input"][0]["content"][0]["text"] == ai_proof_advisor.AI_PROOF_ADVISOR_SYSTEM_PROMPT
+    assert first["input"][1]["content"][0]["text"].startswith("JSON_CONTEXT:{")
+
+    assert usages[0]["cached_input_tokens"] == 0
+    assert usages[1]["cached_input_tokens"] > 0
+    assert usages[1]["input_tokens"] > usages[1]["context_tokens_estimated"] > 0
+    stats = get_ai_stats()
+    assert stats["input_tokens"] == usages[0]["input_tokens"] + usages[1]["input_tokens"]
+    assert stats["cached_input_tokens"] == usages[1]["cached_input_tokens"]
+    assert stats["output_tokens"] > 0
@@ -0,0 +1,204 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from app.models import EscrowAgreement, EscrowStatus, Milestone, MilestoneStatus, User
+from app.schemas.proof import ProofCreate
+from app.services import proof_analysis
+from app.services import proofs as proofs_service
+from app.services.ai_prescreen import PRESCREEN_FLAG, prescreen
+from app.services.invoice_ocr import InvoiceOCRResult
+from app.utils.time import utcnow
+
+_ADVICE = {"risk_level": "warning", "score": 0.6, "flags": ["date_diff_small"], "explanation": "ok"}
+
+
+def _invoice(
+    amount_match=True, relative_diff="0", currency_match=True, iban_match=None, metadata=None, read_by_ocr=True
+):
+    metadata = dict(metadata or {})
+    if read_by_ocr:
+        metadata["ocr_raw"] = {
+            "ocr_status": "success",
+            "total_amount": "100.00",
+            "currency": "USD",
+            "iban_last4": "1234",
+        }
+    return {
+        "backend_checks": {
+            "has_metadata": True,
+            "amount_check": {
+                "invoice_amount": "100.00",
+                "amount_match": amount_match,
+                "relative_diff": relative_diff,
+                "currency_actual": "usd",
+                "currency_match": currency_match,
+            },
+            "iban_check": {"invoice_iban_last4": "1234", "match": iban_match},
+            "date_check": {"in_range": None},
+            "supplier_check": {"exact_match": None},
+        },
+        "document_context": {"type": "PDF", "metadata": metadata},
+    }
+
+
+def test_corroborated_invoice_is_clean_without_the_model():
+    result = prescreen(_invoice(iban_match=True))
+
+    assert result.decided
+    advice = result.as_ai_result()
+    assert advice["risk_level"] == "clean"
+    assert advice["score"] >= 0.95
+    assert advice["flags"] == ["invoice_amount_match", "currency_match", "iban_match", PRESCREEN_FLAG]
+    assert advice["explanation"]
+
+
+def test_declared_matches_alone_are_never_clean():
+    declared = prescreen(_invoice(iban_match=True, read_by_ocr=False))
+    assert not declared.decided
+    assert declared.signals == ()
+
+    # The OCR read a different amount than the one declared.
+    misread = _invoice(iban_match=True)
+    misread["document_context"]["metadata"]["ocr_raw"]["total_amount"] = "250.00"
+    assert "invoice_amount_match" not in prescreen(misread).signals
+    assert not prescreen(misread).decided
+
+    # Declared values contradicting the mandate still settle the proof as suspect.
+    contradicting = _invoice(amount_match=False, relative_diff="0.4", currency_match=False, read_by_ocr=False)
+    assert prescreen(contradicting).risk_level == "suspect"
+
+
+def test_uncorroborated_or_borderline_proofs_go_to_the_model():
+    assert prescreen(_invoice()).deferred_by == "low_confidence"
+    assert prescreen(_invoice(amount_match=False, relative_diff="0.01", iban_match=True)).deferred_by == "low_confidence"
+    normalization = _invoice(iban_match=True, metadata={"invoice_normalization_errors": ["currency"]})
+    assert prescreen(normalization).deferred_by == "invoice_normalization_errors"
+    # No positive or negative evidence at all: never decided locally.
+    assert not prescreen({"backend_checks": {"has_metadata": False}}).decided
+
+
+def test_contradicting_invoice_is_suspect():
+    result = prescreen(_invoice(amount_match=False, relative_diff="0.4", currency_match=False))
+
+    assert result.risk_level == "suspect"
+    assert result.as_ai_result()["score"] <= 0.05
+    assert "invoice_amount_mismatch_large" in result.signals
+
+
+def test_geofenced_photo_is_clean_but_unfenced_photo_is_not():
+    fenced = {"backend_checks": {"has_metadata": True, "geofence_configured": True, "validation_ok": True}}
+    unfenced = {"backend_checks": {"has_metadata": True, "geofence_configured": False, "validation_ok": True}}
+
+    assert prescreen(fenced).risk_level == "clean"
+    assert not prescreen(unfenced).decided
+    assert prescreen(unfenced, confidence=0.5).deferred_by == "no_clean_anchor"
+
+
+def _submit(db_session, *, iban_last4: str | None):
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    db_session.add_all([client_user, provider_user])
+    db_session.flush()
+    escrow = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("100.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={},
+        deadline_at=utcnow(),
+    )
+    db_session.add(escrow)
+    db_session.flush()
+    db_session.add(
+        Milestone(
+            escrow_id=escrow.id,
+            idx=1,
+            label="Invoice",
+            amount=Decimal("100.00"),
+            proof_type="PDF",
+            validator="SENDER",
+            status=MilestoneStatus.WAITING,
+            proof_requirements={
+                "expected_amount": "100.00",
+                "expected_currency": "USD",
+                "expected_iban_last4": "1234",
+            },
+        )
+    )
+    db_session.commit()
+    # The declared "ocr_raw" must not pass for an OCR reading.
+    metadata = {
+        "invoice_total_amount": "100.00",
+        "invoice_currency": "usd",
+        "ocr_raw": {"total_amount": "100.00", "currency": "USD", "iban_last4": "1234"},
+    }
+    if iban_last4:
+        metadata["invoice_iban_last4"] = iban_last4
+    return proofs_service.submit_proof(
+        db_session,
+        ProofCreate(
+            escrow_id=escrow.id,
+            milestone_idx=1,
+            type="PDF",
+            storage_url="https://storage.example.com/proofs/doc.pdf",
+            sha256=f"hash-{uuid4().hex}",
+            metadata=metadata,
+        ),
+    )
+
+
+def _ocr_reading(file_bytes: bytes) -> dict:
+    return InvoiceOCRResult(
+        ocr_status="success", ocr_provider="test", total_amount=Decimal("100.00"), currency="USD", iban_last4="1234"
+    ).model_dump()
+
+
+@pytest.mark.parametrize(
+    ("iban_last4", "ocr_reads", "prescreen_enabled", "decided_by", "risk_level"),
+    [
+        ("1234", True, True, "prescreen", "clean"),
+        ("1234", False, True, "model", "warning"),
+        (None, True, True, "model", "warning"),
+        ("1234", True, False, "model", "warning"),
+    ],
+)
+def test_analysis_records_which_path_decided(
+    db_session,
+    monkeypatch,
+    override_settings,
+    iban_last4,
+    ocr_reads,
+    prescreen_enabled,
+    decided_by,
+    risk_level,
+):
+    override_settings(AI_PROOF_ADVISOR_ENABLED=True, AI_PRESCREEN_ENABLED=prescreen_enabled)
+    if ocr_reads:
+        monkeypatch.setattr(proof_analysis, "run_invoice_ocr_if_enabled", _ocr_reading)
+    calls = []
+
+    def fake_advisor(**kwargs):
+        calls.append(kwargs)
+        kwargs["usage"].update(input_tokens=321, output_tokens=45)
+        return dict(_ADVICE)
+
+    monkeypatch.setattr(proof_analysis, "call_ai_proof_advisor", fake_advisor)
+    before = proof_analysis.get_proof_analysis_stats()[f"ai_decided_{decided_by}"]
+    proof = _submit(db_session, iban_last4=iban_last4)
+
+    proof_analysis.process_pending_jobs(db_session)
+
+    db_session.refresh(proof)
+    assert len(calls) == (decided_by == "model")
+    assert proof.ai_risk_level == risk_level
+    assert proof.metadata_["ai_decided_by"] == decided_by
+    assert (PRESCREEN_FLAG in proof.ai_flags) == (decided_by == "prescreen")
+    if decided_by == "model":
+        assert proof.metadata_["ai_usage"]["input_tokens"] == 321
+        assert proof.metadata_["ai_usage"]["latency_ms"] >= 0
+    else:
+        assert "ai_usage" not in proof.metadata_
+    assert proof_analysis.get_proof_analysis_stats()[f"ai_decided_{decided_by}"] == before + 1
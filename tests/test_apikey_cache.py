@@ -0,0 +1,119 @@
+"""Verified API key cache behaviour."""
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.models.api_key import ApiKey, ApiScope
+from app.models.cache_version import CacheVersion
+from app.utils import apikey as apikey_utils
+from app.utils.apikey import find_valid_key, get_apikey_cache_stats, hash_key
+
+
+def _make_key(db_session, token: str, **overrides) -> ApiKey:
+    row = ApiKey(
+        name=f"cache-{uuid4().hex}",
+        prefix=f"c{uuid4().hex[:10]}",
+        key_hash=hash_key(token),
+        scope=ApiScope.sender,
+        is_active=True,
+        **overrides,
+    )
+    db_session.add(row)
+    db_session.commit()
+    return row
+
+
+def test_second_lookup_is_served_from_cache(db_session, make_api_key):
+    token = f"cache-{uuid4().hex}"
+    created = make_api_key(name=f"cache-{uuid4().hex}", key=token)
+
+    first = find_valid_key(db_session, token)
+    second = find_valid_key(db_session, token)
+
+    assert first.id == created.id
+    assert second.id == created.id
+    assert second.scope == ApiScope.sender
+    stats = get_apikey_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_cached_key_respects_expiry(db_session):
+    token = f"expiring-{uuid4().hex}"
+    row = _make_key(db_session, token, expires_at=datetime.now(UTC) + timedelta(hours=1))
+
+    assert find_valid_key(db_session, token) is not None
+
+    entry = apikey_utils._KEY_CACHE._entries[row.key_hash]
+    apikey_utils._KEY_CACHE._entries[row.key_hash] = apikey_utils._CachedKey(
+        **{**entry.__dict__, "expires_at": datetime.now(UTC) - timedelta(seconds=1)}
+    )
+
+    assert find_valid_key(db_session, token) is None
+    assert row.key_hash not in apikey_utils._KEY_CACHE._entries
+
+
+def test_lru_bound_evicts_oldest(db_session, override_settings):
+    override_settings(API_KEY_CACHE_MAX_ENTRIES=2)
+
+    tokens = [f"lru-{uuid4().hex}" for _ in range(3)]
+    for token in tokens:
+        _make_key(db_session, token)
+        assert find_valid_key(db_session, token) is not None
+
+    assert get_apikey_cache_stats()["size"] == 2
+    assert hash_key(tokens[0]) not in apikey_utils._KEY_CACHE._entries
+
+
+@pytest.mark.anyio
+async def test_revocation_evicts_and_bumps_version(client, db_session, admin_headers, make_api_key):
+    token = f"revoke-{uuid4().hex}"
+    row = make_api_key(name=f"revoke-{uuid4().hex}", key=token)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert (await client.get("/alerts", headers=headers)).status_code == 403  # authenticated, wrong scope
+    assert row.key_hash in apikey_utils._KEY_CACHE._entries
+
+    response = await client.delete(f"/apikeys/{row.id}", headers=admin_headers)
+    assert response.status_code == 204
+
+    assert row.key_hash not in apikey_utils._KEY_CACHE._entries
+    version = db_session.scalar(
+        select(CacheVersion.version).where(CacheVersion.name == apikey_utils.API_KEY_CACHE_VERSION_NAME)
+    )
+    assert version == 1
+    assert (await client.get("/alerts", headers=headers)).status_code == 401
+
+
+def test_remote_version_bump_clears_local_cache(db_session, make_api_key, override_settings):
+    override_settings(API_KEY_CACHE_VERSION_CHECK_SECONDS=0)
+
+    token = f"remote-{uuid4().hex}"
+    make_api_key(name=f"remote-{uuid4().hex}", key=token)
+    assert find_valid_key(db_session, token) is not None
+    assert get_apikey_cache_stats()["size"] == 1
+
+    # Another worker revoked a key: only the shared stamp moves.
+    db_session.add(CacheVersion(name=apikey_utils.API_KEY_CACHE_VERSION_NAME, version=7))
+    db_session.commit()
+
+    assert find_valid_key(db_session, token) is not None
+    stats = get_apikey_cache_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 0
+
+
+def test_version_bump_upserts_missing_row(db_session):
+    name = f"bump-{uuid4().hex}"
+
+    # The first bump on each worker finds no row; the second must not insert again.
+    apikey_utils._bump_cache_version(db_session, name)
+    db_session.commit()
+    apikey_utils._bump_cache_version(db_session, name)
+    db_session.commit()
+
+    rows = db_session.scalars(select(CacheVersion).where(CacheVersion.name == name)).all()
+    assert [row.version for row in rows] == [2]
@@ -0,0 +1,127 @@
+"""Write-behind buffer for API key usage book-keeping."""
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import func, select
+
+from app.models.api_key import ApiKey, ApiScope
+from app.models.audit import AuditLog
+from app.services import apikey_usage
+from app.services.apikey_usage import ApiKeyUsageBuffer, build_usage_audit_row
+from app.utils.apikey import hash_key
+
+
+def _row(key_id: int, at: datetime) -> dict:
+    return build_usage_audit_row(
+        actor=f"apikey:{key_id}",
+        action="API_KEY_USED",
+        entity_id=key_id,
+        data={"scope": "sender", "email": "someone@example.com"},
+        at=at,
+    )
+
+
+def _usage_rows(db_session, key_id: int) -> int:
+    return db_session.scalar(
+        select(func.count())
+        .select_from(AuditLog)
+        .where(AuditLog.action == "API_KEY_USED", AuditLog.entity_id == key_id)
+    )
+
+
+def test_flush_coalesces_last_used_and_bulk_inserts(db_session, make_api_key):
+    key = make_api_key(name=f"buf-{uuid4().hex}", key=f"buf-{uuid4().hex}", scope=ApiScope.sender)
+    buffer = ApiKeyUsageBuffer()
+    base = datetime(2026, 1, 5, 12, 0, 0, tzinfo=UTC)
+    for offset in (3, 1, 2):
+        at = base + timedelta(seconds=offset)
+        buffer.record(api_key_id=key.id, scope="sender", route="/alerts", at=at, audit_row=_row(key.id, at))
+
+    assert buffer.stats()["pending"] == 3
+    assert buffer.stats()["pending_rollups"] == 1
+    assert _usage_rows(db_session, key.id) == 0
+
+    assert buffer.flush(db_session=db_session) == 4
+    assert buffer.pending() == 0
+    assert _usage_rows(db_session, key.id) == 3
+
+    db_session.expire_all()
+    refreshed = db_session.get(ApiKey, key.id)
+    last_used = refreshed.last_used_at.replace(tzinfo=UTC) if refreshed.last_used_at.tzinfo is None else refreshed.last_used_at
+    assert last_used == base + timedelta(seconds=3)
+
+    audit = db_session.scalars(
+        select(AuditLog).where(AuditLog.action == "API_KEY_USED", AuditLog.entity_id == key.id)
+    ).first()
+    assert audit.data_json["email"] == "***@example.com"
+    stats = buffer.stats()
+    assert stats["flushes"] == 1
+    assert stats["flushed_rows"] == 4
+
+
+def test_failed_flush_requeues_entries(db_session):
+    buffer = ApiKeyUsageBuffer()
+    at = datetime.now(UTC)
+    buffer.record(api_key_id=0, scope="admin", route="/alerts", at=at, audit_row=_row(0, at))
+
+    class BrokenSession:
+        def execute(self, *_args, **_kwargs):
+            raise RuntimeError("db down")
+
+        def rollback(self):
+            pass
+
+    assert buffer.flush(db_session=BrokenSession()) == 0
+    assert buffer.stats()["pending"] == 1
+    assert buffer.stats()["pending_rollups"] == 1
+    assert buffer.stats()["flush_errors"] == 1
+
+
+class _ManualBuffer(ApiKeyUsageBuffer):
+    """Buffer that reports itself as running without a background thread."""
+
+    running = True
+
+
+def test_running_buffer_defers_writes_until_flush(db_session, monkeypatch):
+    token = f"deferred-{uuid4().hex}"
+    key = ApiKey(
+        name=f"deferred-{uuid4().hex}",
+        prefix=f"d{uuid4().hex[:10]}",
+        key_hash=hash_key(token),
+        scope=ApiScope.sender,
+        is_active=True,
+    )
+    db_session.add(key)
+    db_session.commit()
+
+    buffer = _ManualBuffer()
+    monkeypatch.setattr(apikey_usage, "_USAGE_BUFFER", buffer)
+
+    for _ in range(2):
+        at = datetime.now(UTC)
+        apikey_usage.record_api_key_usage(
+            db_session, api_key_id=key.id, scope="sender", route="/alerts", at=at, audit_row=_row(key.id, at)
+        )
+    assert buffer.stats()["pending"] == 2
+    assert buffer.stats()["pending_keys"] == 1
+    assert _usage_rows(db_session, key.id) == 0
+
+    assert buffer.flush(db_session=db_session) >= 3
+    assert _usage_rows(db_session, key.id) == 2
+
+
+def test_buffer_thread_starts_and_stops():
+    buffer = ApiKeyUsageBuffer()
+    buffer.start(interval_ms=10, max_entries=10)
+    assert buffer.running
+    buffer.stop()
+    assert not buffer.running
+
+
+def test_sync_path_when_buffer_not_running(db_session):
+    at = datetime.now(UTC)
+    apikey_usage.record_api_key_usage(
+        db_session, api_key_id=0, scope="admin", route="/alerts", at=at, audit_row=_row(0, at)
+    )
+    assert _usage_rows(db_session, 0) >= 1
@@ -0,0 +1,117 @@
+"""Per-key usage rollups and sampled raw usage audit."""
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.api_key import ApiKey, ApiScope
+from app.models.api_key_usage import ApiKeyUsageRollup
+from app.models.audit import AuditLog
+from app.services.apikey_usage import get_key_usage, minute_bucket, persist_usage
+from app.utils.apikey import hash_key
+
+
+def _make_key(db_session, scope: ApiScope) -> tuple[ApiKey, dict[str, str]]:
+    token = f"rollup-{uuid4().hex}"
+    key = ApiKey(
+        name=f"rollup-{uuid4().hex}",
+        prefix=f"r{uuid4().hex[:10]}",
+        key_hash=hash_key(token),
+        scope=scope,
+        is_active=True,
+    )
+    db_session.add(key)
+    db_session.commit()
+    return key, {"Authorization": f"Bearer {token}"}
+
+
+def _audit_count(db_session, key_id: int) -> int:
+    return db_session.scalar(
+        select(func.count())
+        .select_from(AuditLog)
+        .where(AuditLog.action == "API_KEY_USED", AuditLog.entity_id == key_id)
+    )
+
+
+@pytest.mark.anyio
+async def test_sender_calls_are_rolled_up_without_raw_audit(client, db_session):
+    key, headers = _make_key(db_session, ApiScope.sender)
+
+    for _ in range(3):
+        await client.get("/escrows/999999", headers=headers)
+
+    rows = db_session.scalars(
+        select(ApiKeyUsageRollup).where(ApiKeyUsageRollup.api_key_id == key.id)
+    ).all()
+    assert sum(row.count for row in rows) == 3
+    assert {row.route for row in rows} == {"/escrows/{escrow_id}"}
+    assert {row.scope for row in rows} == {"sender"}
+    assert _audit_count(db_session, key.id) == 0
+
+
+@pytest.mark.anyio
+async def test_admin_calls_keep_raw_audit(client, db_session):
+    key, headers = _make_key(db_session, ApiScope.admin)
+
+    await client.get("/alerts", headers=headers)
+
+    assert _audit_count(db_session, key.id) == 1
+
+
+@pytest.mark.anyio
+async def test_sample_rate_one_audits_every_call(client, db_session, override_settings):
+    override_settings(API_KEY_USAGE_AUDIT_SAMPLE_RATE=1.0)
+    key, headers = _make_key(db_session, ApiScope.sender)
+
+    await client.get("/escrows/999999", headers=headers)
+
+    assert _audit_count(db_session, key.id) == 1
+
+
+def test_rollup_upsert_accumulates_counts(db_session):
+    bucket = minute_bucket(datetime(2026, 2, 1, 9, 30, 42, tzinfo=UTC))
+    rollup_key = (4242, "sender", "/alerts", bucket)
+
+    persist_usage(db_session, {}, [], {rollup_key: 2})
+    persist_usage(db_session, {}, [], {rollup_key: 5})
+    db_session.commit()
+
+    usage = get_key_usage(db_session, 4242, since=bucket - timedelta(minutes=1))
+    assert usage["total"] == 7
+    assert usage["by_route"] == [{"route": "/alerts", "scope": "sender", "count": 7}]
+    assert len(usage["buckets"]) == 1
+
+
+def test_rollup_flush_upserts_every_row_in_one_statement(db_session, query_budget):
+    bucket = minute_bucket(datetime(2026, 2, 1, 10, 0, tzinfo=UTC))
+    routes = [f"/route-{index}" for index in range(20)]
+    persist_usage(db_session, {}, [], {(4343, "sender", routes[0], bucket): 1})
+
+    with query_budget(1):
+        persist_usage(db_session, {}, [], {(4343, "sender", route, bucket): 2 for route in routes})
+    db_session.commit()
+
+    usage = get_key_usage(db_session, 4343, since=bucket - timedelta(minutes=1))
+    assert usage["total"] == 41
+    assert {row["route"]: row["count"] for row in usage["by_route"]}[routes[0]] == 3
+
+
+@pytest.mark.anyio
+async def test_usage_endpoint_reports_rollups(client, db_session, admin_headers):
+    key, headers = _make_key(db_session, ApiScope.sender)
+    await client.get("/escrows/999999", headers=headers)
+    await client.get("/escrows/999998/milestones", headers=headers)
+
+    response = await client.get(f"/apikeys/{key.id}/usage", headers=admin_headers)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["api_key_id"] == key.id
+    assert payload["total"] == 2
+    assert {item["route"] for item in payload["by_route"]} == {
+        "/escrows/{escrow_id}",
+        "/escrows/{escrow_id}/milestones",
+    }
+
+    missing = await client.get("/apikeys/987654321/usage", headers=admin_headers)
+    assert missing.status_code == 404
@@ -0,0 +1,108 @@
+"""Async engine and AsyncSession dependency."""
+import inspect
+from uuid import uuid4
+
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import db as db_module
+from app.core.query_stats import capture_queries
+from app.main import app
+from app.models import Alert, Base, User
+from app.models.api_key import ApiScope
+from app.utils.apikey import find_valid_key_async
+
+
+def _dependency_calls(dependant):
+    for sub in dependant.dependencies:
+        yield sub.call
+        yield from _dependency_calls(sub)
+
+
+@pytest.mark.parametrize(
+    ("sync_url", "async_url"),
+    [
+        ("sqlite:///./kobatella.db", "sqlite+aiosqlite:///./kobatella.db"),
+        ("sqlite+pysqlite:////tmp/x.db", "sqlite+aiosqlite:////tmp/x.db"),
+        ("postgresql://u:p@db:5432/kob", "postgresql+asyncpg://u:p@db:5432/kob"),
+        ("postgresql+psycopg2://u:p@db/kob", "postgresql+asyncpg://u:p@db/kob"),
+    ],
+)
+def test_async_database_url(sync_url, async_url):
+    assert db_module.async_database_url(sync_url) == async_url
+
+
+def test_async_database_url_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        db_module.async_database_url("mysql://u:p@db/kob")
+
+
+@pytest.mark.anyio
+async def test_get_async_db_reads_through_aiosqlite(tmp_path, override_settings):
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine, tables=[User.__table__, Alert.__table__])
+    with sync_engine.begin() as conn:
+        conn.execute(Alert.__table__.insert().values(type="ASYNC", message="hello", payload_json={}))
+    sync_engine.dispose()
+
+    await db_module.close_async_engine()
+    override_settings(database_url=f"sqlite:///{path}", ASYNC_DATABASE_URL=None)
+    try:
+        engine = db_module.init_async_engine()
+        assert engine.url.drivername == "sqlite+aiosqlite"
+        async for session in db_module.get_async_db():
+            alerts = (await session.scalars(select(Alert))).all()
+        assert [alert.type for alert in alerts] == ["ASYNC"]
+    finally:
+        await db_module.close_async_engine()
+    assert db_module.async_engine is None
+
+
+@pytest.mark.anyio
+async def test_ported_read_endpoints_are_async(client, db_session, admin_headers):
+    from app.routers import alerts, escrow, kct_public
+
+    handlers = {
+        alerts.list_alerts,
+        escrow.read_escrow,
+        escrow.list_milestones_for_escrow,
+        kct_public.list_projects,
+    }
+    for handler in handlers:
+        assert inspect.iscoroutinefunction(handler)
+    # Auth included: no dependency of these routes may be dispatched to the threadpool.
+    routes = [route for route in app.routes if isinstance(route, APIRoute) and route.endpoint in handlers]
+    assert len(routes) == len(handlers)
+    for route in routes:
+        for call in _dependency_calls(route.dependant):
+            assert inspect.iscoroutinefunction(call) or inspect.isasyncgenfunction(call), (route.path, call)
+
+    db_session.add(Alert(type="ASYNC_ROUTE", message="visible", payload_json={}))
+    db_session.commit()
+    response = await client.get("/alerts", params={"type": "ASYNC_ROUTE"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert [item["message"] for item in response.json()] == ["visible"]
+
+
+@pytest.mark.anyio
+async def test_async_key_verification_hits_the_cache_without_queries(db_session, make_api_key):
+    token = f"async-{uuid4().hex}"
+    make_api_key(name=f"async-{uuid4().hex}", key=token, scope=ApiScope.support)
+    connection = db_session.get_bind()
+
+    class _OnTestConnection(Session):
+        def __init__(self, bind=None, **kwargs) -> None:
+            super().__init__(bind=connection, **kwargs)
+
+    async with AsyncSession(sync_session_class=_OnTestConnection) as session:
+        first = await find_valid_key_async(session, token)
+        with capture_queries() as stats:
+            second = await find_valid_key_async(session, token)
+        assert await find_valid_key_async(session, "not-a-key") is None
+
+    assert first.scope == second.scope == ApiScope.support
+    assert stats.count == 0
@@ -3,6 +3,7 @@ from decimal import Decimal
 
 from app.models import AuditLog, EscrowAgreement, EscrowStatus, Milestone, MilestoneStatus, Proof, User
 from app.schemas.proof import ProofCreate
+from app.services import proof_analysis
 from app.services import proofs as proofs_service
 from app.utils.time import utcnow
 
@@ -46,7 +47,7 @@ async def test_ai_and_ocr_audit_logs(monkeypatch, db_session):
 
     monkeypatch.setattr(proofs_service, "ai_enabled", lambda: True)
     monkeypatch.setattr(
-        proofs_service,
+        proof_analysis,
         "call_ai_proof_advisor",
         lambda **kwargs: {
             "risk_level": "warning",
@@ -56,7 +57,7 @@ async def test_ai_and_ocr_audit_logs(monkeypatch, db_session):
         },
     )
     monkeypatch.setattr(
-        proofs_service,
+        proof_analysis,
         "run_invoice_ocr_if_enabled",
         lambda _bytes: {"ocr_status": "success", "ocr_provider": "stub"},
     )
@@ -71,6 +72,7 @@ async def test_ai_and_ocr_audit_logs(monkeypatch, db_session):
     )
 
     proof: Proof = proofs_service.submit_proof(db_session, payload, actor="tester")
+    proof_analysis.process_pending_jobs(db_session)
     db_session.refresh(proof)
 
     logs = (
@@ -0,0 +1,144 @@
+import gzip
+import json
+import os
+import stat
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import AuditLog, AuditSegment
+from app.services import audit_archive
+
+OLD = datetime(2001, 1, 1, tzinfo=UTC)
+NOW = OLD + timedelta(days=200)
+
+
+@pytest.fixture
+def archive_settings(override_settings, tmp_path):
+    override_settings(
+        AUDIT_ARCHIVE_DIR=str(tmp_path),
+        AUDIT_ARCHIVE_AFTER_DAYS=180,
+        AUDIT_ARCHIVE_SEGMENT_ROWS=4,
+        AUDIT_ARCHIVE_BLOCK_ROWS=2,
+        AUDIT_ARCHIVE_DELETE_CHUNK=3,
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def seeded(db_session):
+    """Six archivable rows for one entity, plus one recent row that stays hot."""
+
+    entity = f"Arch{uuid4().hex[:8]}"
+    db_session.add_all(
+        AuditLog(
+            actor="apikey:alice",
+            action="ARCHIVE_PROBE",
+            entity=entity,
+            entity_id=1,
+            data_json={"n": idx},
+            at=OLD + timedelta(hours=idx),
+        )
+        for idx in range(6)
+    )
+    db_session.add(
+        AuditLog(actor="apikey:alice", action="ARCHIVE_PROBE", entity=entity, entity_id=1, data_json={"n": 6}, at=NOW)
+    )
+    db_session.commit()
+    return entity
+
+
+def _hot_count(db_session, entity: str) -> int:
+    return db_session.scalar(select(func.count()).select_from(AuditLog).where(AuditLog.entity == entity))
+
+
+def test_archive_moves_old_rows_to_sealed_segments(db_session, archive_settings, seeded):
+    result = audit_archive.archive_audit_logs_once(db_session, now=NOW)
+
+    assert result == {"segments": 2, "rows_archived": 6, "rows_deleted": 6}
+    assert _hot_count(db_session, seeded) == 1
+    segments = db_session.scalars(select(AuditSegment).order_by(AuditSegment.first_id)).all()
+    assert [segment.status for segment in segments] == ["sealed", "sealed"]
+    assert [segment.row_count for segment in segments] == [4, 2]
+    assert [len(segment.blocks) for segment in segments] == [2, 1]
+    assert segments[0].entities == [seeded]
+
+    path = archive_settings / segments[0].filename
+    assert not os.stat(path).st_mode & stat.S_IWUSR
+    with gzip.open(path, "rt") as fh:
+        records = [json.loads(line) for line in fh]
+    assert [record["data_json"]["n"] for record in records] == [0, 1, 2, 3]
+
+    block = segments[0].blocks[1]
+    assert [record["data_json"]["n"] for record in audit_archive.read_block(segments[0], block)] == [2, 3]
+
+
+def test_interrupted_deletion_is_resumed(db_session, archive_settings, seeded):
+    rows = db_session.scalars(select(AuditLog).where(AuditLog.entity == seeded, AuditLog.at < NOW)).all()
+    segment = audit_archive.write_segment(archive_settings, list(rows), block_rows=2)
+    db_session.add(segment)
+    db_session.commit()
+
+    result = audit_archive.archive_audit_logs_once(db_session, now=NOW)
+
+    assert result == {"segments": 0, "rows_archived": 0, "rows_deleted": 6}
+    assert segment.status == "sealed"
+    assert _hot_count(db_session, seeded) == 1
+
+
+@pytest.mark.anyio
+async def test_query_api_pages_across_both_tiers(client, admin_headers, db_session, archive_settings, seeded):
+    audit_archive.archive_audit_logs_once(db_session, now=NOW)
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params = {"entity": seeded, "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/audit", params=params, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        seen.extend(item["data_json"]["n"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [6, 5, 4, 3, 2, 1, 0]
+
+
+@pytest.mark.anyio
+async def test_query_api_filters_cold_rows_without_duplicates(
+    client, admin_headers, db_session, archive_settings, seeded
+):
+    rows = db_session.scalars(select(AuditLog).where(AuditLog.entity == seeded, AuditLog.at < NOW)).all()
+    # Segment written but hot rows not yet deleted: every row exists in both tiers.
+    db_session.add(audit_archive.write_segment(archive_settings, list(rows), block_rows=2))
+    db_session.commit()
+
+    response = await client.get(
+        "/audit",
+        params={
+            "entity": seeded,
+            "since": (OLD + timedelta(hours=1)).isoformat(),
+            "until": (OLD + timedelta(hours=4)).isoformat(),
+            "order": "asc",
+        },
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert [item["data_json"]["n"] for item in response.json()["items"]] == [1, 2, 3]
+
+    response = await client.get(
+        "/audit", params={"entity": seeded, "format": "ndjson", "order": "asc"}, headers=admin_headers
+    )
+    assert [json.loads(line)["data_json"]["n"] for line in response.text.splitlines()] == list(range(7))
+
+
+@pytest.mark.anyio
+async def test_health_reports_audit_archive(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "rows_archived" in response.json()["audit_archive"]
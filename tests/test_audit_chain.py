@@ -0,0 +1,158 @@
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Alert, AuditCheckpoint, AuditLog, AuditSegment, Base, User
+from app.services import audit_archive, audit_chain
+
+OLD = datetime(2001, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def audit_rows(db_session):
+    entity = f"Chain{uuid4().hex[:8]}"
+    rows = [
+        AuditLog(
+            actor="apikey:alice",
+            action="CHAIN_PROBE",
+            entity=entity,
+            entity_id=idx,
+            data_json={"n": idx, "nested": {"b": 1, "a": [1, 2]}},
+            at=OLD + timedelta(hours=idx),
+        )
+        for idx in range(10)
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def test_seal_chains_rows_in_id_order(db_session, audit_rows):
+    assert audit_chain.seal_audit_chain(db_session) >= len(audit_rows)
+
+    chained = db_session.scalars(select(AuditLog).order_by(AuditLog.chain_seq)).all()
+    assert [row.chain_seq for row in chained] == list(range(1, len(chained) + 1))
+    assert [row.id for row in chained] == sorted(row.id for row in chained)
+    prev = audit_chain.GENESIS_HASH
+    for row in chained:
+        assert row.row_hash == audit_chain.compute_row_hash(prev, audit_chain._row_record(row, row.chain_seq))
+        prev = row.row_hash
+    assert audit_chain.seal_audit_chain(db_session) == 0
+
+
+def test_checkpoint_then_incremental_verify(db_session, override_settings, audit_rows):
+    override_settings(AUDIT_CHECKPOINT_MAX_ROWS=4, AUDIT_VERIFY_CHUNK_ROWS=2)
+    created = audit_chain.checkpoint_audit_chain(db_session)
+
+    assert created and all(cp.row_count <= 4 for cp in created)
+    assert created[0].first_seq == 1
+    assert [cp.first_seq for cp in created[1:]] == [cp.last_seq + 1 for cp in created[:-1]]
+
+    report = audit_chain.verify_audit_chain(db_session, workers=1)
+    assert report["ok"] is True
+    assert report["checkpoints"] == len(created)
+    assert report["rows"] == created[-1].last_seq
+    assert report["rows_per_second"] is not None
+    assert all(cp.verified_at is not None for cp in created)
+
+    db_session.add(AuditLog(actor="t", action="CHAIN_TAIL", entity="E", entity_id=1, data_json={}, at=OLD))
+    db_session.commit()
+    audit_chain.seal_audit_chain(db_session)
+    report = audit_chain.verify_audit_chain(db_session, workers=1)
+    assert (report["checkpoints"], report["tail_rows"], report["ok"]) == (0, 1, True)
+
+
+def test_tampered_row_is_detected_and_alerted(db_session, override_settings, audit_rows):
+    override_settings(AUDIT_VERIFY_CHUNK_ROWS=4)
+    audit_chain.checkpoint_audit_chain(db_session)
+    target = audit_rows[3]
+    db_session.execute(update(AuditLog).where(AuditLog.id == target.id).values(data_json={"n": 999}))
+    db_session.commit()
+
+    report = audit_chain.verify_audit_chain(db_session, full=True, workers=1)
+
+    assert report["ok"] is False
+    reasons = {(failure.get("seq"), failure["reason"]) for failure in report["failures"]}
+    assert (target.chain_seq, "hash_mismatch") in reasons
+    assert any(failure["reason"] == "merkle_root_mismatch" for failure in report["failures"])
+    assert db_session.scalars(select(Alert).where(Alert.type == audit_chain.ALERT_TYPE)).first() is not None
+
+
+def test_deleted_row_is_reported_missing(db_session, audit_rows):
+    audit_chain.checkpoint_audit_chain(db_session)
+    target = audit_rows[5]
+    db_session.execute(delete(AuditLog).where(AuditLog.id == target.id))
+    db_session.commit()
+
+    report = audit_chain.verify_audit_chain(db_session, full=True, workers=1)
+
+    assert {"checkpoint_id": report["failures"][0]["checkpoint_id"], "seq": target.chain_seq, "reason": "missing"} in (
+        report["failures"]
+    )
+
+
+@pytest.mark.parametrize("count", [1, 2, 5, 8, 13])
+def test_chunk_subtrees_fold_into_the_merkle_root(count):
+    prev = audit_chain.GENESIS_HASH
+    records = []
+    for seq in range(1, count + 1):
+        record = (seq, seq, "a", "ACT", "E", seq, {}, OLD.isoformat(), None)
+        prev = audit_chain.compute_row_hash(prev, record)
+        records.append(record[:8] + (prev,))
+
+    chunk_roots = []
+    for start in range(0, count, 2):
+        chunk = records[start : start + 2]
+        prev = records[start - 1][8] if start else audit_chain.GENESIS_HASH
+        result = audit_chain._verify_records(chunk, chunk[0][0], chunk[-1][0], prev)
+        assert result.failures == []
+        chunk_roots.append(bytes.fromhex(result.root))
+
+    assert audit_chain._fold(chunk_roots).hex() == audit_chain.merkle_root([record[8] for record in records])
+
+
+def test_verify_reads_archived_segments(db_session, override_settings, tmp_path, audit_rows):
+    override_settings(AUDIT_ARCHIVE_DIR=str(tmp_path), AUDIT_ARCHIVE_AFTER_DAYS=1, AUDIT_ARCHIVE_BLOCK_ROWS=3)
+    result = audit_archive.archive_audit_logs_once(db_session, now=OLD + timedelta(days=30))
+    assert result["rows_archived"] >= len(audit_rows)
+    assert db_session.scalar(select(AuditLog).where(AuditLog.id == audit_rows[0].id)) is None
+
+    report = audit_chain.verify_audit_chain(db_session, full=True, workers=1)
+
+    assert report["ok"] is True, report["failures"]
+    assert report["rows"] >= len(audit_rows)
+
+
+def test_verify_uses_a_process_pool(override_settings, tmp_path):
+    override_settings(AUDIT_VERIFY_CHUNK_ROWS=4, AUDIT_ARCHIVE_DIR=str(tmp_path))
+    # Workers read through their own connections, so the rows must be committed.
+    engine = create_engine(f"sqlite:///{tmp_path / 'chain.db'}")
+    tables = [model.__table__ for model in (User, Alert, AuditLog, AuditSegment, AuditCheckpoint)]
+    Base.metadata.create_all(engine, tables=tables)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add_all(
+            AuditLog(actor="t", action="POOL", entity="E", entity_id=n, data_json={"n": n}, at=OLD)
+            for n in range(23)
+        )
+        session.commit()
+        audit_chain.checkpoint_audit_chain(session)
+        session.execute(update(AuditLog).where(AuditLog.entity_id == 17).values(actor="mallory"))
+        session.commit()
+
+        report = audit_chain.verify_audit_chain(session, full=True, workers=2)
+
+    assert report["workers"] == 2
+    assert report["rows"] == 23
+    assert {"checkpoint_id": 1, "seq": 18, "reason": "hash_mismatch"} in report["failures"]
+    engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_health_reports_audit_chain(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "sealed_rows" in response.json()["audit_chain"]
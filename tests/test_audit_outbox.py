@@ -0,0 +1,109 @@
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import AuditLog, AuditOutbox, Base, User
+from app.services import audit_outbox
+from app.utils.audit import log_audit
+from app.utils.time import utcnow
+
+
+def _count(db_session, model, action: str) -> int:
+    return db_session.scalar(select(func.count()).select_from(model).where(model.action == action))
+
+
+@pytest.fixture
+def outbox_active(monkeypatch):
+    monkeypatch.setattr(audit_outbox, "audit_outbox_active", lambda: True)
+
+
+def test_entries_are_staged_with_the_transaction(db_session, outbox_active):
+    action = f"OUTBOX_{uuid4().hex[:8]}"
+    log_audit(db_session, actor="test", action=action, entity="User", entity_id=1, data={"email": "a@b.io"})
+    db_session.commit()
+
+    assert _count(db_session, AuditLog, action) == 0
+    staged = db_session.scalars(select(AuditOutbox).where(AuditOutbox.action == action)).one()
+    assert staged.data_json == {"email": "***@b.io"}
+
+
+def test_rolled_back_change_drops_its_entry(db_session, outbox_active):
+    action = f"OUTBOX_{uuid4().hex[:8]}"
+    nested = db_session.begin_nested()
+    db_session.add(User(username=f"outbox-{uuid4().hex[:8]}", email=f"{uuid4().hex[:8]}@example.com"))
+    log_audit(db_session, actor="test", action=action, entity="User", entity_id=1)
+    db_session.flush()
+    nested.rollback()
+
+    assert _count(db_session, AuditOutbox, action) == 0
+
+
+def test_drain_moves_entries_in_order(db_session, outbox_active):
+    action = f"OUTBOX_{uuid4().hex[:8]}"
+    for idx in range(5):
+        log_audit(db_session, actor="test", action=action, entity="Payment", entity_id=idx)
+    db_session.commit()
+    db_session.execute(AuditOutbox.__table__.delete().where(AuditOutbox.action != action))
+
+    assert audit_outbox.drain_audit_outbox(db_session, batch_size=3) == 3
+    assert audit_outbox.drain_audit_outbox(db_session, batch_size=3) == 2
+    assert audit_outbox.drain_audit_outbox(db_session, batch_size=3) == 0
+
+    moved = db_session.scalars(select(AuditLog).where(AuditLog.action == action).order_by(AuditLog.id)).all()
+    assert [row.entity_id for row in moved] == [0, 1, 2, 3, 4]
+    assert _count(db_session, AuditOutbox, action) == 0
+
+
+def test_log_audit_writes_directly_without_writer(db_session):
+    action = f"DIRECT_{uuid4().hex[:8]}"
+    log_audit(db_session, actor="test", action=action, entity="User", entity_id=1)
+    db_session.flush()
+
+    assert _count(db_session, AuditLog, action) == 1
+    assert _count(db_session, AuditOutbox, action) == 0
+
+
+def test_writer_thread_drains_leftovers_and_new_entries(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine, tables=[AuditLog.__table__, AuditOutbox.__table__])
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        # Left behind by a previous process that crashed before draining.
+        session.add_all(
+            AuditOutbox(actor="t", action="CRASH", entity="E", entity_id=i, data_json={}, at=utcnow())
+            for i in range(3)
+        )
+        session.commit()
+
+    writer = audit_outbox.AuditOutboxWriter(session_factory=factory)
+    writer.start(interval_ms=10, batch_size=2)
+    try:
+        with factory() as session:
+            session.add(
+                AuditOutbox(actor="t", action="LIVE", entity="E", entity_id=9, data_json={}, at=utcnow())
+            )
+            session.commit()
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            with factory() as session:
+                if session.scalar(select(func.count()).select_from(AuditOutbox)) == 0:
+                    break
+            time.sleep(0.01)
+    finally:
+        writer.stop()
+
+    with factory() as session:
+        assert session.scalar(select(func.count()).select_from(AuditOutbox)) == 0
+        assert session.scalars(select(AuditLog.entity_id).order_by(AuditLog.id)).all() == [0, 1, 2, 9]
+    assert writer.stats()["drained_rows"] == 4
+    engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_health_reports_audit_outbox(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "drained_rows" in response.json()["audit_outbox"]
@@ -0,0 +1,112 @@
+import json
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from app.models import AuditLog
+
+BASE = datetime(2031, 3, 1, 12, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def audit_rows(db_session):
+    """Seven rows for one entity (two share a timestamp) plus noise from another actor."""
+
+    entity = f"Probe{uuid4().hex[:8]}"
+    rows = [
+        AuditLog(
+            actor="apikey:alice",
+            action="PROBE_READ" if idx % 2 else "PROBE_WRITE",
+            entity=entity,
+            entity_id=42,
+            data_json={"n": idx},
+            at=BASE + timedelta(minutes=min(idx, 5)),
+        )
+        for idx in range(7)
+    ]
+    rows.append(
+        AuditLog(actor="apikey:bob", action="PROBE_READ", entity=entity, entity_id=7, data_json={}, at=BASE)
+    )
+    db_session.add_all(rows)
+    db_session.commit()
+    return entity
+
+
+@pytest.mark.anyio
+async def test_keyset_pages_cover_every_row_once(client, admin_headers, audit_rows):
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params = {"entity": audit_rows, "entity_id": 42, "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/audit", params=params, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        seen.extend(item["data_json"]["n"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == list(range(7))
+    assert len(seen) == len(set(seen))
+    assert seen[0] in {5, 6}  # newest first; 5 and 6 share a timestamp
+
+
+@pytest.mark.anyio
+async def test_filters_by_actor_action_and_window(client, admin_headers, audit_rows):
+    response = await client.get(
+        "/audit",
+        params={
+            "entity": audit_rows,
+            "actor": "apikey:alice",
+            "action": "PROBE_READ",
+            "since": (BASE + timedelta(minutes=1)).isoformat(),
+            "until": (BASE + timedelta(minutes=4)).isoformat(),
+            "order": "asc",
+        },
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert [item["data_json"]["n"] for item in response.json()["items"]] == [1, 3]
+
+
+@pytest.mark.anyio
+async def test_ndjson_streams_all_matches(client, admin_headers, audit_rows):
+    response = await client.get(
+        "/audit", params={"entity": audit_rows, "format": "ndjson"}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 8
+    assert [line["at"] for line in lines] == sorted((line["at"] for line in lines), reverse=True)
+
+
+@pytest.mark.anyio
+async def test_invalid_cursor_is_rejected(client, admin_headers):
+    response = await client.get("/audit", params={"cursor": "not-a-cursor"}, headers=admin_headers)
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "INVALID_CURSOR"
+
+
+@pytest.mark.anyio
+async def test_audit_requires_admin(client, sender_headers):
+    response = await client.get("/audit", headers=sender_headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize(
+    ("where", "index"),
+    [
+        ("entity = 'Payment' AND entity_id = 1", "ix_audit_logs_entity_entity_id_at"),
+        ("actor = 'apikey:alice' AND at >= '2031-01-01'", "ix_audit_logs_actor_at"),
+    ],
+)
+def test_lookups_use_composite_indexes(db_session, where, index):
+    plan = db_session.execute(
+        text(f"EXPLAIN QUERY PLAN SELECT * FROM audit_logs WHERE {where} ORDER BY at DESC")
+    ).all()
+    assert any(index in row[-1] for row in plan), plan
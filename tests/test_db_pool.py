@@ -0,0 +1,65 @@
+"""Connection pool configuration and telemetry."""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import db as db_module
+from app.config import get_settings
+
+
+@pytest.fixture
+def small_pool(override_settings):
+    settings = override_settings(DB_POOL_SIZE=1, DB_MAX_OVERFLOW=1, DB_POOL_TIMEOUT_SECONDS=0.05)
+    db_module.reset_pool_stats()
+    engine = create_engine(settings.database_url, future=True, **db_module._engine_kwargs())
+    db_module._instrument_pool(engine)
+    yield engine
+    engine.dispose()
+    db_module.reset_pool_stats()
+
+
+def test_engine_kwargs_follow_settings(small_pool):
+    pool = small_pool.pool
+    assert isinstance(pool, db_module.InstrumentedQueuePool)
+    assert pool.size() == 1
+    assert pool.timeout() == pytest.approx(0.05)
+    assert small_pool.pool._pre_ping is True
+
+
+def test_memory_sqlite_keeps_default_pool(override_settings):
+    override_settings(database_url="sqlite:///:memory:")
+    kwargs = db_module._engine_kwargs()
+    assert "pool_size" not in kwargs
+    assert "poolclass" not in kwargs
+
+
+def test_pool_events_track_checkouts_overflow_and_timeouts(small_pool):
+    first = small_pool.connect()
+    second = small_pool.connect()
+    first.execute(text("SELECT 1"))
+
+    stats = db_module._POOL_TELEMETRY.stats()
+    assert stats["in_use"] == 2
+    assert stats["max_in_use"] == 2
+    assert small_pool.pool.overflow() == 1
+
+    with pytest.raises(PoolTimeoutError):
+        small_pool.connect()
+
+    first.close()
+    second.close()
+    stats = db_module._POOL_TELEMETRY.stats()
+    assert stats["in_use"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["checkins"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["checkout_wait_ms_max"] >= 0.0
+
+
+@pytest.mark.anyio
+async def test_health_reports_pool(client):
+    response = await client.get("/health")
+    pool = response.json()["db_pool"]
+    assert pool["pool_class"] == "InstrumentedQueuePool"
+    assert pool["size"] == get_settings().DB_POOL_SIZE
+    assert {"checked_out", "overflow", "checkout_wait_ms_avg", "timeouts"} <= pool.keys()
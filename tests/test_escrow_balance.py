@@ -0,0 +1,160 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models import EscrowAgreement, EscrowBalance, EscrowDeposit, EscrowStatus, Payment, PaymentStatus, User
+from app.services import escrow_balance
+from app.services import payments as payments_service
+from app.utils.time import utcnow
+
+
+@pytest.fixture
+def escrow(db_session):
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    db_session.add_all([client_user, provider_user])
+    db_session.flush()
+    agreement = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("300.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={},
+        deadline_at=utcnow(),
+    )
+    db_session.add(agreement)
+    db_session.commit()
+    return agreement
+
+
+def _deposit(db_session, escrow, amount: str) -> None:
+    db_session.add(EscrowDeposit(escrow_id=escrow.id, amount=Decimal(amount), idempotency_key=f"dep-{uuid4().hex}"))
+    db_session.commit()
+
+
+def _assert_matches_ledger(db_session, escrow_id: int) -> escrow_balance.BalanceSnapshot:
+    snapshot = escrow_balance.get_balance(db_session, escrow_id)
+    assert snapshot[:3] == escrow_balance.ledger_totals(db_session, escrow_id)
+    return snapshot
+
+
+def test_new_escrow_gets_a_zero_balance_row(db_session, escrow):
+    row = db_session.scalar(select(EscrowBalance).where(EscrowBalance.escrow_id == escrow.id))
+    assert row is not None
+    assert (row.deposited, row.paid, row.reserved) == (0, 0, 0)
+
+
+def test_flushes_keep_the_row_in_step_with_the_ledger(db_session, escrow):
+    _deposit(db_session, escrow, "120.00")
+    _deposit(db_session, escrow, "80.00")
+    payment = Payment(escrow_id=escrow.id, amount=Decimal("50.00"), status=PaymentStatus.PENDING)
+    db_session.add(payment)
+    db_session.commit()
+    assert _assert_matches_ledger(db_session, escrow.id)[:3] == (Decimal("200.00"), 0, Decimal("50.00"))
+
+    payment.status = PaymentStatus.SENT
+    db_session.commit()
+    assert _assert_matches_ledger(db_session, escrow.id)[:3] == (Decimal("200.00"), Decimal("50.00"), 0)
+
+    payment.status = PaymentStatus.SETTLED
+    db_session.commit()
+    payment.status = PaymentStatus.ERROR
+    db_session.commit()
+    snapshot = _assert_matches_ledger(db_session, escrow.id)
+    assert snapshot.available == Decimal("200.00")
+
+
+def test_execute_payout_reads_the_row_and_moves_reserved_to_paid(db_session, escrow, query_budget):
+    _deposit(db_session, escrow, "100.00")
+
+    payment = payments_service.execute_payout(
+        db_session, escrow=escrow, milestone=None, amount=Decimal("60.00"), idempotency_key=f"bal-{uuid4().hex}"
+    )
+
+    assert payment.status == PaymentStatus.SENT
+    snapshot = _assert_matches_ledger(db_session, escrow.id)
+    assert (snapshot.paid, snapshot.reserved) == (Decimal("60.00"), 0)
+    with query_budget(1):
+        assert payments_service.available_balance(db_session, escrow.id) == Decimal("40.00")
+
+    with pytest.raises(ValueError, match="INSUFFICIENT_ESCROW_BALANCE"):
+        payments_service.execute_payout(
+            db_session, escrow=escrow, milestone=None, amount=Decimal("50.00"), idempotency_key=f"bal-{uuid4().hex}"
+        )
+
+
+def test_pending_payouts_hold_funds_back_from_new_claims(db_session, escrow):
+    _deposit(db_session, escrow, "100.00")
+    db_session.add(Payment(escrow_id=escrow.id, amount=Decimal("70.00"), status=PaymentStatus.PENDING))
+    db_session.commit()
+
+    assert escrow_balance.claim_payout(db_session, escrow.id, Decimal("40.00")) is False
+    version = escrow_balance.get_balance(db_session, escrow.id).version
+    assert escrow_balance.claim_payout(db_session, escrow.id, Decimal("30.00")) is True
+    assert escrow_balance.get_balance(db_session, escrow.id).version == version + 1
+
+
+def test_available_balance_excludes_reserved_funds_the_payout_guard_refuses(db_session, escrow):
+    _deposit(db_session, escrow, "100.00")
+    db_session.add(Payment(escrow_id=escrow.id, amount=Decimal("70.00"), status=PaymentStatus.PENDING))
+    db_session.commit()
+
+    assert escrow_balance.get_balance(db_session, escrow.id).available == Decimal("100.00")
+    assert payments_service.available_balance(db_session, escrow.id) == Decimal("30.00")
+
+    with pytest.raises(ValueError, match="INSUFFICIENT_ESCROW_BALANCE"):
+        payments_service.execute_payout(
+            db_session, escrow=escrow, milestone=None, amount=Decimal("50.00"), idempotency_key=f"bal-{uuid4().hex}"
+        )
+    payment = payments_service.execute_payout(
+        db_session, escrow=escrow, milestone=None, amount=Decimal("30.00"), idempotency_key=f"bal-{uuid4().hex}"
+    )
+    assert payment.status == PaymentStatus.SENT
+    assert payments_service.available_balance(db_session, escrow.id) == Decimal("0.00")
+
+
+def test_claim_retries_when_the_version_moves(db_session, escrow, monkeypatch):
+    _deposit(db_session, escrow, "100.00")
+    real_get_balance = escrow_balance.get_balance
+    calls = []
+
+    def racing_get_balance(db, escrow_id):
+        snapshot = real_get_balance(db, escrow_id)
+        if not calls:
+            # Another writer lands between our read and our compare-and-set.
+            db.execute(
+                update(EscrowBalance)
+                .where(EscrowBalance.escrow_id == escrow_id)
+                .values(version=EscrowBalance.version + 1)
+            )
+        calls.append(snapshot.version)
+        return snapshot
+
+    monkeypatch.setattr(escrow_balance, "get_balance", racing_get_balance)
+    before = escrow_balance.get_escrow_balance_stats()["cas_conflicts"]
+
+    assert escrow_balance.claim_payout(db_session, escrow.id, Decimal("10.00")) is True
+    assert len(calls) == 2 and calls[1] == calls[0] + 1
+    assert escrow_balance.get_escrow_balance_stats()["cas_conflicts"] == before + 1
+
+
+def test_missing_row_is_backfilled_from_the_ledger(db_session, escrow):
+    _deposit(db_session, escrow, "90.00")
+    db_session.add(Payment(escrow_id=escrow.id, amount=Decimal("15.00"), status=PaymentStatus.SETTLED))
+    db_session.commit()
+    db_session.query(EscrowBalance).filter(EscrowBalance.escrow_id == escrow.id).delete()
+    db_session.commit()
+
+    assert escrow_balance.get_balance(db_session, escrow.id).available == Decimal("75.00")
+    _deposit(db_session, escrow, "10.00")
+    assert _assert_matches_ledger(db_session, escrow.id).available == Decimal("85.00")
+
+
+@pytest.mark.anyio
+async def test_health_reports_escrow_balance(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "payout_claims" in response.json()["escrow_balance"]
@@ -1,4 +1,3 @@
-from app.config import get_settings
 from app.services.invoice_ocr import (
     InvoiceOCRResult,
     normalize_ocr_result,
@@ -6,9 +5,8 @@ from app.services.invoice_ocr import (
 )
 
 
-def test_run_invoice_ocr_disabled(monkeypatch):
-    settings = get_settings()
-    monkeypatch.setattr(settings, "INVOICE_OCR_ENABLED", False, raising=False)
+def test_run_invoice_ocr_disabled(override_settings):
+    override_settings(INVOICE_OCR_ENABLED=False)
 
     result = run_invoice_ocr_if_enabled(b"pdf-bytes-go-here")
     validated = InvoiceOCRResult.model_validate(result)
@@ -17,10 +15,8 @@ def test_run_invoice_ocr_disabled(monkeypatch):
     assert validated.currency is None
 
 
-def test_run_invoice_ocr_dummy_provider_validates(monkeypatch):
-    settings = get_settings()
-    monkeypatch.setattr(settings, "INVOICE_OCR_ENABLED", True, raising=False)
-    monkeypatch.setattr(settings, "INVOICE_OCR_PROVIDER", "dummy", raising=False)
+def test_run_invoice_ocr_dummy_provider_validates(override_settings):
+    override_settings(INVOICE_OCR_ENABLED=True, INVOICE_OCR_PROVIDER="dummy")
 
     result = run_invoice_ocr_if_enabled(b"pdf-bytes-go-here")
     model = InvoiceOCRResult.model_validate(result)
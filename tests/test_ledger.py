@@ -0,0 +1,236 @@
+from datetime import timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import (
+    AuditLog,
+    EscrowAgreement,
+    EscrowDeposit,
+    EscrowStatus,
+    LedgerEntry,
+    Payment,
+    PaymentStatus,
+    Purchase,
+    PurchaseStatus,
+    UsageMandate,
+    User,
+)
+from app.schemas.escrow import EscrowDepositCreate
+from app.schemas.spend import PurchaseCreate
+from app.services import escrow as escrow_service
+from app.services import ledger
+from app.services import payments as payments_service
+from app.services import spend as spend_service
+from app.utils.time import utcnow
+
+
+@pytest.fixture
+def escrow(db_session):
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    db_session.add_all([client_user, provider_user])
+    db_session.flush()
+    agreement = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("100.00"),
+        currency="USD",
+        status=EscrowStatus.DRAFT,
+        release_conditions_json={},
+        deadline_at=utcnow(),
+    )
+    db_session.add(agreement)
+    db_session.commit()
+    return agreement
+
+
+def _entries_for(db_session, source: str, source_id: int) -> list[LedgerEntry]:
+    return list(
+        db_session.scalars(
+            select(LedgerEntry).where(LedgerEntry.source == source, LedgerEntry.source_id == source_id)
+        )
+    )
+
+
+def test_deposit_payout_and_settlement_are_journaled(db_session, escrow):
+    escrow_service.deposit(
+        db_session, escrow.id, EscrowDepositCreate(amount=Decimal("100.00")), idempotency_key=f"dep-{uuid4().hex}"
+    )
+    payment = payments_service.execute_payout(
+        db_session, escrow=escrow, milestone=None, amount=Decimal("40.00"), idempotency_key=f"pay-{uuid4().hex}"
+    )
+    escrow_account = ledger.escrow_account(escrow.id)
+    provider_account = ledger.provider_account(escrow.provider_id)
+
+    assert ledger.account_balance(db_session, escrow_account) == Decimal("60.00")
+    clearing_before = ledger.account_balance(db_session, ledger.CLEARING_ACCOUNT)
+
+    payments_service.finalize_payment_settlement(db_session, payment, source="test")
+
+    assert ledger.account_balance(db_session, provider_account) == Decimal("40.00")
+    assert ledger.account_balance(db_session, ledger.CLEARING_ACCOUNT) == clearing_before - Decimal("40.00")
+    kinds = [entry.kind for entry in _entries_for(db_session, "Payment", payment.id)]
+    assert kinds == ["PAYMENT_SENT", "PAYMENT_SENT", "PAYMENT_SETTLED", "PAYMENT_SETTLED"]
+    unbalanced = db_session.execute(
+        select(LedgerEntry.txn_id).group_by(LedgerEntry.txn_id).having(func.sum(LedgerEntry.amount) != 0)
+    ).all()
+    assert unbalanced == []
+
+
+def test_failed_payout_returns_to_the_escrow(db_session, escrow):
+    escrow_service.deposit(
+        db_session, escrow.id, EscrowDepositCreate(amount=Decimal("50.00")), idempotency_key=f"dep-{uuid4().hex}"
+    )
+    payment = payments_service.execute_payout(
+        db_session, escrow=escrow, milestone=None, amount=Decimal("50.00"), idempotency_key=f"pay-{uuid4().hex}"
+    )
+    assert ledger.account_balance(db_session, ledger.escrow_account(escrow.id)) == 0
+
+    payments_service.mark_failed_from_psp(db_session, payment_id=payment.id, external_error="declined")
+
+    assert payment.status == PaymentStatus.ERROR
+    assert ledger.account_balance(db_session, ledger.escrow_account(escrow.id)) == Decimal("50.00")
+
+
+def test_purchases_debit_the_mandate_account(db_session, make_users_merchants_mandate):
+    sender, beneficiary, merchant_id = make_users_merchants_mandate(total="80.00")
+    payload = PurchaseCreate(
+        sender_id=sender.id,
+        beneficiary_id=beneficiary.id,
+        merchant_id=merchant_id,
+        amount=Decimal("30.00"),
+        currency="USD",
+    )
+
+    spend_service.create_purchase(db_session, payload, idempotency_key=f"buy-{uuid4().hex}")
+
+    mandate = db_session.scalar(select(UsageMandate).where(UsageMandate.beneficiary_id == beneficiary.id))
+    assert ledger.account_balance(db_session, ledger.mandate_account(mandate.id)) == -mandate.total_spent
+    assert ledger.account_balance(db_session, ledger.merchant_account(merchant_id)) == Decimal("30.00")
+
+
+def test_opening_balances_cover_history_before_the_journal(db_session, escrow, make_users_merchants_mandate):
+    # Rows written before the journal existed: no entries of their own.
+    db_session.add(EscrowDeposit(escrow_id=escrow.id, amount=Decimal("100.00"), idempotency_key=f"old-{uuid4().hex}"))
+    sent = Payment(
+        escrow_id=escrow.id, amount=Decimal("30.00"), status=PaymentStatus.SENT, idempotency_key=f"old-{uuid4().hex}"
+    )
+    db_session.add(sent)
+    _, beneficiary, merchant_id = make_users_merchants_mandate(total="80.00")
+    mandate = db_session.scalar(select(UsageMandate).where(UsageMandate.beneficiary_id == beneficiary.id))
+    purchase = Purchase(
+        sender_id=beneficiary.id,
+        merchant_id=merchant_id,
+        amount=Decimal("25.00"),
+        currency="USD",
+        status=PurchaseStatus.COMPLETED,
+    )
+    db_session.add(purchase)
+    db_session.flush()
+    db_session.add(
+        AuditLog(
+            actor="test",
+            action="MANDATE_CONSUMED",
+            entity="UsageMandate",
+            entity_id=mandate.id,
+            data_json={"purchase_id": purchase.id},
+            at=utcnow(),
+        )
+    )
+    db_session.commit()
+
+    posted = ledger.post_opening_balances(db_session)
+    db_session.commit()
+
+    assert posted["escrows"] >= 1 and posted["mandates"] >= 1
+    assert ledger.account_balance(db_session, ledger.escrow_account(escrow.id)) == Decimal("70.00")
+    assert ledger.account_balance(db_session, ledger.mandate_account(mandate.id)) == Decimal("-25.00")
+
+    # Settling the old payout moves it out of clearing without driving the escrow negative.
+    sent.status = PaymentStatus.SETTLED
+    ledger.record_payment_transition(db_session, sent, PaymentStatus.SENT, escrow=escrow)
+    db_session.commit()
+    assert ledger.account_balance(db_session, ledger.escrow_account(escrow.id)) == Decimal("70.00")
+    assert ledger.account_balance(db_session, ledger.provider_account(escrow.provider_id)) == Decimal("30.00")
+
+    # Re-running posts nothing new for the same owners.
+    before = db_session.scalar(select(func.count()).select_from(LedgerEntry))
+    ledger.post_opening_balances(db_session)
+    db_session.flush()
+    assert db_session.scalar(select(func.count()).select_from(LedgerEntry)) == before
+
+
+def test_post_rejects_unbalanced_transactions(db_session):
+    with pytest.raises(ValueError, match="does not balance"):
+        ledger.post(
+            db_session,
+            kind="TEST",
+            legs=[("escrow:1", Decimal("10.00")), ("psp:funding", Decimal("-9.00"))],
+            currency="USD",
+            source="Test",
+            source_id=1,
+        )
+
+
+def test_entries_are_immutable(db_session):
+    txn_id = ledger.post(
+        db_session,
+        kind="TEST",
+        legs=[(f"test:{uuid4().hex}", Decimal("5.00")), ("psp:funding", Decimal("-5.00"))],
+        currency="USD",
+        source="Test",
+        source_id=1,
+    )
+    db_session.commit()
+    entry = ledger.transaction_entries(db_session, txn_id)[0]
+
+    entry.amount = Decimal("6.00")
+    with pytest.raises(ledger.LedgerImmutableError), db_session.begin_nested():
+        db_session.flush()
+    db_session.expire(entry)
+
+    db_session.delete(entry)
+    with pytest.raises(ledger.LedgerImmutableError), db_session.begin_nested():
+        db_session.flush()
+
+
+def test_point_in_time_balance_reads_snapshot_plus_tail(db_session, override_settings, query_budget):
+    override_settings(LEDGER_SNAPSHOT_LAG_SECONDS=0)
+    account = f"test:{uuid4().hex}"
+    start = utcnow() - timedelta(days=3)
+
+    def move(amount: str, at):
+        ledger.post(
+            db_session,
+            kind="TEST",
+            legs=[(account, Decimal(amount)), ("psp:funding", -Decimal(amount))],
+            currency="USD",
+            source="Test",
+            source_id=1,
+            at=at,
+        )
+        db_session.commit()
+
+    move("10.00", start)
+    move("15.00", start + timedelta(hours=1))
+    assert ledger.snapshot_ledger_once(db_session, now=start + timedelta(hours=2)) >= 1
+    move("-5.00", start + timedelta(hours=3))
+    assert ledger.snapshot_ledger_once(db_session, now=start + timedelta(hours=4)) >= 1
+    move("7.00", start + timedelta(hours=5))
+
+    with query_budget(2):
+        assert ledger.account_balance(db_session, account) == Decimal("27.00")
+    assert ledger.account_balance(db_session, account, at=start + timedelta(minutes=30)) == Decimal("10.00")
+    assert ledger.account_balance(db_session, account, at=start + timedelta(hours=2)) == Decimal("25.00")
+    assert ledger.account_balance(db_session, account, at=start + timedelta(hours=4)) == Decimal("20.00")
+    assert ledger.snapshot_ledger_once(db_session, now=start) == 0
+
+
+@pytest.mark.anyio
+async def test_health_reports_ledger(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "snapshots_written" in response.json()["ledger"]
@@ -1,5 +1,14 @@
 """Tests for metadata masking helpers."""
-from app.utils.masking import mask_metadata_for_ai
+from app.utils.masking import (
+    AI_MASK_PLACEHOLDER,
+    KeyRule,
+    MaskingEngine,
+    MaskPolicy,
+    mask_audit_payload,
+    mask_metadata_for_ai,
+    mask_proof_metadata,
+    mask_sensitive_for_ai,
+)
 
 
 def test_mask_metadata_for_ai_drops_unknown_fields():
@@ -16,3 +25,64 @@ def test_mask_metadata_for_ai_drops_unknown_fields():
     assert safe["invoice_currency"] == "EUR"
     assert safe["iban_full"] == "***redacted***"
     assert "supplier_tax_id" not in safe
+
+
+def test_mask_proof_metadata_walks_nested_ocr_output():
+    metadata = {
+        "supplier_name": "ACME",
+        "iban_check": True,
+        "ocr_raw": {
+            "fields": {"supplier_iban": "FR76 3000 6000 0112", "total": "10.00"},
+            "lines": [{"account_number": "00012345", "qty": 2}],
+            "billing_email": ["billing@acme.example", None],
+            "phone_numbers": ("+243812345678",),
+        },
+    }
+
+    masked = mask_proof_metadata(metadata)
+
+    assert masked["supplier_name"] == "***masked***"
+    assert masked["iban_check"] is True
+    assert masked["ocr_raw"]["fields"] == {"supplier_iban": "************0112", "total": "10.00"}
+    assert masked["ocr_raw"]["lines"] == [{"account_number": "****2345", "qty": 2}]
+    assert masked["ocr_raw"]["billing_email"] == ["***@acme.example", None]
+    assert masked["ocr_raw"]["phone_numbers"] == ["***78"]
+    assert metadata["ocr_raw"]["fields"]["supplier_iban"] == "FR76 3000 6000 0112"
+
+
+def test_deeply_nested_payload_does_not_recurse():
+    payload: dict = {"email": "a@b.io"}
+    for _ in range(5000):
+        payload = {"child": [payload]}
+
+    masked = mask_audit_payload(payload)
+
+    for _ in range(5000):
+        masked = masked["child"][0]
+    assert masked == {"email": "***@b.io"}
+
+
+def test_keys_are_classified_once_per_engine():
+    calls: list[str] = []
+
+    def classify(key):
+        calls.append(key)
+        return KeyRule(mask=str.upper) if key == "code" else KeyRule()
+
+    engine = MaskingEngine(MaskPolicy(name="probe", classify=classify), cache_size=8)
+    rows = [{"code": f"ab{n}", "n": n} for n in range(50)]
+
+    assert engine.apply(rows)[3] == {"code": "AB3", "n": 3}
+    assert sorted(calls) == ["code", "n"]
+    assert engine.cache_info()["hits"] == 98
+
+
+def test_mask_sensitive_for_ai_keeps_signals():
+    cleaned = mask_sensitive_for_ai({"distance": 12.5, "payer_email": "x@y.z", "mandate_id_": 4})
+
+    assert cleaned == {
+        "distance": 12.5,
+        "payer_email": AI_MASK_PLACEHOLDER,
+        "mandate_id_": AI_MASK_PLACEHOLDER,
+        "_ai_redacted_keys": ["payer_email", "mandate_id_"],
+    }
@@ -0,0 +1,125 @@
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from app.models import EscrowAgreement, EscrowStatus, Milestone, MilestoneStatus, Payment, PaymentStatus, User
+from app.services import milestones as milestones_service
+from app.services import payments as payments_service
+from app.utils.time import utcnow
+
+
+def _escrow(db_session, count: int = 3) -> tuple[EscrowAgreement, list[Milestone]]:
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    db_session.add_all([client_user, provider_user])
+    db_session.flush()
+    escrow = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("300.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={},
+        deadline_at=utcnow(),
+    )
+    db_session.add(escrow)
+    db_session.flush()
+    milestones = [
+        Milestone(
+            escrow_id=escrow.id,
+            idx=idx,
+            label=f"M{idx}",
+            amount=Decimal("100.00"),
+            currency="USD",
+            proof_type="PHOTO",
+        )
+        for idx in range(1, count + 1)
+    ]
+    db_session.add_all(milestones)
+    db_session.commit()
+    return escrow, milestones
+
+
+def _counters(escrow: EscrowAgreement) -> tuple[int, int, int | None]:
+    return escrow.milestones_total, escrow.milestones_paid, escrow.current_milestone_idx
+
+
+def test_counters_follow_milestone_transitions(db_session):
+    escrow, (first, second, third) = _escrow(db_session)
+    assert _counters(escrow) == (3, 0, 1)
+
+    first.status = MilestoneStatus.PAID
+    db_session.commit()
+    assert _counters(escrow) == (3, 1, 2)
+    assert milestones_service.get_current_open_milestone(db_session, escrow.id).id == second.id
+
+    second.status = MilestoneStatus.REJECTED
+    db_session.commit()
+    assert _counters(escrow) == (3, 1, 3)
+
+    db_session.delete(third)
+    db_session.commit()
+    assert _counters(escrow) == (2, 1, None)
+    assert milestones_service.open_next_waiting_milestone(db_session, escrow.id) is None
+    assert milestones_service.all_milestones_paid(db_session, escrow.id) is False
+
+
+def test_counters_match_the_milestone_rows_in_the_database(db_session):
+    escrow, milestones = _escrow(db_session, count=2)
+    for milestone in milestones:
+        milestone.status = MilestoneStatus.PAID
+    db_session.commit()
+    db_session.expire(escrow)
+
+    stored = db_session.execute(
+        select(
+            EscrowAgreement.milestones_total,
+            EscrowAgreement.milestones_paid,
+            EscrowAgreement.current_milestone_idx,
+        ).where(EscrowAgreement.id == escrow.id)
+    ).one()
+    assert tuple(stored) == (2, 2, None)
+    assert milestones_service.all_milestones_paid(db_session, escrow.id) is True
+
+
+def test_readers_do_not_scan_milestones(db_session, query_budget):
+    escrow, _ = _escrow(db_session, count=5)
+
+    with query_budget(1):
+        assert milestones_service.all_milestones_paid(db_session, escrow.id) is False
+    with query_budget(1):
+        assert milestones_service.get_current_open_milestone(db_session, escrow.id).idx == 1
+
+
+def test_transitions_apply_deltas_without_counting_milestones(db_session, query_budget):
+    escrow, (first, second, _) = _escrow(db_session)
+    before = milestones_service.get_milestone_counter_stats()
+
+    first.status = MilestoneStatus.PAID
+    with query_budget(3) as stats:
+        db_session.flush()
+    assert not any("count(" in sql.lower() for sql in stats.statements)
+    assert _counters(escrow) == (3, 1, 2)
+
+    # PENDING_REVIEW is still open: only milestones_paid could move, and it did not.
+    second.status = MilestoneStatus.PENDING_REVIEW
+    db_session.commit()
+    assert _counters(escrow) == (3, 1, 2)
+
+    after = milestones_service.get_milestone_counter_stats()
+    assert after["delta_updates"] == before["delta_updates"] + 1
+    assert after["recomputes"] == before["recomputes"]
+
+
+def test_settlement_of_last_milestone_releases_escrow(db_session):
+    escrow, (only,) = _escrow(db_session, count=1)
+    payment = Payment(escrow_id=escrow.id, milestone_id=only.id, amount=Decimal("100.00"), status=PaymentStatus.SENT)
+    db_session.add(payment)
+    db_session.commit()
+    only.status = MilestoneStatus.PAID
+
+    payments_service.finalize_payment_settlement(db_session, payment, source="test")
+
+    assert escrow.status == EscrowStatus.RELEASED
+    assert _counters(escrow) == (1, 1, None)
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import EscrowAgreement, EscrowStatus, User
+from app.schemas.escrow import MilestoneCreate
+from app.services import milestones as milestones_service
+from app.utils.time import utcnow
+
+
+@pytest.fixture
+def escrow(db_session):
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    db_session.add_all([client_user, provider_user])
+    db_session.flush()
+    agreement = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("1000.00"),
+        currency="USD",
+        status=EscrowStatus.DRAFT,
+        release_conditions_json={},
+        deadline_at=utcnow(),
+    )
+    db_session.add(agreement)
+    db_session.commit()
+    return agreement
+
+
+def _plan(*indexes: int, amount: str = "100.00", currency: str = "USD") -> list[MilestoneCreate]:
+    return [
+        MilestoneCreate(label=f"Tranche {idx}", amount=Decimal(amount), currency=currency, sequence_index=idx)
+        for idx in indexes
+    ]
+
+
+def test_plan_is_inserted_with_one_statement(db_session, escrow, query_budget):
+    with query_budget(5) as stats:
+        created = milestones_service.create_milestone_plan(db_session, escrow, _plan(*range(1, 9)))
+
+    inserts = [sql for sql in stats.statements if sql.lstrip().upper().startswith("INSERT INTO MILESTONES")]
+    assert len(inserts) == 1 and stats.statements[inserts[0]] == 1
+    assert [milestone.idx for milestone in created] == list(range(1, 9))
+    assert all(milestone.proof_kind == "PHOTO" for milestone in created)
+    assert (escrow.milestones_total, escrow.milestones_paid, escrow.current_milestone_idx) == (8, 0, 1)
+
+
+def test_plan_continues_an_existing_sequence(db_session, escrow):
+    milestones_service.create_milestone_plan(db_session, escrow, _plan(2, 1))
+
+    created = milestones_service.create_milestone_plan(db_session, escrow, _plan(3, 4))
+
+    assert [milestone.idx for milestone in created] == [3, 4]
+    assert escrow.milestones_total == 4
+
+
+@pytest.mark.parametrize(
+    ("plan", "message"),
+    [
+        (_plan(1, 3), "gaps"),
+        (_plan(1, 1), "already exists"),
+        (_plan(1, 2, currency="EUR"), "currency"),
+        (_plan(1, 2, amount="600.00"), "amount_total"),
+    ],
+)
+def test_invalid_plans_write_nothing(db_session, escrow, plan, message):
+    with pytest.raises(HTTPException) as excinfo:
+        milestones_service.create_milestone_plan(db_session, escrow, plan)
+
+    assert excinfo.value.status_code == 400
+    assert message in excinfo.value.detail
+    assert escrow.milestones_total == 0
+
+
+def test_plan_cannot_reuse_existing_indexes(db_session, escrow):
+    milestones_service.create_milestone_plan(db_session, escrow, _plan(1))
+
+    with pytest.raises(HTTPException, match="already exists"):
+        milestones_service.create_milestone_plan(db_session, escrow, _plan(1, 2))
+
+
+@pytest.mark.anyio
+async def test_bulk_endpoint_returns_created_milestones(client, admin_headers, escrow):
+    response = await client.post(
+        f"/escrows/{escrow.id}/milestones:bulk",
+        headers=admin_headers,
+        json={
+            "milestones": [
+                {"label": f"Tranche {idx}", "amount": "250.00", "currency": "USD", "sequence_index": idx}
+                for idx in range(1, 5)
+            ]
+        },
+    )
+
+    assert response.status_code == 201
+    body = response.json()
+    assert [item["sequence_index"] for item in body] == [1, 2, 3, 4]
+    assert {item["status"] for item in body} == {"WAITING"}
+
+    rejected = await client.post(
+        f"/escrows/{escrow.id}/milestones:bulk",
+        headers=admin_headers,
+        json={"milestones": [{"label": "Extra", "amount": "1.00", "currency": "USD", "sequence_index": 5}]},
+    )
+    assert rejected.status_code == 400
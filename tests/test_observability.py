@@ -16,12 +16,10 @@ def test_ai_proof_advisor_logs_status(monkeypatch):
     assert "ai_disabled" in result.get("flags", [])
 
 
-def test_invoice_ocr_logs_status(monkeypatch):
+def test_invoice_ocr_logs_status(override_settings):
     from app.services import invoice_ocr
 
-    settings = invoice_ocr.get_settings()
-    monkeypatch.setattr(settings, "INVOICE_OCR_ENABLED", False, raising=False)
-    monkeypatch.setattr(settings, "INVOICE_OCR_PROVIDER", "none", raising=False)
+    override_settings(INVOICE_OCR_ENABLED=False, INVOICE_OCR_PROVIDER="none")
 
     metadata = invoice_ocr.enrich_metadata_with_invoice_ocr(
         storage_url="test://file.pdf", existing_metadata={}, file_bytes=b""
@@ -31,29 +29,26 @@ def test_invoice_ocr_logs_status(monkeypatch):
     assert metadata["ocr_provider"] == "disabled"
 
 
+
 def test_ai_circuit_breaker_skips_when_open(monkeypatch):
     from app.services import ai_proof_advisor
 
-    ai_proof_advisor._AI_CIRCUIT_OPEN = True
-    ai_proof_advisor._AI_FAILURE_COUNT = 5
+    monkeypatch.setattr(ai_proof_advisor, "ai_enabled", lambda: True)
+    for _ in range(ai_proof_advisor._AI_BREAKER.threshold):
+        ai_proof_advisor._AI_BREAKER.record_failure()
 
     result = ai_proof_advisor.call_ai_proof_advisor(
-        context={"document_context": {"metadata": {}}}, proof_storage_url=None
+        context={"document_context": {"metadata": {}}}, proof_storage_url=None, client=object()
     )
 
     assert "circuit_breaker_open" in result.get("flags", [])
     assert result["score"] == 0.5
-
-    ai_proof_advisor._AI_CIRCUIT_OPEN = False
-    ai_proof_advisor._AI_FAILURE_COUNT = 0
+    assert ai_proof_advisor.get_ai_stats()["rejected_open"] == 1
 
 
-def test_ai_circuit_breaker_opens_after_failures(monkeypatch):
+def test_ai_circuit_breaker_opens_after_failures(monkeypatch, override_settings):
     from app.services import ai_proof_advisor
 
-    class DummySettings:
-        OPENAI_API_KEY = "test"
-
     class FailingClient:
         def __init__(self, *_args, **_kwargs):
             self.responses = self
@@ -61,32 +56,24 @@ def test_ai_circuit_breaker_opens_after_failures(monkeypatch):
         def create(self, *_args, **_kwargs):
             raise ValueError("boom")
 
-    ai_proof_advisor._AI_FAILURE_COUNT = 4
-    ai_proof_advisor._AI_CIRCUIT_OPEN = False
+    override_settings(AI_PROOF_BACKOFF_BASE_MS=1, AI_PROOF_BREAKER_FAILURES=2)
+    ai_proof_advisor._AI_BREAKER.record_failure()
 
-    monkeypatch.setattr(ai_proof_advisor, "get_settings", lambda: DummySettings())
     monkeypatch.setattr(ai_proof_advisor, "ai_enabled", lambda: True)
     monkeypatch.setattr(ai_proof_advisor, "ai_model", lambda: "model")
     monkeypatch.setattr(ai_proof_advisor, "ai_timeout_seconds", lambda: 1)
-    monkeypatch.setattr(ai_proof_advisor, "OpenAI", FailingClient)
 
     result = ai_proof_advisor.call_ai_proof_advisor(
-        context={"document_context": {"metadata": {}}}, proof_storage_url=None
+        context={"document_context": {"metadata": {}}}, proof_storage_url=None, client=FailingClient()
     )
 
-    assert ai_proof_advisor._AI_CIRCUIT_OPEN is True
+    assert ai_proof_advisor.get_ai_stats()["circuit_open"] == 1
     assert "retries_exhausted" in result.get("flags", [])
 
-    ai_proof_advisor._AI_FAILURE_COUNT = 0
-    ai_proof_advisor._AI_CIRCUIT_OPEN = False
-
 
 def test_ai_metrics_track_calls_and_errors(monkeypatch):
     from app.services import ai_proof_advisor
 
-    ai_proof_advisor._AI_CALLS = 0
-    ai_proof_advisor._AI_ERRORS = 0
-
     monkeypatch.setattr(ai_proof_advisor, "ai_enabled", lambda: False)
 
     ai_proof_advisor.call_ai_proof_advisor(
@@ -98,16 +85,10 @@ def test_ai_metrics_track_calls_and_errors(monkeypatch):
     assert stats["calls"] == 1
     assert stats["errors"] == 1
 
-    ai_proof_advisor._AI_CALLS = 0
-    ai_proof_advisor._AI_ERRORS = 0
-
 
 def test_ai_metrics_success_does_not_increment_errors(monkeypatch):
     from app.services import ai_proof_advisor
 
-    class DummySettings:
-        OPENAI_API_KEY = "test"
-
     class DummyResponse:
         output_text = json.dumps(
             {
@@ -125,20 +106,14 @@ def test_ai_metrics_success_does_not_increment_errors(monkeypatch):
         def create(self, *_args, **_kwargs):
             return DummyResponse()
 
-    ai_proof_advisor._AI_CALLS = 0
-    ai_proof_advisor._AI_ERRORS = 0
-    ai_proof_advisor._AI_FAILURE_COUNT = 0
-    ai_proof_advisor._AI_CIRCUIT_OPEN = False
-
-    monkeypatch.setattr(ai_proof_advisor, "get_settings", lambda: DummySettings())
     monkeypatch.setattr(ai_proof_advisor, "ai_enabled", lambda: True)
     monkeypatch.setattr(ai_proof_advisor, "ai_model", lambda: "model")
     monkeypatch.setattr(ai_proof_advisor, "ai_timeout_seconds", lambda: 1)
-    monkeypatch.setattr(ai_proof_advisor, "OpenAI", DummyClient)
 
     ai_proof_advisor.call_ai_proof_advisor(
         context={"document_context": {"metadata": {}}},
         proof_storage_url=None,
+        client=DummyClient(),
     )
 
     stats = ai_proof_advisor.get_ai_stats()
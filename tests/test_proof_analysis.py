@@ -0,0 +1,277 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    AuditLog,
+    Base,
+    EscrowAgreement,
+    EscrowStatus,
+    Milestone,
+    MilestoneStatus,
+    Proof,
+    ProofAnalysisJob,
+    User,
+)
+from app.schemas.proof import ProofCreate
+from app.services import proof_analysis
+from app.services.ai_proof_advisor import _fallback_ai_result
+from app.services import proofs as proofs_service
+from app.utils.time import utcnow
+
+_ADVICE = {"risk_level": "clean", "score": 0.9, "flags": [], "explanation": "ok"}
+
+
+def _milestone(session, proof_type: str = "PDF") -> Milestone:
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    session.add_all([client_user, provider_user])
+    session.flush()
+    escrow = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("100.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={},
+        deadline_at=utcnow(),
+    )
+    session.add(escrow)
+    session.flush()
+    milestone = Milestone(
+        escrow_id=escrow.id,
+        idx=1,
+        label="Delivery",
+        amount=Decimal("100.00"),
+        proof_type=proof_type,
+        validator="SENDER",
+        status=MilestoneStatus.WAITING,
+    )
+    session.add(milestone)
+    session.commit()
+    return milestone
+
+
+def _submit(session, milestone: Milestone, proof_type: str = "PDF") -> Proof:
+    payload = ProofCreate(
+        escrow_id=milestone.escrow_id,
+        milestone_idx=milestone.idx,
+        type=proof_type,
+        storage_url="https://storage.example.com/proofs/doc.pdf",
+        sha256=f"hash-{uuid4().hex}",
+        metadata={"invoice_total_amount": "100.00", "invoice_currency": "usd"},
+    )
+    return proofs_service.submit_proof(session, payload, actor="tester")
+
+
+@pytest.fixture
+def advisor_calls(monkeypatch, override_settings):
+    override_settings(AI_PROOF_ADVISOR_ENABLED=True)
+    calls = []
+
+    def fake_advisor(**kwargs):
+        calls.append(kwargs)
+        return dict(_ADVICE)
+
+    monkeypatch.setattr(proof_analysis, "call_ai_proof_advisor", fake_advisor)
+    return calls
+
+
+@pytest.fixture
+def file_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'analysis.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    session = factory()
+    yield session, factory
+    session.close()
+    engine.dispose()
+
+
+def test_submission_queues_analysis_instead_of_calling_the_advisor(db_session, advisor_calls):
+    proof = _submit(db_session, _milestone(db_session))
+
+    assert advisor_calls == []
+    assert proof.analysis_status == proof_analysis.QUEUED
+    assert proof.ai_checked_at is None
+    job = db_session.scalar(select(ProofAnalysisJob).where(ProofAnalysisJob.proof_id == proof.id))
+    assert (job.status, job.run_ocr, job.run_ai) == ("QUEUED", True, True)
+
+    assert proof_analysis.process_pending_jobs(db_session) == 1
+
+    db_session.refresh(proof)
+    assert len(advisor_calls) == 1
+    context = advisor_calls[0]["context"]
+    assert context["mandate_context"]["invoice_total_amount"] == 100.0
+    assert "ocr_status" in context["document_context"]["metadata"]
+    assert proof.analysis_status == proof_analysis.DONE
+    assert (proof.ai_risk_level, proof.ai_score) == ("clean", Decimal("0.9"))
+    assert proof_analysis.process_pending_jobs(db_session) == 0
+
+
+def test_nothing_to_analyse_is_skipped(db_session, override_settings):
+    override_settings(AI_PROOF_ADVISOR_ENABLED=False)
+    proof = _submit(db_session, _milestone(db_session, proof_type="OTHER"), proof_type="PHOTO")
+
+    assert proof.analysis_status == proof_analysis.SKIPPED
+    assert db_session.scalar(select(ProofAnalysisJob).where(ProofAnalysisJob.proof_id == proof.id)) is None
+
+
+def test_failed_attempts_are_retried_then_marked_failed(file_session, advisor_calls, override_settings, monkeypatch):
+    override_settings(PROOF_ANALYSIS_MAX_ATTEMPTS=2, PROOF_ANALYSIS_RETRY_SECONDS=0)
+    session, _ = file_session
+
+    def broken_advisor(**kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(proof_analysis, "call_ai_proof_advisor", broken_advisor)
+    proof = _submit(session, _milestone(session))
+
+    assert proof_analysis.process_pending_jobs(session, limit=1) == 1
+    job = session.scalar(select(ProofAnalysisJob).where(ProofAnalysisJob.proof_id == proof.id))
+    assert (job.status, job.attempts) == ("QUEUED", 1)
+    assert "provider down" in job.last_error
+    assert job.error_code == proof_analysis.ERROR_AI_FAILED
+
+    assert proof_analysis.process_pending_jobs(session) == 1
+    session.refresh(job)
+    session.refresh(proof)
+    assert (job.status, job.attempts) == ("FAILED", 2)
+    assert proof.analysis_status == proof_analysis.FAILED
+    # The OCR step committed before the advisor call failed, and only ran once.
+    assert proof.metadata_["ocr_status"] is not None
+    assert job.ocr_completed_at is not None
+    ocr_runs = session.scalars(
+        select(AuditLog).where(AuditLog.action == "INVOICE_OCR_RUN", AuditLog.entity_id == proof.id)
+    ).all()
+    assert len(ocr_runs) == 1
+
+
+def test_advisor_fallback_is_retried_until_a_real_verdict(db_session, advisor_calls, override_settings, monkeypatch):
+    override_settings(PROOF_ANALYSIS_MAX_ATTEMPTS=3, PROOF_ANALYSIS_RETRY_SECONDS=0)
+    answers = [_fallback_ai_result("deadline_exceeded"), dict(_ADVICE)]
+
+    def flaky_advisor(**kwargs):
+        advisor_calls.append(kwargs)
+        return answers.pop(0)
+
+    monkeypatch.setattr(proof_analysis, "call_ai_proof_advisor", flaky_advisor)
+    proof = _submit(db_session, _milestone(db_session))
+
+    assert proof_analysis.process_pending_jobs(db_session, limit=1) == 1
+    job = db_session.scalar(select(ProofAnalysisJob).where(ProofAnalysisJob.proof_id == proof.id))
+    db_session.refresh(proof)
+    assert (job.status, job.error_code) == ("QUEUED", proof_analysis.ERROR_AI_FAILED)
+    assert proof.ai_risk_level is None
+
+    assert proof_analysis.process_pending_jobs(db_session) == 1
+    db_session.refresh(job)
+    db_session.refresh(proof)
+    assert (job.status, job.attempts, job.error_code) == ("DONE", 2, None)
+    assert (proof.ai_risk_level, proof.ai_flags) == ("clean", [])
+    assert len(advisor_calls) == 2
+
+
+def test_advisor_fallback_is_kept_once_attempts_run_out(db_session, override_settings, monkeypatch):
+    override_settings(AI_PROOF_ADVISOR_ENABLED=True, PROOF_ANALYSIS_MAX_ATTEMPTS=2, PROOF_ANALYSIS_RETRY_SECONDS=0)
+    monkeypatch.setattr(
+        proof_analysis, "call_ai_proof_advisor", lambda **kwargs: _fallback_ai_result("circuit_breaker_open")
+    )
+    proof = _submit(db_session, _milestone(db_session))
+
+    assert proof_analysis.process_pending_jobs(db_session) == 2
+    job = db_session.scalar(select(ProofAnalysisJob).where(ProofAnalysisJob.proof_id == proof.id))
+    db_session.refresh(proof)
+    assert (job.status, job.error_code) == ("FAILED", proof_analysis.ERROR_AI_FAILED)
+    assert proof.analysis_status == proof_analysis.FAILED
+    assert proof.ai_risk_level == "warning"
+    assert "ai_unavailable" in proof.ai_flags
+
+
+def test_jobs_of_dead_workers_are_reclaimed_after_the_lease(db_session, advisor_calls, override_settings):
+    override_settings(PROOF_ANALYSIS_LEASE_SECONDS=60)
+    proof = _submit(db_session, _milestone(db_session))
+    assert proof_analysis.claim_next_job(db_session, worker="crashed") is not None
+    assert proof_analysis.claim_next_job(db_session, worker="other") is None
+
+    db_session.execute(
+        update(ProofAnalysisJob)
+        .where(ProofAnalysisJob.proof_id == proof.id)
+        .values(locked_at=utcnow() - timedelta(minutes=5))
+    )
+    db_session.commit()
+
+    assert proof_analysis.process_pending_jobs(db_session, worker="other") == 1
+    job = db_session.scalar(select(ProofAnalysisJob).where(ProofAnalysisJob.proof_id == proof.id))
+    assert (job.status, job.attempts) == ("DONE", 2)
+
+
+def test_worker_pool_drains_the_queue(file_session, advisor_calls):
+    session, factory = file_session
+    proof_ids = [_submit(session, _milestone(session)).id for _ in range(5)]
+    pool = proof_analysis.ProofAnalysisPool(factory)
+
+    pool.start(workers=3, poll_ms=10)
+    try:
+        assert pool.running == 3
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            statuses = set(session.scalars(select(Proof.analysis_status).where(Proof.id.in_(proof_ids))))
+            session.commit()
+            if statuses == {proof_analysis.DONE}:
+                break
+            time.sleep(0.02)
+    finally:
+        pool.stop()
+
+    assert statuses == {proof_analysis.DONE}
+    assert len(advisor_calls) == 5
+    assert pool.running == 0
+
+
+@pytest.mark.anyio
+async def test_analysis_endpoint_reports_progress(client, sender_headers, db_session, advisor_calls):
+    proof = _submit(db_session, _milestone(db_session))
+
+    queued = await client.get(f"/proofs/{proof.id}/analysis", headers=sender_headers)
+    assert queued.status_code == 200
+    assert queued.json()["analysis_status"] == "QUEUED"
+
+    proof_analysis.process_pending_jobs(db_session)
+    done = await client.get(f"/proofs/{proof.id}/analysis", headers=sender_headers)
+    body = done.json()
+    assert body["analysis_status"] == "DONE"
+    assert body["attempts"] == 1
+    assert body["ai_risk_level"] == "clean"
+
+    missing = await client.get("/proofs/999999/analysis", headers=sender_headers)
+    assert missing.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_analysis_endpoint_reports_error_codes_not_exceptions(
+    client, sender_headers, db_session, advisor_calls, monkeypatch
+):
+    def broken_advisor(**kwargs):
+        raise RuntimeError("POST https://ai.internal.example/v1/responses: 503")
+
+    monkeypatch.setattr(proof_analysis, "call_ai_proof_advisor", broken_advisor)
+    proof = _submit(db_session, _milestone(db_session))
+    proof_analysis.process_pending_jobs(db_session, limit=1)
+
+    body = (await client.get(f"/proofs/{proof.id}/analysis", headers=sender_headers)).json()
+    assert body["error_code"] == proof_analysis.ERROR_AI_FAILED
+    assert "last_error" not in body
+    assert "ai.internal.example" not in str(body)
+
+
+@pytest.mark.anyio
+async def test_health_reports_proof_analysis(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "enqueued" in response.json()["proof_analysis"]
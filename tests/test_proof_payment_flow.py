@@ -7,7 +7,6 @@ import pytest
 from fastapi import HTTPException, status
 from sqlalchemy import select
 
-from app.config import get_settings
 from app.models import (
     EscrowAgreement,
     EscrowStatus,
@@ -18,6 +17,7 @@ from app.models import (
     User,
 )
 from app.schemas.proof import ProofCreate
+from app.services import proof_analysis
 from app.services import proofs as proofs_service
 
 
@@ -154,10 +154,8 @@ async def test_proof_approval_triggers_payment(client, auth_headers, db_session)
     assert second_exec.json()["status"] == "SENT"
 
 
-def test_submit_proof_persists_ai_columns(monkeypatch, db_session):
-    settings = get_settings()
-    original_flag = settings.AI_PROOF_ADVISOR_ENABLED
-    settings.AI_PROOF_ADVISOR_ENABLED = True
+def test_submit_proof_persists_ai_columns(monkeypatch, db_session, override_settings):
+    override_settings(AI_PROOF_ADVISOR_ENABLED=True)
     stub_result = {
         "risk_level": "warning",
         "score": 0.66,
@@ -165,66 +163,65 @@ def test_submit_proof_persists_ai_columns(monkeypatch, db_session):
         "explanation": "Analyse réussie",
     }
     monkeypatch.setattr(
-        proofs_service, "call_ai_proof_advisor", lambda **_: stub_result,
+        proof_analysis, "call_ai_proof_advisor", lambda **_: stub_result,
     )
-    try:
-        client = User(username="ai-client", email="ai-client@example.com")
-        provider = User(username="ai-provider", email="ai-provider@example.com")
-        db_session.add_all([client, provider])
-        db_session.flush()
-
-        escrow = EscrowAgreement(
-            client_id=client.id,
-            provider_id=provider.id,
-            amount_total=Decimal("100.00"),
-            currency="USD",
-            status=EscrowStatus.FUNDED,
-            release_conditions_json={"type": "milestone"},
-            deadline_at=datetime.now(tz=UTC),
-        )
-        db_session.add(escrow)
-        db_session.flush()
-
-        milestone = Milestone(
-            escrow_id=escrow.id,
-            idx=1,
-            label="Document",
-            amount=Decimal("25.00"),
-            proof_type="PDF",
-            validator="SENDER",
-            status=MilestoneStatus.WAITING,
-        )
-        db_session.add(milestone)
-        db_session.commit()
-
-        payload = ProofCreate(
-            escrow_id=escrow.id,
-            milestone_idx=1,
-            type="PDF",
-            storage_url="https://storage.example.com/proofs/doc.pdf",
-            sha256="hash-ai-proof",
-            metadata={"invoice_total_amount": 25},
-        )
-
-        proof = proofs_service.submit_proof(db_session, payload, actor="apikey:test")
-        db_session.refresh(proof)
-
-        assert proof.ai_risk_level == stub_result["risk_level"]
-        assert isinstance(proof.ai_score, Decimal)
-        assert proof.ai_score == Decimal("0.66")
-        assert proof.ai_flags == stub_result["flags"]
-        assert proof.ai_explanation == stub_result["explanation"]
-        assert proof.ai_checked_at is not None
-        assert proof.metadata_["ai_assessment"] == stub_result
-    finally:
-        settings.AI_PROOF_ADVISOR_ENABLED = original_flag
+    client = User(username="ai-client", email="ai-client@example.com")
+    provider = User(username="ai-provider", email="ai-provider@example.com")
+    db_session.add_all([client, provider])
+    db_session.flush()
+
+    escrow = EscrowAgreement(
+        client_id=client.id,
+        provider_id=provider.id,
+        amount_total=Decimal("100.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={"type": "milestone"},
+        deadline_at=datetime.now(tz=UTC),
+    )
+    db_session.add(escrow)
+    db_session.flush()
+
+    milestone = Milestone(
+        escrow_id=escrow.id,
+        idx=1,
+        label="Document",
+        amount=Decimal("25.00"),
+        proof_type="PDF",
+        validator="SENDER",
+        status=MilestoneStatus.WAITING,
+    )
+    db_session.add(milestone)
+    db_session.commit()
+
+    payload = ProofCreate(
+        escrow_id=escrow.id,
+        milestone_idx=1,
+        type="PDF",
+        storage_url="https://storage.example.com/proofs/doc.pdf",
+        sha256="hash-ai-proof",
+        metadata={"invoice_total_amount": 25},
+    )
+
+    proof = proofs_service.submit_proof(db_session, payload, actor="apikey:test")
+    assert proof.analysis_status == "QUEUED"
+    assert proof_analysis.process_pending_jobs(db_session) == 1
+    db_session.refresh(proof)
+
+    assert proof.ai_risk_level == stub_result["risk_level"]
+    assert isinstance(proof.ai_score, Decimal)
+    assert proof.ai_score == Decimal("0.66")
+    assert proof.ai_flags == stub_result["flags"]
+    assert proof.ai_explanation == stub_result["explanation"]
+    assert proof.ai_checked_at is not None
+    assert proof.metadata_["ai_assessment"] == stub_result
 
 
 def test_submit_proof_uses_ocr_invoice_fields(monkeypatch, db_session):
     escrow, milestone = _create_pdf_milestone(db_session)
 
     monkeypatch.setattr(
-        proofs_service,
+        proof_analysis,
         "run_invoice_ocr_if_enabled",
         lambda _bytes: {
             "ocr_status": "success",
@@ -244,6 +241,8 @@ def test_submit_proof_uses_ocr_invoice_fields(monkeypatch, db_session):
     )
 
     proof = proofs_service.submit_proof(db_session, payload, actor="apikey:test")
+    assert proof.analysis_status == "QUEUED"
+    assert proof_analysis.process_pending_jobs(db_session) == 1
     db_session.refresh(proof)
 
     assert proof.invoice_total_amount == Decimal("321.00")
@@ -258,7 +257,7 @@ def test_submit_proof_prefers_user_invoice_fields(monkeypatch, db_session):
     escrow, milestone = _create_pdf_milestone(db_session)
 
     monkeypatch.setattr(
-        proofs_service,
+        proof_analysis,
         "run_invoice_ocr_if_enabled",
         lambda _bytes: {
             "ocr_status": "success",
@@ -278,6 +277,8 @@ def test_submit_proof_prefers_user_invoice_fields(monkeypatch, db_session):
     )
 
     proof = proofs_service.submit_proof(db_session, payload, actor="apikey:test")
+    assert proof.analysis_status == "QUEUED"
+    assert proof_analysis.process_pending_jobs(db_session) == 1
     db_session.refresh(proof)
 
     assert proof.invoice_total_amount == Decimal("150.50")
@@ -288,11 +289,11 @@ def test_submit_proof_prefers_user_invoice_fields(monkeypatch, db_session):
     assert proof.metadata_["ocr_raw"]["currency"] == "eur"
 
 
-def test_submit_proof_invalid_currency_returns_422(monkeypatch, db_session):
+def test_submit_proof_invalid_ocr_currency_is_recorded(monkeypatch, db_session):
     escrow, milestone = _create_pdf_milestone(db_session)
 
     monkeypatch.setattr(
-        proofs_service,
+        proof_analysis,
         "run_invoice_ocr_if_enabled",
         lambda _bytes: {"ocr_status": "success", "ocr_provider": "dummy", "currency": "usd4"},
     )
@@ -306,6 +307,27 @@ def test_submit_proof_invalid_currency_returns_422(monkeypatch, db_session):
         metadata={},
     )
 
+    proof = proofs_service.submit_proof(db_session, payload, actor="apikey:test")
+    proof_analysis.process_pending_jobs(db_session)
+    db_session.refresh(proof)
+
+    assert proof.analysis_status == "DONE"
+    assert proof.invoice_currency is None
+    assert proof.metadata_["invoice_normalization_errors"]
+
+
+def test_submit_proof_invalid_user_currency_returns_422(db_session):
+    escrow, milestone = _create_pdf_milestone(db_session)
+
+    payload = ProofCreate(
+        escrow_id=escrow.id,
+        milestone_idx=1,
+        type="PDF",
+        storage_url="https://storage.example.com/proofs/doc.pdf",
+        sha256="hash-invoice-proof-invalid-user-currency",
+        metadata={"invoice_currency": "usd4"},
+    )
+
     with pytest.raises(HTTPException) as exc:
         proofs_service.submit_proof(db_session, payload, actor="apikey:test")
 
@@ -129,40 +129,32 @@ async def test_psp_webhook_settles_payment(client, db_session):
 
 
 @pytest.mark.anyio
-async def test_psp_webhook_accepts_next_secret(client, db_session):
-    settings = get_settings()
+async def test_psp_webhook_accepts_next_secret(client, db_session, override_settings):
     db_session.query(PSPWebhookEvent).delete()
     db_session.commit()
     assert db_session.query(PSPWebhookEvent).count() == 0
-    original_secret = settings.psp_webhook_secret
-    original_next = settings.psp_webhook_secret_next
-    try:
-        settings.psp_webhook_secret = None
-        settings.psp_webhook_secret_next = "next-secret"
-        payload = {"type": "payment.settled"}
-        body = json.dumps(payload).encode()
-        timestamp = str(utcnow().timestamp())
-        payload_to_sign = timestamp.encode() + b"." + body
-        signature = hmac.new(
-            settings.psp_webhook_secret_next.encode(),
-            payload_to_sign,
-            hashlib.sha256,
-        ).hexdigest()
-
-        response = await client.post(
-            "/psp/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-PSP-Signature": signature,
-                "X-PSP-Timestamp": timestamp,
-                "X-PSP-Event-Id": "evt-rot", 
-            },
-        )
-        assert response.status_code == 200, response.text
-    finally:
-        settings.psp_webhook_secret = original_secret
-        settings.psp_webhook_secret_next = original_next
+    settings = override_settings(psp_webhook_secret=None, psp_webhook_secret_next="next-secret")
+    payload = {"type": "payment.settled"}
+    body = json.dumps(payload).encode()
+    timestamp = str(utcnow().timestamp())
+    payload_to_sign = timestamp.encode() + b"." + body
+    signature = hmac.new(
+        settings.psp_webhook_secret_next.encode(),
+        payload_to_sign,
+        hashlib.sha256,
+    ).hexdigest()
+
+    response = await client.post(
+        "/psp/webhook",
+        content=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-PSP-Signature": signature,
+            "X-PSP-Timestamp": timestamp,
+            "X-PSP-Event-Id": "evt-rot", 
+        },
+    )
+    assert response.status_code == 200, response.text
 
 
 @pytest.mark.anyio
@@ -260,21 +252,16 @@ async def test_psp_webhook_replay_guard_blocks_recent_event(client):
 
 
 @pytest.mark.anyio
-async def test_psp_webhook_missing_secret(client):
+async def test_psp_webhook_missing_secret(client, override_settings):
     """The PSP webhook should fail-fast if the secret is not configured."""
 
-    settings = get_settings()
-    original_secret = settings.psp_webhook_secret
-    try:
-        settings.psp_webhook_secret = None
-        response = await client.post(
-            "/psp/webhook",
-            content=b"{}",
-            headers={"Content-Type": "application/json"},
-        )
-        assert response.status_code == 503
-    finally:
-        settings.psp_webhook_secret = original_secret
+    override_settings(psp_webhook_secret=None)
+    response = await client.post(
+        "/psp/webhook",
+        content=b"{}",
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 503
 
 
 def test_psp_secrets_refresh_each_call(monkeypatch):
@@ -0,0 +1,105 @@
+"""Per-request SQL statement counting, Server-Timing and query budgets."""
+from datetime import UTC, datetime
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import select
+
+from app.core.query_stats import capture_queries
+from app.models import EscrowAgreement, EscrowStatus, Milestone, User
+
+
+def _escrow_with_milestones(db_session, count: int) -> int:
+    client_user = User(username=f"qs-client-{uuid4().hex[:8]}", email=f"qs-c-{uuid4().hex[:8]}@example.com")
+    provider = User(username=f"qs-prov-{uuid4().hex[:8]}", email=f"qs-p-{uuid4().hex[:8]}@example.com")
+    db_session.add_all([client_user, provider])
+    db_session.flush()
+    escrow = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider.id,
+        amount_total=Decimal("300.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={},
+        deadline_at=datetime.now(tz=UTC),
+    )
+    db_session.add(escrow)
+    db_session.flush()
+    for idx in range(1, count + 1):
+        db_session.add(
+            Milestone(
+                escrow_id=escrow.id,
+                idx=idx,
+                label=f"step {idx}",
+                amount=Decimal("100.00"),
+                proof_type="PHOTO",
+                validator="SENDER",
+                proof_requirements={},
+            )
+        )
+    db_session.commit()
+    return escrow.id
+
+
+@pytest.mark.anyio
+async def test_server_timing_header_reports_db_time(client, admin_headers):
+    response = await client.get("/alerts", headers=admin_headers)
+
+    header = response.headers["server-timing"]
+    assert header.startswith("db;dur=")
+    assert 'queries"' in header
+
+
+@pytest.mark.anyio
+async def test_request_histograms_are_exported(client, admin_headers):
+    def _count() -> float:
+        return REGISTRY.get_sample_value(
+            "kobatella_request_db_queries_count", {"method": "GET", "route": "/alerts"}
+        ) or 0.0
+
+    before = _count()
+    await client.get("/alerts", headers=admin_headers)
+    assert _count() == before + 1
+
+
+@pytest.mark.anyio
+async def test_milestone_listing_stays_within_budget(client, db_session, sender_headers, query_budget):
+    escrow_id = _escrow_with_milestones(db_session, 3)
+
+    with query_budget(12, max_repeats=1) as stats:
+        response = await client.get(f"/escrows/{escrow_id}/milestones", headers=sender_headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert stats.count > 0
+
+
+def test_repeated_statements_are_flagged(db_session, query_budget):
+    escrow_id = _escrow_with_milestones(db_session, 4)
+    ids = db_session.scalars(select(Milestone.id).where(Milestone.escrow_id == escrow_id)).all()
+    db_session.expunge_all()
+
+    with pytest.raises(AssertionError, match="N\\+1"):
+        with query_budget(50, max_repeats=2):
+            for milestone_id in ids:
+                db_session.get(Milestone, milestone_id)
+
+
+def test_budget_overrun_fails(db_session, query_budget):
+    with pytest.raises(AssertionError, match="query budget 1 exceeded"):
+        with query_budget(1):
+            db_session.scalars(select(User)).all()
+            db_session.scalars(select(Milestone)).all()
+
+
+def test_capture_queries_nests(db_session):
+    with capture_queries() as outer:
+        with capture_queries() as inner:
+            db_session.scalars(select(User)).all()
+        db_session.scalars(select(Milestone)).all()
+
+    assert inner.count == 1
+    assert outer.count == 2
+    assert outer.total_ms >= inner.total_ms
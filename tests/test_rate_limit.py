@@ -0,0 +1,147 @@
+"""Token-bucket rate limiting hooked into require_scope."""
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.api_key import ApiKey, ApiScope
+from app.models.rate_limit import RateLimitBucket
+from app.services import rate_limit
+from app.services.rate_limit import (
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    RateLimit,
+    get_rate_limit_stats,
+)
+from app.utils.apikey import hash_key
+
+
+def _sender_headers(db_session) -> dict[str, str]:
+    token = f"rl-{uuid4().hex}"
+    db_session.add(
+        ApiKey(
+            name=f"rl-{uuid4().hex}",
+            prefix=f"rl{uuid4().hex[:10]}",
+            key_hash=hash_key(token),
+            scope=ApiScope.sender,
+            is_active=True,
+        )
+    )
+    db_session.commit()
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def bucket_sessions(db_session):
+    # The DB backend opens its own sessions; keep them on the test connection so
+    # they see (and roll back with) the rows of the test.
+    return lambda: Session(bind=db_session.get_bind(), autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture(autouse=True)
+def db_backend(bucket_sessions, monkeypatch):
+    backend = DatabaseRateLimitBackend(session_factory=bucket_sessions)
+    monkeypatch.setitem(rate_limit._RATE_LIMITER._backends, "db", backend)
+    return backend
+
+
+@pytest.fixture
+def tight_sender_limit(override_settings):
+    return override_settings(
+        RATE_LIMIT_ENABLED=True, RATE_LIMIT_SENDER_PER_MINUTE=6, RATE_LIMIT_SENDER_BURST=2
+    )
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("backend", ["memory", "db"])
+async def test_sender_key_is_throttled_per_route(
+    client, db_session, tight_sender_limit, override_settings, backend
+):
+    override_settings(RATE_LIMIT_BACKEND=backend)
+    headers = _sender_headers(db_session)
+
+    statuses = [(await client.get("/escrows/999999", headers=headers)).status_code for _ in range(3)]
+    assert statuses[:2] == [404, 404]
+    assert statuses[2] == 429
+
+    throttled = await client.get("/escrows/999999", headers=headers)
+    assert throttled.status_code == 429
+    assert throttled.json()["error"]["code"] == "RATE_LIMITED"
+    assert int(throttled.headers["Retry-After"]) >= 1
+
+    # Another route has its own bucket.
+    other = await client.get("/escrows/999999/milestones", headers=headers)
+    assert other.status_code != 429
+
+    stats = get_rate_limit_stats()
+    assert stats["backend"] == backend
+    assert stats["throttled"] == 2
+
+
+@pytest.mark.anyio
+async def test_keys_do_not_share_buckets(client, db_session, tight_sender_limit):
+    first = _sender_headers(db_session)
+    second = _sender_headers(db_session)
+
+    for _ in range(2):
+        await client.get("/escrows/999999", headers=first)
+    assert (await client.get("/escrows/999999", headers=first)).status_code == 429
+    assert (await client.get("/escrows/999999", headers=second)).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_admin_scope_unlimited_by_default(client, admin_headers, tight_sender_limit):
+    for _ in range(5):
+        response = await client.get("/alerts", headers=admin_headers)
+        assert response.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_disabled_limiter_never_throttles(client, db_session, tight_sender_limit, override_settings):
+    override_settings(RATE_LIMIT_ENABLED=False)
+    headers = _sender_headers(db_session)
+
+    for _ in range(4):
+        assert (await client.get("/escrows/999999", headers=headers)).status_code == 404
+
+
+@pytest.mark.parametrize("backend_cls", [MemoryRateLimitBackend, DatabaseRateLimitBackend])
+def test_bucket_refills_over_time(bucket_sessions, backend_cls):
+    backend = backend_cls() if backend_cls is MemoryRateLimitBackend else backend_cls(bucket_sessions)
+    limit = RateLimit(capacity=2, refill_per_second=1.0)
+    key = f"unit:{uuid4().hex}"
+
+    assert backend.consume(key, limit, now=100.0).allowed
+    assert backend.consume(key, limit, now=100.0).allowed
+    denied = backend.consume(key, limit, now=100.25)
+    assert not denied.allowed
+    assert denied.retry_after_seconds == pytest.approx(0.75)
+
+    assert backend.consume(key, limit, now=101.0).allowed
+    # The bucket never refills beyond its capacity.
+    assert backend.consume(key, limit, now=500.0).remaining == pytest.approx(1.0)
+
+
+def test_db_backend_persists_shared_state(db_session, bucket_sessions):
+    limit = RateLimit(capacity=3, refill_per_second=0.5)
+    key = f"shared:{uuid4().hex}"
+
+    DatabaseRateLimitBackend(bucket_sessions).consume(key, limit, now=10.0)
+    # A second worker (fresh backend instance) sees the same bucket.
+    decision = DatabaseRateLimitBackend(bucket_sessions).consume(key, limit, now=10.0)
+
+    assert decision.remaining == pytest.approx(1.0)
+    row = db_session.scalars(select(RateLimitBucket).where(RateLimitBucket.bucket_key == key)).one()
+    assert row.tokens == pytest.approx(1.0)
+    # Both updates landed although they carried the same timestamp.
+    assert row.version == 1
+
+
+def test_db_backend_leaves_request_session_alone(db_session, db_backend):
+    staged = ApiKey(name=f"rl-{uuid4().hex}", prefix="rlstaged", key_hash=uuid4().hex, scope=ApiScope.sender)
+    db_session.add(staged)
+
+    db_backend.consume(f"own:{uuid4().hex}", RateLimit(capacity=1, refill_per_second=1.0), now=1.0)
+
+    assert staged in db_session.new
@@ -0,0 +1,195 @@
+"""Read-replica routing for safe GET handlers."""
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, select
+from starlette.requests import Request
+
+from app import db as db_module
+from app.core import read_replica
+from app.models import Alert, Base
+from app.models.cache_version import CacheVersion
+
+
+def _request(method: str = "GET", token: str = "Bearer replica-client") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": method,
+            "path": "/alerts",
+            "headers": [(b"authorization", token.encode())],
+        }
+    )
+
+
+@pytest.fixture
+def replica_pair(tmp_path, override_settings):
+    """A primary SQLite file plus a replica kept in sync by the local copier."""
+
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    bootstrap = create_engine(primary_url)
+    Base.metadata.create_all(bootstrap)
+    bootstrap.dispose()
+
+    db_module.close_engine()
+    settings = override_settings(
+        database_url=primary_url,
+        DATABASE_READ_URL=replica_url,
+        READ_REPLICA_LAG_CHECK_SECONDS=60.0,
+        READ_REPLICA_MAX_LAG_SECONDS=5.0,
+    )
+
+    read_replica.write_replica_heartbeat()
+    read_replica.copy_sqlite_replica()
+    read_replica.refresh_replica_lag()
+    yield settings
+    asyncio.run(read_replica.close_read_engines())
+    db_module.close_engine()
+
+
+def _add_alert_on_primary(kind: str) -> None:
+    with db_module.get_sessionmaker()() as session:
+        session.add(Alert(type=kind, message="m", payload_json={}))
+        session.commit()
+
+
+def test_reads_go_to_replica_when_in_sync(replica_pair):
+    _add_alert_on_primary("AFTER_COPY")  # not replicated yet
+
+    assert read_replica.measure_replica_lag() == 0.0
+    session_gen = read_replica.get_read_db(_request())
+    session = next(session_gen)
+    try:
+        assert session.get_bind() is read_replica.read_engine
+        assert session.scalars(select(Alert).where(Alert.type == "AFTER_COPY")).all() == []
+    finally:
+        session_gen.close()
+
+    read_replica.copy_sqlite_replica()
+    session_gen = read_replica.get_read_db(_request())
+    session = next(session_gen)
+    try:
+        assert len(session.scalars(select(Alert).where(Alert.type == "AFTER_COPY")).all()) == 1
+    finally:
+        session_gen.close()
+
+
+def test_lagging_replica_falls_back_to_primary(replica_pair, override_settings):
+    time.sleep(0.01)
+    read_replica.write_replica_heartbeat()  # primary moves on, replica does not
+    override_settings(READ_REPLICA_MAX_LAG_SECONDS=0.001)
+
+    assert read_replica.refresh_replica_lag() > 0
+    assert read_replica.use_replica(_request()) is False
+    stats = read_replica.get_replica_stats()
+    assert stats["configured"] is True
+    assert stats["primary_fallbacks"] >= 1
+
+
+def test_missing_heartbeat_means_unknown_lag(replica_pair):
+    with db_module.get_sessionmaker()() as session:
+        session.query(CacheVersion).filter(CacheVersion.name == read_replica.REPLICA_HEARTBEAT_NAME).delete()
+        session.commit()
+
+    assert read_replica.refresh_replica_lag() is None
+    assert read_replica.use_replica(_request()) is False
+
+
+@pytest.mark.anyio
+async def test_writers_read_their_own_writes_from_primary(replica_pair):
+    async def _app(scope, receive, send):
+        return None
+
+    middleware = read_replica.ReadYourWritesMiddleware(_app)
+    await middleware({"type": "http", "method": "POST", "headers": [(b"authorization", b"Bearer writer")]}, None, None)
+
+    assert read_replica.use_replica(_request(token="Bearer writer")) is False
+    assert read_replica.use_replica(_request(token="Bearer someone-else")) is True
+
+
+@pytest.mark.anyio
+async def test_sticky_cookie_routes_the_next_read_to_primary_on_any_worker(replica_pair):
+    async def _app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+
+    sent = []
+
+    async def _send(message):
+        sent.append(message)
+
+    middleware = read_replica.ReadYourWritesMiddleware(_app)
+    await middleware({"type": "http", "method": "POST", "headers": [(b"authorization", b"Bearer writer")]}, None, _send)
+    cookie = dict(sent[0]["headers"])[b"set-cookie"].decode().split(";", 1)[0]
+    assert cookie.startswith(f"{read_replica.READ_PRIMARY_COOKIE}=")
+
+    read_replica.reset_read_routing()  # another worker never saw the write
+    read_replica.refresh_replica_lag()
+    request = Request(
+        {"type": "http", "method": "GET", "path": "/alerts", "headers": [(b"cookie", cookie.encode())]}
+    )
+    assert read_replica.use_replica(request) is False
+
+    forged = f"{read_replica.READ_PRIMARY_COOKIE}={time.time() + 3600}".encode()
+    request = Request({"type": "http", "method": "GET", "path": "/alerts", "headers": [(b"cookie", forged)]})
+    assert read_replica.use_replica(request) is True
+
+
+def test_read_only_session_rejects_writes(replica_pair):
+    session_gen = read_replica.get_read_db(None)
+    session = next(session_gen)
+    try:
+        session.add(Alert(type="NOPE", message="m", payload_json={}))
+        with pytest.raises(read_replica.ReadOnlySessionError):
+            session.flush()
+    finally:
+        session_gen.close()
+
+
+def test_stale_lag_is_refreshed_once_off_the_request_path(replica_pair, override_settings, monkeypatch):
+    override_settings(READ_REPLICA_LAG_CHECK_SECONDS=0.0)
+    release = threading.Event()
+    calls: list[str] = []
+
+    def _slow_measure(engine=None):
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        return 0.0
+
+    monkeypatch.setattr(read_replica, "measure_replica_lag", _slow_measure)
+
+    # Stale reading: callers fall back without waiting, and only one refresh runs.
+    assert [read_replica.use_replica(_request()) for _ in range(5)] == [False] * 5
+    assert calls == ["replica-lag"]
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while read_replica._LAG_MONITOR._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    override_settings(READ_REPLICA_LAG_CHECK_SECONDS=60.0)
+    assert read_replica.use_replica(_request()) is True
+
+
+def test_no_replica_configured_uses_primary():
+    assert read_replica.use_replica(_request()) is False
+    assert read_replica.get_replica_stats() == {"configured": False}
+
+
+@pytest.mark.anyio
+async def test_health_reports_replica(client):
+    response = await client.get("/health")
+    assert response.json()["read_replica"]["configured"] is False
+
+
+def test_heartbeat_upserts_its_row(replica_pair):
+    read_replica.write_replica_heartbeat()
+    read_replica.write_replica_heartbeat()
+
+    with db_module.get_sessionmaker()() as session:
+        rows = session.scalars(
+            select(CacheVersion).where(CacheVersion.name == read_replica.REPLICA_HEARTBEAT_NAME)
+        ).all()
+    # The fixture wrote the first beat on an empty table.
+    assert [row.version for row in rows] == [3]
@@ -0,0 +1,224 @@
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    Alert,
+    AllowedPayee,
+    Base,
+    EscrowAgreement,
+    EscrowBalance,
+    EscrowDeposit,
+    EscrowStatus,
+    Payment,
+    PaymentStatus,
+    UsageMandate,
+    User,
+)
+from app.schemas.spend import PurchaseCreate
+from app.services import ledger, reconciliation
+from app.services import spend as spend_service
+from app.services.usage import spend_to_allowed_payee
+
+
+def _escrow(session, deposit: str | None = "100.00") -> EscrowAgreement:
+    client_user = User(username=f"client-{uuid4().hex[:8]}", email=f"c-{uuid4().hex[:6]}@example.com")
+    provider_user = User(username=f"provider-{uuid4().hex[:8]}", email=f"p-{uuid4().hex[:6]}@example.com")
+    session.add_all([client_user, provider_user])
+    session.flush()
+    escrow = EscrowAgreement(
+        client_id=client_user.id,
+        provider_id=provider_user.id,
+        amount_total=Decimal("100.00"),
+        currency="USD",
+        status=EscrowStatus.FUNDED,
+        release_conditions_json={},
+        deadline_at=datetime.now(tz=UTC),
+    )
+    session.add(escrow)
+    session.flush()
+    if deposit:
+        session.add(EscrowDeposit(escrow_id=escrow.id, amount=Decimal(deposit), idempotency_key=f"dep-{uuid4().hex}"))
+    session.commit()
+    return escrow
+
+
+def _mismatches(report, entity: str, entity_id: int) -> set[str]:
+    return {
+        item["check"] for item in report["details"] if item["entity"] == entity and item["entity_id"] == entity_id
+    }
+
+
+def test_consistent_rows_reconcile_cleanly(db_session, make_users_merchants_mandate):
+    escrow = _escrow(db_session)
+    db_session.add(Payment(escrow_id=escrow.id, amount=Decimal("30.00"), status=PaymentStatus.SETTLED))
+    db_session.commit()
+    sender, beneficiary, merchant_id = make_users_merchants_mandate(total="50.00")
+    spend_service.create_purchase(
+        db_session,
+        PurchaseCreate(
+            sender_id=sender.id,
+            beneficiary_id=beneficiary.id,
+            merchant_id=merchant_id,
+            amount=Decimal("20.00"),
+            currency="USD",
+        ),
+        idempotency_key=f"buy-{uuid4().hex}",
+    )
+    mandate = db_session.scalar(select(UsageMandate).where(UsageMandate.beneficiary_id == beneficiary.id))
+
+    report = reconciliation.reconcile(db_session, workers=1, chunk_size=2)
+
+    assert _mismatches(report, "EscrowAgreement", escrow.id) == set()
+    assert _mismatches(report, "UsageMandate", mandate.id) == set()
+    assert report["rows"] >= 2 and report["chunks"] >= 2
+    assert report["rows_per_second"] is not None
+
+
+def test_drift_is_reported_and_alerted(db_session, make_users_merchants_mandate):
+    drifted = _escrow(db_session)
+    db_session.execute(
+        update(EscrowBalance).where(EscrowBalance.escrow_id == drifted.id).values(deposited=Decimal("999.00"))
+    )
+    overdrawn = _escrow(db_session, deposit="10.00")
+    db_session.add(Payment(escrow_id=overdrawn.id, amount=Decimal("25.00"), status=PaymentStatus.SENT))
+    payee = AllowedPayee(
+        escrow_id=drifted.id,
+        payee_ref="PAYEE-1",
+        label="Payee",
+        spent_today=Decimal("0"),
+        spent_total=Decimal("12.00"),
+    )
+    db_session.add(payee)
+    _, beneficiary, _ = make_users_merchants_mandate(total="50.00")
+    mandate = db_session.scalar(select(UsageMandate).where(UsageMandate.beneficiary_id == beneficiary.id))
+    mandate.total_spent = Decimal("5.00")
+    db_session.commit()
+
+    report = reconciliation.reconcile(db_session, workers=1, chunk_size=3)
+
+    assert report["ok"] is False
+    assert _mismatches(report, "EscrowAgreement", drifted.id) == {"escrow_balance"}
+    assert "escrow_overdrawn" in _mismatches(report, "EscrowAgreement", overdrawn.id)
+    assert _mismatches(report, "AllowedPayee", payee.id) == {"payee_spent"}
+    assert _mismatches(report, "UsageMandate", mandate.id) == {"mandate_spent"}
+    alerts = db_session.scalars(select(Alert).where(Alert.type == reconciliation.ALERT_TYPE)).all()
+    assert len(alerts) == report["alerts"] == report["discrepancies"]
+
+
+def test_alerts_are_capped(db_session, override_settings):
+    override_settings(RECONCILE_MAX_ALERTS=1)
+    for _ in range(2):
+        escrow = _escrow(db_session)
+        db_session.execute(
+            update(EscrowBalance).where(EscrowBalance.escrow_id == escrow.id).values(paid=Decimal("1.00"))
+        )
+    db_session.commit()
+
+    report = reconciliation.reconcile(db_session, workers=1)
+
+    assert report["discrepancies"] >= 2
+    assert report["alerts"] == 1
+
+
+def test_scheduled_runs_do_not_repeat_open_alerts(db_session):
+    escrow = _escrow(db_session)
+    db_session.execute(
+        update(EscrowBalance).where(EscrowBalance.escrow_id == escrow.id).values(paid=Decimal("1.00"))
+    )
+    db_session.commit()
+
+    first = reconciliation.reconcile(db_session, workers=1)
+    second = reconciliation.reconcile(db_session, workers=1)
+
+    assert "escrow_balance" in _mismatches(second, "EscrowAgreement", escrow.id)
+    assert first["alerts"] >= 1 and second["alerts"] == 0
+    alerts = [
+        alert
+        for alert in db_session.scalars(select(Alert).where(Alert.type == reconciliation.ALERT_TYPE))
+        if alert.payload_json["entity_id"] == escrow.id
+    ]
+    assert len(alerts) == 1
+
+
+def test_opening_balance_counts_toward_mandate_spend(db_session, make_users_merchants_mandate):
+    _, beneficiary, merchant_id = make_users_merchants_mandate(total="50.00")
+    mandate = db_session.scalar(select(UsageMandate).where(UsageMandate.beneficiary_id == beneficiary.id))
+    # Spent before the journal existed: only the backfilled opening transaction records it.
+    mandate.total_spent = Decimal("15.00")
+    ledger.post(
+        db_session,
+        kind=ledger.OPENING_KIND,
+        legs=[
+            (ledger.mandate_account(mandate.id), Decimal("-15.00")),
+            (ledger.merchant_account(merchant_id), Decimal("15.00")),
+        ],
+        currency="USD",
+        source="UsageMandate",
+        source_id=mandate.id,
+    )
+    db_session.commit()
+
+    report = reconciliation.reconcile(db_session, workers=1)
+
+    assert _mismatches(report, "UsageMandate", mandate.id) == set()
+
+
+def test_chunks_run_on_worker_threads(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'recon.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    with factory() as session:
+        escrows = [_escrow(session) for _ in range(7)]
+        session.execute(
+            update(EscrowBalance).where(EscrowBalance.escrow_id == escrows[4].id).values(reserved=Decimal("3.00"))
+        )
+        session.commit()
+
+        report = reconciliation.reconcile(session, workers=3, chunk_size=2, alert=False)
+
+    assert report["workers"] == 3
+    assert report["chunks"] == 4  # 7 escrows in ranges of 2, no mandates
+    assert report["rows"] == 7
+    assert [(item["check"], item["entity_id"]) for item in report["details"]] == [
+        ("escrow_balance", escrows[4].id)
+    ]
+    engine.dispose()
+
+
+def test_usage_spend_events_count_toward_payee_totals(db_session):
+    escrow = _escrow(db_session)
+    payee = AllowedPayee(
+        escrow_id=escrow.id,
+        payee_ref="SHOP",
+        label="Shop",
+        spent_today=Decimal("0"),
+        spent_total=Decimal("0"),
+        last_reset_at=(datetime.now(tz=UTC) - timedelta(days=1)).date(),
+    )
+    db_session.add(payee)
+    db_session.commit()
+
+    spend_to_allowed_payee(
+        db_session,
+        escrow_id=escrow.id,
+        payee_ref="SHOP",
+        amount=Decimal("15.50"),
+        idempotency_key=f"spend-{uuid4().hex}",
+        note=None,
+    )
+
+    report = reconciliation.reconcile(db_session, workers=1)
+
+    assert _mismatches(report, "AllowedPayee", payee.id) == set()
+
+
+@pytest.mark.anyio
+async def test_health_reports_reconciliation(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert "discrepancies" in response.json()["reconciliation"]
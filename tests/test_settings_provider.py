@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings, SettingsProvider, get_settings
+from app.services import psp_stripe
+
+
+@pytest.fixture
+def provider(tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("RATE_LIMIT_SENDER_BURST=7\n")
+    return SettingsProvider(factory=lambda: Settings(_env_file=env_file), env_file=env_file), env_file
+
+
+def _touch(path, content: str) -> None:
+    path.write_text(content)
+    stamp = time.time() + 5  # mtime granularity can be coarse; make the change visible
+    os.utime(path, (stamp, stamp))
+
+
+def test_snapshot_is_immutable_and_stable():
+    settings = get_settings()
+    with pytest.raises(ValidationError):
+        settings.RATE_LIMIT_ENABLED = False
+    assert get_settings() is settings
+
+
+def test_unchanged_env_file_does_not_reload(provider):
+    settings_provider, _ = provider
+    first = settings_provider.get()
+    assert settings_provider.check_for_changes() is False
+    assert settings_provider.get() is first
+
+
+def test_env_file_change_swaps_snapshot_and_notifies(provider):
+    settings_provider, env_file = provider
+    first = settings_provider.get()
+    assert first.RATE_LIMIT_SENDER_BURST == 7
+    seen = []
+    settings_provider.subscribe(lambda old, new: seen.append((old, new)))
+
+    _touch(env_file, "RATE_LIMIT_SENDER_BURST=9\n")
+    assert settings_provider.check_for_changes() is True
+
+    current = settings_provider.get()
+    assert current.RATE_LIMIT_SENDER_BURST == 9
+    assert seen == [(first, current)]
+    assert settings_provider.stats()["reloads"] == 1
+
+
+def test_requested_reload_without_changes_keeps_snapshot(provider):
+    settings_provider, _ = provider
+    first = settings_provider.get()
+    settings_provider.request_reload()
+    assert settings_provider.check_for_changes() is False
+    assert settings_provider.get() is first
+
+
+def test_invalid_env_keeps_previous_snapshot(provider):
+    settings_provider, env_file = provider
+    first = settings_provider.get()
+    _touch(env_file, "RATE_LIMIT_SENDER_BURST=lots\n")
+    assert settings_provider.check_for_changes() is False
+    assert settings_provider.get() is first
+    assert settings_provider.stats()["reload_errors"] == 1
+
+
+def test_refresher_thread_picks_up_changes(provider):
+    settings_provider, env_file = provider
+    settings_provider.get()
+    settings_provider.start_refresher(interval=0.01)
+    try:
+        _touch(env_file, "RATE_LIMIT_SENDER_BURST=11\n")
+        deadline = time.monotonic() + 2
+        while settings_provider.get().RATE_LIMIT_SENDER_BURST != 11 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert settings_provider.get().RATE_LIMIT_SENDER_BURST == 11
+    finally:
+        settings_provider.stop_refresher()
+    assert settings_provider.stats()["refresher_running"] is False
+
+
+def test_override_rejects_unknown_fields(override_settings):
+    with pytest.raises(AttributeError):
+        override_settings(NOT_A_SETTING=True)
+
+
+def test_stripe_client_is_reused_until_stripe_settings_change(override_settings):
+    settings = override_settings(STRIPE_ENABLED=True, STRIPE_SECRET_KEY="sk_test_one")
+    client = psp_stripe.get_stripe_client(settings)
+    assert psp_stripe.get_stripe_client() is client
+
+    override_settings(API_KEY_CACHE_TTL_SECONDS=30)
+    assert psp_stripe.get_stripe_client() is client
+
+    override_settings(STRIPE_SECRET_KEY="sk_test_two")
+    rebuilt = psp_stripe.get_stripe_client()
+    assert rebuilt is not client
+    assert rebuilt.settings.STRIPE_SECRET_KEY == "sk_test_two"
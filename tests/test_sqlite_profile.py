@@ -0,0 +1,78 @@
+"""Opt-in SQLite performance profile and WAL checkpoint job."""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db import sqlite_profile_pragmas
+from app.services.sqlite_maintenance import checkpoint_wal_once, get_sqlite_profile_stats
+
+
+@pytest.fixture
+def profile_enabled(override_settings):
+    return override_settings(SQLITE_PERFORMANCE_PROFILE=True, SQLITE_BUSY_TIMEOUT_MS=4321)
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_profile_applies_pragmas_on_file_sqlite(tmp_path, profile_enabled):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    try:
+        assert _pragma(engine, "journal_mode") == "wal"
+        assert _pragma(engine, "synchronous") == 1  # NORMAL
+        assert _pragma(engine, "busy_timeout") == 4321
+        assert _pragma(engine, "temp_store") == 2  # MEMORY
+        assert _pragma(engine, "cache_size") == -profile_enabled.SQLITE_CACHE_SIZE_KIB
+        assert _pragma(engine, "foreign_keys") == 1
+    finally:
+        engine.dispose()
+
+
+def test_profile_is_opt_in(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plain.db'}")
+    try:
+        assert _pragma(engine, "journal_mode") == "delete"
+    finally:
+        engine.dispose()
+
+
+def test_profile_skips_in_memory_sqlite(profile_enabled):
+    engine = create_engine("sqlite:///:memory:")
+    try:
+        assert _pragma(engine, "journal_mode") == "memory"
+    finally:
+        engine.dispose()
+
+
+def test_invalid_profile_values_are_rejected(profile_enabled, override_settings):
+    settings = override_settings(SQLITE_SYNCHRONOUS="SOMETIMES")
+    with pytest.raises(ValueError):
+        sqlite_profile_pragmas(settings)
+
+
+def test_checkpoint_job_truncates_wal(tmp_path, profile_enabled):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)"))
+            for i in range(50):
+                conn.execute(text("INSERT INTO t (v) VALUES (:v)"), {"v": str(i)})
+        runs_before = get_sqlite_profile_stats()["checkpoints"]["runs"]
+
+        result = checkpoint_wal_once(engine=engine, mode="TRUNCATE")
+
+        assert result is not None
+        assert result["busy"] == 0
+        assert get_sqlite_profile_stats()["checkpoints"]["runs"] == runs_before + 1
+        assert (tmp_path / "wal.db-wal").stat().st_size == 0
+    finally:
+        engine.dispose()
+
+
+def test_checkpoint_job_is_noop_without_profile(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'noop.db'}")
+    try:
+        assert checkpoint_wal_once(engine=engine) is None
+    finally:
+        engine.dispose()
@@ -94,7 +94,7 @@ async def test_funding_session_creates_record_when_stripe_enabled(
             return FakePaymentIntent()
 
     monkeypatch.setattr("app.services.funding.get_settings", lambda: StubSettings())
-    monkeypatch.setattr("app.services.funding.StripeClient", FakeStripeClient)
+    monkeypatch.setattr("app.services.funding.get_stripe_client", FakeStripeClient)
 
     escrow_id = await _create_escrow(client, sender_headers, admin_headers)
 
@@ -158,7 +158,7 @@ async def test_stripe_webhook_marks_funding_succeeded(client, db_session, monkey
         return None
 
     monkeypatch.setattr("app.services.psp_webhooks._current_settings", lambda: stub_settings)
-    monkeypatch.setattr("app.services.psp_webhooks.StripeClient", FakeStripeClient)
+    monkeypatch.setattr("app.services.psp_webhooks.get_stripe_client", FakeStripeClient)
     monkeypatch.setattr(
         "app.services.funding.mark_funding_succeeded", fake_mark_funding_succeeded
     )